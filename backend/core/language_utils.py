@@ -5,7 +5,12 @@ Language Detection and Constants
 提供语言检测功能和中英文验证规则。
 """
 
-from typing import Set
+import re
+from typing import Dict, Iterable, List, Set
+
+
+# CJK 统一表意文字（与 detect_language 的判定范围一致）
+_CJK_PATTERN = re.compile('[\u4e00-\u9fff]')
 
 
 def detect_language(text: str) -> str:
@@ -14,22 +19,56 @@ def detect_language(text: str) -> str:
 
     如果文本中 CJK 字符（中日韩统一表意文字）占比 > 50%，判定为中文，否则为英文。
 
+    快速路径：纯 ASCII 文本直接判定为英文；其余情况用预编译正则统计 CJK 字符，
+    避免逐字符的 Python 循环。
+
     Args:
         text: 待检测文本
 
     Returns:
         "zh" 表示中文，"en" 表示英文
     """
-    if not text or not text.strip():
+    if not text:
+        return "en"
+
+    # 纯 ASCII 不可能包含 CJK 字符
+    if text.isascii():
         return "en"
 
     text = text.strip()
+    if not text:
+        return "en"
 
     # 统计 CJK 字符数量
-    cjk_count = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
+    cjk_count = len(_CJK_PATTERN.findall(text))
 
     # 如果 CJK 字符占比 > 50%，判定为中文
-    return "zh" if (cjk_count / len(text)) > 0.5 else "en"
+    return "zh" if cjk_count * 2 > len(text) else "en"
+
+
+def detect_languages(texts: Iterable[str]) -> List[str]:
+    """
+    批量检测文本语言
+
+    一次遍历完成分类，重复出现的字符串（如实体名、关系词）只计算一次。
+    判定规则与 detect_language 完全一致。
+
+    Args:
+        texts: 待检测文本列表
+
+    Returns:
+        与输入一一对应的语言列表（"zh" / "en"）
+    """
+    cache: Dict[str, str] = {}
+    results = []
+    for text in texts:
+        lang = cache.get(text) if text else None
+        if lang is None:
+            lang = detect_language(text)
+            if text:
+                cache[text] = lang
+        results.append(lang)
+    return results
 
 
 # 名称长度限制
@@ -4,11 +4,21 @@ Storage Package
 """
 
 from .neo4j import get_neo4j_storage, Neo4jStorage
+from .neo4j_async import get_async_neo4j_storage, AsyncNeo4jStorage
+from .schema import SchemaManager
+from .bulk_loader import Neo4jBulkLoader
+from .sqlite_graph import get_sqlite_graph_storage, SQLiteGraphStorage
 from .vector import get_vector_store, VectorStore
 
 __all__ = [
     "get_neo4j_storage",
     "Neo4jStorage",
+    "get_async_neo4j_storage",
+    "AsyncNeo4jStorage",
+    "SchemaManager",
+    "Neo4jBulkLoader",
+    "get_sqlite_graph_storage",
+    "SQLiteGraphStorage",
     "get_vector_store",
     "VectorStore"
 ]
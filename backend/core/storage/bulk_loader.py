@@ -0,0 +1,321 @@
+"""
+Neo4j Bulk Loader
+Neo4j 大文档批量导入
+
+save_graph_batch 把覆盖删除和全部写入放在一个显式事务中，超大图谱会在 Neo4j
+中堆积巨大的事务状态，任何一次失败都会回滚全部数据。批量导入模式：
+
+- 删除、节点、MENTIONS、边、收尾分阶段执行，每批一个有界事务
+- 节点批次并发写入（每个线程独立会话，只 MERGE 实体，按 id 排序切分，批次间没有共享的节点）；
+  文档的 MENTIONS 关联都要锁同一个 Document 节点，放在节点写完后顺序建立；
+  边批次顺序写入，避免端点锁互相等待
+- 每批使用托管事务（execute_write），死锁等瞬时错误由驱动自动重试
+- 所有写入都是 MERGE，检查点记录已完成的阶段和批次，失败后可从断点续跑
+- 输出每个阶段的耗时和吞吐量
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Set
+
+from dotenv import load_dotenv
+
+from .neo4j import (
+    ENTITY_UNWIND_QUERY, MENTIONS_UNWIND_QUERY, DOCUMENT_MERGE_QUERY, DOCUMENT_COUNTS_QUERY,
+    DEGREE_UPDATE_QUERY,
+    node_rows, edge_rows_by_type, edge_write_statements
+)
+
+
+# 加载环境变量
+load_dotenv()
+
+
+class Neo4jBulkLoader:
+    """Neo4j 大文档批量导入器"""
+
+    PHASES = ("delete", "nodes", "mentions", "edges", "finalize", "done")
+
+    def __init__(self, storage, batch_size: int = None, workers: int = None,
+                 checkpoint_dir: str = None):
+        """
+        初始化导入器
+
+        Args:
+            storage: Neo4jStorage 实例
+            batch_size: 每个事务的行数，None 时从环境变量读取
+            workers: 并发写入节点的线程数，None 时从环境变量读取
+            checkpoint_dir: 检查点目录，None 时从环境变量读取
+        """
+        self.storage = storage
+        self.batch_size = batch_size or int(os.getenv('NEO4J_BULK_BATCH_SIZE', '5000'))
+        self.workers = workers or int(os.getenv('NEO4J_BULK_WORKERS', '4'))
+        checkpoint_dir = checkpoint_dir or os.getenv('CHECKPOINT_DIR', './data/checkpoints')
+        self.checkpoint_dir = Path(checkpoint_dir)
+
+    # ==================== 检查点 ====================
+
+    def _checkpoint_path(self, doc_id: str) -> Path:
+        """文档的检查点文件"""
+        safe_id = hashlib.sha1(doc_id.encode('utf-8')).hexdigest()[:16]
+        return self.checkpoint_dir / f"bulk_{safe_id}.json"
+
+    @staticmethod
+    def _fingerprint(graph_data: Dict, overwrite: bool) -> str:
+        """图谱指纹：只有同一份数据才能续跑"""
+        digest = hashlib.sha1()
+        digest.update(b"overwrite" if overwrite else b"append")
+        for node in graph_data.get("nodes", []):
+            digest.update(str(node.get("id")).encode('utf-8'))
+        for edge in graph_data.get("edges", []):
+            digest.update(f"{edge.get('source')}|{edge.get('label')}|{edge.get('target')}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _load_checkpoint(self, doc_id: str, fingerprint: str) -> Dict:
+        """加载匹配的检查点，没有时返回初始状态"""
+        path = self._checkpoint_path(doc_id)
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get("fingerprint") == fingerprint and state.get("phase") in self.PHASES:
+                    state["resumed"] = True
+                    return state
+            except (OSError, json.JSONDecodeError):
+                pass
+
+        return {
+            "doc_id": doc_id,
+            "fingerprint": fingerprint,
+            "phase": "delete",
+            "node_batches": [],
+            "mention_batches": [],
+            "edge_batches": [],
+            "touched": [],
+            "resumed": False,
+            "stats": {"nodes_created": 0, "edges_created": 0, "failed": 0,
+                      "deleted_nodes": 0, "deleted_edges": 0},
+            "phases": {}
+        }
+
+    def _save_checkpoint(self, state: Dict):
+        """保存检查点（先写临时文件再替换）"""
+        path = self._checkpoint_path(state["doc_id"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _clear_checkpoint(self, doc_id: str):
+        """导入完成后删除检查点"""
+        path = self._checkpoint_path(doc_id)
+        if path.exists():
+            path.unlink()
+
+    @staticmethod
+    def _record_phase(state: Dict, phase: str, rows: int, seconds: float):
+        """累计阶段耗时和吞吐量（续跑时累加）"""
+        entry = state["phases"].setdefault(phase, {"rows": 0, "seconds": 0.0})
+        entry["rows"] += rows
+        entry["seconds"] = round(entry["seconds"] + seconds, 3)
+        entry["rows_per_sec"] = round(entry["rows"] / entry["seconds"]) if entry["seconds"] > 0 else 0
+
+    # ==================== 主流程 ====================
+
+    def load(self, graph_data: Dict, doc_id: str, overwrite: bool = True,
+             resume: bool = True) -> Dict:
+        """
+        分阶段导入文档图谱
+
+        Args:
+            graph_data: 图谱数据，包含 nodes 和 edges
+            doc_id: 文档 ID
+            overwrite: 是否先删除该文档的旧数据
+            resume: 是否从检查点续跑
+
+        Returns:
+            保存统计信息（与 save_graph_batch 相同的字段，另含 phases / resumed）
+        """
+        fingerprint = self._fingerprint(graph_data, overwrite)
+        if not resume:
+            self._clear_checkpoint(doc_id)
+        state = self._load_checkpoint(doc_id, fingerprint)
+        if state["resumed"]:
+            print(f"  从检查点续跑批量导入: 阶段 {state['phase']}")
+
+        nodes, rejected_nodes = node_rows(graph_data.get("nodes", []))
+        node_batches = [nodes[i:i+self.batch_size] for i in range(0, len(nodes), self.batch_size)]
+        edge_batches, rejected_edges = self._edge_batches(graph_data.get("edges", []),
+                                                          {row["id"] for row in nodes})
+
+        if state["phase"] == "delete":
+            if overwrite:
+                self._delete_phase(doc_id, state)
+            # 没有 id / 端点的行预先剔除，只在离开删除阶段时计入一次失败数
+            state["stats"]["failed"] += rejected_nodes + rejected_edges
+            state["phase"] = "nodes"
+            self._save_checkpoint(state)
+
+        if state["phase"] == "nodes":
+            self._run_storage_consume(DOCUMENT_MERGE_QUERY, doc_id=doc_id)
+            self._nodes_phase(doc_id, node_batches, state)
+            state["phase"] = "mentions"
+            self._save_checkpoint(state)
+
+        if state["phase"] == "mentions":
+            self._mentions_phase(doc_id, node_batches, state)
+            state["phase"] = "edges"
+            self._save_checkpoint(state)
+
+        if state["phase"] == "edges":
+            self._edges_phase(doc_id, edge_batches, state)
+            state["phase"] = "finalize"
+            self._save_checkpoint(state)
+
+        if state["phase"] == "finalize":
+            touched = set(state["touched"]) | {row["id"] for row in nodes}
+            self._finalize_phase(doc_id, touched, state)
+            state["phase"] = "done"
+
+        self._clear_checkpoint(doc_id)
+
+        stats = dict(state["stats"])
+        stats["phases"] = state["phases"]
+        stats["resumed"] = state["resumed"]
+        print(f"✓ 批量导入完成: " + ", ".join(
+            f"{phase} {info['rows']} 行 / {info['seconds']}s" for phase, info in state["phases"].items()))
+        return stats
+
+    def _edge_batches(self, edges: List[Dict], node_ids: Set[str]):
+        """
+        按写入语句切分批次（typed 模式同一批次只包含一种关系类型，一条查询写完）
+
+        Args:
+            edges: 边列表
+            node_ids: 本次导入的节点 ID（端点不在其中的边剔除）
+
+        Returns:
+            ([(查询, 参数行), ...], 缺少端点的剔除数)
+        """
+        grouped, rejected = edge_rows_by_type(edges, node_ids)
+        batches = []
+        for query, rows in edge_write_statements(grouped):
+            for i in range(0, len(rows), self.batch_size):
+                batches.append((query, rows[i:i+self.batch_size]))
+        return batches, rejected
+
+    def _run_storage(self, query: str, **params):
+        """在独立的托管写事务中执行一条查询，返回 single() 记录"""
+        return self.storage.execute_write(query, **params)
+
+    def _run_storage_consume(self, query: str, **params):
+        """在独立的托管写事务中执行一条不返回记录的查询"""
+        return self.storage.execute_write_consume(query, **params)
+
+    # ==================== 阶段 ====================
+
+    def _delete_phase(self, doc_id: str, state: Dict):
+        """分批删除文档旧数据，每批一个事务"""
+        start = time.perf_counter()
+        stats = state["stats"]
+        touched: Set[str] = set(state["touched"])
+
+        for batch in self.storage.iter_delete_batches(doc_id, batch_size=self.batch_size):
+            stats["deleted_edges"] += batch["deleted_edges"]
+            stats["deleted_nodes"] += batch["deleted_nodes"]
+            touched.update(batch["touched"])
+
+        state["touched"] = sorted(touched)
+        self._record_phase(state, "delete", stats["deleted_nodes"] + stats["deleted_edges"],
+                           time.perf_counter() - start)
+
+    def _nodes_phase(self, doc_id: str, batches: List[List[Dict]], state: Dict):
+        """
+        节点批次并发写入
+
+        只 MERGE 实体（不建立 MENTIONS）；参数行按 id 排序后切分，
+        各批次的实体互不重叠，只在其他文档同时写入相同实体时等锁。
+        """
+        pending = [i for i in range(len(batches)) if i not in set(state["node_batches"])]
+        if not pending:
+            return
+
+        def write(index: int):
+            try:
+                record = self._run_storage(ENTITY_UNWIND_QUERY, rows=batches[index], doc_id=doc_id)
+                return index, record["written"], None
+            except Exception as e:
+                return index, 0, e
+
+        start = time.perf_counter()
+        written = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index, count, error in executor.map(write, pending):
+                if error is not None:
+                    print(f"节点批次 {index} 写入失败 ({len(batches[index])} 个): {error}")
+                    continue
+                written += count
+                state["stats"]["nodes_created"] += count
+                state["node_batches"].append(index)
+                self._save_checkpoint(state)
+
+        self._record_phase(state, "nodes", written, time.perf_counter() - start)
+
+        failed = [i for i in pending if i not in set(state["node_batches"])]
+        if failed:
+            # 节点不完整时写边会丢关系，停在本阶段等待续跑
+            raise RuntimeError(f"{len(failed)} 个节点批次写入失败，可重新执行以续跑")
+
+    def _mentions_phase(self, doc_id: str, batches: List[List[Dict]], state: Dict):
+        """建立文档到实体的 MENTIONS 关联（每批都锁同一个 Document 节点，顺序执行）"""
+        done = set(state.setdefault("mention_batches", []))
+        start = time.perf_counter()
+        written = 0
+
+        for index, rows in enumerate(batches):
+            if index in done:
+                continue
+            record = self._run_storage(MENTIONS_UNWIND_QUERY, ids=[row["id"] for row in rows],
+                                       doc_id=doc_id)
+            written += record["written"]
+            state["mention_batches"].append(index)
+            self._save_checkpoint(state)
+
+        self._record_phase(state, "mentions", written, time.perf_counter() - start)
+
+    def _edges_phase(self, doc_id: str, batches: List, state: Dict):
+        """边批次顺序写入（并发写边会在共享端点上互相等锁）"""
+        done = set(state["edge_batches"])
+        start = time.perf_counter()
+        written = 0
+
+        for index, (query, rows) in enumerate(batches):
+            if index in done:
+                continue
+            record = self._run_storage(query, rows=rows, doc_id=doc_id)
+            count = record["written"]
+            written += count
+            state["stats"]["edges_created"] += count
+            # 端点不存在的行不会写入，计入失败数
+            state["stats"]["failed"] += len(rows) - count
+            state["edge_batches"].append(index)
+            self._save_checkpoint(state)
+
+        self._record_phase(state, "edges", written, time.perf_counter() - start)
+
+    def _finalize_phase(self, doc_id: str, touched: Set[str], state: Dict):
+        """更新文档统计和受影响节点的度数"""
+        start = time.perf_counter()
+        self._run_storage_consume(DOCUMENT_COUNTS_QUERY, doc_id=doc_id)
+
+        ids = sorted(touched)
+        for i in range(0, len(ids), self.batch_size):
+            self._run_storage_consume(DEGREE_UPDATE_QUERY, ids=ids[i:i+self.batch_size])
+
+        self._record_phase(state, "finalize", len(ids), time.perf_counter() - start)
+
@@ -0,0 +1,160 @@
+"""
+Graph Delta
+文档重新处理时的增量写入
+
+覆盖写入（rewrite）会删除文档的全部关系、从所有节点移除 doc_id、删除孤立节点，再全部重建，
+即使重新处理只改动了少数实体。增量写入：
+
+- 读取文档当前的足迹（MENTIONS 关联的实体、归属该文档的边）
+- 与新的规范化图谱比较，得到新增 / 修改 / 移除的节点和边
+- 只对差异执行批量语句，写入量和索引变动与改动规模成正比
+
+结果与覆盖写入一致：节点属性遵循 NODE_UNWIND_QUERY 的合并规则
+（只属于本文档的节点以新数据为准，共享节点只补全空描述），边以 (source, 关系类型, target) 为键。
+"""
+
+from typing import Dict, List, Tuple
+
+from .neo4j import node_rows, edge_rows_by_type
+
+
+# 文档当前的节点足迹
+FOOTPRINT_NODES_QUERY = """
+    MATCH (:Document {id: $doc_id})-[:MENTIONS]->(n:Entity)
+    RETURN n.id as id, n.label as label, n.type as type,
+           n.description as description, n.doc_ids as doc_ids
+"""
+
+# 文档当前的边足迹（带关系类型，作为差异比较的键；single 模式的类型保存在 r.type）
+# 从任一端点匹配：旧数据中起点不属于本文档的边也进入比较，新图谱不再包含时删除
+FOOTPRINT_EDGES_QUERY = """
+    MATCH (:Document {id: $doc_id})-[:MENTIONS]->(:Entity)-[r]-(:Entity)
+    WHERE r.doc_id = $doc_id
+    WITH DISTINCT r
+    RETURN startNode(r).id as source, endNode(r).id as target,
+           coalesce(r.type, type(r)) as rel_type,
+           r.label as label, r.weight as weight
+"""
+
+# 删除移除的边
+DELETE_EDGES_DELTA_QUERY = """
+    UNWIND $rows as row
+    MATCH (s:Entity {id: row.source})-[r]->(t:Entity {id: row.target})
+    WHERE coalesce(r.type, type(r)) = row.rel_type AND r.doc_id = $doc_id
+    DELETE r
+    RETURN count(r) as deleted
+"""
+
+# 解除移除的节点与文档的关联，不再属于任何文档的节点直接删除，返回其邻居（度数需要重算）
+DETACH_NODES_DELTA_QUERY = """
+    UNWIND $ids as id
+    MATCH (:Document {id: $doc_id})-[m:MENTIONS]->(n:Entity {id: id})
+    DELETE m
+    SET n.doc_ids = [x IN coalesce(n.doc_ids, []) WHERE x <> $doc_id]
+    WITH n WHERE size(n.doc_ids) = 0
+    OPTIONAL MATCH (n)--(o:Entity)
+    WITH n, collect(o.id) as neighbors
+    DETACH DELETE n
+    WITH count(n) as deleted, collect(neighbors) as neighbors
+    RETURN deleted, reduce(ids = [], x IN neighbors | ids + x) as touched
+"""
+
+# 更新修改的节点：只属于本文档时以新数据为准，共享节点只补全空描述（与覆盖写入的结果一致）
+UPDATE_NODES_DELTA_QUERY = """
+    UNWIND $rows as row
+    MATCH (n:Entity {id: row.id})
+    WITH n, row, n.doc_ids = [$doc_id] as owned
+    SET n.label = CASE WHEN owned THEN row.label ELSE n.label END,
+        n.type = CASE WHEN owned THEN row.type ELSE n.type END,
+        n.description = CASE
+            WHEN owned OR n.description IS NULL OR n.description = ''
+            THEN row.description
+            ELSE n.description
+        END,
+        n.updated_at = datetime()
+    RETURN count(n) as written
+"""
+
+
+def _node_changed(old: Dict, new: Dict, doc_id: str) -> bool:
+    """节点写入后属性是否会变化"""
+    if old.get("doc_ids") == [doc_id]:
+        return any((old.get(key) or "") != (new.get(key) or "")
+                   for key in ("label", "type", "description"))
+    return not old.get("description") and bool(new.get("description"))
+
+
+def compute_graph_delta(old_nodes: List[Dict], old_edges: List[Dict],
+                        graph_data: Dict, doc_id: str) -> Dict:
+    """
+    比较文档当前足迹和新图谱
+
+    Args:
+        old_nodes: FOOTPRINT_NODES_QUERY 的结果
+        old_edges: FOOTPRINT_EDGES_QUERY 的结果
+        graph_data: 新的规范化图谱
+        doc_id: 文档 ID
+
+    Returns:
+        {
+            "nodes_added", "nodes_changed": NODE_UNWIND_QUERY 参数行,
+            "nodes_removed": 实体 ID 列表,
+            "edges_upsert": {关系类型: 边参数行}（新增 + 修改，交给 edge_write_statements）,
+            "edges_removed": [{"source", "target", "rel_type"}],
+            "rejected": 缺少 id / 端点（或端点不在新图谱节点中）的行数,
+            "counts": 各类差异的数量
+        }
+    """
+    new_nodes, rejected_nodes = node_rows(graph_data.get("nodes", []))
+    grouped, rejected_edges = edge_rows_by_type(graph_data.get("edges", []),
+                                                {row["id"] for row in new_nodes})
+
+    # 节点：按 id 去重（后出现的覆盖前面的，与 MERGE 顺序执行的结果一致）
+    new_by_id = {row["id"]: row for row in new_nodes}
+    old_by_id = {node["id"]: node for node in old_nodes}
+
+    nodes_added = [row for node_id, row in new_by_id.items() if node_id not in old_by_id]
+    nodes_changed = [row for node_id, row in new_by_id.items()
+                     if node_id in old_by_id and _node_changed(old_by_id[node_id], row, doc_id)]
+    nodes_removed = sorted(node_id for node_id in old_by_id if node_id not in new_by_id)
+
+    # 边：键为 (source, 关系类型, target)
+    new_edges: Dict[Tuple, Dict] = {}
+    for rel_type, rows in grouped.items():
+        for row in rows:
+            new_edges[(row["source"], rel_type, row["target"])] = row
+    old_by_key = {(edge["source"], edge["rel_type"], edge["target"]): edge for edge in old_edges}
+
+    edges_upsert: Dict[str, List[Dict]] = {}
+    edges_added = edges_changed = 0
+    for key, row in new_edges.items():
+        old = old_by_key.get(key)
+        if old is None:
+            edges_added += 1
+        elif old.get("label") != row["label"] or old.get("weight") != row["weight"]:
+            edges_changed += 1
+        else:
+            continue
+        edges_upsert.setdefault(key[1], []).append(row)
+
+    edges_removed = [{"source": s, "rel_type": rel_type, "target": t}
+                     for (s, rel_type, t) in sorted(old_by_key) if (s, rel_type, t) not in new_edges]
+
+    return {
+        "nodes_added": nodes_added,
+        "nodes_changed": nodes_changed,
+        "nodes_removed": nodes_removed,
+        "edges_upsert": edges_upsert,
+        "edges_removed": edges_removed,
+        "rejected": rejected_nodes + rejected_edges,
+        "counts": {
+            "nodes_added": len(nodes_added),
+            "nodes_changed": len(nodes_changed),
+            "nodes_removed": len(nodes_removed),
+            "nodes_unchanged": len(new_by_id) - len(nodes_added) - len(nodes_changed),
+            "edges_added": edges_added,
+            "edges_changed": edges_changed,
+            "edges_removed": len(edges_removed),
+            "edges_unchanged": len(new_edges) - edges_added - edges_changed
+        }
+    }
@@ -5,11 +5,15 @@ Neo4j 存储适配器
 核心功能：
 - 批量保存图谱数据到 Neo4j
 - 高性能图遍历和查询
-- 自动索引管理
+- 约束和索引由 SchemaManager 在启动时统一迁移（见 schema.py）
+- 文档目录：(:Document)-[:MENTIONS]->(:Entity)，删除/覆盖只访问文档自身的足迹
+- 维护 Entity.degree（实体间关系数），热门标签等按度数排序的查询直接走索引
+- 关系存储模式（NEO4J_RELATION_MODE）：typed 每种关系一个 Neo4j 关系类型；
+  single 统一为 RELATES 并把类型存为索引属性 r.type，写入语句完全参数化
 """
 
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from dotenv import load_dotenv
 
 try:
@@ -115,6 +119,601 @@ def normalize_relation_type(chinese_relation: str) -> str:
     return 'RELATES'
 
 
+def node_rows(nodes: List[Dict]):
+    """
+    节点 -> NODE_UNWIND_QUERY 的参数行
+
+    没有 id 的节点会让整批 MERGE 失败，预先剔除。
+
+    Returns:
+        (参数行列表, 剔除数)
+    """
+    rows = []
+    rejected = 0
+    for node in nodes:
+        if not node.get("id"):
+            rejected += 1
+            continue
+        rows.append({
+            "id": node["id"],
+            "label": node.get("label"),
+            "type": node.get("type"),
+            "description": node.get("description", "")
+        })
+    # 按 id 排序：并发写入的文档以相同顺序获取节点锁，减少死锁
+    rows.sort(key=lambda row: row["id"])
+    return rows, rejected
+
+
+def edge_rows_by_type(edges: List[Dict], node_ids: Optional[Set[str]] = None):
+    """
+    边 -> 按关系类型分组的 EDGE_UNWIND_QUERY 参数行
+
+    Args:
+        edges: 边列表
+        node_ids: 本次保存的节点 ID。给定时端点不在其中的边也会剔除：
+            文档足迹（删除、增量比较、边数统计）经 MENTIONS 定位，
+            端点不属于本文档的边写入后无法被找回
+
+    Returns:
+        ({关系类型: 参数行列表}, 缺少端点的剔除数)
+    """
+    grouped: Dict[str, List[Dict]] = {}
+    rejected = 0
+    for edge in edges:
+        if not edge.get("source") or not edge.get("target"):
+            rejected += 1
+            continue
+        if node_ids is not None and (edge["source"] not in node_ids
+                                     or edge["target"] not in node_ids):
+            rejected += 1
+            continue
+        # 获取中文关系标签，并转换为 Neo4j 兼容的关系类型
+        chinese_label = edge.get("label", "RELATES")
+        rel_type = normalize_relation_type(chinese_label)
+        grouped.setdefault(rel_type, []).append({
+            "source": edge["source"],
+            "target": edge["target"],
+            "rel_type": rel_type,
+            "label": chinese_label,  # 保存中文标签
+            "weight": edge.get("weight", 1)
+        })
+    for rows in grouped.values():
+        rows.sort(key=lambda row: (row["source"], row["target"]))
+    return grouped, rejected
+
+
+def relation_mode() -> str:
+    """关系存储模式：typed（默认）或 single"""
+    mode = os.getenv('NEO4J_RELATION_MODE', 'typed').lower()
+    return 'single' if mode == 'single' else 'typed'
+
+
+def edge_write_statements(grouped: Dict[str, List[Dict]]):
+    """
+    按关系存储模式生成边的写入语句
+
+    typed 模式每种关系类型一条拼接的查询；single 模式所有类型合并为一条参数化查询，
+    查询文本固定，执行计划可以缓存复用。
+
+    Args:
+        grouped: edge_rows_by_type 的分组结果
+
+    Returns:
+        [(查询, 参数行), ...]
+    """
+    if relation_mode() == 'single':
+        rows = sorted((row for rows in grouped.values() for row in rows),
+                      key=lambda row: (row["source"], row["target"]))
+        return [(EDGE_SINGLE_UNWIND_QUERY, rows)] if rows else []
+    return [(EDGE_UNWIND_QUERY.format(rel_type=rel_type), rows)
+            for rel_type, rows in grouped.items()]
+
+
+def for_relation_mode(query: str) -> str:
+    """
+    single 模式下把实体间的无类型关系模式限定为 RELATES
+
+    按类型展开可以直接使用节点上按类型维护的关系计数，并跳过其他类型的关系。
+    """
+    if relation_mode() == 'single':
+        return query.replace('-[r]-', f'-[r:{SINGLE_RELATION_TYPE}]-')
+    return query
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    是否为可重试的瞬时错误（死锁、锁等待超时、连接中断等）
+
+    Args:
+        error: 写入时抛出的异常
+
+    Returns:
+        True 表示整个事务可以安全重试
+    """
+    is_retryable = getattr(error, "is_retryable", None)
+    if callable(is_retryable):
+        try:
+            return bool(is_retryable())
+        except Exception:
+            pass
+    code = getattr(error, "code", None) or ""
+    return "TransientError" in code or "DeadlockDetected" in str(error)
+
+
+# 节点属性合并：ON MATCH 时补全描述并追加 doc_id
+_ENTITY_MERGE_CLAUSE = """
+    UNWIND $rows as row
+    MERGE (n:Entity {id: row.id})
+    ON CREATE SET
+        n.label = row.label,
+        n.type = row.type,
+        n.description = row.description,
+        n.doc_ids = [$doc_id],
+        n.created_at = datetime()
+    ON MATCH SET
+        n.description = CASE
+            WHEN n.description IS NULL OR n.description = ''
+            THEN row.description
+            ELSE n.description
+        END,
+        n.doc_ids = CASE
+            WHEN NOT $doc_id IN n.doc_ids
+            THEN n.doc_ids + $doc_id
+            ELSE n.doc_ids
+        END,
+        n.updated_at = datetime()"""
+
+# 节点写入（同时建立文档的 MENTIONS 关联）
+NODE_UNWIND_QUERY = _ENTITY_MERGE_CLAUSE + """
+    WITH n
+    MATCH (d:Document {id: $doc_id})
+    MERGE (d)-[:MENTIONS]->(n)
+    RETURN count(n) as written
+"""
+
+# 只写节点、不建立 MENTIONS（批量导入并发写节点时使用：MENTIONS 都要锁同一个
+# Document 节点，并发批次会互相等待，改为节点写完后由 MENTIONS_UNWIND_QUERY 顺序建立）
+ENTITY_UNWIND_QUERY = _ENTITY_MERGE_CLAUSE + """
+    RETURN count(n) as written
+"""
+
+MENTIONS_UNWIND_QUERY = """
+    MATCH (d:Document {id: $doc_id})
+    UNWIND $ids as id
+    MATCH (n:Entity {id: id})
+    MERGE (d)-[:MENTIONS]->(n)
+    RETURN count(n) as written
+"""
+
+NODE_ROW_QUERY = """
+    MERGE (n:Entity {id: $id})
+    ON CREATE SET
+        n.label = $label,
+        n.type = $type,
+        n.description = $description,
+        n.doc_ids = [$doc_id],
+        n.created_at = datetime()
+    ON MATCH SET
+        n.description = CASE
+            WHEN n.description IS NULL OR n.description = ''
+            THEN $description
+            ELSE n.description
+        END,
+        n.doc_ids = CASE
+            WHEN NOT $doc_id IN n.doc_ids
+            THEN n.doc_ids + $doc_id
+            ELSE n.doc_ids
+        END,
+        n.updated_at = datetime()
+    WITH n
+    MATCH (d:Document {id: $doc_id})
+    MERGE (d)-[:MENTIONS]->(n)
+"""
+
+# 文档目录节点：每个文档一个 (:Document)，通过 MENTIONS 关联其实体
+DOCUMENT_MERGE_QUERY = """
+    MERGE (d:Document {id: $doc_id})
+    ON CREATE SET d.created_at = datetime()
+"""
+
+# 只统计该文档的足迹（MENTIONS 关联的实体及其归属该文档的边）
+# 边从任一端点可达即属于足迹：写入时已保证两端都是本文档的实体，
+# 第二个 COUNT 只统计旧数据中起点不属于本文档的边
+DOCUMENT_COUNTS_QUERY = """
+    MATCH (d:Document {id: $doc_id})
+    SET d.node_count = COUNT { (d)-[:MENTIONS]->(:Entity) },
+        d.edge_count = COUNT {
+            MATCH (d)-[:MENTIONS]->(:Entity)-[r]->(:Entity)
+            WHERE r.doc_id = $doc_id
+        } + COUNT {
+            MATCH (d)-[:MENTIONS]->(:Entity)<-[r]-(s:Entity)
+            WHERE r.doc_id = $doc_id AND NOT (d)-[:MENTIONS]->(s)
+        },
+        d.updated_at = datetime()
+"""
+
+# 度数维护：只重算受影响节点；两个 COUNT 都由节点的关系计数直接得到，不展开关系
+DEGREE_UPDATE_QUERY = """
+    UNWIND $ids as id
+    MATCH (n:Entity {id: id})
+    SET n.degree = COUNT { (n)--() } - COUNT { (n)-[:MENTIONS]-() }
+"""
+
+# 分批删除（iter_delete_batches）：文档的边，每批在独立事务中执行，直到没有剩余
+# 从任一端点匹配，旧数据中起点不属于本文档的边也能删除
+DELETE_EDGES_BATCH_QUERY = """
+    MATCH (:Document {id: $doc_id})-[:MENTIONS]->(:Entity)-[r]-(:Entity)
+    WHERE r.doc_id = $doc_id
+    WITH DISTINCT r
+    WITH r, startNode(r).id as source, endNode(r).id as target
+    LIMIT $limit
+    DELETE r
+    RETURN count(r) as deleted, collect(DISTINCT source) + collect(DISTINCT target) as touched
+"""
+
+# 分批解除文档与实体的关联，返回处理的实体
+DETACH_MENTIONS_BATCH_QUERY = """
+    MATCH (:Document {id: $doc_id})-[m:MENTIONS]->(n:Entity)
+    WITH m, n
+    LIMIT $limit
+    DELETE m
+    SET n.doc_ids = [x IN coalesce(n.doc_ids, []) WHERE x <> $doc_id]
+    RETURN collect(n.id) as ids
+"""
+
+# 删除不再属于任何文档的实体（与解除关联在同一事务中），返回其邻居（度数需要重算）
+DELETE_ORPHANS_QUERY = """
+    UNWIND $ids as id
+    MATCH (n:Entity {id: id})
+    WHERE size(n.doc_ids) = 0
+    OPTIONAL MATCH (n)--(o:Entity)
+    WITH n, collect(o.id) as neighbors
+    DETACH DELETE n
+    WITH count(n) as deleted, collect(neighbors) as neighbors
+    RETURN deleted, reduce(ids = [], x IN neighbors | ids + x) as touched
+"""
+
+# 关系写入：关系类型通过 str.format 填入（Cypher 不支持参数化关系类型）
+EDGE_UNWIND_QUERY = """
+    UNWIND $rows as row
+    MATCH (s:Entity {{id: row.source}})
+    MATCH (t:Entity {{id: row.target}})
+    MERGE (s)-[r:{rel_type}]->(t)
+    SET r.label = row.label,
+        r.weight = row.weight,
+        r.doc_id = $doc_id,
+        r.updated_at = datetime()
+    RETURN count(r) as written
+"""
+
+# single 模式：唯一的关系类型，关系类型作为 MERGE 键的一部分以属性保存
+SINGLE_RELATION_TYPE = 'RELATES'
+
+EDGE_SINGLE_UNWIND_QUERY = """
+    UNWIND $rows as row
+    MATCH (s:Entity {id: row.source})
+    MATCH (t:Entity {id: row.target})
+    MERGE (s)-[r:RELATES {type: row.rel_type}]->(t)
+    SET r.label = row.label,
+        r.weight = row.weight,
+        r.doc_id = $doc_id,
+        r.updated_at = datetime()
+    RETURN count(r) as written
+"""
+
+EDGE_SINGLE_ROW_QUERY = """
+    MATCH (s:Entity {id: $source})
+    MATCH (t:Entity {id: $target})
+    MERGE (s)-[r:RELATES {type: $rel_type}]->(t)
+    SET r.label = $label,
+        r.weight = $weight,
+        r.doc_id = $doc_id,
+        r.updated_at = datetime()
+"""
+
+EDGE_ROW_QUERY = """
+    MATCH (s:Entity {{id: $source}})
+    MATCH (t:Entity {{id: $target}})
+    MERGE (s)-[r:{rel_type}]->(t)
+    SET r.label = $label,
+        r.weight = $weight,
+        r.doc_id = $doc_id,
+        r.updated_at = datetime()
+"""
+
+
+# ==================== 读查询（同步/异步存储共用） ====================
+
+POPULAR_LABELS_QUERY = """
+    MATCH (n:Entity)
+    WHERE n.degree IS NOT NULL
+    RETURN n.id as id
+    ORDER BY n.degree DESC
+    LIMIT $limit
+"""
+
+# Entity.degree 由 schema 迁移 v6（entity_degree，见 schema.py）回填；
+# 回填完成前旧实体没有 degree，按度数排序的读查询改用 coalesce 的全量排序版本，不遗漏实体
+DEGREE_MIGRATION_VERSION = 6
+
+SCHEMA_VERSION_QUERY = """
+    MATCH (m:SchemaMigration) RETURN max(m.version) as version
+"""
+
+POPULAR_LABELS_FALLBACK_QUERY = """
+    MATCH (n:Entity)
+    RETURN n.id as id
+    ORDER BY coalesce(n.degree, 0) DESC
+    LIMIT $limit
+"""
+
+# 每个计数都是无过滤的单标签/单类型计数，直接读取计数存储
+STATS_QUERY = """
+    CALL { MATCH (n:Entity) RETURN count(n) as node_count }
+    CALL { MATCH ()-[r]->() RETURN count(r) as rel_count }
+    CALL { MATCH ()-[m:MENTIONS]->() RETURN count(m) as mention_count }
+    CALL { MATCH (d:Document) RETURN count(d) as document_count }
+    RETURN node_count, rel_count - mention_count as edge_count, document_count
+"""
+
+SUBGRAPH_START_QUERY = """
+    MATCH (n:Entity {id: $entity_id})
+    RETURN n.id as id, n.label as label, n.type as type, n.description as description
+"""
+
+# 逐层扩展：每个前沿节点只取度数/权重最高的 $fanout 条关系，超级节点不会让结果爆炸
+SUBGRAPH_EXPAND_QUERY = """
+    UNWIND $frontier as id
+    MATCH (n:Entity {id: id})
+    CALL {
+        WITH n
+        MATCH (n)-[r]-(m:Entity)
+        RETURN r, m
+        ORDER BY coalesce(m.degree, 0) DESC, coalesce(r.weight, 1) DESC
+        LIMIT $fanout
+    }
+    RETURN elementId(r) as rid, startNode(r).id as source, endNode(r).id as target,
+           coalesce(r.label, r.type, type(r)) as label, r.weight as weight,
+           m.id as id, m.label as node_label, m.type as type, m.description as description
+"""
+
+DOCUMENT_NODES_QUERY = """
+    MATCH (:Document {id: $doc_id})-[:MENTIONS]->(n:Entity)
+    RETURN n.id as id, n.label as label, n.type as type,
+           n.description as description, n.doc_ids as doc_ids
+"""
+
+DOCUMENT_EDGES_QUERY = """
+    MATCH (:Document {id: $doc_id})-[:MENTIONS]->(:Entity)-[r]-(:Entity)
+    WHERE r.doc_id = $doc_id
+    WITH DISTINCT r
+    RETURN startNode(r).id as source, endNode(r).id as target,
+           coalesce(r.label, r.type, type(r)) as label, r.weight as weight
+"""
+
+LIST_DOCUMENTS_QUERY = """
+    MATCH (d:Document)
+    RETURN d.id as doc_id, d.node_count as node_count,
+           d.edge_count as edge_count, toString(d.updated_at) as updated_at
+    ORDER BY d.id DESC
+"""
+
+# 全图查询截断时保留度数最高的节点（度数索引有序扫描）
+ALL_NODES_QUERY = """
+    MATCH (n:Entity)
+    WHERE n.degree IS NOT NULL
+    RETURN n.id as id, n.label as label, n.type as type,
+           n.description as description,
+           size(n.doc_ids) as doc_count,
+           n.degree as degree
+    ORDER BY n.degree DESC
+    LIMIT 1000
+"""
+
+ALL_NODES_FALLBACK_QUERY = """
+    MATCH (n:Entity)
+    RETURN n.id as id, n.label as label, n.type as type,
+           n.description as description,
+           size(n.doc_ids) as doc_count,
+           coalesce(n.degree, 0) as degree
+    ORDER BY degree DESC
+    LIMIT 1000
+"""
+
+# 度数读查询 -> 度数回填完成前使用的版本
+DEGREE_FALLBACK_QUERIES = {
+    POPULAR_LABELS_QUERY: POPULAR_LABELS_FALLBACK_QUERY,
+    ALL_NODES_QUERY: ALL_NODES_FALLBACK_QUERY,
+}
+
+
+def degree_read_query(query: str, schema_version: Optional[int]) -> str:
+    """
+    按 schema 版本选择按度数排序的读查询
+
+    Args:
+        query: POPULAR_LABELS_QUERY 或 ALL_NODES_QUERY
+        schema_version: 数据库已执行的 schema 版本
+
+    Returns:
+        度数迁移已执行时返回原查询（度数索引有序扫描），否则返回 coalesce(n.degree, 0) 版本
+    """
+    if (schema_version or 0) >= DEGREE_MIGRATION_VERSION:
+        return query
+    return DEGREE_FALLBACK_QUERIES[query]
+
+
+ALL_EDGES_QUERY = """
+    MATCH (s:Entity)-[r]->(t:Entity)
+    RETURN DISTINCT s.id as source, t.id as target,
+           coalesce(r.label, r.type, type(r)) as label
+    LIMIT 5000
+"""
+
+
+# 键集分页：按 Entity.id 取一页节点，及这些节点的出边（每条边只在源节点所在页出现一次）
+GRAPH_PAGE_NODES_QUERY = """
+    MATCH (n:Entity)
+    WHERE n.id > $cursor
+    RETURN n.id as id, n.label as label, n.type as type,
+           n.description as description, coalesce(n.degree, 0) as degree
+    ORDER BY n.id
+    LIMIT $limit
+"""
+
+GRAPH_PAGE_EDGES_QUERY = """
+    UNWIND $ids as id
+    MATCH (s:Entity {id: id})-[r]->(t:Entity)
+    RETURN s.id as source, t.id as target,
+           coalesce(r.label, r.type, type(r)) as label, coalesce(r.weight, 1) as weight
+"""
+
+
+def stats_from_record(record) -> Dict:
+    """STATS_QUERY 结果 -> 统计信息"""
+    return {
+        "total_nodes": record["node_count"],
+        "total_edges": record["edge_count"],
+        "total_documents": record["document_count"]
+    }
+
+
+class SubgraphExpansion:
+    """
+    有界的逐层子图扩展状态（同步/异步存储共用，只负责去重和预算，不做 I/O）
+
+    每层用 SUBGRAPH_EXPAND_QUERY 扩展前沿节点，节点和边按 id 去重；
+    达到节点/边预算后停止扩展，结果标记 truncated。
+    """
+
+    def __init__(self, start: Dict, n_hops: int, fanout: int = None,
+                 max_nodes: int = None, max_edges: int = None):
+        """
+        初始化扩展
+
+        Args:
+            start: 起始节点
+            n_hops: 跳数
+            fanout: 每个节点最多展开的关系数，None 时从环境变量读取
+            max_nodes: 节点预算，None 时从环境变量读取
+            max_edges: 边预算，None 时从环境变量读取
+        """
+        self.n_hops = n_hops
+        self.fanout = fanout or int(os.getenv('NEO4J_SUBGRAPH_FANOUT', '50'))
+        self.max_nodes = max_nodes or int(os.getenv('NEO4J_SUBGRAPH_MAX_NODES', '500'))
+        self.max_edges = max_edges or int(os.getenv('NEO4J_SUBGRAPH_MAX_EDGES', '2000'))
+
+        self.nodes: Dict[str, Dict] = {start["id"]: start}
+        self.edges: Dict[str, Dict] = {}
+        self.frontier: List[str] = [start["id"]]
+        self.level = 0
+        self.truncated = False
+
+    def done(self) -> bool:
+        """是否已无需继续扩展"""
+        return (not self.frontier or self.level >= self.n_hops
+                or len(self.nodes) >= self.max_nodes or len(self.edges) >= self.max_edges)
+
+    def add_rows(self, rows: List[Dict]) -> Dict:
+        """
+        合并一层扩展结果
+
+        Args:
+            rows: SUBGRAPH_EXPAND_QUERY 的记录
+
+        Returns:
+            本层新增的 {"nodes": [...], "edges": [...]}
+        """
+        new_nodes, new_edges = [], []
+
+        for row in rows:
+            if row["rid"] in self.edges:
+                continue
+            if len(self.edges) >= self.max_edges:
+                self.truncated = True
+                break
+
+            if row["id"] not in self.nodes:
+                if len(self.nodes) >= self.max_nodes:
+                    # 节点预算已满，只保留已有节点之间的边
+                    self.truncated = True
+                    continue
+                node = {
+                    "id": row["id"],
+                    "label": row["node_label"],
+                    "type": row["type"],
+                    "description": row["description"]
+                }
+                self.nodes[node["id"]] = node
+                new_nodes.append(node)
+
+            edge = {
+                "source": row["source"],
+                "target": row["target"],
+                "label": row["label"],
+                "weight": row["weight"]
+            }
+            self.edges[row["rid"]] = edge
+            new_edges.append(edge)
+
+        self.level += 1
+        self.frontier = [node["id"] for node in new_nodes]
+        if self.frontier and self.level < self.n_hops and self.done():
+            self.truncated = True
+        return {"nodes": new_nodes, "edges": new_edges}
+
+    def result(self) -> Dict:
+        """完整子图"""
+        return {
+            "nodes": list(self.nodes.values()),
+            "edges": list(self.edges.values()),
+            "truncated": self.truncated
+        }
+
+
+def document_from_record(record) -> Dict:
+    """LIST_DOCUMENTS_QUERY 结果 -> 文档信息（缺失的统计取默认值）"""
+    return {
+        "doc_id": record["doc_id"],
+        "node_count": record["node_count"] or 0,
+        "edge_count": record["edge_count"] or 0,
+        "updated_at": record["updated_at"] or "N/A"
+    }
+
+
+def graph_node_from_record(record) -> Dict:
+    """ALL_NODES_QUERY 结果 -> 节点"""
+    return {
+        "id": record["id"],
+        "label": record["label"],
+        "type": record["type"],
+        "description": record["description"],
+        "degree": record["degree"]
+    }
+
+
+def graph_page(nodes: List[Dict], edges: List[Dict], limit: int) -> Dict:
+    """
+    组装一页图谱
+
+    Returns:
+        {"nodes", "edges", "next_cursor"}；最后一页 next_cursor 为 None
+    """
+    next_cursor = nodes[-1]["id"] if len(nodes) == limit else None
+    return {"nodes": nodes, "edges": edges, "next_cursor": next_cursor}
+
+
+def graph_edge_from_record(record) -> Dict:
+    """ALL_EDGES_QUERY 结果 -> 边"""
+    return {
+        "source": record["source"],
+        "target": record["target"],
+        "label": record["label"],
+        "weight": 1
+    }
+
+
 class Neo4jStorage:
     """Neo4j 存储适配器"""
 
@@ -143,11 +742,37 @@ class Neo4jStorage:
             max_connection_pool_size=max_pool_size
         )
 
+        # 启动时由 SchemaManager 填充的 schema 状态
+        self.schema_state: Dict = {}
+
+    def _schema_version(self) -> int:
+        """
+        按度数读取前确认的 schema 版本
+
+        优先使用启动迁移的状态；未自动迁移（NEO4J_AUTO_MIGRATE=false）或度数迁移尚未执行时查询数据库，
+        迁移在运行中完成后即可切换到度数索引查询。
+        """
+        version = (self.schema_state or {}).get("version") or 0
+        if version >= DEGREE_MIGRATION_VERSION:
+            return version
+        with self.driver.session() as session:
+            record = session.run(SCHEMA_VERSION_QUERY).single()
+        version = (record["version"] if record else None) or 0
+        if version >= DEGREE_MIGRATION_VERSION:
+            self.schema_state = dict(self.schema_state or {}, version=version)
+        return version
+
     def save_graph_batch(self, graph_data: Dict, doc_id: str,
                          overwrite: bool = True) -> Dict:
         """
         批量保存图谱（优化性能）
 
+        默认每批节点一条 UNWIND MERGE，每批边按关系类型分组、每种类型一条 UNWIND MERGE；
+        NEO4J_WRITE_MODE=row 时沿用逐行写入（用于对比测试）。
+        节点数 + 边数超过 NEO4J_BULK_THRESHOLD 时改用 Neo4jBulkLoader 分事务导入。
+        覆盖已有文档时默认只写入差异（NEO4J_OVERWRITE_MODE=delta，见 graph_delta.py），
+        rewrite 时先删除旧数据再全部重建。
+
         Args:
             graph_data: 图谱数据，包含 nodes 和 edges
             doc_id: 文档 ID
@@ -157,170 +782,454 @@ class Neo4jStorage:
             保存统计信息
         """
         batch_size = int(os.getenv('NEO4J_BATCH_SIZE', '500'))
+        write_mode = os.getenv('NEO4J_WRITE_MODE', 'unwind').lower()
         stats = {"nodes_created": 0, "edges_created": 0, "failed": 0,
                 "deleted_nodes": 0, "deleted_edges": 0}
 
+        nodes = graph_data.get("nodes", [])
+        edges = graph_data.get("edges", [])
+
+        # 超大图谱改用分阶段、多事务的批量导入（失败可续跑）
+        bulk_threshold = int(os.getenv('NEO4J_BULK_THRESHOLD', '20000'))
+        if bulk_threshold > 0 and len(nodes) + len(edges) > bulk_threshold:
+            from .bulk_loader import Neo4jBulkLoader
+            return Neo4jBulkLoader(self).load(graph_data, doc_id, overwrite=overwrite)
+
+        overwrite_mode = os.getenv('NEO4J_OVERWRITE_MODE', 'delta').lower()
+        use_delta = overwrite and overwrite_mode == 'delta' and write_mode != 'row'
+
         with self.driver.session() as session:
             with session.begin_transaction() as tx:
+                if use_delta:
+                    found = tx.run("""
+                        MATCH (d:Document {id: $doc_id}) RETURN count(d) as found
+                    """, doc_id=doc_id).single()["found"]
+                    # 新文档和没有文档目录的旧数据走原有流程
+                    if found:
+                        return self._save_graph_delta(tx, graph_data, doc_id, batch_size)
+
+                # 度数可能变化的节点
+                touched = set()
+
                 # 如果覆盖模式，先删除该文档的旧数据
                 if overwrite:
                     try:
-                        # 1. 删除该文档的所有关系
-                        result_edges = tx.run("""
-                            MATCH ()-[r {doc_id: $doc_id}]->()
-                            DELETE r
-                            RETURN count(r) as deleted
-                        """, doc_id=doc_id)
-                        stats["deleted_edges"] = result_edges.single()["deleted"]
-
-                        # 2. 从节点的 doc_ids 数组中移除该 doc_id
-                        tx.run("""
-                            MATCH (n:Entity)
-                            WHERE $doc_id IN n.doc_ids
-                            SET n.doc_ids = [x IN n.doc_ids WHERE x <> $doc_id]
-                        """, doc_id=doc_id)
-
-                        # 3. 删除 doc_ids 为空的孤立节点
-                        result_nodes = tx.run("""
-                            MATCH (n:Entity)
-                            WHERE size(n.doc_ids) = 0
-                            DELETE n
-                            RETURN count(n) as deleted
-                        """)
-                        stats["deleted_nodes"] = result_nodes.single()["deleted"]
-
+                        deleted = self._delete_doc_footprint(tx, doc_id, keep_document=True,
+                                                             touched=touched)
+                        stats["deleted_nodes"], stats["deleted_edges"] = deleted
                         if stats["deleted_edges"] > 0 or stats["deleted_nodes"] > 0:
                             print(f"  已删除旧数据: {stats['deleted_nodes']} 个节点, {stats['deleted_edges']} 条边")
                     except Exception as e:
+                        # 死锁等瞬时错误会终止事务，交给调用方整体重试
+                        if is_transient_error(e):
+                            raise
                         print(f"删除旧数据失败: {e}")
-                # 批量创建节点
+
+                # 文档目录节点（节点写入时建立 MENTIONS 关联）
+                tx.run(DOCUMENT_MERGE_QUERY, doc_id=doc_id)
+
                 # 注意：节点可能跨文档共享，所以 doc_ids 是数组
-                nodes = graph_data.get("nodes", [])
-                for i in range(0, len(nodes), batch_size):
-                    batch = nodes[i:i+batch_size]
-                    for node in batch:
-                        try:
-                            tx.run("""
-                                MERGE (n:Entity {id: $id})
-                                ON CREATE SET
-                                    n.label = $label,
-                                    n.type = $type,
-                                    n.description = $description,
-                                    n.doc_ids = [$doc_id],
-                                    n.created_at = datetime()
-                                ON MATCH SET
-                                    n.description = CASE
-                                        WHEN n.description IS NULL OR n.description = ''
-                                        THEN $description
-                                        ELSE n.description
-                                    END,
-                                    n.doc_ids = CASE
-                                        WHEN NOT $doc_id IN n.doc_ids
-                                        THEN n.doc_ids + $doc_id
-                                        ELSE n.doc_ids
-                                    END,
-                                    n.updated_at = datetime()
-                            """,
-                                id=node.get("id"),
-                                label=node.get("label"),
-                                type=node.get("type"),
-                                description=node.get("description", ""),
-                                doc_id=doc_id
-                            )
-                            stats["nodes_created"] += 1
-                        except Exception as e:
-                            print(f"节点创建失败: {e}")
-                            stats["failed"] += 1
-
-                # 批量创建关系
-                edges = graph_data.get("edges", [])
-                for i in range(0, len(edges), batch_size):
-                    batch = edges[i:i+batch_size]
-                    for edge in batch:
-                        try:
-                            # 获取中文关系标签
-                            chinese_label = edge.get("label", "RELATES")
-
-                            # 转换为 Neo4j 兼容的关系类型
-                            rel_type = normalize_relation_type(chinese_label)
-
-                            # 使用动态关系类型（通过字符串拼接，因为 Cypher 不支持参数化关系类型）
-                            query = f"""
-                                MATCH (s:Entity {{id: $source}})
-                                MATCH (t:Entity {{id: $target}})
-                                MERGE (s)-[r:{rel_type}]->(t)
-                                SET r.label = $label,
-                                    r.weight = $weight,
-                                    r.doc_id = $doc_id,
-                                    r.updated_at = datetime()
-                            """
-
-                            tx.run(query,
-                                source=edge.get("source"),
-                                target=edge.get("target"),
-                                label=chinese_label,  # 保存中文标签
-                                weight=edge.get("weight", 1),
-                                doc_id=doc_id
-                            )
-                            stats["edges_created"] += 1
-                        except Exception as e:
-                            print(f"关系创建失败 ({chinese_label}): {e}")
-                            stats["failed"] += 1
-
-        # 创建索引（在事务外部，使用单独的 session）
-        try:
-            with self.driver.session() as index_session:
-                index_session.run("CREATE INDEX entity_id_index IF NOT EXISTS FOR (n:Entity) ON (n.id)")
-                index_session.run("CREATE INDEX entity_type_index IF NOT EXISTS FOR (n:Entity) ON (n.type)")
-        except Exception as e:
-            # 索引已存在时会报错，可以忽略
-            pass
+                # 边的两个端点都必须是本文档的节点（经 MENTIONS 可达）
+                node_ids = {node["id"] for node in nodes if node.get("id")}
+                if write_mode == 'row':
+                    self._write_nodes_by_row(tx, nodes, doc_id, stats)
+                    self._write_edges_by_row(tx, edges, doc_id, stats, node_ids)
+                else:
+                    self._write_nodes_unwind(tx, nodes, doc_id, batch_size, stats)
+                    self._write_edges_unwind(tx, edges, doc_id, batch_size, stats, node_ids)
+
+                tx.run(DOCUMENT_COUNTS_QUERY, doc_id=doc_id)
+
+                touched.update(node["id"] for node in nodes if node.get("id"))
+                self.refresh_degrees(touched, tx=tx, batch_size=batch_size)
 
         return stats
 
+    def _save_graph_delta(self, tx, graph_data: Dict, doc_id: str, batch_size: int) -> Dict:
+        """
+        只写入新图谱与文档当前足迹的差异
+
+        Args:
+            tx: 事务
+            graph_data: 新的规范化图谱
+            doc_id: 文档 ID（文档目录中已存在）
+            batch_size: 每批行数
+
+        Returns:
+            保存统计信息（nodes_created / edges_created 只统计实际写入的差异，另含 delta）
+        """
+        from .graph_delta import (
+            FOOTPRINT_NODES_QUERY, FOOTPRINT_EDGES_QUERY, DELETE_EDGES_DELTA_QUERY,
+            DETACH_NODES_DELTA_QUERY, UPDATE_NODES_DELTA_QUERY, compute_graph_delta
+        )
+
+        old_nodes = [dict(record) for record in tx.run(FOOTPRINT_NODES_QUERY, doc_id=doc_id)]
+        old_edges = [dict(record) for record in tx.run(FOOTPRINT_EDGES_QUERY, doc_id=doc_id)]
+        delta = compute_graph_delta(old_nodes, old_edges, graph_data, doc_id)
+
+        stats = {"nodes_created": 0, "edges_created": 0, "failed": delta["rejected"],
+                 "deleted_nodes": 0, "deleted_edges": 0, "mode": "delta",
+                 "delta": delta["counts"]}
+        # 度数可能变化的节点
+        touched = set()
+
+        def batches(rows):
+            return (rows[i:i+batch_size] for i in range(0, len(rows), batch_size))
+
+        # 1. 先删除移除的边和节点，再写入新增和修改
+        for batch in batches(delta["edges_removed"]):
+            stats["deleted_edges"] += tx.run(DELETE_EDGES_DELTA_QUERY, rows=batch,
+                                             doc_id=doc_id).single()["deleted"]
+            touched.update(row["source"] for row in batch)
+            touched.update(row["target"] for row in batch)
+
+        for batch in batches(delta["nodes_removed"]):
+            record = tx.run(DETACH_NODES_DELTA_QUERY, ids=batch, doc_id=doc_id).single()
+            stats["deleted_nodes"] += record["deleted"]
+            touched.update(record.get("touched") or [])
+
+        # 2. 新增节点（同时建立 MENTIONS）、修改节点
+        for batch in batches(delta["nodes_added"]):
+            stats["nodes_created"] += tx.run(NODE_UNWIND_QUERY, rows=batch,
+                                             doc_id=doc_id).single()["written"]
+            touched.update(row["id"] for row in batch)
+
+        for batch in batches(delta["nodes_changed"]):
+            tx.run(UPDATE_NODES_DELTA_QUERY, rows=batch, doc_id=doc_id)
+
+        # 3. 新增和修改的边
+        for query, rows in edge_write_statements(delta["edges_upsert"]):
+            for batch in batches(rows):
+                written = tx.run(query, rows=batch, doc_id=doc_id).single()["written"]
+                stats["edges_created"] += written
+                # 端点不存在的行不会写入，计入失败数
+                stats["failed"] += len(batch) - written
+                touched.update(row["source"] for row in batch)
+                touched.update(row["target"] for row in batch)
+
+        if any(delta["counts"][key] for key in
+               ("nodes_added", "nodes_removed", "edges_added", "edges_changed", "edges_removed")):
+            tx.run(DOCUMENT_COUNTS_QUERY, doc_id=doc_id)
+            self.refresh_degrees(touched, tx=tx, batch_size=batch_size)
+
+        counts = delta["counts"]
+        print(f"  增量写入: 节点 +{counts['nodes_added']} ~{counts['nodes_changed']} -{counts['nodes_removed']}, "
+              f"边 +{counts['edges_added']} ~{counts['edges_changed']} -{counts['edges_removed']}")
+        return stats
+
+    def _delete_doc_footprint(self, tx, doc_id: str, keep_document: bool = False,
+                              touched: set = None):
+        """
+        删除文档的数据，只访问该文档的足迹
+
+        通过 (:Document)-[:MENTIONS]->(:Entity) 定位文档的实体和边；
+        尚未迁移到文档目录的旧数据回退到全图扫描。
+
+        Args:
+            tx: 事务
+            doc_id: 文档 ID
+            keep_document: 是否保留文档节点（覆盖写入时复用）
+            touched: 收集度数可能变化的节点 ID（删除边的端点、被删节点的邻居）
+
+        Returns:
+            (删除的节点数, 删除的边数) 元组
+        """
+        found = tx.run("""
+            MATCH (d:Document {id: $doc_id}) RETURN count(d) as found
+        """, doc_id=doc_id).single()["found"]
+
+        if not found:
+            return self._delete_doc_by_scan(tx, doc_id, touched=touched)
+
+        # 1. 删除该文档的关系（只遍历该文档实体的关系，任一端点可达即删除）
+        edges = tx.run("""
+            MATCH (:Document {id: $doc_id})-[:MENTIONS]->(:Entity)-[r]-(:Entity)
+            WHERE r.doc_id = $doc_id
+            WITH DISTINCT r
+            WITH r, startNode(r).id as source, endNode(r).id as target
+            DELETE r
+            RETURN count(r) as deleted, collect(DISTINCT source) + collect(DISTINCT target) as touched
+        """, doc_id=doc_id).single()
+
+        # 2. 从节点的 doc_ids 中移除该文档，只属于该文档的节点直接删除
+        nodes = tx.run("""
+            MATCH (:Document {id: $doc_id})-[m:MENTIONS]->(n:Entity)
+            DELETE m
+            SET n.doc_ids = [x IN coalesce(n.doc_ids, []) WHERE x <> $doc_id]
+            WITH n WHERE size(n.doc_ids) = 0
+            OPTIONAL MATCH (n)--(o:Entity)
+            WITH n, collect(o.id) as neighbors
+            DETACH DELETE n
+            WITH count(n) as deleted, collect(neighbors) as neighbors
+            RETURN deleted, reduce(ids = [], x IN neighbors | ids + x) as touched
+        """, doc_id=doc_id).single()
+
+        if touched is not None:
+            touched.update(edges.get("touched") or [])
+            touched.update(nodes.get("touched") or [])
+        edges_deleted, nodes_deleted = edges["deleted"], nodes["deleted"]
+
+        if not keep_document:
+            tx.run("""
+                MATCH (d:Document {id: $doc_id}) DETACH DELETE d
+            """, doc_id=doc_id)
+
+        return nodes_deleted, edges_deleted
+
+    def _delete_doc_by_scan(self, tx, doc_id: str, touched: set = None):
+        """旧数据（没有文档节点）的删除方式：扫描全部关系和节点"""
+        edges = tx.run("""
+            MATCH (s)-[r {doc_id: $doc_id}]->(t)
+            WITH r, s.id as source, t.id as target
+            DELETE r
+            RETURN count(r) as deleted, collect(DISTINCT source) + collect(DISTINCT target) as touched
+        """, doc_id=doc_id).single()
+
+        nodes = tx.run("""
+            MATCH (n:Entity)
+            WHERE $doc_id IN n.doc_ids
+            SET n.doc_ids = [x IN n.doc_ids WHERE x <> $doc_id]
+            WITH n WHERE size(n.doc_ids) = 0
+            OPTIONAL MATCH (n)--(o:Entity)
+            WITH n, collect(o.id) as neighbors
+            DETACH DELETE n
+            WITH count(n) as deleted, collect(neighbors) as neighbors
+            RETURN deleted, reduce(ids = [], x IN neighbors | ids + x) as touched
+        """, doc_id=doc_id).single()
+
+        if touched is not None:
+            touched.update(edges.get("touched") or [])
+            touched.update(nodes.get("touched") or [])
+        return nodes["deleted"], edges["deleted"]
+
+    def _write_nodes_unwind(self, tx, nodes: List[Dict], doc_id: str,
+                            batch_size: int, stats: Dict):
+        """每批节点一条 UNWIND MERGE"""
+        rows, rejected = node_rows(nodes)
+        stats["failed"] += rejected
+
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i+batch_size]
+            try:
+                result = tx.run(NODE_UNWIND_QUERY, rows=batch, doc_id=doc_id)
+                stats["nodes_created"] += result.single()["written"]
+            except Exception as e:
+                if is_transient_error(e):
+                    raise
+                print(f"节点批量写入失败 ({len(batch)} 个): {e}")
+                stats["failed"] += len(batch)
+
+    def _write_edges_unwind(self, tx, edges: List[Dict], doc_id: str,
+                            batch_size: int, stats: Dict, node_ids: Set[str]):
+        """每批边按关系类型分组，每种类型一条 UNWIND MERGE（single 模式每批一条）"""
+        for i in range(0, len(edges), batch_size):
+            grouped, rejected = edge_rows_by_type(edges[i:i+batch_size], node_ids)
+            stats["failed"] += rejected
+
+            for query, rows in edge_write_statements(grouped):
+                try:
+                    result = tx.run(query, rows=rows, doc_id=doc_id)
+                    written = result.single()["written"]
+                    stats["edges_created"] += written
+                    # 端点不存在的行不会写入，计入失败数
+                    stats["failed"] += len(rows) - written
+                except Exception as e:
+                    if is_transient_error(e):
+                        raise
+                    print(f"关系批量写入失败 ({rows[0]['rel_type']}, {len(rows)} 条): {e}")
+                    stats["failed"] += len(rows)
+
+    def _write_nodes_by_row(self, tx, nodes: List[Dict], doc_id: str, stats: Dict):
+        """逐行写入节点（NEO4J_WRITE_MODE=row）"""
+        for node in nodes:
+            try:
+                tx.run(NODE_ROW_QUERY,
+                    id=node.get("id"),
+                    label=node.get("label"),
+                    type=node.get("type"),
+                    description=node.get("description", ""),
+                    doc_id=doc_id
+                )
+                stats["nodes_created"] += 1
+            except Exception as e:
+                print(f"节点创建失败: {e}")
+                stats["failed"] += 1
+
+    def _write_edges_by_row(self, tx, edges: List[Dict], doc_id: str, stats: Dict,
+                            node_ids: Set[str]):
+        """逐行写入关系（NEO4J_WRITE_MODE=row）"""
+        for edge in edges:
+            chinese_label = edge.get("label", "RELATES")
+            if edge.get("source") not in node_ids or edge.get("target") not in node_ids:
+                print(f"关系端点不属于本文档，跳过 ({chinese_label}): "
+                      f"{edge.get('source')} -> {edge.get('target')}")
+                stats["failed"] += 1
+                continue
+            try:
+                rel_type = normalize_relation_type(chinese_label)
+                query = (EDGE_SINGLE_ROW_QUERY if relation_mode() == 'single'
+                         else EDGE_ROW_QUERY.format(rel_type=rel_type))
+                tx.run(query,
+                    rel_type=rel_type,
+                    source=edge.get("source"),
+                    target=edge.get("target"),
+                    label=chinese_label,
+                    weight=edge.get("weight", 1),
+                    doc_id=doc_id
+                )
+                stats["edges_created"] += 1
+            except Exception as e:
+                print(f"关系创建失败 ({chinese_label}): {e}")
+                stats["failed"] += 1
+
     def query_subgraph(self, entity_id: str, n_hops: int = 1) -> Dict:
         """
-        查询实体的 N 跳子图
+        查询实体的 N 跳子图（有界、去重）
 
         Args:
             entity_id: 实体 ID
             n_hops: 跳数
 
         Returns:
-            子图数据
+            子图数据 {"nodes", "edges", "truncated"}
+        """
+        nodes, edges = [], []
+        truncated = False
+        for batch in self.iter_subgraph(entity_id, n_hops):
+            nodes.extend(batch["nodes"])
+            edges.extend(batch["edges"])
+            truncated = batch["truncated"]
+        return {"nodes": nodes, "edges": edges, "truncated": truncated}
+
+    def iter_subgraph(self, entity_id: str, n_hops: int = 1, **limits):
+        """
+        逐层流式返回实体的 N 跳子图
+
+        每层只展开上一层新发现的节点，每个节点最多展开 fanout 条关系
+        （按邻居度数、关系权重排序），节点和边超出预算时停止。
+
+        Args:
+            entity_id: 实体 ID
+            n_hops: 跳数
+            limits: fanout / max_nodes / max_edges，覆盖环境变量配置
+
+        Yields:
+            每层新增的 {"nodes", "edges", "level", "truncated"}；第 0 层为起始节点
         """
         with self.driver.session() as session:
-            result = session.run(f"""
-                MATCH path = (start:Entity {{id: $entity_id}})-[*1..{n_hops}]-(connected)
-                WITH start, connected, relationships(path) as rels
-                RETURN
-                    collect(DISTINCT {{
-                        id: start.id,
-                        label: start.label,
-                        type: start.type,
-                        description: start.description
-                    }}) +
-                    collect(DISTINCT {{
-                        id: connected.id,
-                        label: connected.label,
-                        type: connected.type,
-                        description: connected.description
-                    }}) as nodes,
-                    [r in rels | {{
-                        source: startNode(r).id,
-                        target: endNode(r).id,
-                        label: type(r),
-                        weight: r.weight
-                    }}] as edges
-            """, entity_id=entity_id)
-
-            record = result.single()
-            if record:
-                return {
-                    "nodes": record["nodes"],
-                    "edges": record["edges"]
-                }
-            return {"nodes": [], "edges": []}
+            start = session.run(SUBGRAPH_START_QUERY, entity_id=entity_id).single()
+            if not start:
+                return
+
+            expansion = SubgraphExpansion(dict(start), n_hops, **limits)
+            yield {"nodes": [dict(start)], "edges": [], "level": 0, "truncated": False}
+
+            while not expansion.done():
+                rows = [dict(record) for record in session.run(
+                    for_relation_mode(SUBGRAPH_EXPAND_QUERY), frontier=expansion.frontier,
+                    fanout=expansion.fanout
+                )]
+                batch = expansion.add_rows(rows)
+                batch.update(level=expansion.level, truncated=expansion.truncated)
+                yield batch
+
+    def document_entity_ids(self, doc_id: str) -> List[str]:
+        """
+        文档当前关联的实体 ID（通过文档目录）
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            实体 ID 列表（没有文档目录的旧数据返回空列表）
+        """
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (:Document {id: $doc_id})-[:MENTIONS]->(n:Entity)
+                RETURN n.id as id
+            """, doc_id=doc_id)
+            return [record["id"] for record in result]
+
+    def execute_write(self, query: str, **params):
+        """
+        在独立的托管写事务中执行一条查询（死锁等瞬时错误由驱动自动重试）
+
+        Returns:
+            single() 记录
+        """
+        def work(tx):
+            return tx.run(query, **params).single()
+
+        with self.driver.session() as session:
+            return session.execute_write(work)
+
+    def execute_write_consume(self, query: str, **params):
+        """
+        在独立的托管写事务中执行一条不返回记录的查询
+
+        Returns:
+            ResultSummary（写入计数等）
+        """
+        def work(tx):
+            return tx.run(query, **params).consume()
+
+        with self.driver.session() as session:
+            return session.execute_write(work)
+
+    def iter_delete_batches(self, doc_id: str, batch_size: int = 5000):
+        """
+        分批删除文档的边和实体，每批一个有界事务（保留文档节点）
+
+        每批都只删除剩余的数据，中断后重新调用即可继续。
+
+        Args:
+            doc_id: 文档 ID
+            batch_size: 每批行数
+
+        Yields:
+            {"deleted_edges", "deleted_nodes", "touched": 度数可能变化的实体 ID 列表}
+        """
+        found = self.execute_write("MATCH (d:Document {id: $doc_id}) RETURN count(d) as found",
+                                   doc_id=doc_id)
+        if not found or not found["found"]:
+            # 没有文档目录的旧数据：整体扫描删除（一次性迁移前的数据）
+            touched = set()
+
+            def legacy(tx):
+                touched.clear()
+                return self._delete_doc_by_scan(tx, doc_id, touched=touched)
+
+            with self.driver.session() as session:
+                nodes, edges = session.execute_write(legacy)
+            yield {"deleted_edges": edges, "deleted_nodes": nodes, "touched": sorted(touched)}
+            return
+
+        while True:
+            record = self.execute_write(DELETE_EDGES_BATCH_QUERY, doc_id=doc_id, limit=batch_size)
+            yield {"deleted_edges": record["deleted"], "deleted_nodes": 0,
+                   "touched": record["touched"] or []}
+            if record["deleted"] < batch_size:
+                break
+
+        def detach(tx):
+            ids = tx.run(DETACH_MENTIONS_BATCH_QUERY, doc_id=doc_id, limit=batch_size).single()["ids"] or []
+            if not ids:
+                return ids, {"deleted": 0, "touched": []}
+            return ids, tx.run(DELETE_ORPHANS_QUERY, ids=ids).single()
+
+        while True:
+            with self.driver.session() as session:
+                ids, record = session.execute_write(detach)
+            yield {"deleted_edges": 0, "deleted_nodes": record["deleted"],
+                   "touched": record["touched"] or []}
+            if len(ids) < batch_size:
+                break
+
+    def delete_document_node(self, doc_id: str):
+        """删除文档目录节点（分批删除完成后调用）"""
+        self.execute_write("""
+            MATCH (d:Document {id: $doc_id}) DETACH DELETE d RETURN count(d) as deleted
+        """, doc_id=doc_id)
 
     def delete_by_doc(self, doc_id: str) -> Dict:
         """
@@ -333,60 +1242,657 @@ class Neo4jStorage:
             删除统计信息
         """
         with self.driver.session() as session:
-            # 删除关系
-            result_edges = session.run("""
-                MATCH ()-[r {doc_id: $doc_id}]->()
+            with session.begin_transaction() as tx:
+                touched = set()
+                nodes_deleted, edges_deleted = self._delete_doc_footprint(tx, doc_id, touched=touched)
+                self.refresh_degrees(touched, tx=tx)
+
+        return {
+            "nodes_deleted": nodes_deleted,
+            "edges_deleted": edges_deleted
+        }
+
+    def migrate_document_catalog(self, page_size: int = 1000) -> Dict:
+        """
+        为已有数据建立文档目录（一次性迁移，可重复执行）
+
+        按实体分页，根据 doc_ids 创建 (:Document) 节点和 MENTIONS 关联，最后统计每个文档的节点数和边数。
+
+        Args:
+            page_size: 每页实体数
+
+        Returns:
+            {"entities": 处理的实体数, "documents": 文档数}
+        """
+        entities = 0
+        for page in self.iter_entity_ids(page_size=page_size):
+            with self.driver.session() as session:
+                session.run("""
+                    UNWIND $ids as id
+                    MATCH (n:Entity {id: id})
+                    UNWIND coalesce(n.doc_ids, []) as doc_id
+                    MERGE (d:Document {id: doc_id})
+                    ON CREATE SET d.created_at = datetime()
+                    MERGE (d)-[:MENTIONS]->(n)
+                """, ids=[row["id"] for row in page])
+            entities += len(page)
+
+        with self.driver.session() as session:
+            doc_ids = [record["id"] for record in session.run("MATCH (d:Document) RETURN d.id as id")]
+            for doc_id in doc_ids:
+                session.run(DOCUMENT_COUNTS_QUERY, doc_id=doc_id)
+
+        print(f"✓ 文档目录迁移完成: {entities} 个实体, {len(doc_ids)} 个文档")
+        return {"entities": entities, "documents": len(doc_ids)}
+
+    def iter_entity_ids(self, page_size: int = 1000):
+        """
+        按 id 顺序分页遍历所有实体（键集分页，内存占用与页大小成正比）
+
+        Args:
+            page_size: 每页节点数
+
+        Yields:
+            每页的节点列表 [{"id", "label", "type"}, ...]
+        """
+        last_id = ""
+        while True:
+            with self.driver.session() as session:
+                result = session.run("""
+                    MATCH (n:Entity)
+                    WHERE n.id > $last_id
+                    RETURN n.id as id, n.label as label, n.type as type
+                    ORDER BY n.id
+                    LIMIT $limit
+                """, last_id=last_id, limit=page_size)
+                page = [dict(record) for record in result]
+
+            if not page:
+                return
+
+            yield page
+            last_id = page[-1]["id"]
+
+    def iter_entity_edges(self, page_size: int = 1000):
+        """
+        按源节点 id 分页遍历所有实体间的边
+
+        Args:
+            page_size: 每页源节点数
+
+        Yields:
+            每页的边列表 [{"source", "target"}, ...]
+        """
+        last_id = ""
+        while True:
+            with self.driver.session() as session:
+                result = session.run("""
+                    MATCH (s:Entity)
+                    WHERE s.id > $last_id
+                    WITH s ORDER BY s.id LIMIT $limit
+                    OPTIONAL MATCH (s)-[]->(t:Entity)
+                    RETURN s.id as source, t.id as target
+                """, last_id=last_id, limit=page_size)
+                rows = [dict(record) for record in result]
+
+            if not rows:
+                return
+
+            yield [row for row in rows if row["target"] is not None]
+            last_id = max(row["source"] for row in rows)
+
+    def link_entities(self, links: List[Dict]) -> Dict:
+        """
+        批量写入推断出的连接（如全局孤岛连接）
+
+        边归属于源节点的第一个文档，删除该文档时随之删除。
+
+        Args:
+            links: [{"source", "target", "relation"}, ...]
+
+        Returns:
+            {"edges_created": 写入的边数}
+        """
+        grouped = {}
+        for link in links:
+            rel_type = normalize_relation_type(link["relation"])
+            grouped.setdefault(rel_type, []).append(dict(link, rel_type=rel_type))
+        if relation_mode() == 'single':
+            grouped = {None: [row for rows in grouped.values() for row in rows]}
+
+        created = 0
+        with self.driver.session() as session:
+            for rel_type, rows in grouped.items():
+                merge = (f"(s)-[r:{rel_type}]->(t)" if rel_type
+                         else f"(s)-[r:{SINGLE_RELATION_TYPE} {{type: row.rel_type}}]->(t)")
+                result = session.run(f"""
+                    UNWIND $rows as row
+                    MATCH (s:Entity {{id: row.source}})
+                    MATCH (t:Entity {{id: row.target}})
+                    MERGE {merge}
+                    SET r.label = row.relation,
+                        r.weight = 1,
+                        r.inferred = true,
+                        r.doc_id = coalesce(r.doc_id, head(s.doc_ids)),
+                        r.updated_at = datetime()
+                    RETURN count(r) as created
+                """, rows=rows)
+                record = result.single()
+                created += record["created"] if record else 0
+
+            self.refresh_degrees({link[key] for link in links for key in ("source", "target")},
+                                 tx=session)
+
+        return {"edges_created": created}
+
+    def merge_entities(self, source_id: str, target_id: str) -> Dict:
+        """
+        将实体 source_id 合并到 target_id
+
+        关系逐类型迁移到目标节点（Cypher 不支持参数化关系类型），
+        doc_ids 取并集，目标节点描述为空时沿用源节点描述，最后删除源节点。
+
+        Args:
+            source_id: 被合并（删除）的实体 ID
+            target_id: 保留的规范实体 ID
+
+        Returns:
+            合并统计信息
+        """
+        stats = {"merged": 0, "relations_moved": 0}
+        if not source_id or not target_id or source_id == target_id:
+            return stats
+
+        with self.driver.session() as session:
+            with session.begin_transaction() as tx:
+                record = tx.run("""
+                    MATCH (s:Entity {id: $source_id})
+                    MATCH (c:Entity {id: $target_id})
+                    RETURN elementId(s) as source, elementId(c) as target
+                    LIMIT 1
+                """, source_id=source_id, target_id=target_id).single()
+                if not record:
+                    return stats
+
+                stats["relations_moved"] = self._merge_nodes(tx, record["source"], record["target"])
+                stats["merged"] = 1
+
+        return stats
+
+    def _merge_nodes(self, tx, source: str, target: str) -> int:
+        """
+        按 elementId 把节点 source 合并到 target（同一事务内）
+
+        Args:
+            tx: 事务
+            source: 被合并（删除）节点的 elementId
+            target: 保留节点的 elementId
+
+        Returns:
+            迁移的关系数
+        """
+        # 收集源节点的所有关系（出边 + 入边）
+        rels = tx.run("""
+            MATCH (s)-[r]-(o)
+            WHERE elementId(s) = $source AND elementId(o) <> $target AND o <> s
+            RETURN type(r) as type, elementId(o) as other,
+                   startNode(r) = s as outgoing, properties(r) as props
+        """, source=source, target=target)
+
+        grouped = {}
+        for record in rels:
+            key = (record["type"], record["outgoing"])
+            grouped.setdefault(key, []).append({
+                "other": record["other"],
+                "props": record["props"]
+            })
+
+        moved = 0
+        for (rel_type, outgoing), rows in grouped.items():
+            # single 模式的关系类型保存在 r.type 中，必须作为 MERGE 键，否则不同类型会被合并
+            key = (" {type: coalesce(row.props.type, 'RELATES')}"
+                   if rel_type == SINGLE_RELATION_TYPE and relation_mode() == 'single' else "")
+            pattern = (f"(c)-[r:`{rel_type}`{key}]->(o)" if outgoing
+                       else f"(o)-[r:`{rel_type}`{key}]->(c)")
+            tx.run(f"""
+                MATCH (c) WHERE elementId(c) = $target
+                UNWIND $rows as row
+                MATCH (o) WHERE elementId(o) = row.other
+                MERGE {pattern}
+                SET r += row.props
+            """, target=target, rows=rows)
+            moved += len(rows)
+
+        # 合并属性并删除源节点
+        tx.run("""
+            MATCH (s) WHERE elementId(s) = $source
+            MATCH (c) WHERE elementId(c) = $target
+            SET c.doc_ids = coalesce(c.doc_ids, []) +
+                    [x IN coalesce(s.doc_ids, []) WHERE NOT x IN coalesce(c.doc_ids, [])],
+                c.description = CASE
+                    WHEN c.description IS NULL OR c.description = ''
+                    THEN s.description
+                    ELSE c.description
+                END,
+                c.updated_at = datetime()
+            DETACH DELETE s
+        """, source=source, target=target)
+
+        # 目标节点及其邻居的度数可能变化（重复关系被 MERGE 合并）
+        tx.run("""
+            MATCH (c) WHERE elementId(c) = $target
+            OPTIONAL MATCH (c)--(o:Entity)
+            WITH c, collect(DISTINCT o) as neighbors
+            UNWIND neighbors + c as n
+            SET n.degree = COUNT { (n)--() } - COUNT { (n)-[:MENTIONS]-() }
+        """, target=target)
+
+        return moved
+
+    def get_entity_page(self, cursor: str = "", limit: int = 1000) -> List[Dict]:
+        """
+        按 id 键集分页读取实体（重新规范化节点阶段）
+
+        Args:
+            cursor: 上一页最后一个实体 ID（首页为空字符串）
+            limit: 每页节点数
+
+        Returns:
+            [{"id", "type", "description"}, ...]
+        """
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (n:Entity)
+                WHERE n.id > $cursor
+                RETURN n.id as id, n.type as type, n.description as description
+                ORDER BY n.id
+                LIMIT $limit
+            """, cursor=cursor, limit=limit)
+            return [dict(record) for record in result]
+
+    def get_relation_page(self, cursor: str = "", limit: int = 1000):
+        """
+        按源节点 id 分页读取出边（带 elementId，供按关系更新）
+
+        Args:
+            cursor: 上一页最后一个源节点 ID
+            limit: 每页源节点数
+
+        Returns:
+            ([{"source", "rid", "type", "label", "target"}, ...], 下一页游标)；没有更多源节点时游标为 None
+        """
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (s:Entity)
+                WHERE s.id > $cursor
+                WITH s ORDER BY s.id LIMIT $limit
+                OPTIONAL MATCH (s)-[r]->(t:Entity)
+                RETURN s.id as source, elementId(r) as rid, coalesce(r.type, type(r)) as type,
+                       r.label as label, t.id as target
+            """, cursor=cursor, limit=limit)
+            rows = [dict(record) for record in result]
+
+        if not rows:
+            return [], None
+        return ([row for row in rows if row["rid"] is not None],
+                max(row["source"] for row in rows))
+
+    def existing_entity_ids(self, ids: List[str]) -> Set[str]:
+        """
+        查询哪些实体 ID 已存在
+
+        Args:
+            ids: 实体 ID 列表
+
+        Returns:
+            已存在的 ID 集合
+        """
+        if not ids:
+            return set()
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (n:Entity) WHERE n.id IN $ids RETURN n.id as id
+            """, ids=list(ids))
+            return {record["id"] for record in result}
+
+    def set_entity_types(self, rows: List[Dict]) -> int:
+        """
+        批量更新实体类型
+
+        Args:
+            rows: [{"id", "type"}, ...]
+
+        Returns:
+            更新的实体数
+        """
+        if not rows:
+            return 0
+        record = self.execute_write("""
+            UNWIND $rows as row
+            MATCH (n:Entity {id: row.id})
+            SET n.type = row.type, n.updated_at = datetime()
+            RETURN count(n) as written
+        """, rows=rows)
+        return record["written"] if record else 0
+
+    def rename_entity(self, old_id: str, new_id: str) -> Dict:
+        """
+        重命名实体；新 ID 已存在时合并到已有实体
+
+        在同一事务内检查新 ID 是否存在再决定改名或合并，不会因读取后新建的同名实体
+        触发唯一约束；与并发写入的竞争仍失败时回退到 merge_entities。
+
+        Args:
+            old_id: 原实体 ID
+            new_id: 规范化后的实体 ID
+
+        Returns:
+            {"renamed": 0|1, "merged": 0|1, "relations_moved"}
+        """
+        stats = {"renamed": 0, "merged": 0, "relations_moved": 0}
+        if not old_id or not new_id or old_id == new_id:
+            return stats
+
+        try:
+            with self.driver.session() as session:
+                with session.begin_transaction() as tx:
+                    record = tx.run("""
+                        MATCH (s:Entity {id: $old_id})
+                        OPTIONAL MATCH (c:Entity {id: $new_id})
+                        RETURN elementId(s) as source, elementId(c) as target
+                        LIMIT 1
+                    """, old_id=old_id, new_id=new_id).single()
+                    if not record:
+                        return stats
+
+                    if record["target"] is not None:
+                        stats["relations_moved"] = self._merge_nodes(tx, record["source"], record["target"])
+                        stats["merged"] = 1
+                        return stats
+
+                    tx.run("""
+                        MATCH (n) WHERE elementId(n) = $source
+                        SET n.id = $new_id, n.label = $new_id, n.updated_at = datetime()
+                    """, source=record["source"], new_id=new_id)
+                    stats["renamed"] = 1
+        except Exception as e:
+            if is_transient_error(e):
+                raise
+            # 并发写入在检查后创建了同名实体（唯一约束冲突）：改为合并
+            merged = self.merge_entities(old_id, new_id)
+            if not merged["merged"]:
+                raise
+            stats.update(merged)
+        return stats
+
+    def relabel_relations(self, rows: List[Dict]) -> int:
+        """
+        按 elementId 批量更新关系词（关系类型不变）
+
+        Args:
+            rows: [{"rid", "label"}, ...]
+
+        Returns:
+            更新的关系数
+        """
+        if not rows:
+            return 0
+        record = self.execute_write("""
+            UNWIND $rows as row
+            MATCH ()-[r]->() WHERE elementId(r) = row.rid
+            SET r.label = row.label, r.updated_at = datetime()
+            RETURN count(r) as written
+        """, rows=rows)
+        return record["written"] if record else 0
+
+    def retype_relations(self, rel_type: str, rows: List[Dict]) -> int:
+        """
+        按 elementId 把关系重建为新的关系类型（与同类型的已有关系合并），并重算端点度数
+
+        关系类型无法参数化，typed 模式按类型拼接查询；single 模式类型是 RELATES 的属性。
+
+        Args:
+            rel_type: 目标关系类型（normalize_relation_type 的结果）
+            rows: [{"rid", "label"}, ...]
+
+        Returns:
+            重建的关系数
+        """
+        if not rows:
+            return 0
+        if relation_mode() == 'single':
+            query = f"""
+                UNWIND $rows as row
+                MATCH (s)-[r]->(t) WHERE elementId(r) = row.rid
+                MERGE (s)-[n:{SINGLE_RELATION_TYPE} {{type: $rel_type}}]->(t)
+                SET n += properties(r), n.type = $rel_type, n.label = row.label,
+                    n.updated_at = datetime()
                 DELETE r
-                RETURN count(r) as deleted
-            """, doc_id=doc_id)
+                RETURN count(n) as written, collect(s.id) + collect(t.id) as touched
+            """
+        else:
+            query = f"""
+                UNWIND $rows as row
+                MATCH (s)-[r]->(t) WHERE elementId(r) = row.rid
+                MERGE (s)-[n:{rel_type}]->(t)
+                SET n += properties(r), n.label = row.label, n.updated_at = datetime()
+                DELETE r
+                RETURN count(n) as written, collect(s.id) + collect(t.id) as touched
+            """
+
+        def work(tx):
+            record = tx.run(query, rows=rows, rel_type=rel_type).single()
+            # 重建时可能与已有关系合并，端点度数需要重算
+            self.refresh_degrees(set(record["touched"] or []), tx=tx)
+            return record["written"]
 
-            edges_deleted = result_edges.single()["deleted"]
+        with self.driver.session() as session:
+            return session.execute_write(work)
 
-            # 从节点的 doc_ids 中移除该文档
-            # 如果节点只属于这一个文档，则删除节点
-            result_nodes = session.run("""
+    def merge_duplicate_ids(self) -> int:
+        """
+        合并 id 相同的重复实体（缺少唯一约束时并发写入可能产生）
+
+        Returns:
+            合并（删除）的重复节点数
+        """
+        merged = 0
+        with self.driver.session() as session:
+            duplicates = [dict(record) for record in session.run("""
                 MATCH (n:Entity)
-                WHERE $doc_id IN n.doc_ids
-                WITH n,
-                     [id IN n.doc_ids WHERE id <> $doc_id] as new_doc_ids,
-                     size([id IN n.doc_ids WHERE id <> $doc_id]) as remaining_count
-                FOREACH (ignoreMe IN CASE WHEN remaining_count = 0 THEN [1] ELSE [] END |
-                    DELETE n
-                )
-                FOREACH (ignoreMe IN CASE WHEN remaining_count > 0 THEN [1] ELSE [] END |
-                    SET n.doc_ids = new_doc_ids
-                )
-                RETURN count(n) as processed,
-                       sum(CASE WHEN remaining_count = 0 THEN 1 ELSE 0 END) as deleted
-            """, doc_id=doc_id)
+                WITH n.id as id, collect(elementId(n)) as element_ids
+                WHERE size(element_ids) > 1
+                RETURN id, element_ids
+            """)]
+
+            for row in duplicates:
+                target, *sources = row["element_ids"]
+                with session.begin_transaction() as tx:
+                    for source in sources:
+                        self._merge_nodes(tx, source, target)
+                        merged += 1
+
+        if merged:
+            print(f"✓ 已合并 {merged} 个重复实体")
+        return merged
+
+    def refresh_degrees(self, ids, tx=None, batch_size: int = 500):
+        """
+        重算指定实体的度数（实体间关系数，不含 MENTIONS）
 
-            result = result_nodes.single()
-            nodes_deleted = result["deleted"] if result else 0
+        Args:
+            ids: 实体 ID 集合
+            tx: 事务或会话，None 时使用新会话
+            batch_size: 每批节点数
+        """
+        ids = sorted(ids)
+        if not ids:
+            return
+        if tx is None:
+            with self.driver.session() as session:
+                self.refresh_degrees(ids, tx=session, batch_size=batch_size)
+            return
+
+        for i in range(0, len(ids), batch_size):
+            tx.run(DEGREE_UPDATE_QUERY, ids=ids[i:i+batch_size])
+
+    def backfill_degrees(self, page_size: int = 1000) -> int:
+        """
+        为全部实体回填度数（一次性迁移，可重复执行）
 
-            return {
-                "nodes_deleted": nodes_deleted,
-                "edges_deleted": edges_deleted
-            }
+        Args:
+            page_size: 每页实体数
+
+        Returns:
+            处理的实体数
+        """
+        entities = 0
+        for page in self.iter_entity_ids(page_size=page_size):
+            self.refresh_degrees([row["id"] for row in page], batch_size=page_size)
+            entities += len(page)
+
+        print(f"✓ 度数回填完成: {entities} 个实体")
+        return entities
+
+    def convert_to_single_relation_type(self, batch_size: int = 5000) -> int:
+        """
+        把已有关系转换为 single 模式（RELATES + r.type），切换 NEO4J_RELATION_MODE 前执行一次
+
+        分批执行，可重复执行；转换过程中与已有同类型关系重复的会被合并。
+
+        Args:
+            batch_size: 每个事务转换的关系数
+
+        Returns:
+            转换的关系数
+        """
+        converted = 0
+        while True:
+            with self.driver.session() as session:
+                record = session.run("""
+                    MATCH (s:Entity)-[r]->(t:Entity)
+                    WHERE type(r) <> 'RELATES' OR r.type IS NULL
+                    WITH s, r, t, coalesce(r.type, type(r)) as rel_type
+                    LIMIT $limit
+                    MERGE (s)-[n:RELATES {type: rel_type}]->(t)
+                    SET n += properties(r), n.type = rel_type
+                    DELETE r
+                    RETURN count(r) as converted
+                """, limit=batch_size).single()
+            count = record["converted"] if record else 0
+            converted += count
+            if count < batch_size:
+                break
+
+        if converted:
+            # 重复关系合并后度数可能变化
+            self.backfill_degrees()
+        print(f"✓ 关系转换完成: {converted} 条")
+        return converted
+
+    def load_document(self, doc_id: str) -> Dict:
+        """
+        读取文档的图谱（只访问该文档的 MENTIONS 足迹）
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            {"nodes": [...], "edges": [...]}
+        """
+        with self.driver.session() as session:
+            nodes = [dict(record) for record in session.run(DOCUMENT_NODES_QUERY, doc_id=doc_id)]
+            edges = [dict(record) for record in
+                     session.run(for_relation_mode(DOCUMENT_EDGES_QUERY), doc_id=doc_id)]
+        return {"nodes": nodes, "edges": edges}
+
+    def list_documents(self) -> List[Dict]:
+        """
+        从文档目录列出所有文档
+
+        Returns:
+            [{"doc_id", "node_count", "edge_count", "updated_at"}, ...]
+        """
+        with self.driver.session() as session:
+            return [document_from_record(record) for record in session.run(LIST_DOCUMENTS_QUERY)]
+
+    def get_all_graphs(self) -> Dict:
+        """
+        读取全部图谱（节点按度数截断）
+
+        Returns:
+            {"nodes": [...], "edges": [...]}
+        """
+        query = degree_read_query(ALL_NODES_QUERY, self._schema_version())
+        with self.driver.session() as session:
+            nodes = [graph_node_from_record(record) for record in session.run(query)]
+            edges = [graph_edge_from_record(record) for record in session.run(ALL_EDGES_QUERY)]
+        return {"nodes": nodes, "edges": edges}
+
+    def get_graph_page(self, cursor: str = "", limit: int = 1000) -> Dict:
+        """
+        按 Entity.id 键集分页读取图谱
+
+        Args:
+            cursor: 上一页的 next_cursor（首页为空字符串）
+            limit: 每页节点数
+
+        Returns:
+            {"nodes", "edges", "next_cursor"}；最后一页 next_cursor 为 None
+        """
+        with self.driver.session() as session:
+            nodes = [dict(record) for record in
+                     session.run(GRAPH_PAGE_NODES_QUERY, cursor=cursor or "", limit=limit)]
+            edges = [dict(record) for record in
+                     session.run(GRAPH_PAGE_EDGES_QUERY, ids=[node["id"] for node in nodes])] if nodes else []
+        return graph_page(nodes, edges, limit)
+
+    def iter_graph_pages(self, page_size: int = 1000, cursor: str = ""):
+        """
+        流式遍历整个图谱，内存占用只与页大小相关
+
+        Args:
+            page_size: 每页节点数
+            cursor: 起始游标（用于续传）
+
+        Yields:
+            每页 {"nodes", "edges", "next_cursor"}
+        """
+        while True:
+            page = self.get_graph_page(cursor, page_size)
+            if page["nodes"]:
+                yield page
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    def get_popular_labels(self, limit: int = 30) -> List[str]:
+        """
+        按度数获取热门实体（度数索引有序扫描，不做全图聚合；度数迁移未执行时按 coalesce 排序）
+
+        Args:
+            limit: 返回数量
+
+        Returns:
+            实体 ID 列表
+        """
+        query = degree_read_query(POPULAR_LABELS_QUERY, self._schema_version())
+        with self.driver.session() as session:
+            result = session.run(query, limit=limit)
+            return [record["id"] for record in result]
 
     def get_stats(self) -> Dict:
         """
         获取 Neo4j 统计信息
 
+        每个计数都是不带过滤条件的单标签/单类型计数，直接读取计数存储，
+        耗时与图谱规模无关，可供监控面板高频轮询。
+
         Returns:
             统计信息
         """
         with self.driver.session() as session:
-            result = session.run("""
-                MATCH (n:Entity)
-                OPTIONAL MATCH ()-[r]->()
-                RETURN count(DISTINCT n) as node_count, count(r) as edge_count
-            """)
-
-            record = result.single()
-            return {
-                "total_nodes": record["node_count"],
-                "total_edges": record["edge_count"]
-            }
+            return stats_from_record(session.run(STATS_QUERY).single())
 
     def close(self):
         """关闭连接"""
@@ -417,6 +1923,11 @@ def get_neo4j_storage() -> Optional[Neo4jStorage]:
             print(f"Neo4j 初始化失败: {e}")
             return None
 
+        # 启动时执行一次 schema 迁移（约束、索引、数据迁移）
+        if os.getenv('NEO4J_AUTO_MIGRATE', 'true').lower() == 'true':
+            from .schema import SchemaManager
+            SchemaManager(_neo4j_instance).migrate()
+
     return _neo4j_instance
 
 
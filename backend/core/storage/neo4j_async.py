@@ -0,0 +1,259 @@
+"""
+Async Neo4j Storage Adapter
+Neo4j 异步存储适配器
+
+核心功能：
+- 基于 neo4j AsyncGraphDatabase，供 FastAPI 端点使用，查询期间不阻塞事件循环
+- 只提供读查询，与同步 Neo4jStorage 共用同一组 Cypher 和结果格式
+- 写入（save_graph_batch 等）仍走同步驱动，供 process_book.py 等脚本使用
+"""
+
+import os
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+from .neo4j import (
+    POPULAR_LABELS_QUERY, STATS_QUERY, SUBGRAPH_START_QUERY, SUBGRAPH_EXPAND_QUERY,
+    DOCUMENT_NODES_QUERY, DOCUMENT_EDGES_QUERY, LIST_DOCUMENTS_QUERY,
+    ALL_NODES_QUERY, ALL_EDGES_QUERY, GRAPH_PAGE_NODES_QUERY, GRAPH_PAGE_EDGES_QUERY,
+    SCHEMA_VERSION_QUERY, DEGREE_MIGRATION_VERSION,
+    SubgraphExpansion, graph_page, stats_from_record, document_from_record,
+    graph_node_from_record, graph_edge_from_record, for_relation_mode, degree_read_query
+)
+
+try:
+    from neo4j import AsyncGraphDatabase
+    NEO4J_ASYNC_AVAILABLE = True
+except ImportError:
+    NEO4J_ASYNC_AVAILABLE = False
+
+
+# 加载环境变量
+load_dotenv()
+
+
+class AsyncNeo4jStorage:
+    """Neo4j 异步存储适配器（只读）"""
+
+    def __init__(self):
+        """
+        初始化 Neo4j 异步连接
+        所有配置从环境变量读取（与 Neo4jStorage 相同）
+        """
+        if not NEO4J_ASYNC_AVAILABLE:
+            raise ImportError("需要安装 neo4j 包: pip install neo4j")
+
+        uri = os.getenv('NEO4J_URI')
+        user = os.getenv('NEO4J_USER')
+        password = os.getenv('NEO4J_PASSWORD')
+
+        if not all([uri, user, password]):
+            raise ValueError("请在 .env 中配置 NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD")
+
+        max_pool_size = int(os.getenv('NEO4J_MAX_POOL_SIZE', '50'))
+
+        self.driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_pool_size
+        )
+
+        # 度数迁移已执行后缓存的 schema 版本（0 表示尚未确认）
+        self.schema_version = 0
+
+    async def _fetch(self, query: str, **params) -> List:
+        """执行只读查询，返回全部记录"""
+        async with self.driver.session() as session:
+            result = await session.run(query, **params)
+            return [record async for record in result]
+
+    async def _schema_version(self) -> int:
+        """数据库已执行的 schema 版本（度数迁移执行后缓存，之前每次查询）"""
+        if self.schema_version:
+            return self.schema_version
+        records = await self._fetch(SCHEMA_VERSION_QUERY)
+        version = (records[0]["version"] if records else None) or 0
+        if version >= DEGREE_MIGRATION_VERSION:
+            self.schema_version = version
+        return version
+
+    async def query_subgraph(self, entity_id: str, n_hops: int = 1) -> Dict:
+        """
+        查询实体的 N 跳子图（有界、去重，与同步版本一致）
+
+        Args:
+            entity_id: 实体 ID
+            n_hops: 跳数
+
+        Returns:
+            子图数据 {"nodes", "edges", "truncated"}
+        """
+        nodes, edges = [], []
+        truncated = False
+        async for batch in self.iter_subgraph(entity_id, n_hops):
+            nodes.extend(batch["nodes"])
+            edges.extend(batch["edges"])
+            truncated = batch["truncated"]
+        return {"nodes": nodes, "edges": edges, "truncated": truncated}
+
+    async def iter_subgraph(self, entity_id: str, n_hops: int = 1, **limits):
+        """
+        逐层流式返回实体的 N 跳子图
+
+        Args:
+            entity_id: 实体 ID
+            n_hops: 跳数
+            limits: fanout / max_nodes / max_edges
+
+        Yields:
+            每层新增的 {"nodes", "edges", "level", "truncated"}
+        """
+        start = await self._fetch(SUBGRAPH_START_QUERY, entity_id=entity_id)
+        if not start:
+            return
+
+        expansion = SubgraphExpansion(dict(start[0]), n_hops, **limits)
+        yield {"nodes": [dict(start[0])], "edges": [], "level": 0, "truncated": False}
+
+        while not expansion.done():
+            rows = await self._fetch(for_relation_mode(SUBGRAPH_EXPAND_QUERY),
+                                     frontier=expansion.frontier, fanout=expansion.fanout)
+            batch = expansion.add_rows([dict(record) for record in rows])
+            batch.update(level=expansion.level, truncated=expansion.truncated)
+            yield batch
+
+    async def load_document(self, doc_id: str) -> Dict:
+        """
+        读取文档的图谱
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            {"nodes": [...], "edges": [...]}
+        """
+        nodes = await self._fetch(DOCUMENT_NODES_QUERY, doc_id=doc_id)
+        edges = await self._fetch(for_relation_mode(DOCUMENT_EDGES_QUERY), doc_id=doc_id)
+        return {"nodes": [dict(record) for record in nodes],
+                "edges": [dict(record) for record in edges]}
+
+    async def list_documents(self) -> List[Dict]:
+        """
+        从文档目录列出所有文档
+
+        Returns:
+            文档列表
+        """
+        return [document_from_record(record) for record in await self._fetch(LIST_DOCUMENTS_QUERY)]
+
+    async def get_all_graphs(self) -> Dict:
+        """
+        读取全部图谱（节点按度数截断）
+
+        Returns:
+            {"nodes": [...], "edges": [...]}
+        """
+        nodes = await self._fetch(degree_read_query(ALL_NODES_QUERY, await self._schema_version()))
+        edges = await self._fetch(ALL_EDGES_QUERY)
+        return {"nodes": [graph_node_from_record(record) for record in nodes],
+                "edges": [graph_edge_from_record(record) for record in edges]}
+
+    async def get_graph_page(self, cursor: str = "", limit: int = 1000) -> Dict:
+        """
+        按 Entity.id 键集分页读取图谱
+
+        Args:
+            cursor: 上一页的 next_cursor
+            limit: 每页节点数
+
+        Returns:
+            {"nodes", "edges", "next_cursor"}
+        """
+        nodes = [dict(record) for record in
+                 await self._fetch(GRAPH_PAGE_NODES_QUERY, cursor=cursor or "", limit=limit)]
+        edges = []
+        if nodes:
+            edges = [dict(record) for record in
+                     await self._fetch(GRAPH_PAGE_EDGES_QUERY, ids=[node["id"] for node in nodes])]
+        return graph_page(nodes, edges, limit)
+
+    async def iter_graph_pages(self, page_size: int = 1000, cursor: str = ""):
+        """
+        流式遍历整个图谱
+
+        Args:
+            page_size: 每页节点数
+            cursor: 起始游标
+
+        Yields:
+            每页 {"nodes", "edges", "next_cursor"}
+        """
+        while True:
+            page = await self.get_graph_page(cursor, page_size)
+            if page["nodes"]:
+                yield page
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    async def get_popular_labels(self, limit: int = 30) -> List[str]:
+        """
+        按度数获取热门实体
+
+        Args:
+            limit: 返回数量
+
+        Returns:
+            实体 ID 列表
+        """
+        query = degree_read_query(POPULAR_LABELS_QUERY, await self._schema_version())
+        return [record["id"] for record in await self._fetch(query, limit=limit)]
+
+    async def get_stats(self) -> Dict:
+        """
+        获取统计信息（计数存储）
+
+        Returns:
+            统计信息
+        """
+        records = await self._fetch(STATS_QUERY)
+        return stats_from_record(records[0])
+
+    async def close(self):
+        """关闭连接"""
+        if self.driver:
+            await self.driver.close()
+
+
+# 单例实例
+_async_neo4j_instance: Optional[AsyncNeo4jStorage] = None
+
+
+def get_async_neo4j_storage() -> Optional[AsyncNeo4jStorage]:
+    """
+    获取 Neo4j 异步存储实例（单例）
+
+    Returns:
+        AsyncNeo4jStorage 实例，如果不可用返回 None
+    """
+    global _async_neo4j_instance
+
+    if not NEO4J_ASYNC_AVAILABLE:
+        return None
+
+    if _async_neo4j_instance is None:
+        try:
+            _async_neo4j_instance = AsyncNeo4jStorage()
+        except Exception as e:
+            print(f"Neo4j 异步驱动初始化失败: {e}")
+            return None
+
+    return _async_neo4j_instance
+
+
+async def close_async_neo4j_storage():
+    """关闭异步驱动（应用退出时调用）"""
+    global _async_neo4j_instance
+    if _async_neo4j_instance is not None:
+        await _async_neo4j_instance.close()
+        _async_neo4j_instance = None
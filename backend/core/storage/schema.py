@@ -0,0 +1,190 @@
+"""
+Neo4j Schema Manager
+Neo4j schema 版本化迁移
+
+核心功能：
+- 启动时执行一次，代替每次保存后的 CREATE INDEX
+- 迁移按版本号顺序执行，已执行的版本记录在 (:SchemaMigration) 节点中
+- Entity.id 唯一约束（MERGE 走约束索引，并发保存不会产生重复实体）
+- 实体 type / doc_ids / degree 索引、关系 doc_id 索引、全文索引
+- 查询当前 schema 状态（供 /ready 使用）
+"""
+
+from typing import Callable, Dict, List, NamedTuple, Union
+
+from .neo4j import RELATION_TYPE_MAPPING
+
+
+class Migration(NamedTuple):
+    """单个迁移：语句列表或接收 storage 的函数"""
+    version: int
+    name: str
+    steps: Union[List[str], Callable]
+
+
+def _relation_types() -> List[str]:
+    """所有可能写入的关系类型（normalize_relation_type 的取值范围）"""
+    return sorted(set(RELATION_TYPE_MAPPING.values()) | {'RELATES'})
+
+
+def _unique_entity_ids(storage):
+    """先合并重复实体，再用唯一约束替换原来的 id 普通索引"""
+    storage.merge_duplicate_ids()
+    with storage.driver.session() as session:
+        # 唯一约束自带索引，与同属性的普通索引冲突
+        session.run("DROP INDEX entity_id_index IF EXISTS")
+        session.run("CREATE CONSTRAINT entity_id_unique IF NOT EXISTS "
+                    "FOR (n:Entity) REQUIRE n.id IS UNIQUE")
+
+
+def _document_catalog(storage):
+    """文档目录约束，并为已有数据建立 (:Document) 节点"""
+    with storage.driver.session() as session:
+        session.run("CREATE CONSTRAINT document_id_unique IF NOT EXISTS "
+                    "FOR (d:Document) REQUIRE d.id IS UNIQUE")
+    storage.migrate_document_catalog()
+
+
+def _relationship_doc_id_indexes(storage):
+    """关系索引必须按类型创建"""
+    with storage.driver.session() as session:
+        for rel_type in _relation_types():
+            session.run(f"CREATE INDEX rel_{rel_type.lower()}_doc_id IF NOT EXISTS "
+                        f"FOR ()-[r:{rel_type}]-() ON (r.doc_id)")
+
+
+def _entity_degree(storage):
+    """度数索引（按度数排序的查询走索引有序扫描），并回填已有实体的度数"""
+    with storage.driver.session() as session:
+        session.run("CREATE INDEX entity_degree_index IF NOT EXISTS FOR (n:Entity) ON (n.degree)")
+    storage.backfill_degrees()
+
+
+def _single_relation_indexes(storage):
+    """single 关系模式下按 r.type / r.label 过滤关系（typed 模式也可以创建，不影响写入）"""
+    with storage.driver.session() as session:
+        session.run("CREATE INDEX rel_relates_type IF NOT EXISTS "
+                    "FOR ()-[r:RELATES]-() ON (r.type)")
+        session.run("CREATE INDEX rel_relates_label IF NOT EXISTS "
+                    "FOR ()-[r:RELATES]-() ON (r.label)")
+
+
+# 迁移列表：只能追加，不能修改已发布的版本
+MIGRATIONS: List[Migration] = [
+    Migration(1, "entity_id_unique", _unique_entity_ids),
+    Migration(2, "entity_property_indexes", [
+        "CREATE INDEX entity_type_index IF NOT EXISTS FOR (n:Entity) ON (n.type)",
+        "CREATE INDEX entity_doc_ids_index IF NOT EXISTS FOR (n:Entity) ON (n.doc_ids)",
+    ]),
+    Migration(3, "document_catalog", _document_catalog),
+    Migration(4, "relationship_doc_id_indexes", _relationship_doc_id_indexes),
+    Migration(5, "entity_fulltext", [
+        "CREATE FULLTEXT INDEX entity_fulltext IF NOT EXISTS "
+        "FOR (n:Entity) ON EACH [n.id, n.label, n.description]",
+    ]),
+    Migration(6, "entity_degree", _entity_degree),
+    Migration(7, "single_relation_indexes", _single_relation_indexes),
+]
+
+
+class SchemaManager:
+    """Neo4j schema 迁移管理器"""
+
+    def __init__(self, storage, migrations: List[Migration] = None):
+        """
+        初始化管理器
+
+        Args:
+            storage: Neo4jStorage 实例
+            migrations: 迁移列表（默认 MIGRATIONS）
+        """
+        self.storage = storage
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+
+    @property
+    def latest_version(self) -> int:
+        """最新迁移版本"""
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self) -> int:
+        """
+        数据库当前的 schema 版本
+
+        Returns:
+            已执行的最大版本号，未执行过迁移时为 0
+        """
+        with self.storage.driver.session() as session:
+            record = session.run("""
+                MATCH (m:SchemaMigration) RETURN max(m.version) as version
+            """).single()
+        return (record["version"] if record else None) or 0
+
+    def pending(self) -> List[Migration]:
+        """尚未执行的迁移"""
+        current = self.current_version()
+        return [m for m in self.migrations if m.version > current]
+
+    def _apply(self, migration: Migration):
+        """执行单个迁移并记录版本"""
+        if callable(migration.steps):
+            migration.steps(self.storage)
+        else:
+            with self.storage.driver.session() as session:
+                for statement in migration.steps:
+                    session.run(statement)
+
+        with self.storage.driver.session() as session:
+            session.run("""
+                MERGE (m:SchemaMigration {version: $version})
+                SET m.name = $name, m.applied_at = datetime()
+            """, version=migration.version, name=migration.name)
+
+    def migrate(self) -> Dict:
+        """
+        按顺序执行所有未执行的迁移（失败时停止，下次启动从失败的版本继续）
+
+        Returns:
+            schema 状态 {"version", "latest", "applied", "error"?}
+        """
+        applied = []
+        state = {"version": 0, "latest": self.latest_version, "applied": applied}
+
+        try:
+            for migration in self.pending():
+                print(f"  执行 schema 迁移 v{migration.version}: {migration.name}")
+                self._apply(migration)
+                applied.append(migration.name)
+            state["version"] = self.current_version()
+            if applied:
+                print(f"✓ Neo4j schema 已迁移到 v{state['version']}")
+        except Exception as e:
+            print(f"⚠ Neo4j schema 迁移失败: {e}")
+            state["error"] = str(e)
+            try:
+                state["version"] = self.current_version()
+            except Exception:
+                pass
+
+        self.storage.schema_state = state
+        return state
+
+    def get_state(self) -> Dict:
+        """
+        查询 schema 状态（供就绪检查使用）
+
+        Returns:
+            {"version", "latest", "pending", "indexes_online", "indexes_total"}
+        """
+        version = self.current_version()
+        with self.storage.driver.session() as session:
+            indexes = [dict(record) for record in session.run(
+                "SHOW INDEXES YIELD name, state RETURN name, state"
+            )]
+
+        return {
+            "version": version,
+            "latest": self.latest_version,
+            "pending": [m.name for m in self.migrations if m.version > version],
+            "indexes_online": sum(1 for index in indexes if index["state"] == "ONLINE"),
+            "indexes_total": len(indexes)
+        }
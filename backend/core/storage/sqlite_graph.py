@@ -0,0 +1,723 @@
+"""
+SQLite Graph Storage
+嵌入式图谱存储（单机部署、CI、基准测试）
+
+核心功能：
+- 与 Neo4jStorage 相同的接口（save_graph_batch / query_subgraph / delete_by_doc / get_stats /
+  list_documents / load_document / 分页读取 / 分批删除 / 实体合并），通过 GRAPH_BACKEND=sqlite 选择
+- 表结构对应 Neo4j 的图模型：entities（Entity 节点）、documents（Document 节点）、
+  mentions（MENTIONS 关联）、edges（实体间关系，以 (source, 关系类型, target) 为键，与 MERGE 一致）
+- 写入语义与 Neo4j 一致：共享节点只补全空描述，只属于本文档的节点随文档删除，维护 degree
+- 子图查询复用 SubgraphExpansion 的去重和预算规则；问答检索由管理器的进程内邻接索引完成
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .neo4j import (
+    node_rows,
+    edge_rows_by_type,
+    normalize_relation_type,
+    graph_page,
+    SubgraphExpansion
+)
+
+
+# 加载环境变量
+load_dotenv()
+
+
+SCHEMA_VERSION = 1
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS entities (
+        id TEXT PRIMARY KEY,
+        label TEXT,
+        type TEXT,
+        description TEXT,
+        degree INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT,
+        updated_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_entities_degree ON entities(degree DESC);
+
+    CREATE TABLE IF NOT EXISTS documents (
+        id TEXT PRIMARY KEY,
+        node_count INTEGER NOT NULL DEFAULT 0,
+        edge_count INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT,
+        updated_at TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS mentions (
+        doc_id TEXT NOT NULL,
+        entity_id TEXT NOT NULL,
+        PRIMARY KEY (doc_id, entity_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_mentions_entity ON mentions(entity_id);
+
+    CREATE TABLE IF NOT EXISTS edges (
+        source TEXT NOT NULL,
+        rel_type TEXT NOT NULL,
+        target TEXT NOT NULL,
+        label TEXT,
+        weight REAL NOT NULL DEFAULT 1,
+        doc_id TEXT,
+        inferred INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT,
+        PRIMARY KEY (source, rel_type, target)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_edges_target ON edges(target);
+    CREATE INDEX IF NOT EXISTS idx_edges_doc ON edges(doc_id);
+"""
+
+# 节点写入：新节点直接写入；已有节点只补全空描述（与 NODE_UNWIND_QUERY 一致）
+NODE_UPSERT_SQL = """
+    INSERT INTO entities (id, label, type, description, created_at, updated_at)
+    VALUES (:id, :label, :type, :description, :now, :now)
+    ON CONFLICT(id) DO UPDATE SET
+        description = CASE
+            WHEN entities.description IS NULL OR entities.description = ''
+            THEN excluded.description
+            ELSE entities.description
+        END,
+        updated_at = excluded.updated_at
+"""
+
+# 边写入：两个端点都存在时才写入（与 MATCH + MERGE 一致）
+EDGE_UPSERT_SQL = """
+    INSERT INTO edges (source, rel_type, target, label, weight, doc_id, updated_at)
+    SELECT :source, :rel_type, :target, :label, coalesce(:weight, 1), :doc_id, :now
+    WHERE EXISTS (SELECT 1 FROM entities WHERE id = :source)
+      AND EXISTS (SELECT 1 FROM entities WHERE id = :target)
+    ON CONFLICT(source, rel_type, target) DO UPDATE SET
+        label = excluded.label,
+        weight = excluded.weight,
+        doc_id = excluded.doc_id,
+        updated_at = excluded.updated_at
+"""
+
+# 度数：实体间关系数（自环只计一次）
+DEGREE_UPDATE_SQL = """
+    UPDATE entities SET degree =
+        (SELECT count(*) FROM edges WHERE source = entities.id)
+        + (SELECT count(*) FROM edges WHERE target = entities.id AND source != target)
+    WHERE id = ?
+"""
+
+DOCUMENT_COUNTS_SQL = """
+    UPDATE documents SET
+        node_count = (SELECT count(*) FROM mentions WHERE doc_id = :doc_id),
+        edge_count = (SELECT count(*) FROM edges WHERE doc_id = :doc_id),
+        updated_at = :now
+    WHERE id = :doc_id
+"""
+
+# 逐层扩展：每个前沿节点只取邻居度数/关系权重最高的 fanout 条关系（与 SUBGRAPH_EXPAND_QUERY 一致）
+SUBGRAPH_EXPAND_SQL = """
+    WITH frontier(id) AS (SELECT value FROM json_each(:frontier)),
+    incident AS (
+        SELECT f.id as fid, e.source, e.rel_type, e.target, e.label, e.weight, e.target as other
+        FROM frontier f JOIN edges e ON e.source = f.id
+        UNION ALL
+        SELECT f.id, e.source, e.rel_type, e.target, e.label, e.weight, e.source
+        FROM frontier f JOIN edges e ON e.target = f.id AND e.source != e.target
+    ),
+    ranked AS (
+        SELECT i.*, m.label as node_label, m.type, m.description,
+               ROW_NUMBER() OVER (
+                   PARTITION BY i.fid ORDER BY m.degree DESC, coalesce(i.weight, 1) DESC
+               ) as rn
+        FROM incident i JOIN entities m ON m.id = i.other
+    )
+    SELECT source || char(31) || rel_type || char(31) || target as rid,
+           source, target, label, weight,
+           other as id, node_label, type, description
+    FROM ranked
+    WHERE rn <= :fanout
+"""
+
+
+class SQLiteGraphStorage:
+    """SQLite 图谱存储（接口与 Neo4jStorage 一致）"""
+
+    def __init__(self, db_path: str = None):
+        """
+        打开（或创建）数据库
+
+        Args:
+            db_path: 数据库文件路径，None 时从环境变量读取；":memory:" 为内存数据库
+        """
+        if db_path is None:
+            db_path = os.getenv('SQLITE_GRAPH_PATH', './data/storage/graph.db')
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+
+        # 单连接 + 锁：FastAPI 线程池中的读写串行执行
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock:
+            if db_path != ":memory:":
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA_SQL)
+
+        # 与 Neo4jStorage 一致的 schema 状态（表结构在连接时创建，无需迁移）
+        self.schema_state: Dict = {"backend": "sqlite", "version": SCHEMA_VERSION,
+                                   "latest": SCHEMA_VERSION}
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat()
+
+    def _rows(self, sql: str, params=()) -> List[Dict]:
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    # ==================== 写入 ====================
+
+    def save_graph_batch(self, graph_data: Dict, doc_id: str,
+                         overwrite: bool = True) -> Dict:
+        """
+        保存图谱（单个事务）
+
+        覆盖已有文档时先删除旧数据再全部写入（本地事务，无需增量写入）。
+
+        Args:
+            graph_data: 图谱数据，包含 nodes 和 edges
+            doc_id: 文档 ID
+            overwrite: 是否覆盖已存在的文档数据（默认 True）
+
+        Returns:
+            保存统计信息
+        """
+        stats = {"nodes_created": 0, "edges_created": 0, "failed": 0,
+                 "deleted_nodes": 0, "deleted_edges": 0}
+        nodes, rejected_nodes = node_rows(graph_data.get("nodes", []))
+        grouped, rejected_edges = edge_rows_by_type(graph_data.get("edges", []),
+                                                    {row["id"] for row in nodes})
+        stats["failed"] = rejected_nodes + rejected_edges
+        now = self._now()
+
+        with self._lock, self.conn:
+            touched = set()
+            if overwrite:
+                deleted_edges, deleted_nodes = self._delete_footprint(doc_id, touched)
+                stats["deleted_edges"], stats["deleted_nodes"] = deleted_edges, deleted_nodes
+                if deleted_edges or deleted_nodes:
+                    print(f"  已删除旧数据: {deleted_nodes} 个节点, {deleted_edges} 条边")
+
+            self.conn.execute("""
+                INSERT INTO documents (id, created_at, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO NOTHING
+            """, (doc_id, now, now))
+
+            for row in nodes:
+                row["now"] = now
+            self.conn.executemany(NODE_UPSERT_SQL, nodes)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO mentions (doc_id, entity_id) VALUES (?, ?)",
+                [(doc_id, row["id"]) for row in nodes])
+            stats["nodes_created"] = len(nodes)
+
+            for rows in grouped.values():
+                params = [dict(row, doc_id=doc_id, now=now) for row in rows]
+                written = self.conn.executemany(EDGE_UPSERT_SQL, params).rowcount
+                stats["edges_created"] += written
+                stats["failed"] += len(rows) - written
+                touched.update(row[key] for row in rows for key in ("source", "target"))
+
+            self._refresh_degrees(touched)
+            self.conn.execute(DOCUMENT_COUNTS_SQL, {"doc_id": doc_id, "now": now})
+
+        return stats
+
+    def _delete_footprint(self, doc_id: str, touched: set):
+        """
+        删除文档的边和只属于该文档的实体（保留文档行，调用方负责事务）
+
+        Returns:
+            (删除的边数, 删除的节点数)
+        """
+        deleted_edges = deleted_nodes = 0
+        for batch in self._iter_delete(doc_id, batch_size=None):
+            deleted_edges += batch["deleted_edges"]
+            deleted_nodes += batch["deleted_nodes"]
+            touched.update(batch["touched"])
+        return deleted_edges, deleted_nodes
+
+    def _iter_delete(self, doc_id: str, batch_size: Optional[int]):
+        """
+        分批删除文档数据（不提交事务）
+
+        Args:
+            doc_id: 文档 ID
+            batch_size: 每批行数，None 时一次删除全部
+
+        Yields:
+            {"deleted_edges", "deleted_nodes", "touched"}
+        """
+        limit = batch_size or -1
+
+        while True:
+            rows = self._rows("""
+                SELECT source, rel_type, target FROM edges WHERE doc_id = ? LIMIT ?
+            """, (doc_id, limit))
+            if not rows:
+                break
+            self.conn.executemany("""
+                DELETE FROM edges WHERE source = :source AND rel_type = :rel_type AND target = :target
+            """, rows)
+            yield {"deleted_edges": len(rows), "deleted_nodes": 0,
+                   "touched": sorted({row[key] for row in rows for key in ("source", "target")})}
+            if batch_size is None or len(rows) < batch_size:
+                break
+
+        while True:
+            ids = [row["entity_id"] for row in self._rows("""
+                SELECT entity_id FROM mentions WHERE doc_id = ? LIMIT ?
+            """, (doc_id, limit))]
+            if not ids:
+                break
+            self.conn.executemany("DELETE FROM mentions WHERE doc_id = ? AND entity_id = ?",
+                                  [(doc_id, entity_id) for entity_id in ids])
+
+            # 不再属于任何文档的实体：连同其全部关系删除，邻居的度数需要重算
+            orphans = [entity_id for entity_id in ids if not self.conn.execute(
+                "SELECT 1 FROM mentions WHERE entity_id = ? LIMIT 1", (entity_id,)).fetchone()]
+            touched = set()
+            for entity_id in orphans:
+                for row in self.conn.execute("""
+                    SELECT target as id FROM edges WHERE source = ?
+                    UNION SELECT source FROM edges WHERE target = ?
+                """, (entity_id, entity_id)):
+                    touched.add(row["id"])
+                self.conn.execute("DELETE FROM edges WHERE source = ? OR target = ?",
+                                  (entity_id, entity_id))
+                self.conn.execute("DELETE FROM entities WHERE id = ?", (entity_id,))
+
+            yield {"deleted_edges": 0, "deleted_nodes": len(orphans),
+                   "touched": sorted(touched - set(orphans))}
+            if batch_size is None or len(ids) < batch_size:
+                break
+
+    def iter_delete_batches(self, doc_id: str, batch_size: int = 5000):
+        """
+        分批删除文档的边和实体，每批一个事务（保留文档行）
+
+        Args:
+            doc_id: 文档 ID
+            batch_size: 每批行数
+
+        Yields:
+            {"deleted_edges", "deleted_nodes", "touched"}
+        """
+        batches = self._iter_delete(doc_id, batch_size)
+        while True:
+            with self._lock, self.conn:
+                batch = next(batches, None)
+            if batch is None:
+                return
+            yield batch
+
+    def delete_document_node(self, doc_id: str):
+        """删除文档行（分批删除完成后调用）"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def delete_by_doc(self, doc_id: str) -> Dict:
+        """
+        删除指定文档的所有数据
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            删除统计信息
+        """
+        with self._lock, self.conn:
+            touched = set()
+            edges_deleted, nodes_deleted = self._delete_footprint(doc_id, touched)
+            self._refresh_degrees(touched)
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+        return {
+            "nodes_deleted": nodes_deleted,
+            "edges_deleted": edges_deleted
+        }
+
+    def refresh_degrees(self, ids, tx=None, batch_size: int = 500):
+        """
+        重算指定实体的度数（独立事务）
+
+        Args:
+            ids: 实体 ID 集合
+            tx: 兼容 Neo4jStorage 的参数（忽略）
+            batch_size: 兼容 Neo4jStorage 的参数（忽略）
+        """
+        with self._lock, self.conn:
+            self._refresh_degrees(ids)
+
+    def _refresh_degrees(self, ids):
+        """重算度数（在调用方的事务中执行）"""
+        self.conn.executemany(DEGREE_UPDATE_SQL, [(entity_id,) for entity_id in sorted(ids)])
+
+    def link_entities(self, links: List[Dict]) -> Dict:
+        """
+        批量写入推断出的连接（边归属于源节点的第一个文档）
+
+        Args:
+            links: [{"source", "target", "relation"}, ...]
+
+        Returns:
+            {"edges_created": 写入的边数}
+        """
+        now = self._now()
+        rows = [{
+            "source": link["source"],
+            "target": link["target"],
+            "rel_type": normalize_relation_type(link["relation"]),
+            "label": link["relation"],
+            "now": now
+        } for link in links]
+
+        with self._lock, self.conn:
+            created = self.conn.executemany("""
+                INSERT INTO edges (source, rel_type, target, label, weight, doc_id, inferred, updated_at)
+                SELECT :source, :rel_type, :target, :label, 1,
+                       (SELECT min(doc_id) FROM mentions WHERE entity_id = :source), 1, :now
+                WHERE EXISTS (SELECT 1 FROM entities WHERE id = :source)
+                  AND EXISTS (SELECT 1 FROM entities WHERE id = :target)
+                ON CONFLICT(source, rel_type, target) DO UPDATE SET
+                    label = excluded.label, weight = 1, inferred = 1,
+                    doc_id = coalesce(edges.doc_id, excluded.doc_id),
+                    updated_at = excluded.updated_at
+            """, rows).rowcount
+            self._refresh_degrees({row[key] for row in rows for key in ("source", "target")})
+
+        return {"edges_created": created}
+
+    def merge_entities(self, source_id: str, target_id: str) -> Dict:
+        """
+        将实体 source_id 合并到 target_id
+
+        关系迁移到目标节点（目标已有相同关系时保留目标的），两者之间的关系删除，
+        文档关联取并集，目标描述为空时沿用源描述，最后删除源节点。
+
+        Args:
+            source_id: 被合并（删除）的实体 ID
+            target_id: 保留的规范实体 ID
+
+        Returns:
+            合并统计信息
+        """
+        stats = {"merged": 0, "relations_moved": 0}
+        if not source_id or not target_id or source_id == target_id:
+            return stats
+
+        with self._lock, self.conn:
+            found = self.conn.execute("SELECT count(*) FROM entities WHERE id IN (?, ?)",
+                                      (source_id, target_id)).fetchone()[0]
+            if found < 2:
+                return stats
+
+            neighbors = {row["id"] for row in self.conn.execute("""
+                SELECT target as id FROM edges WHERE source = ?
+                UNION SELECT source FROM edges WHERE target = ?
+            """, (source_id, source_id))}
+
+            self.conn.execute("""
+                DELETE FROM edges WHERE (source = ? AND target = ?) OR (source = ? AND target = ?)
+            """, (source_id, target_id, target_id, source_id))
+            moved = self.conn.execute("UPDATE OR IGNORE edges SET source = ? WHERE source = ?",
+                                      (target_id, source_id)).rowcount
+            moved += self.conn.execute("UPDATE OR IGNORE edges SET target = ? WHERE target = ?",
+                                       (target_id, source_id)).rowcount
+            self.conn.execute("DELETE FROM edges WHERE source = ? OR target = ?",
+                              (source_id, source_id))
+
+            self.conn.execute("""
+                INSERT OR IGNORE INTO mentions (doc_id, entity_id)
+                SELECT doc_id, ? FROM mentions WHERE entity_id = ?
+            """, (target_id, source_id))
+            self.conn.execute("DELETE FROM mentions WHERE entity_id = ?", (source_id,))
+            self.conn.execute("""
+                UPDATE entities SET description = (SELECT description FROM entities WHERE id = ?)
+                WHERE id = ? AND (description IS NULL OR description = '')
+            """, (source_id, target_id))
+            self.conn.execute("DELETE FROM entities WHERE id = ?", (source_id,))
+            self._refresh_degrees((neighbors - {source_id}) | {target_id})
+
+        stats["merged"] = 1
+        stats["relations_moved"] = moved
+        return stats
+
+    def migrate_document_catalog(self, page_size: int = 1000) -> Dict:
+        """
+        文档目录在写入时维护，无需迁移（与 Neo4jStorage 接口一致）
+
+        Returns:
+            {"entities": 实体数, "documents": 文档数}
+        """
+        with self._lock:
+            entities = self.conn.execute("SELECT count(*) FROM entities").fetchone()[0]
+            documents = self.conn.execute("SELECT count(*) FROM documents").fetchone()[0]
+        return {"entities": entities, "documents": documents}
+
+    # ==================== 读取 ====================
+
+    def document_entity_ids(self, doc_id: str) -> List[str]:
+        """文档当前关联的实体 ID"""
+        with self._lock:
+            return [row["entity_id"] for row in
+                    self._rows("SELECT entity_id FROM mentions WHERE doc_id = ?", (doc_id,))]
+
+    def load_document(self, doc_id: str) -> Dict:
+        """
+        读取文档的图谱
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            {"nodes": [...], "edges": [...]}
+        """
+        with self._lock:
+            nodes = self._rows("""
+                SELECT e.id, e.label, e.type, e.description,
+                       (SELECT json_group_array(m2.doc_id) FROM mentions m2
+                        WHERE m2.entity_id = e.id) as doc_ids
+                FROM mentions m JOIN entities e ON e.id = m.entity_id
+                WHERE m.doc_id = ?
+            """, (doc_id,))
+            edges = self._rows("""
+                SELECT source, target, label, weight FROM edges WHERE doc_id = ?
+            """, (doc_id,))
+        for node in nodes:
+            node["doc_ids"] = json.loads(node["doc_ids"])
+        return {"nodes": nodes, "edges": edges}
+
+    def list_documents(self) -> List[Dict]:
+        """
+        列出所有文档
+
+        Returns:
+            [{"doc_id", "node_count", "edge_count", "updated_at"}, ...]
+        """
+        with self._lock:
+            return self._rows("""
+                SELECT id as doc_id, node_count, edge_count, coalesce(updated_at, 'N/A') as updated_at
+                FROM documents ORDER BY id DESC
+            """)
+
+    def get_all_graphs(self) -> Dict:
+        """
+        读取全部图谱（节点按度数截断，与 Neo4jStorage 一致）
+
+        Returns:
+            {"nodes": [...], "edges": [...]}
+        """
+        with self._lock:
+            nodes = self._rows("""
+                SELECT id, label, type, description, degree FROM entities
+                ORDER BY degree DESC LIMIT 1000
+            """)
+            edges = self._rows("SELECT source, target, label, 1 as weight FROM edges LIMIT 5000")
+        return {"nodes": nodes, "edges": edges}
+
+    def get_graph_page(self, cursor: str = "", limit: int = 1000) -> Dict:
+        """
+        按实体 ID 键集分页读取图谱（每条边只在源节点所在页出现一次）
+
+        Args:
+            cursor: 上一页的 next_cursor（首页为空字符串）
+            limit: 每页节点数
+
+        Returns:
+            {"nodes", "edges", "next_cursor"}；最后一页 next_cursor 为 None
+        """
+        with self._lock:
+            nodes = self._rows("""
+                SELECT id, label, type, description, degree FROM entities
+                WHERE id > ? ORDER BY id LIMIT ?
+            """, (cursor or "", limit))
+            edges = self._rows("""
+                SELECT source, target, label, weight FROM edges
+                WHERE source IN (SELECT value FROM json_each(?))
+            """, (json.dumps([node["id"] for node in nodes]),)) if nodes else []
+        return graph_page(nodes, edges, limit)
+
+    def iter_graph_pages(self, page_size: int = 1000, cursor: str = ""):
+        """
+        流式遍历整个图谱
+
+        Args:
+            page_size: 每页节点数
+            cursor: 起始游标（用于续传）
+
+        Yields:
+            每页 {"nodes", "edges", "next_cursor"}
+        """
+        while True:
+            page = self.get_graph_page(cursor, page_size)
+            if page["nodes"]:
+                yield page
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    def iter_entity_ids(self, page_size: int = 1000):
+        """
+        按 id 顺序分页遍历所有实体
+
+        Yields:
+            每页的节点列表 [{"id", "label", "type"}, ...]
+        """
+        last_id = ""
+        while True:
+            with self._lock:
+                page = self._rows("""
+                    SELECT id, label, type FROM entities WHERE id > ? ORDER BY id LIMIT ?
+                """, (last_id, page_size))
+            if not page:
+                return
+            yield page
+            last_id = page[-1]["id"]
+
+    def iter_entity_edges(self, page_size: int = 1000):
+        """
+        按源节点 id 分页遍历所有边
+
+        Yields:
+            每页的边列表 [{"source", "target"}, ...]
+        """
+        last_id = ""
+        while True:
+            with self._lock:
+                sources = [row["id"] for row in self._rows("""
+                    SELECT DISTINCT source as id FROM edges WHERE source > ? ORDER BY source LIMIT ?
+                """, (last_id, page_size))]
+                if not sources:
+                    return
+                rows = self._rows("""
+                    SELECT source, target FROM edges WHERE source >= ? AND source <= ?
+                """, (sources[0], sources[-1]))
+            yield rows
+            last_id = sources[-1]
+
+    def get_popular_labels(self, limit: int = 30) -> List[str]:
+        """
+        按度数获取热门实体
+
+        Args:
+            limit: 返回数量
+
+        Returns:
+            实体 ID 列表
+        """
+        with self._lock:
+            return [row["id"] for row in
+                    self._rows("SELECT id FROM entities ORDER BY degree DESC LIMIT ?", (limit,))]
+
+    def query_subgraph(self, entity_id: str, n_hops: int = 1) -> Dict:
+        """
+        查询实体的 N 跳子图（有界、去重）
+
+        Args:
+            entity_id: 实体 ID
+            n_hops: 跳数
+
+        Returns:
+            子图数据 {"nodes", "edges", "truncated"}
+        """
+        nodes, edges = [], []
+        truncated = False
+        for batch in self.iter_subgraph(entity_id, n_hops):
+            nodes.extend(batch["nodes"])
+            edges.extend(batch["edges"])
+            truncated = batch["truncated"]
+        return {"nodes": nodes, "edges": edges, "truncated": truncated}
+
+    def iter_subgraph(self, entity_id: str, n_hops: int = 1, **limits):
+        """
+        逐层流式返回实体的 N 跳子图（扩展规则与 Neo4jStorage.iter_subgraph 一致）
+
+        Args:
+            entity_id: 实体 ID
+            n_hops: 跳数
+            limits: fanout / max_nodes / max_edges
+
+        Yields:
+            每层新增的 {"nodes", "edges", "level", "truncated"}；第 0 层为起始节点
+        """
+        with self._lock:
+            start = self._rows("""
+                SELECT id, label, type, description FROM entities WHERE id = ?
+            """, (entity_id,))
+        if not start:
+            return
+
+        expansion = SubgraphExpansion(start[0], n_hops, **limits)
+        yield {"nodes": [dict(start[0])], "edges": [], "level": 0, "truncated": False}
+
+        while not expansion.done():
+            with self._lock:
+                rows = self._rows(SUBGRAPH_EXPAND_SQL, {"frontier": json.dumps(expansion.frontier),
+                                                        "fanout": expansion.fanout})
+            batch = expansion.add_rows(rows)
+            batch.update(level=expansion.level, truncated=expansion.truncated)
+            yield batch
+
+    def get_stats(self) -> Dict:
+        """
+        获取统计信息
+
+        Returns:
+            {"total_nodes", "total_edges", "total_documents"}
+        """
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT (SELECT count(*) FROM entities), (SELECT count(*) FROM edges),
+                       (SELECT count(*) FROM documents)
+            """).fetchone()
+        return {
+            "total_nodes": row[0],
+            "total_edges": row[1],
+            "total_documents": row[2]
+        }
+
+    def close(self):
+        """关闭连接"""
+        with self._lock:
+            self.conn.close()
+
+
+# 单例实例
+_sqlite_instance: Optional[SQLiteGraphStorage] = None
+
+
+def get_sqlite_graph_storage() -> Optional[SQLiteGraphStorage]:
+    """
+    获取 SQLite 图谱存储实例（单例模式）
+
+    Returns:
+        SQLiteGraphStorage 实例，打开失败时返回 None
+    """
+    global _sqlite_instance
+
+    if _sqlite_instance is None:
+        try:
+            _sqlite_instance = SQLiteGraphStorage()
+        except Exception as e:
+            print(f"SQLite 图谱存储初始化失败: {e}")
+            return None
+
+    return _sqlite_instance
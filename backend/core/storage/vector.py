@@ -179,19 +179,7 @@ class VectorStore:
         Returns:
             删除的 chunk 数量
         """
-        # 先查询该文档的所有 chunks
-        results = self._chunks_collection.get(
-            where={"doc_id": doc_id},
-            include=[]
-        )
-
-        if not results or not results.get("ids"):
-            return 0
-
-        chunk_ids = results["ids"]
-        self._chunks_collection.delete(ids=chunk_ids)
-
-        return len(chunk_ids)
+        return sum(self._iter_delete_where_doc(self._chunks_collection, doc_id))
 
     def get_chunks_count(self, doc_id: Optional[str] = None) -> int:
         """获取 chunk 数量"""
@@ -304,12 +292,60 @@ class VectorStore:
             include=["documents", "metadatas", "distances"]
         )
 
-        # 整理结果
+        return self._format_entity_results(results, 0)
+
+    def search_entities_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5
+    ) -> List[List[Dict]]:
+        """
+        批量搜索相似实体（一次 embedding 调用 + 一次向量查询）
+
+        Args:
+            queries: 查询文本列表
+            top_k: 每个查询的返回数量
+
+        Returns:
+            与 queries 一一对应的搜索结果列表
+        """
+        if not queries:
+            return []
+
+        embeddings = self.embedding_service.embed_texts(queries)
+        valid_positions = [i for i, emb in enumerate(embeddings) if emb]
+        batch_results: List[List[Dict]] = [[] for _ in queries]
+
+        if not valid_positions or self._entities_collection.count() == 0:
+            return batch_results
+
+        results = self._entities_collection.query(
+            query_embeddings=[embeddings[i] for i in valid_positions],
+            n_results=top_k,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        for row, position in enumerate(valid_positions):
+            batch_results[position] = self._format_entity_results(results, row)
+
+        return batch_results
+
+    def _format_entity_results(self, results: Dict, row: int) -> List[Dict]:
+        """
+        整理实体查询结果
+
+        Args:
+            results: ChromaDB query 返回值
+            row: 第几个查询的结果
+
+        Returns:
+            搜索结果列表
+        """
         items = []
         if results and results.get("ids"):
-            ids = results["ids"][0]
-            metadatas = results["metadatas"][0] if results.get("metadatas") else []
-            distances = results["distances"][0] if results.get("distances") else []
+            ids = results["ids"][row]
+            metadatas = results["metadatas"][row] if results.get("metadatas") else []
+            distances = results["distances"][row] if results.get("distances") else []
 
             for i, store_id in enumerate(ids):
                 meta = metadatas[i] if i < len(metadatas) else {}
@@ -336,18 +372,7 @@ class VectorStore:
         Returns:
             删除的实体数量
         """
-        results = self._entities_collection.get(
-            where={"doc_id": doc_id},
-            include=[]
-        )
-
-        if not results or not results.get("ids"):
-            return 0
-
-        entity_ids = results["ids"]
-        self._entities_collection.delete(ids=entity_ids)
-
-        return len(entity_ids)
+        return sum(self._iter_delete_where_doc(self._entities_collection, doc_id))
 
     def get_entities_count(self, doc_id: Optional[str] = None) -> int:
         """获取实体数量"""
@@ -361,6 +386,39 @@ class VectorStore:
 
     # ==================== 通用操作 ====================
 
+    def _iter_delete_where_doc(self, collection, doc_id: str, batch_size: int = 1000):
+        """
+        分批删除集合中属于该文档的记录（每批先取 id 再删除，直到没有剩余）
+
+        Yields:
+            每批删除的数量
+        """
+        while True:
+            results = collection.get(where={"doc_id": doc_id}, include=[], limit=batch_size)
+            ids = results.get("ids") if results else None
+            if not ids:
+                return
+            collection.delete(ids=ids)
+            yield len(ids)
+            if len(ids) < batch_size:
+                return
+
+    def iter_delete_batches(self, doc_id: str, batch_size: int = 1000):
+        """
+        分批删除文档的 chunks 和实体（中断后重新调用即可继续）
+
+        Args:
+            doc_id: 文档 ID
+            batch_size: 每批数量
+
+        Yields:
+            {"collection": "chunks" | "entities", "deleted": 本批删除数}
+        """
+        for name, collection in (("chunks", self._chunks_collection),
+                                 ("entities", self._entities_collection)):
+            for deleted in self._iter_delete_where_doc(collection, doc_id, batch_size):
+                yield {"collection": name, "deleted": deleted}
+
     def delete_by_doc(self, doc_id: str) -> Dict[str, int]:
         """
         删除指定文档的所有数据
@@ -7,10 +7,12 @@ from .extractor import KnowledgeGraphExtractor
 from .async_extractor import AsyncKnowledgeGraphExtractor
 from .normalizer import KnowledgeGraphNormalizer
 from .entity_filter import EntityFilter
+from .graph_builder import IncrementalGraphBuilder
 
 __all__ = [
     "KnowledgeGraphExtractor",
     "AsyncKnowledgeGraphExtractor",
     "KnowledgeGraphNormalizer",
-    "EntityFilter"
+    "EntityFilter",
+    "IncrementalGraphBuilder"
 ]
@@ -13,14 +13,15 @@ import asyncio
 import json
 import re
 import os
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from pathlib import Path
 
 from dotenv import load_dotenv
 from tqdm.asyncio import tqdm
 
 from ..retrieval.prompts.prompt_loader import get_extraction_prompt, get_document_topic_prompt
-from .normalizer import KnowledgeGraphNormalizer
+from .normalizer import KnowledgeGraphNormalizer, PROVENANCE_NONE, json_default
+from .graph_builder import IncrementalGraphBuilder
 from .entity_filter import get_entity_filter
 from ..core.observability import get_tracer
 
@@ -60,8 +61,8 @@ class AsyncKnowledgeGraphExtractor:
             )
             self.model_name = os.getenv('LLM_MODEL')
 
-        # 规范化器
-        self.normalizer = KnowledgeGraphNormalizer()
+        # 规范化器（提取结果直接写入图谱存储且不会再次规范化，不保留来源数据）
+        self.normalizer = KnowledgeGraphNormalizer({'provenance': PROVENANCE_NONE})
 
         # Langfuse 追踪器
         self.tracer = get_tracer()
@@ -250,6 +251,10 @@ class AsyncKnowledgeGraphExtractor:
                     wait_time = (2 ** attempt)
                     await asyncio.sleep(wait_time)
 
+    async def _extract_indexed(self, chunk: str, chunk_id: int, context: str = "") -> Tuple[int, Dict]:
+        """提取单个块，并带上块 ID 返回（用于按完成顺序收集结果）"""
+        return chunk_id, await self.extract_chunk_bounded(chunk, chunk_id, context)
+
     def _save_checkpoint(self, chunk_id: int, result: Dict):
         """保存单个块的检查点"""
         checkpoint_file = self.checkpoint_dir / f"chunk_{chunk_id}.json"
@@ -495,6 +500,18 @@ class AsyncKnowledgeGraphExtractor:
                     if name and len(name) <= 10:
                         core_entities.add(name)
 
+        # 增量构建图谱：按块顺序合并（保证结果与块的完成先后无关）
+        builder = IncrementalGraphBuilder(self.normalizer)
+        next_chunk = 0
+
+        def ingest_ready():
+            nonlocal next_chunk
+            while next_chunk < total and results[next_chunk] is not None:
+                builder.add_result(results[next_chunk])
+                next_chunk += 1
+
+        ingest_ready()
+
         # 创建任务（只处理未完成的块）
         tasks = []
         for i, chunk in enumerate(chunks):
@@ -507,44 +524,43 @@ class AsyncKnowledgeGraphExtractor:
                     context += f"已识别的核心实体：{', '.join(list(core_entities)[:10])}\n"
                     context += "请注意：如果当前文本与这些实体相关，请建立关系连接。\n\n"
 
-                tasks.append((i, self.extract_chunk_bounded(chunk, i, context)))
+                tasks.append(asyncio.ensure_future(self._extract_indexed(chunk, i, context)))
 
-        # 并发执行（带进度条）
+        # 并发执行（带进度条），每个块完成后立即合并
         if tasks:
             print(f"开始异步处理 {len(tasks)} 个未完成的块...")
-            for idx, (i, task_coro) in enumerate(tqdm(tasks, desc="提取知识图谱")):
-                # 检查是否被取消
-                if cancellation_check and cancellation_check():
-                    print(f"\n⚠️  处理被用户中断 (已完成 {completed + idx}/{total} 块)")
-                    raise Exception("处理被用户中断")
-
-                result = await task_coro
-                results[i] = result
-
-                # 更新核心实体
-                for entity in result.get("entities", []):
-                    name = entity.get("name", "")
-                    if name and len(name) <= 10:
-                        core_entities.add(name)
-
-                # 更新进度
-                if progress_callback:
-                    current_completed = completed + idx + 1
-                    progress_callback(current_completed, total, "提取实体和关系")
+            try:
+                for idx, finished in enumerate(tqdm(asyncio.as_completed(tasks),
+                                                    total=len(tasks), desc="提取知识图谱")):
+                    # 检查是否被取消
+                    if cancellation_check and cancellation_check():
+                        print(f"\n⚠️  处理被用户中断 (已完成 {completed + idx}/{total} 块)")
+                        raise Exception("处理被用户中断")
+
+                    i, result = await finished
+                    results[i] = result
+                    ingest_ready()
+
+                    # 更新核心实体
+                    for entity in result.get("entities", []):
+                        name = entity.get("name", "")
+                        if name and len(name) <= 10:
+                            core_entities.add(name)
+
+                    # 更新进度
+                    if progress_callback:
+                        current_completed = completed + idx + 1
+                        progress_callback(current_completed, total, "提取实体和关系")
+            finally:
+                for task in tasks:
+                    task.cancel()
 
         # 更新进度：合并
         if progress_callback:
             progress_callback(total, total, "合并结果")
 
-        # 合并结果
-        merged = self.merge_graphs([r for r in results if r])
-        print(f"合并后：{len(merged['entities'])} 个实体，{len(merged['relations'])} 个关系")
-
-        # 转换为前端格式
-        graph_data = self._convert_to_graph_format(merged)
-
-        # 规范化
-        normalized = self.normalizer.normalize_graph(graph_data)
+        # 最后一个块合并后图谱即已规范化完毕
+        normalized = builder.build()
         print(f"规范化后：{normalized['stats']}")
 
         # 清理检查点
@@ -569,7 +585,7 @@ if __name__ == "__main__":
             # 处理文件
             file_path = sys.argv[1]
             result = await extractor.extract_document_async(file_path)
-            print(json.dumps(result, ensure_ascii=False, indent=2))
+            print(json.dumps(result, ensure_ascii=False, indent=2, default=json_default))
         else:
             # 测试文本
             test_text = """
@@ -585,7 +601,7 @@ if __name__ == "__main__":
                 temp_path = f.name
 
             result = await extractor.extract_document_async(temp_path)
-            print(json.dumps(result, ensure_ascii=False, indent=2))
+            print(json.dumps(result, ensure_ascii=False, indent=2, default=json_default))
 
             # 清理临时文件
             Path(temp_path).unlink()
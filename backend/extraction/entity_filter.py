@@ -3,16 +3,37 @@ Entity Filter
 实体过滤模块 - 提升知识图谱质量
 """
 
+import re
 from typing import Dict, List, Set
 from ..core.language_utils import detect_language, STOP_WORDS_EN
 
 
+# 特殊字符（出现即视为低质量实体）
+SPECIAL_CHARS = "!@#$%^&*()+=[]{}|\\:;\"'<>?/"
+
+# 低质量实体模式（预编译为单个正则）：
+# 单字实体（通常太模糊）、过长的实体名（可能是句子）、包含特殊字符
+BAD_PATTERN = re.compile(
+    r'^.$|^.{51,}$|[' + re.escape(SPECIAL_CHARS) + r']',
+    re.DOTALL
+)
+
+# 通用关系词（替换为 RELATES，让后续逻辑处理）
+GENERIC_RELATIONS = frozenset({
+    "relates", "related_to", "关联", "相关",
+    "涉及", "关于", "有关", "连接"
+})
+
+# 名称判定缓存上限（超过后清空，避免无限增长）
+MAX_CACHE_SIZE = 100000
+
+
 class EntityFilter:
     """实体过滤器"""
 
     def __init__(self):
         # 停用实体（太通用或无意义）- 中文
-        self.stop_entities = {
+        self.stop_entities = frozenset({
             # 单字通用词
             "人", "事", "物", "时", "地", "年", "月", "日",
             "个", "种", "类", "次", "度", "量", "值", "率",
@@ -29,18 +50,16 @@ class EntityFilter:
             # 时间通用词
             "现在", "过去", "未来", "当前", "之前", "之后",
             "今天", "明天", "昨天"
-        }
+        })
 
         # 停用实体 - 英文
-        self.stop_entities_en = STOP_WORDS_EN
+        self.stop_entities_en = frozenset(STOP_WORDS_EN)
+
+        # 低质量实体模式（单字 / 过长 / 特殊字符，纯数字单独用 isdigit 判断）
+        self.bad_pattern = BAD_PATTERN
 
-        # 低质量实体模式
-        self.bad_patterns = [
-            lambda x: len(x) == 1,  # 单字实体（通常太模糊）
-            lambda x: x.isdigit(),  # 纯数字
-            lambda x: any(c in x for c in "!@#$%^&*()+=[]{}|\\:;\"'<>?/"),  # 特殊字符
-            lambda x: len(x) > 50,  # 过长的实体名（可能是句子）
-        ]
+        # 名称 -> 是否过滤 的判定缓存（同一名称在各块中反复出现）
+        self._cache: Dict[str, bool] = {}
 
     def should_filter(self, entity_name: str) -> bool:
         """
@@ -53,10 +72,34 @@ class EntityFilter:
             True 表示应该过滤（删除），False 表示保留
         """
         # 空实体
-        if not entity_name or not entity_name.strip():
+        if not entity_name:
             return True
 
+        cached = self._cache.get(entity_name)
+        if cached is not None:
+            return cached
+
+        result = self._check(entity_name)
+
+        if len(self._cache) >= MAX_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[entity_name] = result
+
+        return result
+
+    def _check(self, entity_name: str) -> bool:
+        """
+        实际的过滤判定（无缓存）
+
+        Args:
+            entity_name: 非空实体名称
+
+        Returns:
+            True 表示应该过滤
+        """
         entity_name = entity_name.strip()
+        if not entity_name:
+            return True
 
         # 检测语言并应用对应的停用词表
         lang = detect_language(entity_name)
@@ -70,12 +113,12 @@ class EntityFilter:
             if entity_name.lower() in self.stop_entities_en:
                 return True
 
-        # 检查模式
-        for pattern in self.bad_patterns:
-            if pattern(entity_name):
-                return True
+        # 纯数字
+        if entity_name.isdigit():
+            return True
 
-        return False
+        # 单字 / 过长 / 特殊字符
+        return self.bad_pattern.search(entity_name) is not None
 
     def filter_entities(self, entities: List[Dict]) -> List[Dict]:
         """
@@ -140,15 +183,7 @@ class EntityFilter:
         Returns:
             规范化后的关系名称
         """
-        # 通用关系词映射（替换为空，让后续逻辑处理）
-        generic_relations = {
-            "relates", "related_to", "关联", "相关",
-            "涉及", "关于", "有关", "连接"
-        }
-
-        relation_lower = relation.lower().strip()
-
-        if relation_lower in generic_relations:
+        if relation.lower().strip() in GENERIC_RELATIONS:
             return "RELATES"  # 标记为通用关系
 
         return relation
@@ -163,21 +198,39 @@ class EntityFilter:
         Returns:
             过滤后的图谱
         """
-        # 过滤实体
-        filtered_entities = self.filter_entities(graph.get("entities", []))
+        # 单次遍历实体：同时得到保留列表和有效名称集合
+        should_filter = self.should_filter
+        filtered_entities = []
+        valid_entities = set()
+        removed = []
+
+        for entity in graph.get("entities", []):
+            name = entity.get("name", "")
+            if should_filter(name):
+                removed.append(name)
+            else:
+                filtered_entities.append(entity)
+                valid_entities.add(name)
 
-        # 构建有效实体集合
-        valid_entities = {e.get("name") for e in filtered_entities}
+        if removed:
+            print(f"过滤掉 {len(removed)} 个低质量实体: {removed[:10]}")
 
-        # 过滤关系
-        filtered_relations = self.filter_relations(
-            graph.get("relations", []),
-            valid_entities
-        )
+        # 单次遍历关系：剔除悬空关系并规范化关系词
+        filtered_relations = []
+        removed_count = 0
 
-        # 规范化关系
-        for rel in filtered_relations:
-            rel["relation"] = self.normalize_relation(rel.get("relation", ""))
+        for rel in graph.get("relations", []):
+            if rel.get("source", "") in valid_entities and rel.get("target", "") in valid_entities:
+                relation = rel.get("relation", "")
+                if relation.lower().strip() in GENERIC_RELATIONS:
+                    relation = "RELATES"
+                rel["relation"] = relation
+                filtered_relations.append(rel)
+            else:
+                removed_count += 1
+
+        if removed_count > 0:
+            print(f"过滤掉 {removed_count} 条无效关系")
 
         return {
             "entities": filtered_entities,
@@ -18,7 +18,7 @@ from openai import OpenAI
 from dotenv import load_dotenv
 
 from ..retrieval.prompts import get_extraction_prompt, NODE_TYPES
-from .normalizer import KnowledgeGraphNormalizer
+from .normalizer import KnowledgeGraphNormalizer, json_default
 from ..core.observability import get_tracer
 
 
@@ -583,7 +583,7 @@ if __name__ == "__main__":
         # 处理文件
         file_path = sys.argv[1]
         result = extractor.extract_from_document(file_path)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=json_default))
     else:
         # 测试文本
         test_text = """
@@ -594,4 +594,4 @@ if __name__ == "__main__":
         result = extractor.extract_from_text(test_text)
         graph = extractor._convert_to_graph_format(result)
         normalized = extractor.normalizer.normalize_graph(graph)
-        print(json.dumps(normalized, ensure_ascii=False, indent=2))
+        print(json.dumps(normalized, ensure_ascii=False, indent=2, default=json_default))
@@ -0,0 +1,235 @@
+"""
+Incremental Graph Builder
+增量图谱构建器
+
+把 merge_graphs → _convert_to_graph_format → normalize_graph 三个阶段融合为一个流式阶段：
+每个块的提取结果到达后立即规范化、去重并更新度数，
+最后一个块处理完后图谱即已就绪，无需再对整个图谱做多轮遍历和复制。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from .normalizer import KnowledgeGraphNormalizer, PROVENANCE_NONE
+
+
+class IncrementalGraphBuilder:
+    """增量图谱构建器"""
+
+    # 相似节点的清洗后名称长度差上限（与 KnowledgeGraphNormalizer._is_similar_node 一致）
+    SIMILAR_LENGTH_DELTA = 3
+
+    def __init__(self, normalizer: KnowledgeGraphNormalizer = None):
+        """
+        初始化构建器
+
+        Args:
+            normalizer: 规范化器（默认使用默认规则，不保留来源数据）
+        """
+        self.normalizer = normalizer or KnowledgeGraphNormalizer({'provenance': PROVENANCE_NONE})
+
+        # 规范化后的节点和边（列表保持插入顺序，字典用于 O(1) 查找）
+        self.nodes: List[Dict] = []
+        self.edges: List[Dict] = []
+        self._node_map: Dict[str, Dict] = {}
+        self._edge_keys = set()
+
+        # 原始名称 -> 规范节点 ID
+        self._raw_names: Dict[str, str] = {}
+        # 仅由关系端点隐式创建、尚未见到实体声明的节点
+        self._implicit = set()
+        # 清洗后名称长度 -> [(插入序号, 节点 ID)]，用于缩小相似节点的查找范围
+        self._length_buckets: Dict[int, List[Tuple[int, str]]] = {}
+
+        # 原始关系去重键
+        self._raw_relations = set()
+
+    def add_result(self, result: Dict):
+        """
+        合并一个块的提取结果
+
+        Args:
+            result: 提取结果 {"entities": [...], "relations": [...]}
+        """
+        if not result:
+            return
+
+        for entity in result.get("entities", []):
+            name = (entity.get("name") or "").strip()
+            if name:
+                self._add_entity(name, entity)
+
+        for relation in result.get("relations", []):
+            self._add_relation(relation)
+
+    def add_results(self, results: List[Dict]):
+        """
+        按顺序合并多个块的提取结果
+
+        Args:
+            results: 提取结果列表
+        """
+        for result in results:
+            self.add_result(result)
+
+    def build(self) -> Dict:
+        """
+        返回当前图谱（不复制节点和边）
+
+        Returns:
+            规范化后的图谱数据，包含统计信息
+        """
+        return {
+            "nodes": self.nodes,
+            "edges": self.edges,
+            "stats": {
+                "original_nodes": len(self._raw_names),
+                "normalized_nodes": len(self.nodes),
+                "original_edges": len(self._raw_relations),
+                "normalized_edges": len(self.edges)
+            }
+        }
+
+    # ==================== 节点 ====================
+
+    def _find_similar(self, name: str) -> Optional[str]:
+        """
+        查找与规范化名称相似的已有节点
+
+        只比较清洗后长度相差不超过 SIMILAR_LENGTH_DELTA 的节点；
+        多个候选时取最早插入的，与 merge_duplicate_nodes 的结果一致。
+        """
+        length = len(self.normalizer.clean_node_name(name))
+        best = None
+        for candidate_length in range(max(0, length - self.SIMILAR_LENGTH_DELTA),
+                                      length + self.SIMILAR_LENGTH_DELTA + 1):
+            for order, node_id in self._length_buckets.get(candidate_length, ()):
+                if best is not None and order >= best[0]:
+                    break
+                if self.normalizer._is_similar_node(name, node_id):
+                    best = (order, node_id)
+                    break
+        return best[1] if best else None
+
+    def _create_node(self, name: str, entity: Optional[Dict], index: int) -> str:
+        """创建规范化节点，返回节点 ID"""
+        raw = {
+            "id": name,
+            "label": name,
+            "type": (entity or {}).get("type", "Entity"),
+            "description": (entity or {}).get("description", ""),
+            "properties": {},
+            "degree": 0
+        }
+        node = self.normalizer.normalize_node(raw, index=index)
+        node_id = node["id"]
+
+        order = len(self.nodes)
+        self.nodes.append(node)
+        self._node_map[node_id] = node
+        length = len(self.normalizer.clean_node_name(node_id))
+        self._length_buckets.setdefault(length, []).append((order, node_id))
+
+        if entity is None:
+            self._implicit.add(node_id)
+        return node_id
+
+    def _merge_into(self, node_id: str, entity: Optional[Dict]):
+        """把实体声明合并进已有节点"""
+        if entity is None:
+            return
+
+        node = self._node_map[node_id]
+        if node_id in self._implicit:
+            # 先由关系端点创建的节点，用实体声明补全类型
+            self._implicit.discard(node_id)
+            node["type"] = self.normalizer.infer_node_type({
+                "id": node_id,
+                "label": node_id,
+                "type": entity.get("type", "Entity"),
+                "description": entity.get("description", "")
+            })
+
+        if entity.get("description") and not node.get("description"):
+            description, properties = self.normalizer.extract_properties({
+                "description": entity["description"],
+                "properties": node.get("properties")
+            })
+            node["description"] = description
+            node["properties"] = properties
+
+    def _resolve(self, name: str, entity: Optional[Dict] = None) -> Optional[str]:
+        """
+        把原始名称映射到规范节点（不存在时创建）
+
+        Args:
+            name: 原始名称（已去除首尾空白）
+            entity: 实体声明；关系端点隐式引用时为 None
+
+        Returns:
+            规范节点 ID
+        """
+        node_id = self._raw_names.get(name)
+        if node_id is not None:
+            self._merge_into(node_id, entity)
+            return node_id
+
+        normalized = self.normalizer.normalize_node_name(name)
+        if not normalized:
+            return None
+
+        node_id = self._find_similar(normalized)
+        if node_id is None:
+            node_id = self._create_node(name, entity, index=len(self._raw_names))
+        else:
+            self._merge_into(node_id, entity)
+
+        self._raw_names[name] = node_id
+        return node_id
+
+    def _add_entity(self, name: str, entity: Dict):
+        """合并实体声明"""
+        self._resolve(name, entity)
+
+    # ==================== 边 ====================
+
+    def _add_relation(self, relation: Dict):
+        """合并关系，并更新端点度数"""
+        source = (relation.get("source") or "").strip()
+        target = (relation.get("target") or "").strip()
+        rel = (relation.get("relation") or "").strip()
+
+        if not source or not target or not rel or source == target:
+            return
+
+        raw_key = (source, rel, target)
+        if raw_key in self._raw_relations:
+            return
+        self._raw_relations.add(raw_key)
+
+        source_id = self._resolve(source)
+        target_id = self._resolve(target)
+        if not source_id or not target_id or source_id == target_id:
+            return
+
+        label = self.normalizer.normalize_relation(rel)
+        edge_key = (source_id, label, target_id)
+        if edge_key in self._edge_keys:
+            return
+        self._edge_keys.add(edge_key)
+
+        edge = {
+            "source": source_id,
+            "target": target_id,
+            "label": label,
+            "weight": 1
+        }
+        original = self.normalizer._edge_provenance(
+            {"source": source, "target": target, "label": rel},
+            len(self._raw_relations) - 1
+        )
+        if original is not None:
+            edge["original"] = original
+        self.edges.append(edge)
+
+        self._node_map[source_id]["degree"] += 1
+        self._node_map[target_id]["degree"] += 1
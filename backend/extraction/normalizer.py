@@ -7,8 +7,10 @@ Knowledge Graph Normalizer
 2. 节点类型标准化
 3. 关系词规范化（映射到标准关系词表）- 支持中英文
 4. 属性提取和分离
+5. 来源数据（provenance）保留：full / compact / none 三种模式
 """
 
+import os
 import re
 from typing import Dict, List, Set, Tuple, Optional
 from collections import defaultdict
@@ -22,6 +24,61 @@ from ..core.language_utils import (
 )
 
 
+# 来源数据保留模式
+PROVENANCE_FULL = 'full'        # 完整复制原始字典（默认，兼容旧行为）
+PROVENANCE_COMPACT = 'compact'  # 仅保留原始列表下标和常用字段
+PROVENANCE_NONE = 'none'        # 不保留来源数据（入库热路径）
+PROVENANCE_MODES = (PROVENANCE_FULL, PROVENANCE_COMPACT, PROVENANCE_NONE)
+
+
+class Provenance:
+    """
+    紧凑的来源记录
+
+    只保存原始提取结果中的下标和实际用到的字段，
+    使用 __slots__ 避免每个节点/边都携带一份完整的字典副本。
+    """
+
+    __slots__ = ('index', 'name', 'type', 'label')
+
+    def __init__(self, index: Optional[int] = None, name: Optional[str] = None,
+                 type: Optional[str] = None, label: Optional[str] = None):
+        self.index = index    # 在原始 nodes / edges 列表中的下标
+        self.name = name      # 原始名称（节点 id，或边的 "source->target"）
+        self.type = type      # 原始节点类型
+        self.label = label    # 原始关系词
+
+    def to_dict(self) -> Dict:
+        """转换为字典（用于 JSON 序列化）"""
+        return {slot: getattr(self, slot) for slot in self.__slots__
+                if getattr(self, slot) is not None}
+
+    def _key(self) -> Tuple:
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Provenance):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"Provenance({self.to_dict()})"
+
+
+def json_default(obj):
+    """
+    json.dumps 的 default 钩子：把 compact 模式的 Provenance 记录序列化为字典
+
+    用法: json.dumps(graph, default=json_default)
+    """
+    if isinstance(obj, Provenance):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 class KnowledgeGraphNormalizer:
     """知识图谱数据规范化器"""
     
@@ -153,6 +210,15 @@ class KnowledgeGraphNormalizer:
         
         # 关系名称最大长度
         self.max_relation_length = self.config.get('max_relation_length', 8)
+
+        # 来源数据保留模式（full / compact / none）
+        self.provenance = self.config.get(
+            'provenance', os.getenv('KG_PROVENANCE_MODE', PROVENANCE_FULL)
+        )
+        if self.provenance not in PROVENANCE_MODES:
+            raise ValueError(
+                f"不支持的 provenance 模式: {self.provenance}，可选: {PROVENANCE_MODES}"
+            )
     
     def normalize_node_name(self, name: str) -> str:
         """
@@ -398,6 +464,18 @@ class KnowledgeGraphNormalizer:
         
         return list(node_map.values()), aliases
     
+    def clean_node_name(self, name: str) -> str:
+        """
+        移除书名号、引号和空白，用于相似节点比较
+
+        Args:
+            name: 节点名称
+
+        Returns:
+            清洗后的名称
+        """
+        return re.sub(r'[《》""'' \t\n]', '', name)
+
     def _is_similar_node(self, name1: str, name2: str) -> bool:
         """
         检查两个节点名称是否相似
@@ -413,8 +491,8 @@ class KnowledgeGraphNormalizer:
             return True
         
         # 移除常见修饰词后比较
-        clean1 = re.sub(r'[《》""'' \t\n]', '', name1)
-        clean2 = re.sub(r'[《》""'' \t\n]', '', name2)
+        clean1 = self.clean_node_name(name1)
+        clean2 = self.clean_node_name(name2)
         
         if clean1 == clean2:
             return True
@@ -425,12 +503,68 @@ class KnowledgeGraphNormalizer:
         
         return False
     
-    def normalize_node(self, node: Dict) -> Dict:
+    def _node_provenance(self, node: Dict, index: Optional[int]):
+        """
+        按当前模式生成节点来源数据
+
+        Args:
+            node: 原始节点字典
+            index: 节点在原始列表中的下标
+
+        Returns:
+            原始字典副本 / Provenance 记录；none 模式返回 None
+        """
+        if self.provenance == PROVENANCE_NONE:
+            return None
+
+        # 已规范化过的节点直接沿用（避免嵌套）
+        if node.get('original'):
+            return node['original']
+
+        if self.provenance == PROVENANCE_COMPACT:
+            return Provenance(
+                index=index,
+                name=node.get('id') or node.get('label'),
+                type=node.get('type') or node.get('entity_type')
+            )
+
+        return {k: v for k, v in node.items() if k != 'original'}
+
+    def _edge_provenance(self, edge: Dict, index: Optional[int]):
+        """
+        按当前模式生成边来源数据
+
+        Args:
+            edge: 原始边字典
+            index: 边在原始列表中的下标
+
+        Returns:
+            原始字典副本 / Provenance 记录；none 模式返回 None
+        """
+        if self.provenance == PROVENANCE_NONE:
+            return None
+
+        if edge.get('original'):
+            return edge['original']
+
+        if self.provenance == PROVENANCE_COMPACT:
+            source = edge.get('source') or edge.get('src_id') or edge.get('from', '')
+            target = edge.get('target') or edge.get('tgt_id') or edge.get('to', '')
+            return Provenance(
+                index=index,
+                name=f"{source}->{target}",
+                label=edge.get('label') or edge.get('relation')
+            )
+
+        return {k: v for k, v in edge.items() if k != 'original'}
+
+    def normalize_node(self, node: Dict, index: Optional[int] = None) -> Dict:
         """
         规范化单个节点
         
         Args:
             node: 原始节点字典
+            index: 节点在原始提取结果中的下标（compact 模式记录）
             
         Returns:
             规范化后的节点字典
@@ -438,29 +572,31 @@ class KnowledgeGraphNormalizer:
         normalized_name = self.normalize_node_name(node.get('id') or node.get('label', ''))
         node_type = self.infer_node_type(node)
         description, properties = self.extract_properties(node)
-        
-        # 获取原始数据（避免嵌套）
-        original_data = node.get('original') or {
-            k: v for k, v in node.items() if k != 'original'
-        }
 
-        return {
+        normalized = {
             'id': normalized_name,
             'label': normalized_name,
             'type': node_type,
             'description': description,
             'properties': properties,
-            'degree': node.get('degree', 0),
-            'original': original_data
+            'degree': node.get('degree', 0)
         }
+
+        original_data = self._node_provenance(node, index)
+        if original_data is not None:
+            normalized['original'] = original_data
+
+        return normalized
     
-    def normalize_edge(self, edge: Dict, node_aliases: Dict[str, str] = None) -> Dict:
+    def normalize_edge(self, edge: Dict, node_aliases: Dict[str, str] = None,
+                       index: Optional[int] = None) -> Dict:
         """
         规范化关系（边）
         
         Args:
             edge: 原始边字典
             node_aliases: 节点别名映射
+            index: 边在原始提取结果中的下标（compact 模式记录）
             
         Returns:
             规范化后的边字典
@@ -482,18 +618,18 @@ class KnowledgeGraphNormalizer:
             '相关'
         )
         
-        # 获取原始数据（避免嵌套）
-        original_data = edge.get('original') or {
-            k: v for k, v in edge.items() if k != 'original'
-        }
-
-        return {
+        normalized = {
             'source': normalized_source,
             'target': normalized_target,
             'label': relation,
-            'weight': edge.get('weight') or (edge.get('properties', {}) or {}).get('weight', 1),
-            'original': original_data
+            'weight': edge.get('weight') or (edge.get('properties', {}) or {}).get('weight', 1)
         }
+
+        original_data = self._edge_provenance(edge, index)
+        if original_data is not None:
+            normalized['original'] = original_data
+
+        return normalized
     
     def normalize_graph(self, graph_data: Dict) -> Dict:
         """
@@ -510,7 +646,10 @@ class KnowledgeGraphNormalizer:
             return {'nodes': [], 'edges': [], 'stats': {}}
         
         # 1. 规范化节点
-        raw_nodes = [self.normalize_node(node) for node in (graph_data.get('nodes') or [])]
+        raw_nodes = [
+            self.normalize_node(node, index=i)
+            for i, node in enumerate(graph_data.get('nodes') or [])
+        ]
         
         # 2. 合并重复节点
         nodes, aliases = self.merge_duplicate_nodes(raw_nodes)
@@ -518,8 +657,8 @@ class KnowledgeGraphNormalizer:
         # 3. 规范化边
         raw_edges = graph_data.get('edges') or []
         edges = []
-        for edge in raw_edges:
-            normalized_edge = self.normalize_edge(edge, aliases)
+        for i, edge in enumerate(raw_edges):
+            normalized_edge = self.normalize_edge(edge, aliases, index=i)
             # 过滤掉无效边（源或目标为空，或源等于目标）
             if normalized_edge['source'] and normalized_edge['target'] and \
                normalized_edge['source'] != normalized_edge['target']:
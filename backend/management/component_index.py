@@ -0,0 +1,395 @@
+"""
+Component Index
+全局连通分量索引
+
+核心功能：
+- 持久化并查集：维护整个图谱（跨文档）的连通分量
+- 每次保存文档后增量合并新边，无需扫描全图
+- 快速查询"实体属于哪个分量"
+- 全局孤岛连接：为孤立分量生成到主图的连接建议
+- 增量持久化：每次保存只向日志文件追加本次的节点和边（O(文档大小)），
+  日志累积到 COMPONENT_INDEX_COMPACT_EVERY 条后才整体写回快照
+- 删除文档后并查集无法拆分，标记失效并在下次使用时从存储分页重建：
+  重建是一次 O(节点数 + 边数) 的全图分页扫描；连续多次删除只触发一次重建，
+  失效期间的保存不再登记（重建时会从存储读到）
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+
+# 加载环境变量
+load_dotenv()
+
+
+class ComponentIndex:
+    """全局连通分量索引（持久化并查集）"""
+
+    # 每个分量保留的候选连接点数量（按度数排序）
+    MAX_CONNECTORS = 3
+
+    def __init__(self, index_path: str = None):
+        """
+        初始化索引
+
+        Args:
+            index_path: 索引文件路径，None 时从环境变量读取
+        """
+        if index_path is None:
+            index_path = os.getenv('COMPONENT_INDEX_PATH', './data/storage/component_index.json')
+        self.index_path = Path(index_path)
+        # 追加日志：快照之后的增量（每行一条 JSON 记录）
+        self.journal_path = self.index_path.with_suffix('.journal')
+        self.compact_every = int(os.getenv('COMPONENT_INDEX_COMPACT_EVERY', '100'))
+        self._journal_entries = 0
+
+        # 节点 -> 父节点
+        self.parent: Dict[str, str] = {}
+        # 根节点 -> 分量大小
+        self.size: Dict[str, int] = {}
+        # 根节点 -> 度数最高的几个节点（连接孤岛时的候选连接点）
+        self.connectors: Dict[str, List[str]] = {}
+        # 节点 -> 度数（近似值，仅用于挑选连接点）
+        self.degree: Dict[str, int] = {}
+        # 节点 -> 类型
+        self.types: Dict[str, str] = {}
+        # 删除数据后并查集失效，需要重建
+        self.stale = False
+
+        self._lock = threading.RLock()
+        self._load()
+
+    # ==================== 持久化 ====================
+
+    def _load(self):
+        """从磁盘加载快照并重放日志"""
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.parent = data.get("parent", {})
+                self.size = data.get("size", {})
+                self.connectors = data.get("connectors", {})
+                self.degree = data.get("degree", {})
+                self.types = data.get("types", {})
+                self.stale = data.get("stale", False)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠ 连通分量索引加载失败，将重新构建: {e}")
+                self.stale = True
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """重放快照之后的追加日志（最后一行写到一半时忽略）"""
+        if not self.journal_path.exists():
+            return
+
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError as e:
+            print(f"⚠ 连通分量索引日志读取失败，将重新构建: {e}")
+            self.stale = True
+            return
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._journal_entries += 1
+            if entry.get("stale"):
+                self.stale = True
+                continue
+            for node_id, node_type in entry.get("nodes", []):
+                self._add_node(node_id, node_type)
+            for source, target in entry.get("edges", []):
+                self._add_edge(source, target)
+
+    def _append_journal(self, entry: Dict):
+        """追加一条日志，累积过多时写回快照（调用方持有锁）"""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal_entries += 1
+        if self._journal_entries >= self.compact_every:
+            self.save()
+
+    def save(self):
+        """将索引整体写回快照并清空日志（先写临时文件再替换）"""
+        with self._lock:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "parent": self.parent,
+                    "size": self.size,
+                    "connectors": self.connectors,
+                    "degree": self.degree,
+                    "types": self.types,
+                    "stale": self.stale
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+            if self.journal_path.exists():
+                self.journal_path.unlink()
+            self._journal_entries = 0
+
+    def invalidate(self):
+        """
+        标记索引失效（删除或合并实体后调用）
+
+        只追加一条日志；下次 ensure_fresh 时从存储全量重建（O(节点数 + 边数)）。
+        """
+        with self._lock:
+            if self.stale:
+                return
+            self.stale = True
+            self._append_journal({"stale": True})
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            self.parent = {}
+            self.size = {}
+            self.connectors = {}
+            self.degree = {}
+            self.types = {}
+            self.stale = False
+
+    # ==================== 并查集 ====================
+
+    def _add_node(self, node_id: str, node_type: str = None):
+        """登记节点（已存在时只补全类型）"""
+        if node_id not in self.parent:
+            self.parent[node_id] = node_id
+            self.size[node_id] = 1
+            self.connectors[node_id] = [node_id]
+            self.degree.setdefault(node_id, 0)
+        if node_type and self.types.get(node_id, 'Entity') == 'Entity':
+            self.types[node_id] = node_type
+
+    def find(self, node_id: str) -> Optional[str]:
+        """
+        查找节点所在分量的根节点（路径压缩）
+
+        Args:
+            node_id: 实体 ID
+
+        Returns:
+            根节点 ID，节点不存在时返回 None
+        """
+        if node_id not in self.parent:
+            return None
+
+        root = node_id
+        while self.parent[root] != root:
+            root = self.parent[root]
+
+        # 路径压缩（迭代实现，避免长链递归过深）
+        while self.parent[node_id] != root:
+            self.parent[node_id], node_id = root, self.parent[node_id]
+
+        return root
+
+    def _top_connectors(self, candidates: List[str]) -> List[str]:
+        """按度数挑选候选连接点"""
+        unique = list(dict.fromkeys(candidates))
+        unique.sort(key=lambda n: self.degree.get(n, 0), reverse=True)
+        return unique[:self.MAX_CONNECTORS]
+
+    def _union(self, a: str, b: str):
+        """合并两个节点所在分量（按大小合并）"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size.pop(root_b)
+        self.connectors[root_a] = self._top_connectors(
+            self.connectors.get(root_a, []) + self.connectors.pop(root_b, [])
+        )
+
+    def _add_edge(self, source: str, target: str):
+        """登记一条边：合并分量并更新端点度数"""
+        for node_id in (source, target):
+            self._add_node(node_id)
+            self.degree[node_id] = self.degree.get(node_id, 0) + 1
+
+        self._union(source, target)
+
+        root = self.find(source)
+        self.connectors[root] = self._top_connectors(
+            self.connectors.get(root, []) + [source, target]
+        )
+
+    def add_graph(self, graph: Dict, persist: bool = True):
+        """
+        增量登记一个文档的图谱
+
+        索引已失效时跳过（下次重建会从存储读到该文档）。
+
+        Args:
+            graph: 规范化后的图谱 {"nodes": [...], "edges": [...]}
+            persist: 是否追加到持久化日志
+        """
+        with self._lock:
+            if self.stale:
+                return
+
+            nodes = [[node["id"], node.get("type")]
+                     for node in graph.get("nodes") or [] if node.get("id")]
+            edges = [[edge.get("source"), edge.get("target")]
+                     for edge in graph.get("edges") or []
+                     if edge.get("source") and edge.get("target")
+                     and edge.get("source") != edge.get("target")]
+
+            for node_id, node_type in nodes:
+                self._add_node(node_id, node_type)
+            for source, target in edges:
+                self._add_edge(source, target)
+
+            if persist:
+                self._append_journal({"nodes": nodes, "edges": edges})
+
+    def rebuild(self, storage, page_size: int = 1000):
+        """
+        从存储分页重建索引（删除数据后使用）
+
+        Args:
+            storage: Neo4jStorage 实例（需提供 iter_entity_ids / iter_entity_edges）
+            page_size: 每页节点数
+        """
+        with self._lock:
+            self.clear()
+            for page in storage.iter_entity_ids(page_size=page_size):
+                for row in page:
+                    self._add_node(row["id"], row.get("type"))
+            for page in storage.iter_entity_edges(page_size=page_size):
+                for row in page:
+                    self._add_edge(row["source"], row["target"])
+            self.save()
+            print(f"✓ 连通分量索引已重建: {len(self.parent)} 个节点, {len(self.size)} 个分量")
+
+    def ensure_fresh(self, storage):
+        """索引失效时从存储重建"""
+        if self.stale and storage is not None:
+            self.rebuild(storage)
+
+    # ==================== 查询 ====================
+
+    def component_of(self, node_id: str) -> Optional[Dict]:
+        """
+        查询实体所在分量
+
+        Args:
+            node_id: 实体 ID
+
+        Returns:
+            {"root", "size", "connectors"}，实体不存在时返回 None
+        """
+        with self._lock:
+            root = self.find(node_id)
+            if root is None:
+                return None
+            return {
+                "root": root,
+                "size": self.size[root],
+                "connectors": list(self.connectors.get(root, []))
+            }
+
+    def same_component(self, a: str, b: str) -> bool:
+        """两个实体是否连通"""
+        with self._lock:
+            root_a = self.find(a)
+            return root_a is not None and root_a == self.find(b)
+
+    def get_stats(self) -> Dict:
+        """
+        获取分量统计
+
+        Returns:
+            {"nodes", "components", "largest_component", "stale"}
+        """
+        with self._lock:
+            return {
+                "nodes": len(self.parent),
+                "components": len(self.size),
+                "largest_component": max(self.size.values(), default=0),
+                "stale": self.stale
+            }
+
+    def plan_island_links(self, limit: int = None) -> List[Dict]:
+        """
+        为孤立分量生成到主图（最大分量）的连接建议
+
+        策略与文档内孤岛连接一致：
+        1. 孤岛中度数最高的节点作为连接点
+        2. 优先连接到主图中同类型的核心节点（"相关"）
+        3. 否则连接到主图度数最高的节点（"提及"）
+
+        Args:
+            limit: 最多生成的连接数
+
+        Returns:
+            连接建议 [{"source", "target", "relation"}, ...]
+        """
+        with self._lock:
+            if len(self.size) <= 1:
+                return []
+
+            main_root = max(self.size, key=lambda root: self.size[root])
+            core_nodes = self.connectors.get(main_root) or [main_root]
+
+            # 较大的孤岛优先连接
+            islands = sorted((root for root in self.size if root != main_root),
+                             key=lambda root: self.size[root], reverse=True)
+            if limit is not None:
+                islands = islands[:limit]
+
+            links = []
+            for root in islands:
+                connector = (self.connectors.get(root) or [root])[0]
+                connector_type = self.types.get(connector, 'Entity')
+
+                same_type = [core for core in core_nodes
+                             if self.types.get(core, 'Entity') == connector_type]
+                if same_type:
+                    links.append({"source": connector, "target": same_type[0], "relation": "相关"})
+                else:
+                    links.append({"source": connector, "target": core_nodes[0], "relation": "提及"})
+
+            return links
+
+    def apply_links(self, links: List[Dict], persist: bool = True):
+        """
+        登记已写入存储的连接
+
+        Args:
+            links: plan_island_links 生成的连接
+            persist: 是否追加到持久化日志
+        """
+        with self._lock:
+            edges = [[link["source"], link["target"]] for link in links]
+            for source, target in edges:
+                self._add_edge(source, target)
+            if persist:
+                self._append_journal({"edges": edges})
+
+
+# 单例
+_component_index: Optional[ComponentIndex] = None
+
+
+def get_component_index() -> ComponentIndex:
+    """获取连通分量索引实例（单例）"""
+    global _component_index
+    if _component_index is None:
+        _component_index = ComponentIndex()
+    return _component_index
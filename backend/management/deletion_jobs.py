@@ -0,0 +1,270 @@
+"""
+Document Deletion Jobs
+文档删除任务
+
+核心功能：
+- DELETE /documents/{doc_id} 只创建任务并立即返回任务 ID，删除在后台执行
+- Neo4j 和 Chroma 都按有界批次删除，每批一个事务 / 一次调用
+- 每批完成后持久化进度（阶段、已删除数量、度数待重算的实体），进程崩溃后从断点继续
+- 同一文档同时只有一个未完成的删除任务，同一任务同时只执行一次
+- 启动时自动继续的失败任务有次数上限（DELETION_JOBS_MAX_ATTEMPTS），超过后只能通过再次删除请求重试
+- 图谱存储未启用时跳过图谱阶段，仍删除向量
+"""
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+
+# 加载环境变量
+load_dotenv()
+
+
+class DocumentDeletionJobs:
+    """可续跑的文档删除任务"""
+
+    def __init__(self, kg_manager, vector_store, jobs_dir: str = None, batch_size: int = None):
+        """
+        初始化任务管理器
+
+        Args:
+            kg_manager: KnowledgeGraphManager 实例
+            vector_store: VectorStore 实例
+            jobs_dir: 任务状态目录，None 时使用 CHECKPOINT_DIR/deletion_jobs
+            batch_size: 每批删除数，None 时从环境变量读取
+        """
+        self.kg_manager = kg_manager
+        self.vector_store = vector_store
+        if jobs_dir is None:
+            jobs_dir = Path(os.getenv('CHECKPOINT_DIR', './data/checkpoints')) / "deletion_jobs"
+        self.jobs_dir = Path(jobs_dir)
+        self.batch_size = batch_size or int(os.getenv('DELETE_BATCH_SIZE', '1000'))
+        self.max_attempts = int(os.getenv('DELETION_JOBS_MAX_ATTEMPTS', '3'))
+        self._lock = threading.Lock()
+        # 本进程中正在执行的任务 ID（磁盘上的 running 可能是崩溃遗留）
+        self._running = set()
+
+    # ==================== 持久化 ====================
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _save(self, job: Dict):
+        """保存任务状态（先写临时文件再替换）"""
+        job["updated_at"] = datetime.now().isoformat()
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        path = self._job_path(job["job_id"])
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        读取任务状态
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            任务状态（不含内部字段），不存在时返回 None
+        """
+        try:
+            job = self._load(job_id)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if job is not None:
+            job.pop("touched", None)
+        return job
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        # 任务 ID 只含十六进制字符，拒绝路径分隔符等输入
+        if not job_id.isalnum():
+            return None
+        path = self._job_path(job_id)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def list_unfinished(self) -> List[Dict]:
+        """所有未完成（排队、执行中、失败）的任务"""
+        if not self.jobs_dir.exists():
+            return []
+        jobs = []
+        for path in sorted(self.jobs_dir.glob("*.json")):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if job.get("status") != "completed":
+                jobs.append(job)
+        return jobs
+
+    # ==================== 任务 ====================
+
+    def submit(self, doc_id: str) -> Dict:
+        """
+        创建删除任务（该文档已有未完成任务时返回该任务，执行时从其断点继续）
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            任务状态
+        """
+        with self._lock:
+            for job in self.list_unfinished():
+                if job["doc_id"] == doc_id:
+                    job.pop("touched", None)
+                    return job
+
+            job = {
+                "job_id": uuid.uuid4().hex[:12],
+                "doc_id": doc_id,
+                "status": "queued",
+                "phase": "neo4j",
+                "progress": {"batches": 0, "deleted_edges": 0, "deleted_nodes": 0,
+                             "chunks_deleted": 0, "entities_deleted": 0},
+                "touched": [],
+                "attempts": 0,
+                "error": None,
+                "created_at": datetime.now().isoformat()
+            }
+            self._save(job)
+
+        job = dict(job)
+        job.pop("touched")
+        return job
+
+    def is_running(self, job_id: str) -> bool:
+        """任务是否正在本进程中执行"""
+        with self._lock:
+            return job_id in self._running
+
+    def run(self, job_id: str) -> Optional[Dict]:
+        """
+        执行（或继续）删除任务，从记录的阶段开始
+
+        阶段顺序：neo4j（按批删除边、解除关联、删除孤立节点，最后重算度数并删除 Document 节点）
+        -> vectors（按批删除 chunks 和实体向量）-> done。
+        任务已在执行时直接返回当前状态，不重复执行。
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            最终任务状态
+        """
+        with self._lock:
+            if job_id in self._running:
+                return self.get(job_id)
+            self._running.add(job_id)
+        try:
+            return self._run(job_id)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+
+    def _run(self, job_id: str) -> Optional[Dict]:
+        job = self._load(job_id)
+        if job is None or job["status"] == "completed":
+            return job
+
+        job["status"] = "running"
+        job["error"] = None
+        job["attempts"] = job.get("attempts", 0) + 1
+        self._save(job)
+        progress = job["progress"]
+
+        try:
+            if job["phase"] == "neo4j" and not self.kg_manager.neo4j_storage:
+                print(f"⚠ 图谱存储未启用，跳过文档 {job['doc_id']} 的图谱删除")
+                job["phase"] = "vectors"
+                self._save(job)
+
+            if job["phase"] == "neo4j":
+                touched = set(job["touched"])
+                for batch in self.kg_manager.iter_delete_document(job["doc_id"], self.batch_size):
+                    progress["batches"] += 1
+                    progress["deleted_edges"] += batch["deleted_edges"]
+                    progress["deleted_nodes"] += batch["deleted_nodes"]
+                    touched.update(batch["touched"])
+                    job["touched"] = sorted(touched)
+                    self._save(job)
+
+                self.kg_manager.finish_document_delete(job["doc_id"], touched)
+                job["phase"] = "vectors"
+                job["touched"] = []
+                self._save(job)
+
+            if job["phase"] == "vectors":
+                for batch in self.vector_store.iter_delete_batches(job["doc_id"], self.batch_size):
+                    progress["batches"] += 1
+                    progress[f"{batch['collection']}_deleted"] += batch["deleted"]
+                    self._save(job)
+                job["phase"] = "done"
+
+            job["status"] = "completed"
+            self._save(job)
+            print(f"✓ 文档 {job['doc_id']} 已删除: {progress['deleted_nodes']} 节点, "
+                  f"{progress['deleted_edges']} 边, {progress['chunks_deleted']} chunks")
+        except Exception as e:
+            print(f"文档删除任务失败 ({job['doc_id']}, 阶段 {job['phase']}): {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+            self._save(job)
+
+        job.pop("touched", None)
+        return job
+
+    def resume_unfinished(self) -> List[str]:
+        """
+        继续未完成的任务（启动时调用；进程崩溃时任务停留在 running）
+
+        已失败 max_attempts 次的任务不再自动重试，避免每次启动都重复失败。
+
+        Returns:
+            继续执行的任务 ID
+        """
+        resumed = []
+        for job in self.list_unfinished():
+            if job["status"] == "failed" and job.get("attempts", 0) >= self.max_attempts:
+                print(f"  ⚠ 文档删除任务 {job['job_id']} ({job['doc_id']}) 已失败 "
+                      f"{job['attempts']} 次，不再自动重试")
+                continue
+            print(f"  继续文档删除任务 {job['job_id']} ({job['doc_id']}, 阶段 {job['phase']})")
+            self.run(job["job_id"])
+            resumed.append(job["job_id"])
+        return resumed
+
+
+# 单例实例
+_deletion_jobs: Optional[DocumentDeletionJobs] = None
+
+
+def get_deletion_jobs(kg_manager=None, vector_store=None) -> DocumentDeletionJobs:
+    """
+    获取删除任务管理器实例（单例）
+
+    Args:
+        kg_manager: 首次创建时使用的管理器，None 时使用 get_kg_manager()
+        vector_store: 首次创建时使用的向量存储，None 时使用 get_vector_store()
+    """
+    global _deletion_jobs
+    if _deletion_jobs is None:
+        if kg_manager is None:
+            from backend.management.kg_manager import get_kg_manager
+            kg_manager = get_kg_manager()
+        if vector_store is None:
+            from backend.core.storage.vector import get_vector_store
+            vector_store = get_vector_store()
+        _deletion_jobs = DocumentDeletionJobs(kg_manager, vector_store)
+    return _deletion_jobs
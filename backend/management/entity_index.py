@@ -0,0 +1,115 @@
+"""
+Entity Index
+实体名称的 n-gram 倒排索引（检索时的模糊匹配）
+
+核心功能：
+- 问题中抽取的实体不是精确的节点 ID 时，原先逐个扫描全部节点 ID 做子串判断，
+  每个问题 O(实体数 × 节点数)，并返回所有子串命中
+- 实体 ID 和标签按字符 n-gram（默认二元组，适合中文）建立倒排表，
+  只对与查询共享 n-gram 的候选打分
+- 排序：包含关系（查询包含实体名或实体名包含查询）优先，其次 n-gram 重合度（Jaccard），最后由调用方给出的度数
+"""
+
+import heapq
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+def ngrams(text: str, n: int = 2) -> Set[str]:
+    """
+    文本 -> 字符 n-gram 集合（忽略大小写；短于 n 的文本整体作为一个 gram）
+
+    Args:
+        text: 文本
+        n: gram 长度
+
+    Returns:
+        n-gram 集合
+    """
+    text = (text or "").casefold().strip()
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    """n-gram 倒排索引：键（节点编号）可以登记多个文本（ID、标签）"""
+
+    def __init__(self, n: int = 2):
+        """
+        初始化索引
+
+        Args:
+            n: gram 长度
+        """
+        self.n = n
+        self.clear()
+
+    def clear(self):
+        """清空索引"""
+        # 文本编号 -> (键, 规范化文本, gram 数)
+        self._texts: List[Tuple[int, str, int]] = []
+        self._seen: Set[Tuple[int, str]] = set()
+        # gram -> 文本编号列表
+        self._postings: Dict[str, List[int]] = {}
+
+    def add(self, key: int, text: str):
+        """
+        登记键的一个文本（重复登记忽略）
+
+        Args:
+            key: 节点编号
+            text: 实体 ID 或标签
+        """
+        grams = ngrams(text, self.n)
+        normalized = (text or "").casefold().strip()
+        if not grams or (key, normalized) in self._seen:
+            return
+        self._seen.add((key, normalized))
+        text_idx = len(self._texts)
+        self._texts.append((key, normalized, len(grams)))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(text_idx)
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0,
+               tiebreak: Optional[Callable[[int], float]] = None) -> List[Tuple[int, bool, float]]:
+        """
+        模糊查找
+
+        Args:
+            query: 查询文本
+            limit: 最多返回的键数
+            min_score: 不存在包含关系时的最低 n-gram 重合度
+            tiebreak: 键 -> 同分时的排序值（例如度数）
+
+        Returns:
+            [(键, 是否包含关系, 重合度)]，按包含关系、重合度、tiebreak 降序
+        """
+        query_grams = ngrams(query, self.n)
+        normalized = (query or "").casefold().strip()
+        if not query_grams:
+            return []
+
+        # 单字实体只登记了自身，另按查询中的单字查找（单字查询只匹配单字实体，避免泛滥）
+        lookup = query_grams | set(normalized)
+        shared: Dict[int, int] = {}
+        for gram in lookup:
+            for text_idx in self._postings.get(gram, ()):
+                shared[text_idx] = shared.get(text_idx, 0) + 1
+
+        best: Dict[int, Tuple[bool, float]] = {}
+        for text_idx, count in shared.items():
+            key, text, gram_count = self._texts[text_idx]
+            contained = text in normalized or normalized in text
+            score = min(count / (len(query_grams) + gram_count - count), 1.0)
+            if not contained and score < min_score:
+                continue
+            if key not in best or (contained, score) > best[key]:
+                best[key] = (contained, score)
+
+        ranked = heapq.nlargest(
+            limit, best.items(),
+            key=lambda item: (item[1][0], item[1][1], tiebreak(item[0]) if tiebreak else 0))
+        return [(key, contained, round(score, 3)) for key, (contained, score) in ranked]
+
+    def __len__(self) -> int:
+        return len(self._texts)
@@ -0,0 +1,360 @@
+"""
+Entity Resolver
+跨文档实体消歧
+
+核心功能：
+- 持久化别名索引：清洗后名称哈希 → 规范实体 ID（O(1) 查找）
+- 向量召回：未命中别名索引时，在 kg_entities 集合上做 ANN 候选召回（O(log n)）
+- 保存文档时把新节点映射到已有的规范实体
+- 批量任务：对 Neo4j 中已有节点重新消歧并合并
+"""
+
+import copy
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+
+# 加载环境变量
+load_dotenv()
+
+
+# 清洗时移除的字符：书名号、引号、空白、常见标点
+_CLEAN_PATTERN = re.compile(r'[《》"“”\'‘’\s\-_·.,，。:：;；!！?？()（）\[\]【】]')
+
+
+def clean_entity_name(name: str) -> str:
+    """
+    清洗实体名称，用作别名索引的键
+
+    Args:
+        name: 实体名称
+
+    Returns:
+        去除标点空白并转小写后的名称
+    """
+    if not name:
+        return ""
+    return _CLEAN_PATTERN.sub('', name).lower()
+
+
+class EntityResolver:
+    """跨文档实体消歧器（持久化别名索引）"""
+
+    def __init__(self, index_path: str = None, use_embeddings: bool = None,
+                 threshold: float = None, vector_store=None):
+        """
+        初始化消歧器
+
+        Args:
+            index_path: 别名索引文件路径，None 时从环境变量读取
+            use_embeddings: 是否启用向量召回，None 时从环境变量读取
+            threshold: 向量召回的相似度阈值
+            vector_store: 向量存储实例（默认按需获取单例）
+        """
+        if index_path is None:
+            index_path = os.getenv('ENTITY_ALIAS_INDEX_PATH', './data/storage/alias_index.json')
+        self.index_path = Path(index_path)
+
+        if use_embeddings is None:
+            use_embeddings = os.getenv('ENTITY_RESOLUTION_USE_EMBEDDINGS', 'false').lower() == 'true'
+        self.use_embeddings = use_embeddings
+
+        if threshold is None:
+            threshold = float(os.getenv('ENTITY_RESOLUTION_THRESHOLD', '0.92'))
+        self.threshold = threshold
+
+        self.ann_top_k = int(os.getenv('ENTITY_RESOLUTION_TOP_K', '3'))
+        self._vector_store = vector_store
+
+        # 清洗后名称 -> 规范实体 ID
+        self.aliases: Dict[str, str] = {}
+        # 规范实体 ID -> 实体类型
+        self.canonicals: Dict[str, str] = {}
+
+        self._lock = threading.RLock()
+        self._load()
+
+    # ==================== 持久化 ====================
+
+    def _load(self):
+        """从磁盘加载别名索引"""
+        if not self.index_path.exists():
+            return
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.aliases = data.get("aliases", {})
+            self.canonicals = data.get("canonicals", {})
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠ 别名索引加载失败，将重新构建: {e}")
+
+    def save(self):
+        """将别名索引写回磁盘（先写临时文件再替换，避免写坏索引）"""
+        with self._lock:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"aliases": self.aliases, "canonicals": self.canonicals},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+
+    # ==================== 查找与注册 ====================
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        在别名索引中查找规范实体 ID
+
+        Args:
+            name: 实体名称
+
+        Returns:
+            规范实体 ID，未命中返回 None
+        """
+        return self.aliases.get(clean_entity_name(name))
+
+    def add_alias(self, alias: str, canonical_id: str, entity_type: str = None):
+        """
+        手动登记别名（如 "DCA" -> "定投"）
+
+        Args:
+            alias: 别名
+            canonical_id: 规范实体 ID
+            entity_type: 规范实体类型
+        """
+        with self._lock:
+            canonical_id = self.aliases.get(clean_entity_name(canonical_id), canonical_id)
+            self.canonicals.setdefault(canonical_id, entity_type or 'Entity')
+            self.aliases[clean_entity_name(canonical_id)] = canonical_id
+            self.aliases[clean_entity_name(alias)] = canonical_id
+
+    def _types_compatible(self, type1: Optional[str], type2: Optional[str]) -> bool:
+        """类型一致，或任一方是通用 Entity 类型"""
+        if not type1 or not type2 or 'Entity' in (type1, type2):
+            return True
+        return type1 == type2
+
+    def _get_vector_store(self):
+        """按需获取向量存储（避免未启用时加载 ChromaDB）"""
+        if self._vector_store is None:
+            from backend.core.storage.vector import get_vector_store
+            self._vector_store = get_vector_store()
+        return self._vector_store
+
+    def _find_candidates(self, names: List[str], types: List[Optional[str]]) -> List[Optional[str]]:
+        """
+        向量召回：批量在 kg_entities 集合上查找相似实体
+
+        Args:
+            names: 未命中别名索引的实体名称
+            types: 对应的实体类型
+
+        Returns:
+            与 names 对应的规范实体 ID（未找到为 None）
+        """
+        matches: List[Optional[str]] = [None] * len(names)
+        if not self.use_embeddings or not names:
+            return matches
+
+        try:
+            batch_results = self._get_vector_store().search_entities_batch(
+                names, top_k=self.ann_top_k
+            )
+        except Exception as e:
+            print(f"⚠ 实体向量召回失败: {e}")
+            return matches
+
+        for i, results in enumerate(batch_results):
+            for candidate in results:
+                candidate_id = candidate.get("id")
+                if not candidate_id or candidate.get("score", 0) < self.threshold:
+                    continue
+                canonical = self.aliases.get(clean_entity_name(candidate_id), candidate_id)
+                canonical_type = self.canonicals.get(canonical, candidate.get("type"))
+                if self._types_compatible(types[i], canonical_type):
+                    matches[i] = canonical
+                    break
+
+        return matches
+
+    def resolve_many(self, names: List[str], types: List[Optional[str]] = None) -> List[str]:
+        """
+        批量消歧：别名索引 O(1) 命中优先，未命中的再统一做一次向量召回
+
+        Args:
+            names: 实体名称列表
+            types: 实体类型列表（可选）
+
+        Returns:
+            规范实体 ID 列表
+        """
+        types = types or [None] * len(names)
+        resolved: List[Optional[str]] = []
+        misses: List[int] = []
+
+        with self._lock:
+            for i, name in enumerate(names):
+                hit = self.aliases.get(clean_entity_name(name))
+                resolved.append(hit)
+                if hit is None:
+                    misses.append(i)
+
+            candidates = self._find_candidates(
+                [names[i] for i in misses], [types[i] for i in misses]
+            )
+
+            for i, candidate in zip(misses, candidates):
+                key = clean_entity_name(names[i])
+                # 同一批次中的重复名称以先登记者为准
+                canonical = self.aliases.get(key) or candidate or names[i]
+                self.canonicals.setdefault(canonical, types[i] or 'Entity')
+                self.aliases[key] = canonical
+                resolved[i] = canonical
+
+        return resolved
+
+    def resolve(self, name: str, entity_type: str = None) -> str:
+        """
+        消歧单个实体
+
+        Args:
+            name: 实体名称
+            entity_type: 实体类型
+
+        Returns:
+            规范实体 ID
+        """
+        return self.resolve_many([name], [entity_type])[0]
+
+    def resolve_graph(self, graph: Dict, persist: bool = True) -> Dict:
+        """
+        将规范化图谱中的节点映射到规范实体
+
+        原地更新 graph 的 nodes / edges，便于调用方后续（如向量索引）使用规范 ID。
+        合并后产生的自环被丢弃，重复边合并为一条（权重相加），均计入 dropped_edges。
+
+        Args:
+            graph: 规范化后的图谱 {"nodes": [...], "edges": [...]}
+            persist: 是否在消歧后写回别名索引
+
+        Returns:
+            消歧统计信息 {"resolved_nodes": 被映射到其他实体的节点数, ...}
+        """
+        nodes = graph.get("nodes") or []
+        edges = graph.get("edges") or []
+
+        ids = [node.get("id") for node in nodes]
+        canonical_ids = self.resolve_many(ids, [node.get("type") for node in nodes])
+        mapping = {old: new for old, new in zip(ids, canonical_ids) if old != new}
+
+        # 合并映射到同一规范实体的节点
+        merged: Dict[str, Dict] = {}
+        for node, canonical in zip(nodes, canonical_ids):
+            existing = merged.get(canonical)
+            if existing is None:
+                node["id"] = canonical
+                node["label"] = canonical
+                merged[canonical] = node
+            else:
+                existing["degree"] = max(existing.get("degree", 0), node.get("degree", 0))
+                if node.get("description") and not existing.get("description"):
+                    existing["description"] = node["description"]
+
+        # 重写边端点，丢弃合并后产生的自环；端点合并后重复的边（同源、同关系、同目标）合并权重
+        resolved: Dict[Tuple, Dict] = {}
+        for edge in edges:
+            edge["source"] = mapping.get(edge.get("source"), edge.get("source"))
+            edge["target"] = mapping.get(edge.get("target"), edge.get("target"))
+            if edge["source"] == edge["target"]:
+                continue
+            key = (edge["source"], edge.get("label"), edge["target"])
+            existing = resolved.get(key)
+            if existing is None:
+                resolved[key] = edge
+            else:
+                existing["weight"] = (existing.get("weight") or 1) + (edge.get("weight") or 1)
+        resolved_edges = list(resolved.values())
+
+        graph["nodes"] = list(merged.values())
+        graph["edges"] = resolved_edges
+
+        if persist:
+            self.save()
+
+        return {
+            "resolved_nodes": len(mapping),
+            "merged_nodes": len(nodes) - len(merged),
+            "dropped_edges": len(edges) - len(resolved_edges)
+        }
+
+    def _preview_copy(self) -> "EntityResolver":
+        """别名索引的副本（dry-run 在副本上计算，不改动在用的索引）"""
+        with self._lock:
+            preview = copy.copy(self)
+            preview.aliases = dict(self.aliases)
+            preview.canonicals = dict(self.canonicals)
+        preview._lock = threading.RLock()
+        return preview
+
+    # ==================== 批量任务 ====================
+
+    def resolve_existing(self, storage, page_size: int = 1000,
+                         dry_run: bool = False) -> Tuple[Dict, List[Tuple[str, str]]]:
+        """
+        对存储中已有的实体重新消歧，并合并重复节点
+
+        分页遍历全部实体；每页先统一消歧，再逐个合并到规范实体。
+        dry_run 时在别名索引的副本上计算，不写入存储，也不改动在用的索引。
+
+        Args:
+            storage: Neo4jStorage 实例（需提供 iter_entity_ids / merge_entities）
+            page_size: 每页节点数
+            dry_run: 只计算合并计划，不写入
+
+        Returns:
+            (统计信息, 合并列表 [(alias_id, canonical_id), ...]) 元组
+        """
+        stats = {"scanned": 0, "merged": 0, "failed": 0}
+        merges: List[Tuple[str, str]] = []
+        resolver = self._preview_copy() if dry_run else self
+
+        for page in storage.iter_entity_ids(page_size=page_size):
+            ids = [row["id"] for row in page]
+            canonical_ids = resolver.resolve_many(ids, [row.get("type") for row in page])
+            stats["scanned"] += len(ids)
+
+            for entity_id, canonical in zip(ids, canonical_ids):
+                if entity_id == canonical:
+                    continue
+                merges.append((entity_id, canonical))
+                if dry_run:
+                    continue
+                try:
+                    storage.merge_entities(entity_id, canonical)
+                    stats["merged"] += 1
+                except Exception as e:
+                    print(f"实体合并失败 ({entity_id} -> {canonical}): {e}")
+                    stats["failed"] += 1
+
+        if not dry_run:
+            self.save()
+
+        return stats, merges
+
+
+# 单例
+_resolver: Optional[EntityResolver] = None
+
+
+def get_entity_resolver() -> EntityResolver:
+    """获取实体消歧器实例（单例）"""
+    global _resolver
+    if _resolver is None:
+        _resolver = EntityResolver()
+    return _resolver
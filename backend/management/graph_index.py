@@ -0,0 +1,388 @@
+"""
+Graph Index
+进程内图谱邻接索引（CSR）
+
+核心功能：
+- 问答检索每次都要从 Neo4j 分页读取整个图谱、在 Python 中重建邻接表再做 BFS，
+  是除 LLM 之外单次问答最大的开销
+- 索引常驻进程：节点编号为整数，邻接关系保存为 CSR 数组
+  （offsets / neighbors / edge_ids，numpy），N 跳扩展为向量化的数组运算
+- 首次使用时从存储分页构建；保存文档后增量追加新节点和新边（O(文档大小)），
+  CSR 只标记为待更新，下次查询时一次性重排（连续多次保存只重排一次）；
+  删除、覆盖或合并实体后标记失效，下次使用时重建（与连通分量索引一致）
+- 随节点同步维护实体名称的 n-gram 倒排索引，用于问题实体的模糊匹配
+- 个性化 PageRank 排序：从匹配的种子实体出发的带重启随机游走，按得分返回预算内的节点和边
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.core.storage.neo4j import normalize_relation_type
+from backend.management.entity_index import NgramIndex
+
+
+class GraphIndex:
+    """CSR 邻接索引（线程安全）"""
+
+    def __init__(self):
+        """初始化空索引（失效状态，首次使用时构建）"""
+        self._lock = threading.RLock()
+        self.stale = True
+        self.built_at: Optional[float] = None
+        self.clear()
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            # 整数编号 -> 节点 / 实体 ID
+            self.nodes: List[Dict] = []
+            self.node_ids: List[str] = []
+            self.id_to_idx: Dict[str, int] = {}
+            # 实体 ID 和标签的 n-gram 倒排索引
+            self.entity_index = NgramIndex()
+            # 边编号 -> 边；(source, 关系类型, target) -> 边编号（与 Neo4j MERGE 的键一致）
+            self.edges: List[Dict] = []
+            self._edge_keys: Dict[Tuple[str, str, str], int] = {}
+            # 每条边的端点编号（增量追加的先放入待合并列表，生成 CSR 时拼接）
+            self._src = np.zeros(0, dtype=np.int32)
+            self._dst = np.zeros(0, dtype=np.int32)
+            self._pending_src: List[int] = []
+            self._pending_dst: List[int] = []
+            self._csr_dirty = False
+            # CSR：节点 i 的邻居为 neighbors[offsets[i]:offsets[i+1]]，对应的边为 edge_ids[同一区间]
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.neighbors = np.zeros(0, dtype=np.int32)
+            self.edge_ids = np.zeros(0, dtype=np.int32)
+
+    # ==================== 构建 ====================
+
+    def _add_node(self, node: Dict, replace: bool) -> int:
+        """
+        登记节点
+
+        Args:
+            node: 节点数据
+            replace: 已存在时是否整体替换（从存储构建时）；否则只补全空描述（共享节点的合并规则）
+
+        Returns:
+            节点编号
+        """
+        node_id = node["id"]
+        idx = self.id_to_idx.get(node_id)
+        if idx is None:
+            idx = len(self.nodes)
+            self.id_to_idx[node_id] = idx
+            self.node_ids.append(node_id)
+            self.nodes.append({"degree": 0, **node})
+        elif replace:
+            self.nodes[idx].update(node)
+        elif not self.nodes[idx].get("description") and node.get("description"):
+            self.nodes[idx]["description"] = node["description"]
+
+        self.entity_index.add(idx, node_id)
+        if node.get("label"):
+            self.entity_index.add(idx, node["label"])
+        return idx
+
+    def _add_edges(self, edges: Iterable[Dict], count_degree: bool) -> int:
+        """
+        登记边（端点不存在时创建占位节点，重复的边忽略）
+
+        Args:
+            edges: 边数据
+            count_degree: 是否递增端点度数（增量追加时；从存储构建时度数已由存储给出）
+
+        Returns:
+            新增的边数
+        """
+        added = 0
+        for edge in edges:
+            source, target = edge.get("source"), edge.get("target")
+            if not source or not target:
+                continue
+            label = edge.get("label") or "RELATES"
+            key = (source, normalize_relation_type(label), target)
+            if key in self._edge_keys:
+                continue
+
+            s = self._add_node({"id": source}, replace=False)
+            t = self._add_node({"id": target}, replace=False)
+            self._edge_keys[key] = len(self.edges)
+            self.edges.append({"source": source, "target": target,
+                               "label": label, "weight": edge.get("weight", 1)})
+            self._pending_src.append(s)
+            self._pending_dst.append(t)
+            added += 1
+            if count_degree:
+                self.nodes[s]["degree"] = self.nodes[s].get("degree", 0) + 1
+                if t != s:
+                    self.nodes[t]["degree"] = self.nodes[t].get("degree", 0) + 1
+
+        if added:
+            self._csr_dirty = True
+        return added
+
+    def _ensure_csr(self):
+        """有待合并的边或新节点时重新生成 CSR（查询前调用，调用方持有锁）"""
+        if self._csr_dirty or len(self.offsets) != len(self.nodes) + 1:
+            self._build_csr()
+
+    def _build_csr(self):
+        """由边的端点数组生成 CSR（无向：每条边在两个端点下各出现一次，自环只出现一次）"""
+        if self._pending_src:
+            self._src = np.concatenate([self._src, np.asarray(self._pending_src, dtype=np.int32)])
+            self._dst = np.concatenate([self._dst, np.asarray(self._pending_dst, dtype=np.int32)])
+            self._pending_src, self._pending_dst = [], []
+        self._csr_dirty = False
+
+        edge_count = len(self._src)
+        ids = np.arange(edge_count, dtype=np.int32)
+        loop = self._src == self._dst
+
+        src = np.concatenate([self._src, self._dst[~loop]])
+        dst = np.concatenate([self._dst, self._src[~loop]])
+        eids = np.concatenate([ids, ids[~loop]])
+
+        order = np.argsort(src, kind="stable")
+        self.neighbors = dst[order]
+        self.edge_ids = eids[order]
+        counts = np.bincount(src, minlength=len(self.nodes))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def rebuild(self, pages: Iterable[Dict]):
+        """
+        从存储分页重建索引
+
+        Args:
+            pages: 图谱分页 {"nodes", "edges"}（kg_manager.iter_graph_pages()）
+        """
+        with self._lock:
+            start = time.perf_counter()
+            self.clear()
+            for page in pages:
+                for node in page.get("nodes") or []:
+                    if node.get("id"):
+                        self._add_node(node, replace=True)
+                self._add_edges(page.get("edges") or [], count_degree=False)
+            self._build_csr()
+            self.stale = False
+            self.built_at = time.time()
+            print(f"✓ 图谱邻接索引已构建: {len(self.nodes)} 个节点, {len(self.edges)} 条边 "
+                  f"({time.perf_counter() - start:.2f}s)")
+
+    def ensure_fresh(self, load_pages: Callable[[], Iterable[Dict]]):
+        """
+        索引失效时重建
+
+        Args:
+            load_pages: 返回图谱分页迭代器的函数
+        """
+        with self._lock:
+            if self.stale:
+                self.rebuild(load_pages())
+
+    def add_graph(self, graph: Dict):
+        """
+        增量追加一个文档新写入的节点和边（索引失效时忽略，重建时会包含）
+
+        只登记节点和边，CSR 在下次查询时生成。
+
+        Args:
+            graph: 规范化后的图谱 {"nodes": [...], "edges": [...]}
+        """
+        with self._lock:
+            if self.stale:
+                return
+            for node in graph.get("nodes") or []:
+                if node.get("id"):
+                    self._add_node({key: node.get(key) for key in ("id", "label", "type", "description")},
+                                   replace=False)
+            self._add_edges(graph.get("edges") or [], count_degree=True)
+
+    def invalidate(self):
+        """标记索引失效（删除、覆盖或合并实体后调用）"""
+        with self._lock:
+            self.stale = True
+
+    # ==================== 查询 ====================
+
+    def has(self, node_id: str) -> bool:
+        """实体是否在图谱中"""
+        return node_id in self.id_to_idx
+
+    def fuzzy_match(self, query: str, limit: int = 5, min_score: float = 0.5) -> List[Dict]:
+        """
+        模糊匹配实体（查询不是精确的实体 ID 时）
+
+        Args:
+            query: 问题中抽取的实体名称
+            limit: 最多返回的候选数
+            min_score: 不存在包含关系时的最低 n-gram 重合度
+
+        Returns:
+            [{"id", "contained", "score", "degree"}]，按包含关系、重合度、度数降序
+        """
+        with self._lock:
+            hits = self.entity_index.search(
+                query, limit=limit, min_score=min_score,
+                tiebreak=lambda idx: self.nodes[idx].get("degree") or 0)
+            return [{"id": self.node_ids[idx], "contained": contained, "score": score,
+                     "degree": self.nodes[idx].get("degree") or 0}
+                    for idx, contained, score in hits]
+
+    def _seeds(self, seed_ids: Iterable[str]) -> np.ndarray:
+        """实体 ID -> 排序后的节点编号数组（不存在的忽略）"""
+        return np.asarray(sorted({self.id_to_idx[s] for s in seed_ids if s in self.id_to_idx}),
+                          dtype=np.int64)
+
+    def _expand(self, seeds: np.ndarray, n_hops: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        向量化 BFS
+
+        Returns:
+            (到达的节点掩码, 扩展过程中经过的边掩码)
+        """
+        offsets, neighbors, edge_ids = self.offsets, self.neighbors, self.edge_ids
+        visited = np.zeros(len(self.nodes), dtype=bool)
+        visited[seeds] = True
+        seen_edges = np.zeros(len(self.edges), dtype=bool)
+
+        frontier = seeds
+        for _ in range(n_hops):
+            starts = offsets[frontier]
+            counts = offsets[frontier + 1] - starts
+            total = int(counts.sum())
+            if total == 0:
+                break
+            # 拼接各节点的邻接区间：区间起点按长度重复 + 区间内偏移
+            positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+            seen_edges[edge_ids[positions]] = True
+            reached = neighbors[positions]
+            frontier = np.unique(reached[~visited[reached]])
+            visited[frontier] = True
+
+        return visited, seen_edges
+
+    def neighborhood(self, seed_ids: Iterable[str], n_hops: int = 1) -> Tuple[List[Dict], List[Dict]]:
+        """
+        N 跳扩展：种子实体及其 N 跳内的邻居，以及扩展过程中经过的边
+
+        Args:
+            seed_ids: 种子实体 ID（不存在的忽略）
+            n_hops: 跳数
+
+        Returns:
+            (节点列表, 边列表)
+        """
+        with self._lock:
+            seeds = self._seeds(seed_ids)
+            if seeds.size == 0:
+                return [], []
+
+            self._ensure_csr()
+            visited, seen_edges = self._expand(seeds, n_hops)
+
+            # 返回副本，调用方修改结果不影响索引
+            nodes = [dict(self.nodes[i]) for i in np.flatnonzero(visited)]
+            edges = [dict(self.edges[i]) for i in np.flatnonzero(seen_edges)]
+            return nodes, edges
+
+    def ranked_neighborhood(self, seed_ids: Iterable[str], n_hops: int = 2,
+                            max_nodes: int = 30, max_edges: int = 60,
+                            restart: float = 0.15, max_iter: int = 30,
+                            tol: float = 1e-6) -> Tuple[List[Dict], List[Dict]]:
+        """
+        个性化 PageRank（带重启的随机游走）排序的 N 跳邻域
+
+        游走限制在种子的 N 跳邻域内（邻域内的全部边，无向、按边数均匀转移），
+        每轮迭代是一次稀疏矩阵向量乘（np.bincount），计算量与邻域大小和迭代上限成正比。
+        返回得分最高的 max_nodes 个节点（种子总是保留）和两端都入选、得分最高的 max_edges 条边。
+
+        Args:
+            seed_ids: 种子实体 ID
+            n_hops: 邻域跳数
+            max_nodes: 返回节点数上限
+            max_edges: 返回边数上限
+            restart: 每步回到种子的概率
+            max_iter: 最大迭代次数
+            tol: 收敛阈值（L1）
+
+        Returns:
+            (节点列表, 边列表)，按得分降序，每项带 "score"
+        """
+        with self._lock:
+            seeds = self._seeds(seed_ids)
+            if seeds.size == 0:
+                return [], []
+
+            self._ensure_csr()
+            visited, _ = self._expand(seeds, n_hops)
+            region = np.flatnonzero(visited)
+            local = np.full(len(self.nodes), -1, dtype=np.int64)
+            local[region] = np.arange(region.size)
+
+            # 邻域内的边（两端都在邻域内），展开为无向转移
+            region_edges = np.flatnonzero(visited[self._src] & visited[self._dst])
+            src, dst = local[self._src[region_edges]], local[self._dst[region_edges]]
+            loop = src == dst
+            rows = np.concatenate([src, dst[~loop]])
+            cols = np.concatenate([dst, src[~loop]])
+            degree = np.bincount(rows, minlength=region.size).astype(float)
+            inv_degree = np.divide(1.0, degree, out=np.zeros_like(degree), where=degree > 0)
+            dangling = degree == 0
+
+            personalization = np.zeros(region.size)
+            personalization[local[seeds]] = 1.0 / seeds.size
+            scores = personalization.copy()
+            for _ in range(max_iter):
+                spread = np.bincount(cols, weights=(scores * inv_degree)[rows],
+                                     minlength=region.size).astype(float, copy=False)
+                # 没有邻居的节点把概率交回种子
+                spread += scores[dangling].sum() * personalization
+                updated = (1 - restart) * spread + restart * personalization
+                converged = np.abs(updated - scores).sum() < tol
+                scores = updated
+                if converged:
+                    break
+
+            # 节点：种子 + 其余得分最高的节点
+            is_seed = np.zeros(region.size, dtype=bool)
+            is_seed[local[seeds]] = True
+            others = np.flatnonzero(~is_seed)
+            others = others[np.argsort(-scores[others], kind="stable")][:max(max_nodes - seeds.size, 0)]
+            selected = np.concatenate([np.flatnonzero(is_seed), others])
+            selected = selected[np.argsort(-scores[selected], kind="stable")]
+
+            chosen = np.zeros(region.size, dtype=bool)
+            chosen[selected] = True
+            # 边：两端都入选，按较小端点得分排序
+            keep = chosen[src] & chosen[dst]
+            edge_scores = np.minimum(scores[src[keep]], scores[dst[keep]])
+            order = np.argsort(-edge_scores, kind="stable")[:max_edges]
+            kept_edges = region_edges[keep][order]
+
+            nodes = [{**self.nodes[region[i]], "score": round(float(scores[i]), 6)} for i in selected]
+            edges = [{**self.edges[e], "score": round(float(edge_scores[j]), 6)}
+                     for e, j in zip(kept_edges, order)]
+            return nodes, edges
+
+    def get_stats(self) -> Dict:
+        """
+        获取索引统计
+
+        Returns:
+            {"nodes", "edges", "stale", "built_at", "memory_bytes"}
+        """
+        with self._lock:
+            self._ensure_csr()
+            arrays = (self._src, self._dst, self.offsets, self.neighbors, self.edge_ids)
+            return {
+                "nodes": len(self.nodes),
+                "edges": len(self.edges),
+                "stale": self.stale,
+                "built_at": self.built_at,
+                "memory_bytes": int(sum(a.nbytes for a in arrays))
+            }
@@ -3,17 +3,32 @@ Knowledge Graph Management
 知识图谱统一管理接口
 
 核心功能：
-- 统一管理 Neo4j 存储
+- 统一管理图谱存储（Neo4j，或单机部署使用的嵌入式 SQLite，GRAPH_BACKEND 选择）
 - 自动降级处理
 - 规范化集成
+- 跨文档实体消歧
+- 全局连通分量索引
+- 进程内图谱邻接索引（问答检索的 N 跳扩展）
+- 异步读接口（a 前缀方法，供 FastAPI 端点使用，不阻塞事件循环）
 """
 
+import asyncio
 import os
+from collections import OrderedDict
 from typing import Dict, Optional, List
 from dotenv import load_dotenv
 
 from backend.core.storage.neo4j import get_neo4j_storage
-from backend.extraction.normalizer import KnowledgeGraphNormalizer
+from backend.core.storage.sqlite_graph import get_sqlite_graph_storage
+from backend.core.storage.neo4j_async import get_async_neo4j_storage
+from backend.core.storage.schema import SchemaManager
+from backend.extraction.normalizer import KnowledgeGraphNormalizer, PROVENANCE_NONE
+from backend.management.entity_resolver import get_entity_resolver
+from backend.management.component_index import get_component_index
+from backend.management.renormalizer import GraphRenormalizationJob
+from backend.management.write_coordinator import get_write_coordinator
+from backend.management.query_cache import QueryCache
+from backend.management.graph_index import GraphIndex
 
 
 # 加载环境变量
@@ -23,22 +38,37 @@ load_dotenv()
 class KnowledgeGraphManager:
     """知识图谱统一管理接口（Neo4j）"""
 
-    def __init__(self, use_neo4j: bool = None):
+    # 记住写入实体的文档数上限（写入协调的键，最近使用的优先保留）
+    DOC_ENTITY_CACHE_SIZE = 1024
+
+    def __init__(self, use_neo4j: bool = None, use_entity_resolution: bool = None,
+                 use_component_index: bool = None, graph_backend: str = None):
         """
         初始化管理器
 
         Args:
             use_neo4j: 是否使用 Neo4j，None 时从环境变量读取
+            use_entity_resolution: 是否启用跨文档实体消歧，None 时从环境变量读取
+            use_component_index: 是否维护全局连通分量索引，None 时从环境变量读取
+            graph_backend: 图谱存储后端 neo4j / sqlite，None 时从环境变量读取
         """
-        # 规范化器
-        self.normalizer = KnowledgeGraphNormalizer()
+        # 规范化器（Neo4j 不存储来源数据，入库时不保留 original）
+        self.normalizer = KnowledgeGraphNormalizer({'provenance': PROVENANCE_NONE})
+
+        # 图谱存储：neo4j_storage 保存所选后端的存储（SQLiteGraphStorage 与 Neo4jStorage 接口一致）
+        if graph_backend is None:
+            graph_backend = os.getenv('GRAPH_BACKEND', 'neo4j').lower()
+        self.graph_backend = 'sqlite' if graph_backend == 'sqlite' else 'neo4j'
 
-        # Neo4j 存储
         if use_neo4j is None:
             use_neo4j = os.getenv('USE_NEO4J', 'true').lower() == 'true'
 
         self.neo4j_storage = None
-        if use_neo4j:
+        if self.graph_backend == 'sqlite':
+            self.neo4j_storage = get_sqlite_graph_storage()
+            if self.neo4j_storage:
+                print(f"✓ SQLite 图谱存储已启用 ({self.neo4j_storage.db_path})")
+        elif use_neo4j:
             try:
                 self.neo4j_storage = get_neo4j_storage()
                 if self.neo4j_storage:
@@ -48,6 +78,33 @@ class KnowledgeGraphManager:
             except Exception as e:
                 print(f"⚠ Neo4j 初始化失败: {e}")
 
+        # 跨文档实体消歧（持久化别名索引）
+        if use_entity_resolution is None:
+            use_entity_resolution = os.getenv('ENTITY_RESOLUTION_ENABLED', 'false').lower() == 'true'
+        self.entity_resolver = get_entity_resolver() if use_entity_resolution else None
+
+        # 全局连通分量索引（随每次保存增量更新）
+        if use_component_index is None:
+            use_component_index = os.getenv('COMPONENT_INDEX_ENABLED', 'true').lower() == 'true'
+        self.component_index = (get_component_index()
+                                if use_component_index and self.neo4j_storage else None)
+
+        # 并发写入协调（按实体分片排队，瞬时错误重试）
+        self.write_coordinator = get_write_coordinator()
+        # 文档 -> 本进程上次为其写入的实体 ID（覆盖写入时作为写入键，免去一次存储查询）
+        self._doc_entities: "OrderedDict[str, frozenset]" = OrderedDict()
+
+        # 读缓存（保存/删除文档时整体失效；缓存的是本管理器存储的查询结果）
+        self.query_cache = QueryCache()
+
+        # 图谱邻接索引（首次检索时构建，保存后增量追加，删除后重建）
+        self.graph_index = (GraphIndex()
+                            if os.getenv('GRAPH_INDEX_ENABLED', 'true').lower() == 'true' else None)
+
+        # 异步驱动（首次调用 a 前缀方法时创建；NEO4J_ASYNC=false 时改为线程池执行同步查询）
+        self.use_async_driver = os.getenv('NEO4J_ASYNC', 'true').lower() == 'true'
+        self._async_storage = None
+
     def save_document(self, doc_id: str, raw_graph: Dict,
                      metadata: Dict = None) -> Dict:
         """
@@ -67,60 +124,200 @@ class KnowledgeGraphManager:
         else:
             normalized = raw_graph
 
-        # 2. 保存到 Neo4j
+        # 2. 跨文档实体消歧（将节点映射到已有规范实体）
+        resolution_stats = {}
+        if self.entity_resolver:
+            try:
+                resolution_stats = self.entity_resolver.resolve_graph(normalized)
+            except Exception as e:
+                print(f"⚠ 实体消歧失败，按原 ID 保存: {e}")
+                resolution_stats = {"error": str(e)}
+
+        # 3. 保存到 Neo4j
         neo4j_stats = {}
         if self.neo4j_storage:
             try:
-                neo4j_stats = self.neo4j_storage.save_graph_batch(normalized, doc_id)
+                neo4j_stats = self.write_coordinator.run(
+                    self._write_keys(doc_id, normalized),
+                    lambda: self.neo4j_storage.save_graph_batch(normalized, doc_id)
+                )
+                self._remember_doc_entities(doc_id, normalized)
                 print(f"✓ Neo4j 保存成功: {neo4j_stats.get('nodes_created', 0)} 节点, {neo4j_stats.get('edges_created', 0)} 边")
+                self._update_component_index(normalized, neo4j_stats)
+                self._update_graph_index(normalized, neo4j_stats)
             except Exception as e:
                 print(f"✗ Neo4j 写入失败: {e}")
                 neo4j_stats = {"error": str(e)}
+                # 部分写入后足迹未知，下次保存重新查询
+                self._doc_entities.pop(doc_id, None)
+            finally:
+                # 批量导入失败时部分批次已提交，无论成败都让读缓存失效
+                self.query_cache.invalidate()
         else:
             neo4j_stats = {"error": "Neo4j 未启用"}
 
-        return {
+        result = {
             "normalization": normalized.get("stats", {}),
             "neo4j": neo4j_stats
         }
+        if self.entity_resolver:
+            result["resolution"] = resolution_stats
+        return result
 
-    def load_document(self, doc_id: str) -> Optional[Dict]:
+    def _write_keys(self, doc_id: str, graph: Dict = None) -> set:
         """
-        加载文档（从 Neo4j）
+        写入会加锁的实体：新图谱的节点和边端点 + 文档已有的实体（覆盖/删除时会修改）
+
+        文档已有的实体优先使用本进程上次保存该文档时记录的 ID，
+        只有未记录（首次保存、重启后、图谱被合并或删除后）时才查询存储。
 
         Args:
             doc_id: 文档 ID
+            graph: 将要写入的图谱，删除时为 None
 
         Returns:
-            图谱数据
+            实体 ID 集合
         """
-        if not self.neo4j_storage:
-            return {"nodes": [], "edges": [], "error": "Neo4j 未启用"}
+        keys = self._graph_entity_ids(graph) if graph else set()
+        existing = self._doc_entities.get(doc_id)
+        if existing is None:
+            try:
+                existing = self.neo4j_storage.document_entity_ids(doc_id)
+            except Exception as e:
+                print(f"⚠ 读取文档实体失败，仅按新数据协调写入: {e}")
+                existing = ()
+        keys.update(existing)
+        keys.discard(None)
+        return keys
+
+    @staticmethod
+    def _graph_entity_ids(graph: Dict) -> set:
+        """图谱的节点和边端点 ID"""
+        ids = {node.get("id") for node in graph.get("nodes", [])}
+        for edge in graph.get("edges", []):
+            ids.update((edge.get("source"), edge.get("target")))
+        ids.discard(None)
+        return ids
+
+    def _remember_doc_entities(self, doc_id: str, graph: Dict):
+        """记录保存成功的文档实体（下次覆盖写入的写入键）"""
+        self._doc_entities[doc_id] = frozenset(self._graph_entity_ids(graph))
+        self._doc_entities.move_to_end(doc_id)
+        while len(self._doc_entities) > self.DOC_ENTITY_CACHE_SIZE:
+            self._doc_entities.popitem(last=False)
+
+    def _cached(self, method: str, *args):
+        """
+        读穿缓存调用 neo4j_storage 的同名方法（异常不缓存）
+
+        Args:
+            method: 存储方法名，与参数一起作为缓存键
+            args: 参数
+        """
+        return self.query_cache.get_or_load(
+            (method,) + args, lambda: getattr(self.neo4j_storage, method)(*args))
+
+    def get_cache_stats(self) -> Dict:
+        """
+        获取读缓存统计（命中率、条目数、版本号）
+
+        Returns:
+            读缓存统计
+        """
+        return self.query_cache.get_metrics()
+
+    def get_write_stats(self) -> Dict:
+        """
+        获取并发写入统计（冲突数、重试数等）
+
+        Returns:
+            写入协调器统计
+        """
+        return self.write_coordinator.get_metrics()
+
+    def _update_component_index(self, graph: Dict, neo4j_stats: Dict):
+        """
+        保存成功后增量更新连通分量索引
+
+        覆盖写入删除了旧数据时，并查集无法拆分分量，改为标记失效。
+        """
+        if not self.component_index:
+            return
 
         try:
-            # 查询该文档的所有节点和边
-            with self.neo4j_storage.driver.session() as session:
-                # 查询节点
-                nodes_result = session.run("""
-                    MATCH (n:Entity)
-                    WHERE $doc_id IN n.doc_ids
-                    RETURN n.id as id, n.label as label, n.type as type,
-                           n.description as description, n.doc_ids as doc_ids
-                """, doc_id=doc_id)
+            if neo4j_stats.get("deleted_edges") or neo4j_stats.get("deleted_nodes"):
+                self.component_index.invalidate()
+            else:
+                self.component_index.add_graph(graph)
+        except Exception as e:
+            print(f"⚠ 连通分量索引更新失败: {e}")
 
-                nodes = [dict(record) for record in nodes_result]
+    def _update_graph_index(self, graph: Dict, neo4j_stats: Dict):
+        """
+        保存成功后增量追加邻接索引
+
+        覆盖写入删除了旧数据、或增量写入删除 / 修改了已有节点和边时，改为标记失效；
+        只有新增的增量写入（含无差异的重新处理）照常追加。
+        """
+        if not self.graph_index:
+            return
+
+        delta = neo4j_stats.get("delta") or {}
+        if (neo4j_stats.get("deleted_edges") or neo4j_stats.get("deleted_nodes")
+                or any(delta.get(key) for key in
+                       ("nodes_changed", "nodes_removed", "edges_changed", "edges_removed"))):
+            self.graph_index.invalidate()
+        else:
+            self.graph_index.add_graph(graph)
+
+    def get_graph_index(self) -> GraphIndex:
+        """
+        获取最新的图谱邻接索引
 
-                # 查询边
-                edges_result = session.run("""
-                    MATCH (s:Entity)-[r {doc_id: $doc_id}]->(t:Entity)
-                    RETURN s.id as source, t.id as target,
-                           COALESCE(r.label, type(r)) as label, r.weight as weight
-                """, doc_id=doc_id)
+        索引关闭时每次从存储临时构建（与原先逐次读取全图的行为一致）。
 
-                edges = [dict(record) for record in edges_result]
+        Returns:
+            GraphIndex 实例
+        """
+        if not self.graph_index:
+            index = GraphIndex()
+            index.rebuild(self.iter_graph_pages())
+            return index
+
+        self.graph_index.ensure_fresh(self.iter_graph_pages)
+        return self.graph_index
 
-                return {"nodes": nodes, "edges": edges}
+    def _invalidate_component_index(self):
+        """
+        删除或合并实体后标记连通分量索引失效
 
+        图谱已变化，读缓存、邻接索引和记录的文档实体同时失效。
+        """
+        self.query_cache.invalidate()
+        self._doc_entities.clear()
+        if self.graph_index:
+            self.graph_index.invalidate()
+        if self.component_index:
+            try:
+                self.component_index.invalidate()
+            except Exception as e:
+                print(f"⚠ 连通分量索引标记失败: {e}")
+
+    def load_document(self, doc_id: str) -> Optional[Dict]:
+        """
+        加载文档（从 Neo4j）
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            图谱数据
+        """
+        if not self.neo4j_storage:
+            return {"nodes": [], "edges": [], "error": "Neo4j 未启用"}
+
+        try:
+            return self._cached("load_document", doc_id)
         except Exception as e:
             print(f"从 Neo4j 加载失败: {e}")
             return {"nodes": [], "edges": [], "error": str(e)}
@@ -136,26 +333,7 @@ class KnowledgeGraphManager:
             return []
 
         try:
-            with self.neo4j_storage.driver.session() as session:
-                result = session.run("""
-                    MATCH (n:Entity)
-                    UNWIND n.doc_ids as doc_id
-                    WITH doc_id, count(n) as node_count
-                    RETURN doc_id, node_count
-                    ORDER BY doc_id DESC
-                """)
-
-                docs = []
-                for record in result:
-                    docs.append({
-                        "doc_id": record["doc_id"],
-                        "node_count": record["node_count"],
-                        "edge_count": 0,  # TODO: 查询边数
-                        "updated_at": "N/A"
-                    })
-
-                return docs
-
+            return self._cached("list_documents")
         except Exception as e:
             print(f"列出文档失败: {e}")
             return []
@@ -174,13 +352,195 @@ class KnowledgeGraphManager:
             return {"error": "Neo4j 未启用"}
 
         try:
-            stats = self.neo4j_storage.delete_by_doc(doc_id)
+            stats = self.write_coordinator.run(
+                self._write_keys(doc_id),
+                lambda: self.neo4j_storage.delete_by_doc(doc_id)
+            )
+            self._invalidate_component_index()
             print(f"✓ 已删除文档 {doc_id}: {stats.get('nodes_deleted', 0)} 节点, {stats.get('edges_deleted', 0)} 边")
             return {"neo4j": stats}
         except Exception as e:
             print(f"从 Neo4j 删除失败: {e}")
             return {"error": str(e)}
 
+    def iter_delete_document(self, doc_id: str, batch_size: int = 1000):
+        """
+        分批删除文档的图谱数据（删除任务使用，每批一个事务，可中断后继续）
+
+        Args:
+            doc_id: 文档 ID
+            batch_size: 每批行数
+
+        Yields:
+            {"deleted_edges", "deleted_nodes", "touched"}
+        """
+        if not self.neo4j_storage:
+            raise RuntimeError("Neo4j 未启用")
+
+        try:
+            with self.write_coordinator.hold(self._write_keys(doc_id)):
+                yield from self.neo4j_storage.iter_delete_batches(doc_id, batch_size=batch_size)
+        finally:
+            self._invalidate_component_index()
+
+    def finish_document_delete(self, doc_id: str, touched) -> None:
+        """
+        分批删除完成后重算受影响实体的度数并删除文档目录节点
+
+        Args:
+            doc_id: 文档 ID
+            touched: 度数可能变化的实体 ID
+        """
+        self.neo4j_storage.refresh_degrees(touched)
+        self.neo4j_storage.delete_document_node(doc_id)
+        self._invalidate_component_index()
+
+    def migrate_document_catalog(self) -> Dict:
+        """
+        为已有数据建立文档目录（(:Document) 节点和 MENTIONS 关联）
+
+        Returns:
+            迁移统计信息
+        """
+        if not self.neo4j_storage:
+            return {"error": "Neo4j 未启用"}
+
+        try:
+            stats = self.neo4j_storage.migrate_document_catalog()
+            self.query_cache.invalidate()
+            return stats
+        except Exception as e:
+            print(f"文档目录迁移失败: {e}")
+            return {"error": str(e)}
+
+    def resolve_existing_entities(self, dry_run: bool = False) -> Dict:
+        """
+        对 Neo4j 中已有实体批量重新消歧（后台任务）
+
+        Args:
+            dry_run: 只返回合并计划，不写入
+
+        Returns:
+            统计信息
+        """
+        if not self.neo4j_storage:
+            return {"error": "Neo4j 未启用"}
+
+        resolver = self.entity_resolver or get_entity_resolver()
+        try:
+            stats, merges = resolver.resolve_existing(self.neo4j_storage, dry_run=dry_run)
+            if merges and not dry_run:
+                self._invalidate_component_index()
+            print(f"✓ 实体消歧完成: 扫描 {stats['scanned']} 个, 合并 {len(merges)} 个")
+            if dry_run:
+                stats["merges"] = merges[:100]
+            return stats
+        except Exception as e:
+            print(f"实体消歧失败: {e}")
+            return {"error": str(e)}
+
+    def renormalize_graph(self, dry_run: bool = False, resume: bool = True) -> Dict:
+        """
+        按当前规范化规则重新规范化 Neo4j 中的全部图谱（后台任务）
+
+        Args:
+            dry_run: 只生成差异报告，不写入
+            resume: 是否从检查点续跑
+
+        Returns:
+            差异报告
+        """
+        if not self.neo4j_storage:
+            return {"error": "Neo4j 未启用"}
+        if self.graph_backend != 'neo4j':
+            return {"error": "重新规范化仅支持 Neo4j 后端"}
+
+        try:
+            job = GraphRenormalizationJob(self.neo4j_storage, dry_run=dry_run,
+                                          coordinator=self.write_coordinator)
+            report = job.run(resume=resume)
+            if not dry_run:
+                self._invalidate_component_index()
+            return report
+        except Exception as e:
+            print(f"重新规范化失败: {e}")
+            return {"error": str(e)}
+
+    def get_component(self, entity_id: str) -> Optional[Dict]:
+        """
+        查询实体所在的全局连通分量
+
+        Args:
+            entity_id: 实体 ID
+
+        Returns:
+            {"root", "size", "connectors"}，实体不存在时返回 None
+        """
+        if not self.component_index:
+            return None
+
+        self.component_index.ensure_fresh(self.neo4j_storage)
+        return self.component_index.component_of(entity_id)
+
+    def connect_islands_globally(self, dry_run: bool = False, limit: int = None) -> Dict:
+        """
+        把全局孤立分量连接到主图
+
+        Args:
+            dry_run: 只返回连接建议，不写入
+            limit: 最多连接的孤岛数
+
+        Returns:
+            {"links": 连接列表, "components": 分量统计, ...}
+        """
+        if not self.neo4j_storage or not self.component_index:
+            return {"error": "Neo4j 或连通分量索引未启用"}
+
+        try:
+            self.component_index.ensure_fresh(self.neo4j_storage)
+            links = self.component_index.plan_island_links(limit=limit)
+            result = {"links": links, "dry_run": dry_run}
+
+            if links and not dry_run:
+                result["neo4j"] = self.neo4j_storage.link_entities(links)
+                self.query_cache.invalidate()
+                if self.graph_index:
+                    self.graph_index.invalidate()
+                self.component_index.apply_links(links)
+                print(f"✓ 已连接 {len(links)} 个孤立分量")
+
+            result["components"] = self.component_index.get_stats()
+            return result
+        except Exception as e:
+            print(f"全局孤岛连接失败: {e}")
+            return {"error": str(e)}
+
+    def get_schema_state(self) -> Dict:
+        """
+        获取 Neo4j schema 迁移状态
+
+        Returns:
+            {"status": "ok"|"pending"|"error"|"disabled", "version", "latest", ...}
+        """
+        if not self.neo4j_storage:
+            return {"status": "disabled"}
+
+        state = dict(self.neo4j_storage.schema_state or {})
+        if not state:
+            # 未自动迁移（NEO4J_AUTO_MIGRATE=false），直接查询数据库
+            try:
+                state = SchemaManager(self.neo4j_storage).get_state()
+            except Exception as e:
+                return {"status": "error", "error": str(e)}
+
+        if state.get("error"):
+            state["status"] = "error"
+        elif state.get("version", 0) < state.get("latest", 0):
+            state["status"] = "pending"
+        else:
+            state["status"] = "ok"
+        return state
+
     def get_stats(self) -> Dict:
         """
         获取统计信息
@@ -192,7 +552,7 @@ class KnowledgeGraphManager:
             return {"error": "Neo4j 未启用"}
 
         try:
-            stats = self.neo4j_storage.get_stats()
+            stats = self._cached("get_stats")
             return {"neo4j": stats}
         except Exception as e:
             return {"error": str(e)}
@@ -208,54 +568,46 @@ class KnowledgeGraphManager:
             return {"nodes": [], "edges": []}
 
         try:
-            with self.neo4j_storage.driver.session() as session:
-                # 查询所有节点
-                nodes_result = session.run("""
-                    MATCH (n:Entity)
-                    RETURN n.id as id, n.label as label, n.type as type,
-                           n.description as description,
-                           size(n.doc_ids) as doc_count
-                    LIMIT 1000
-                """)
-
-                nodes = [{
-                    "id": record["id"],
-                    "label": record["label"],
-                    "type": record["type"],
-                    "description": record["description"],
-                    "degree": 0  # 将在计算边后更新
-                } for record in nodes_result]
-
-                # 查询所有边
-                edges_result = session.run("""
-                    MATCH (s:Entity)-[r]->(t:Entity)
-                    RETURN DISTINCT s.id as source, t.id as target,
-                           COALESCE(r.label, type(r)) as label
-                    LIMIT 5000
-                """)
-
-                edges = [{
-                    "source": record["source"],
-                    "target": record["target"],
-                    "label": record["label"],
-                    "weight": 1
-                } for record in edges_result]
-
-                # 计算节点度数
-                degree_map = {}
-                for edge in edges:
-                    degree_map[edge["source"]] = degree_map.get(edge["source"], 0) + 1
-                    degree_map[edge["target"]] = degree_map.get(edge["target"], 0) + 1
-
-                for node in nodes:
-                    node["degree"] = degree_map.get(node["id"], 0)
-
-                return {"nodes": nodes, "edges": edges}
-
+            return self._cached("get_all_graphs")
         except Exception as e:
             print(f"查询全部图谱失败: {e}")
             return {"nodes": [], "edges": []}
 
+    def get_graph_page(self, cursor: str = "", limit: int = 1000) -> Dict:
+        """
+        分页获取图谱（按 Entity.id 键集分页，不截断）
+
+        Args:
+            cursor: 上一页返回的 next_cursor，首页为空
+            limit: 每页节点数
+
+        Returns:
+            {"nodes", "edges", "next_cursor"}
+        """
+        if not self.neo4j_storage:
+            return {"nodes": [], "edges": [], "next_cursor": None}
+
+        try:
+            return self.neo4j_storage.get_graph_page(cursor, limit)
+        except Exception as e:
+            print(f"分页查询图谱失败: {e}")
+            return {"nodes": [], "edges": [], "next_cursor": None, "error": str(e)}
+
+    def iter_graph_pages(self, page_size: int = None):
+        """
+        流式遍历整个图谱
+
+        Args:
+            page_size: 每页节点数，None 时从环境变量读取
+
+        Yields:
+            每页 {"nodes", "edges", "next_cursor"}
+        """
+        if not self.neo4j_storage:
+            return
+        page_size = page_size or int(os.getenv('GRAPH_PAGE_SIZE', '1000'))
+        yield from self.neo4j_storage.iter_graph_pages(page_size=page_size)
+
     def get_graph_by_label(self, label: str) -> Dict:
         """
         按标签查询子图
@@ -282,18 +634,7 @@ class KnowledgeGraphManager:
             return []
 
         try:
-            with self.neo4j_storage.driver.session() as session:
-                result = session.run("""
-                    MATCH (n:Entity)
-                    OPTIONAL MATCH (n)-[r]-()
-                    WITH n, count(r) as degree
-                    RETURN n.id as id
-                    ORDER BY degree DESC, n.id
-                    LIMIT $limit
-                """, limit=limit)
-
-                return [record["id"] for record in result]
-
+            return self._cached("get_popular_labels", limit)
         except Exception as e:
             print(f"获取热门标签失败: {e}")
             return []
@@ -313,12 +654,118 @@ class KnowledgeGraphManager:
             return {"nodes": [], "edges": []}
 
         try:
-            return self.neo4j_storage.query_subgraph(entity_id, n_hops)
+            return self._cached("query_subgraph", entity_id, n_hops)
         except Exception as e:
             print(f"Neo4j 查询失败: {e}")
             return {"nodes": [], "edges": []}
 
 
+    # ==================== 异步读接口 ====================
+
+    def _get_async_storage(self):
+        """异步存储（仅 Neo4j 后端且同步存储可用时创建；SQLite 后端在线程池中执行同步查询）"""
+        if not self.neo4j_storage or not self.use_async_driver or self.graph_backend != 'neo4j':
+            return None
+        if self._async_storage is None:
+            self._async_storage = get_async_neo4j_storage()
+        return self._async_storage
+
+    async def _read(self, method: str, *args, default=None):
+        """
+        执行读查询：有异步驱动时直接 await（结果写入读缓存），否则在线程池中执行同步方法
+
+        Args:
+            method: 方法名（同步管理器与异步存储同名）
+            args: 参数
+            default: 异步查询失败时的返回值
+        """
+        storage = self._get_async_storage()
+        if storage is None:
+            return await asyncio.to_thread(getattr(self, method), *args)
+
+        try:
+            return await self._acached(storage, method, *args)
+        except Exception as e:
+            print(f"Neo4j 异步查询失败 ({method}): {e}")
+            return default
+
+    async def _acached(self, storage, method: str, *args):
+        """读穿缓存执行异步查询（异常不缓存，原样抛出）"""
+        key = (method,) + args
+        hit, value, version = self.query_cache.lookup(key)
+        if hit:
+            return value
+        value = await getattr(storage, method)(*args)
+        self.query_cache.store(key, value, version)
+        return value
+
+    async def aload_document(self, doc_id: str) -> Optional[Dict]:
+        """load_document 的异步版本"""
+        storage = self._get_async_storage()
+        if storage is None:
+            return await asyncio.to_thread(self.load_document, doc_id)
+        try:
+            return await self._acached(storage, "load_document", doc_id)
+        except Exception as e:
+            print(f"从 Neo4j 加载失败: {e}")
+            return {"nodes": [], "edges": [], "error": str(e)}
+
+    async def alist_documents(self) -> List[Dict]:
+        """list_documents 的异步版本"""
+        return await self._read("list_documents", default=[])
+
+    async def aget_stats(self) -> Dict:
+        """get_stats 的异步版本"""
+        storage = self._get_async_storage()
+        if storage is None:
+            return await asyncio.to_thread(self.get_stats)
+        try:
+            return {"neo4j": await self._acached(storage, "get_stats")}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def aget_all_graphs(self) -> Dict:
+        """get_all_graphs 的异步版本"""
+        return await self._read("get_all_graphs", default={"nodes": [], "edges": []})
+
+    async def aget_graph_by_label(self, label: str) -> Dict:
+        """get_graph_by_label 的异步版本"""
+        return await self.aquery_subgraph(label, n_hops=2)
+
+    async def aget_graph_page(self, cursor: str = "", limit: int = 1000) -> Dict:
+        """get_graph_page 的异步版本"""
+        return await self._read("get_graph_page", cursor, limit,
+                                default={"nodes": [], "edges": [], "next_cursor": None})
+
+    async def aiter_graph_pages(self, page_size: int = None):
+        """iter_graph_pages 的异步版本（逐页 await，查询失败时抛出异常）"""
+        if not self.neo4j_storage:
+            return
+        page_size = page_size or int(os.getenv('GRAPH_PAGE_SIZE', '1000'))
+
+        storage = self._get_async_storage()
+        if storage is not None:
+            async for page in storage.iter_graph_pages(page_size=page_size):
+                yield page
+            return
+
+        cursor = ""
+        while cursor is not None:
+            page = await asyncio.to_thread(self.neo4j_storage.get_graph_page, cursor, page_size)
+            if page["nodes"]:
+                yield page
+            cursor = page["next_cursor"]
+
+    async def aget_popular_labels(self, limit: int = 30) -> List[str]:
+        """get_popular_labels 的异步版本"""
+        return await self._read("get_popular_labels", limit, default=[])
+
+    async def aquery_subgraph(self, entity_id: str, n_hops: int = 1) -> Dict:
+        """query_subgraph 的异步版本"""
+        return await self._read("query_subgraph", entity_id, n_hops,
+                                default={"nodes": [], "edges": []})
+
+
 # 单例实例
 _manager_instance = None
 
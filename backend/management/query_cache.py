@@ -0,0 +1,131 @@
+"""
+Query Cache
+读查询缓存
+
+核心功能：
+- 图谱只在保存/删除文档时变化，两次写入之间相同的读查询结果不变
+- 按 (查询名, 参数) 缓存结果，超出容量时淘汰最久未使用的条目（LRU）
+- 全局版本号：每次写入递增并清空缓存；写入期间开始的读查询结果不会写回缓存
+- 统计命中、未命中、淘汰次数
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from dotenv import load_dotenv
+
+
+# 加载环境变量
+load_dotenv()
+
+
+class QueryCache:
+    """带版本号的 LRU 读缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = None, ttl: float = None, enabled: bool = None):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大条目数，None 时从环境变量读取
+            ttl: 条目有效期（秒，0 表示只按版本失效），None 时从环境变量读取
+            enabled: 是否启用，None 时从环境变量读取
+        """
+        if enabled is None:
+            enabled = os.getenv('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+        self.enabled = enabled
+        self.max_entries = max_entries or int(os.getenv('QUERY_CACHE_SIZE', '256'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('QUERY_CACHE_TTL', '0'))
+
+        self.version = 0
+        # 键 -> (写入时间, 结果)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any, int]:
+        """
+        查找缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (是否命中, 结果, 当前版本号)；未命中时用返回的版本号调用 store
+        """
+        with self._lock:
+            if self.enabled and key in self._entries:
+                stored_at, value = self._entries[key]
+                if not self.ttl or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._metrics["hits"] += 1
+                    return True, value, self.version
+                del self._entries[key]
+            self._metrics["misses"] += 1
+            return False, None, self.version
+
+    def store(self, key: Hashable, value: Any, version: int):
+        """
+        写入缓存（查询期间版本已变化时丢弃，避免缓存写入前的旧结果）
+
+        Args:
+            key: 缓存键
+            value: 查询结果（调用方不得修改缓存的结果）
+            version: lookup 返回的版本号
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        读穿缓存：命中时直接返回，否则执行 loader 并缓存结果
+
+        loader 抛出的异常原样抛出，不会被缓存。
+
+        Args:
+            key: 缓存键
+            loader: 无参查询函数
+
+        Returns:
+            查询结果
+        """
+        hit, value, version = self.lookup(key)
+        if hit:
+            return value
+        value = loader()
+        self.store(key, value, version)
+        return value
+
+    def invalidate(self):
+        """图谱已变化：递增版本号并清空缓存"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._metrics["invalidations"] += 1
+
+    def get_metrics(self) -> Dict:
+        """
+        获取缓存统计
+
+        Returns:
+            {"enabled", "version", "size", "max_entries", "hits", "misses", "hit_rate", ...}
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics.update(enabled=self.enabled, version=self.version,
+                           size=len(self._entries), max_entries=self.max_entries)
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / lookups, 3) if lookups else 0.0
+        return metrics
+
@@ -0,0 +1,319 @@
+"""
+Graph Re-normalization Job
+全量图谱重新规范化任务
+
+修改规范化规则（standard_relations、node_types、名称长度限制等）后，
+无需重新调用 LLM 提取，直接对 Neo4j 中已有数据重跑规则：
+
+- 按 Entity.id 键集分页流式读取节点和出边，内存占用只与页大小相关
+- 节点：重新规范化名称（重命名 / 合并重复节点）、重新推断类型
+- 边：重新规范化关系词（更新 label / 重建关系类型）
+- 读写都通过 Neo4jStorage 的方法，写入经 WriteCoordinator 占用涉及实体的分片，
+  与并发的文档保存互不踩锁
+- 每页批量写回，检查点记录进度，中断后可续跑
+- dry-run 模式只生成差异报告，不写入
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+from backend.core.storage.neo4j import normalize_relation_type
+from backend.extraction.normalizer import KnowledgeGraphNormalizer, PROVENANCE_NONE
+from backend.management.write_coordinator import WriteCoordinator, get_write_coordinator
+
+
+# 加载环境变量
+load_dotenv()
+
+
+class GraphRenormalizationJob:
+    """Neo4j 图谱重新规范化任务"""
+
+    PHASES = ("nodes", "edges", "done")
+
+    def __init__(self, storage, normalizer: KnowledgeGraphNormalizer = None,
+                 page_size: int = None, checkpoint_path: str = None,
+                 dry_run: bool = False, max_samples: int = 50,
+                 coordinator: WriteCoordinator = None):
+        """
+        初始化任务
+
+        Args:
+            storage: Neo4jStorage 实例
+            normalizer: 规范化器（默认使用当前规则）
+            page_size: 每页节点数，None 时从环境变量读取
+            checkpoint_path: 检查点文件路径
+            dry_run: 只生成差异报告，不写入
+            max_samples: 报告中每类变更最多保留的样例数
+            coordinator: 写入协调器（默认进程内共享的实例）
+        """
+        self.storage = storage
+        self.coordinator = coordinator or get_write_coordinator()
+        self.normalizer = normalizer or KnowledgeGraphNormalizer({'provenance': PROVENANCE_NONE})
+        self.page_size = page_size or int(os.getenv('RENORMALIZE_PAGE_SIZE', '1000'))
+        self.dry_run = dry_run
+        self.max_samples = max_samples
+
+        if checkpoint_path is None:
+            checkpoint_dir = os.getenv('CHECKPOINT_DIR', './data/checkpoints')
+            checkpoint_path = Path(checkpoint_dir) / "renormalize.json"
+        self.checkpoint_path = Path(checkpoint_path)
+        # 最近一次运行的差异报告（dry-run 也会写入）
+        self.report_path = self.checkpoint_path.with_name(self.checkpoint_path.stem + "_report.json")
+
+        self.state = self._new_state()
+
+    def _new_state(self) -> Dict:
+        """初始任务状态"""
+        return {
+            "phase": "nodes",
+            "cursor": "",
+            "dry_run": self.dry_run,
+            "stats": {
+                "nodes_scanned": 0,
+                "nodes_renamed": 0,
+                "nodes_merged": 0,
+                "nodes_retyped": 0,
+                "edges_scanned": 0,
+                "edges_relabeled": 0,
+                "edges_retyped": 0,
+                "failed": 0
+            },
+            "samples": {"rename": [], "merge": [], "retype": [], "relabel": []}
+        }
+
+    # ==================== 检查点 ====================
+
+    def _load_checkpoint(self) -> bool:
+        """加载检查点，返回是否成功恢复"""
+        if self.dry_run or not self.checkpoint_path.exists():
+            return False
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if state.get("phase") not in self.PHASES or state.get("phase") == "done":
+            return False
+        self.state = state
+        return True
+
+    def _save_checkpoint(self):
+        """保存检查点（dry-run 不保存）"""
+        if self.dry_run:
+            return
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _save_report(self):
+        """写出差异报告"""
+        self.report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+
+    def _sample(self, kind: str, change: Dict):
+        """记录变更样例（数量有上限，保证报告大小有界）"""
+        samples = self.state["samples"][kind]
+        if len(samples) < self.max_samples:
+            samples.append(change)
+
+    # ==================== 主流程 ====================
+
+    def run(self, resume: bool = True) -> Dict:
+        """
+        执行任务
+
+        Args:
+            resume: 是否从检查点续跑
+
+        Returns:
+            差异报告 {"phase", "dry_run", "stats", "samples"}
+        """
+        if not (resume and self._load_checkpoint()):
+            self.state = self._new_state()
+
+        if self.state["phase"] == "nodes":
+            self._run_phase(self._fetch_node_page, self._process_node_page)
+            self.state["phase"] = "edges"
+            self.state["cursor"] = ""
+            self._save_checkpoint()
+
+        if self.state["phase"] == "edges":
+            self._run_phase(self._fetch_edge_page, self._process_edge_page)
+            self.state["phase"] = "done"
+            self._save_checkpoint()
+
+        self._save_report()
+
+        stats = self.state["stats"]
+        mode = "dry-run" if self.dry_run else "已写入"
+        print(f"✓ 重新规范化完成（{mode}）: 节点重命名 {stats['nodes_renamed']}, "
+              f"合并 {stats['nodes_merged']}, 类型变更 {stats['nodes_retyped']}, "
+              f"关系词变更 {stats['edges_relabeled']}, 关系类型变更 {stats['edges_retyped']}")
+        return self.state
+
+    def _run_phase(self, fetch_page, process_page):
+        """按页处理，直到没有更多数据"""
+        while True:
+            page, cursor = fetch_page(self.state["cursor"])
+            if cursor is None:
+                return
+            process_page(page)
+            self.state["cursor"] = cursor
+            self._save_checkpoint()
+
+    # ==================== 节点 ====================
+
+    def _fetch_node_page(self, cursor: str):
+        """读取一页节点，返回 (节点列表, 下一页游标)；没有数据时游标为 None"""
+        page = self.storage.get_entity_page(cursor, self.page_size)
+        return page, (page[-1]["id"] if page else None)
+
+    def _process_node_page(self, page: List[Dict]):
+        """规范化一页节点并写回"""
+        stats = self.state["stats"]
+        renames = []
+        retypes = []
+
+        for node in page:
+            stats["nodes_scanned"] += 1
+            old_id = node["id"]
+            new_id = self.normalizer.normalize_node_name(old_id) or old_id
+            new_type = self.normalizer.infer_node_type({
+                "id": new_id,
+                "label": new_id,
+                "type": node.get("type"),
+                "description": node.get("description")
+            })
+
+            if new_type != node.get("type"):
+                retypes.append({"id": old_id, "type": new_type})
+                self._sample("retype", {"id": old_id, "from": node.get("type"), "to": new_type})
+
+            if new_id != old_id:
+                renames.append((old_id, new_id))
+
+        stats["nodes_retyped"] += len(retypes)
+
+        if self.dry_run:
+            self._plan_renames(renames)
+            return
+
+        if retypes:
+            self.coordinator.run({row["id"] for row in retypes},
+                                 lambda: self.storage.set_entity_types(retypes))
+
+        # 逐个重命名：存储在事务内判断目标是否已存在（存在则合并），
+        # 同页多个节点指向同一目标时第一个改名、其余合并；统计以实际写入结果为准
+        for old_id, new_id in renames:
+            try:
+                result = self.coordinator.run(
+                    {old_id, new_id},
+                    lambda old_id=old_id, new_id=new_id: self.storage.rename_entity(old_id, new_id)
+                )
+            except Exception as e:
+                print(f"节点重命名失败 ({old_id} -> {new_id}): {e}")
+                stats["failed"] += 1
+                continue
+
+            if result["merged"]:
+                stats["nodes_merged"] += result["merged"]
+                self._sample("merge", {"from": old_id, "to": new_id})
+            elif result["renamed"]:
+                stats["nodes_renamed"] += result["renamed"]
+                self._sample("rename", {"from": old_id, "to": new_id})
+
+    def _plan_renames(self, renames: List):
+        """dry-run：按目标是否已存在预估改名和合并（同页多个节点指向同一目标时，第一个改名，其余合并）"""
+        stats = self.state["stats"]
+        existing = self.storage.existing_entity_ids(sorted({new_id for _, new_id in renames}))
+        for old_id, new_id in renames:
+            if new_id in existing:
+                stats["nodes_merged"] += 1
+                self._sample("merge", {"from": old_id, "to": new_id})
+            else:
+                stats["nodes_renamed"] += 1
+                existing.add(new_id)
+                self._sample("rename", {"from": old_id, "to": new_id})
+
+    # ==================== 边 ====================
+
+    def _fetch_edge_page(self, cursor: str):
+        """按源节点 id 分页读取出边，返回 (边列表, 下一页游标)"""
+        return self.storage.get_relation_page(cursor, self.page_size)
+
+    def _process_edge_page(self, edges: List[Dict]):
+        """规范化一页边的关系词并批量写回"""
+        stats = self.state["stats"]
+        relabels = []
+        retypes: Dict[str, List[Dict]] = {}
+        endpoints = {}
+
+        for edge in edges:
+            stats["edges_scanned"] += 1
+            label = edge.get("label")
+            if not label:
+                # 没有原始关系词的边无法重新规范化
+                continue
+
+            new_label = self.normalizer.normalize_relation(label)
+            new_type = normalize_relation_type(new_label)
+
+            if new_type != edge["type"]:
+                retypes.setdefault(new_type, []).append({"rid": edge["rid"], "label": new_label})
+                self._sample("retype", {"source": edge["source"], "target": edge["target"],
+                                        "from": edge["type"], "to": new_type})
+            elif new_label != label:
+                relabels.append({"rid": edge["rid"], "label": new_label})
+                self._sample("relabel", {"source": edge["source"], "target": edge["target"],
+                                         "from": label, "to": new_label})
+            else:
+                continue
+            endpoints[edge["rid"]] = (edge["source"], edge["target"])
+
+        stats["edges_relabeled"] += len(relabels)
+        stats["edges_retyped"] += sum(len(rows) for rows in retypes.values())
+
+        if self.dry_run:
+            return
+
+        def keys(rows):
+            return {entity_id for row in rows for entity_id in endpoints[row["rid"]]}
+
+        if relabels:
+            self.coordinator.run(keys(relabels), lambda: self.storage.relabel_relations(relabels))
+
+        # 关系类型无法参数化，按目标类型分组重建
+        for rel_type, rows in retypes.items():
+            self.coordinator.run(
+                keys(rows),
+                lambda rel_type=rel_type, rows=rows: self.storage.retype_relations(rel_type, rows)
+            )
+
+
+# 命令行入口
+if __name__ == "__main__":
+    import argparse
+
+    from backend.core.storage.neo4j import get_neo4j_storage
+
+    parser = argparse.ArgumentParser(description="对 Neo4j 中已有图谱重新执行规范化规则")
+    parser.add_argument("--dry-run", action="store_true", help="只输出差异报告，不写入")
+    parser.add_argument("--no-resume", action="store_true", help="忽略检查点，从头开始")
+    parser.add_argument("--page-size", type=int, default=None, help="每页节点数")
+    args = parser.parse_args()
+
+    storage = get_neo4j_storage()
+    if not storage:
+        print("Neo4j 不可用")
+    else:
+        job = GraphRenormalizationJob(storage, page_size=args.page_size, dry_run=args.dry_run)
+        report = job.run(resume=not args.no_resume)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
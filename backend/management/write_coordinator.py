@@ -0,0 +1,176 @@
+"""
+Write Coordinator
+并发写入协调器
+
+核心功能：
+- 共享实体（作者、书名、核心概念）的文档同时保存时，MERGE 和 doc_ids 更新会争抢同一批节点锁，
+  Neo4j 中表现为死锁或大量锁等待
+- 实体 ID 哈希到固定数量的分片，写入前一次性占用涉及的全部分片：
+  没有共同分片的文档并行写入，只有冲突的写入排队
+- 冲突的写入按到达顺序（FIFO 票号）获得分片：后到的写入不能越过与其冲突的先到写入，
+  大文档不会被持续到达的小写入饿死
+- 大文档：实体数接近分片数时几乎占满所有分片，等同于独占写入，
+  与同时到达的几乎所有写入串行（而不只是真正共享实体的写入）；
+  需要更细的并行度时调大 NEO4J_WRITE_SHARDS
+- 死锁等瞬时错误按指数退避 + 随机抖动重试整个事务
+- 统计写入数、冲突数、等待时间、重试数和失败数
+"""
+
+import os
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from dotenv import load_dotenv
+
+from backend.core.storage.neo4j import is_transient_error
+
+
+# 加载环境变量
+load_dotenv()
+
+
+class WriteCoordinator:
+    """按实体分片协调并发写入"""
+
+    def __init__(self, shards: int = None, max_retries: int = None,
+                 base_delay: float = None):
+        """
+        初始化协调器
+
+        Args:
+            shards: 分片数，None 时从环境变量读取
+            max_retries: 瞬时错误的最大重试次数，None 时从环境变量读取
+            base_delay: 首次重试的退避上限（秒），None 时从环境变量读取
+        """
+        self.shards = shards or int(os.getenv('NEO4J_WRITE_SHARDS', '4096'))
+        self.max_retries = (max_retries if max_retries is not None
+                            else int(os.getenv('NEO4J_WRITE_MAX_RETRIES', '5')))
+        self.base_delay = (base_delay if base_delay is not None
+                           else float(os.getenv('NEO4J_WRITE_RETRY_DELAY', '0.05')))
+
+        # 正在写入的分片
+        self._held: Set[int] = set()
+        # 等待中的写入：票号 -> 分片（按到达顺序）
+        self._waiting: Dict[int, Set[int]] = {}
+        self._next_ticket = 0
+        self._cond = threading.Condition()
+        self._metrics = {
+            "writes": 0,
+            "conflicts": 0,
+            "wait_seconds": 0.0,
+            "retries": 0,
+            "failed": 0,
+            "in_flight": 0
+        }
+
+    def shards_for(self, entity_ids: Iterable[str]) -> Set[int]:
+        """实体 ID -> 分片编号（crc32 取模，跨进程稳定）"""
+        return {zlib.crc32(str(entity_id).encode('utf-8')) % self.shards
+                for entity_id in entity_ids if entity_id}
+
+    @contextmanager
+    def hold(self, entity_ids: Iterable[str]):
+        """
+        占用实体所在的全部分片，直到退出上下文
+
+        一次性占用（全部可用才占用），不会出现持有部分分片再等待其余分片的死锁。
+        分片被占用、或有更早到达的冲突写入在等待时排队；互不冲突的写入不受影响。
+
+        Args:
+            entity_ids: 本次写入涉及的实体 ID
+        """
+        shards = self.shards_for(entity_ids)
+        start = time.perf_counter()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            if self._blocked(ticket, shards):
+                self._metrics["conflicts"] += 1
+                self._waiting[ticket] = shards
+                try:
+                    while self._blocked(ticket, shards):
+                        self._cond.wait()
+                finally:
+                    del self._waiting[ticket]
+                    # 本写入离开队列后，排在其后的冲突写入可能已可以执行
+                    self._cond.notify_all()
+            self._held |= shards
+            self._metrics["in_flight"] += 1
+            self._metrics["wait_seconds"] += time.perf_counter() - start
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._held -= shards
+                self._metrics["in_flight"] -= 1
+                self._cond.notify_all()
+
+    def _blocked(self, ticket: int, shards: Set[int]) -> bool:
+        """分片被占用，或有更早的等待写入需要其中的分片（调用方持有锁）"""
+        if self._held & shards:
+            return True
+        return any(other < ticket and other_shards & shards
+                   for other, other_shards in self._waiting.items())
+
+    def run(self, entity_ids: Iterable[str], write: Callable):
+        """
+        在分片保护下执行写入，瞬时错误带抖动重试
+
+        Args:
+            entity_ids: 本次写入涉及的实体 ID
+            write: 无参写入函数（需要整体可重试，例如一个完整事务）
+
+        Returns:
+            write 的返回值
+        """
+        with self.hold(entity_ids):
+            attempt = 0
+            while True:
+                try:
+                    result = write()
+                    self._count("writes")
+                    return result
+                except Exception as e:
+                    if not is_transient_error(e) or attempt >= self.max_retries:
+                        self._count("failed")
+                        raise
+                    # 全抖动退避：冲突的写入错开重试时间，避免再次同时撞锁
+                    delay = random.uniform(0, self.base_delay * (2 ** attempt))
+                    attempt += 1
+                    self._count("retries")
+                    print(f"⚠ 写入遇到瞬时错误，{delay:.2f}s 后第 {attempt} 次重试: {e}")
+                    time.sleep(delay)
+
+    def _count(self, key: str):
+        with self._cond:
+            self._metrics[key] += 1
+
+    def get_metrics(self) -> Dict:
+        """
+        获取协调器统计
+
+        Returns:
+            {"writes", "conflicts", "wait_seconds", "retries", "failed", "in_flight", "shards"}
+        """
+        with self._cond:
+            metrics = dict(self._metrics)
+        metrics["wait_seconds"] = round(metrics["wait_seconds"], 3)
+        metrics["shards"] = self.shards
+        return metrics
+
+
+# 单例实例
+_write_coordinator: Optional[WriteCoordinator] = None
+
+
+def get_write_coordinator() -> WriteCoordinator:
+    """获取写入协调器实例（单例，进程内所有管理器共享）"""
+    global _write_coordinator
+    if _write_coordinator is None:
+        _write_coordinator = WriteCoordinator()
+    return _write_coordinator
@@ -11,7 +11,6 @@ Hybrid Retriever
 
 import os
 from typing import List, Dict, Optional, Tuple
-from collections import defaultdict
 
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -49,6 +48,16 @@ class HybridRetriever:
 
         self.top_k = int(os.getenv('RAG_TOP_K', '5'))
 
+        # KG 模糊匹配：每个问题实体最多取的候选数、无包含关系时的最低 n-gram 重合度
+        self.fuzzy_max_candidates = int(os.getenv('KG_FUZZY_MAX_CANDIDATES', '5'))
+        self.fuzzy_min_score = float(os.getenv('KG_FUZZY_MIN_SCORE', '0.5'))
+
+        # KG 上下文排序：bfs（N 跳内全部节点按度数排序）或 ppr（个性化 PageRank，按预算截取）
+        self.kg_ranking = os.getenv('KG_RETRIEVAL_RANKING', 'bfs').lower()
+        self.ppr_max_nodes = int(os.getenv('KG_PPR_MAX_NODES', '30'))
+        self.ppr_max_edges = int(os.getenv('KG_PPR_MAX_EDGES', '60'))
+        self.ppr_restart = float(os.getenv('KG_PPR_RESTART', '0.15'))
+
     def classify_query(self, question: str) -> QueryType:
         """
         分类查询类型
@@ -139,72 +148,41 @@ class HybridRetriever:
         Returns:
             (相关实体列表, 相关关系列表)
         """
-        all_graph = self.kg_manager.get_all_graphs()
-
-        if not all_graph["nodes"]:
+        # 进程内邻接索引（首次使用时构建，之后随保存/删除维护）
+        index = self.kg_manager.get_graph_index()
+        if not index.nodes:
             return [], []
 
-        # 构建图索引
-        node_map = {node["id"]: node for node in all_graph["nodes"]}
-        adjacency = defaultdict(list)  # node_id -> [(neighbor_id, edge)]
-
-        for edge in all_graph["edges"]:
-            source = edge.get("source")
-            target = edge.get("target")
-            if source and target:
-                adjacency[source].append((target, edge))
-                adjacency[target].append((source, edge))
-
         # 精确匹配实体
         matched_entities = set()
         for entity in entities:
-            if entity in node_map:
+            if index.has(entity):
                 matched_entities.add(entity)
             else:
-                # 模糊匹配
-                for node_id in node_map:
-                    if entity in node_id or node_id in entity:
-                        matched_entities.add(node_id)
+                # 模糊匹配（n-gram 倒排索引，候选数有上限）
+                for candidate in index.fuzzy_match(entity, limit=self.fuzzy_max_candidates,
+                                                   min_score=self.fuzzy_min_score):
+                    matched_entities.add(candidate["id"])
 
         if not matched_entities:
             # 尝试向量搜索实体
             for entity in entities:
                 results = self.vector_store.search_entities(entity, top_k=2)
                 for r in results:
-                    if r.get("label") in node_map:
+                    if index.has(r.get("label")):
                         matched_entities.add(r["label"])
 
         if not matched_entities:
             return [], []
 
-        # BFS 扩展 N 跳邻居
-        visited = set(matched_entities)
-        current_level = set(matched_entities)
-        related_edges = []
-        seen_edges = set()
-
-        for _ in range(n_hops):
-            next_level = set()
-            for node_id in current_level:
-                for neighbor_id, edge in adjacency[node_id]:
-                    if neighbor_id not in visited:
-                        next_level.add(neighbor_id)
-                        visited.add(neighbor_id)
-
-                    # 记录边
-                    edge_key = f"{edge['source']}->{edge['target']}"
-                    if edge_key not in seen_edges:
-                        seen_edges.add(edge_key)
-                        related_edges.append(edge)
-
-            current_level = next_level
-
-        # 构建结果
-        related_entities = [
-            node_map[node_id]
-            for node_id in visited
-            if node_id in node_map
-        ]
+        if self.kg_ranking == "ppr":
+            # 个性化 PageRank：只返回与种子最相关的节点和边（数量有上限）
+            return index.ranked_neighborhood(
+                matched_entities, n_hops,
+                max_nodes=self.ppr_max_nodes, max_edges=self.ppr_max_edges, restart=self.ppr_restart)
+
+        # 扩展 N 跳邻居（CSR 数组上的向量化 BFS）
+        related_entities, related_edges = index.neighborhood(matched_entities, n_hops)
 
         # 按度数排序
         related_entities.sort(key=lambda n: n.get("degree", 0), reverse=True)
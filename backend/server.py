@@ -9,8 +9,11 @@ Knowledge Graph API Server
 - 混合问答 (KG + RAG)
 """
 
+import asyncio
+import json
 import os
 import shutil
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional, List
 from datetime import datetime
@@ -18,13 +21,15 @@ from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from .extraction import KnowledgeGraphExtractor, AsyncKnowledgeGraphExtractor
 from .management import get_kg_manager, get_progress_tracker
+from .management.deletion_jobs import get_deletion_jobs
 from .core.storage import get_vector_store
+from .core.storage.neo4j_async import close_async_neo4j_storage
 from .retrieval import get_qa_engine
 
 
@@ -35,11 +40,21 @@ load_dotenv()
 from .core.phoenix_observability import get_phoenix_tracer
 phoenix_tracer = get_phoenix_tracer()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时在后台继续未完成的删除任务，退出时关闭 Neo4j 异步驱动"""
+    if os.getenv('DELETION_JOBS_RESUME', 'true').lower() == 'true' and deletion_jobs.list_unfinished():
+        asyncio.get_running_loop().run_in_executor(None, deletion_jobs.resume_unfinished)
+    yield
+    await close_async_neo4j_storage()
+
+
 # 创建 FastAPI 应用
 app = FastAPI(
     title="KnowledgeWeaver API",
     description="轻量级知识图谱提取和查询服务 (Neo4j)",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS 配置
@@ -95,6 +110,8 @@ kg_manager = get_kg_manager()
 vector_store = get_vector_store()
 qa_engine = get_qa_engine()
 progress_tracker = get_progress_tracker()
+deletion_jobs = get_deletion_jobs(kg_manager, vector_store)
+
 
 # 上传目录
 UPLOAD_DIR = Path(__file__).parent.parent / "data" / "inputs" / "__enqueued__"
@@ -110,6 +127,12 @@ class GraphResponse(BaseModel):
     edges: List[dict]
 
 
+class GraphPageResponse(BaseModel):
+    nodes: List[dict]
+    edges: List[dict]
+    next_cursor: Optional[str]
+
+
 class DocumentInfo(BaseModel):
     doc_id: str
     file: str
@@ -187,16 +210,24 @@ async def readiness_check():
         # 检查向量存储
         vector_ready = vector_store is not None
 
-        if neo4j_ready and vector_ready:
-            return {
-                "status": "ready",
-                "services": {
-                    "neo4j": "connected",
-                    "vector_store": "connected"
-                }
-            }
-        else:
+        if not (neo4j_ready and vector_ready):
             raise HTTPException(status_code=503, detail="Services not ready")
+
+        # 检查 schema 迁移（约束/索引缺失时写入会产生重复实体）
+        schema = kg_manager.get_schema_state()
+        if schema.get("status") == "error":
+            raise HTTPException(status_code=503, detail=f"Schema migration failed: {schema.get('error')}")
+
+        return {
+            "status": "ready",
+            "services": {
+                "neo4j": "connected",
+                "vector_store": "connected"
+            },
+            "schema": schema
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Not ready: {e}")
 
@@ -208,7 +239,7 @@ async def get_popular_labels(limit: int = Query(default=30, ge=1, le=100)):
 
     返回按度数排序的热门节点标签列表
     """
-    labels = kg_manager.get_popular_labels(limit)
+    labels = await kg_manager.aget_popular_labels(limit)
     return labels
 
 
@@ -221,9 +252,9 @@ async def get_graphs(label: Optional[str] = Query(default=None)):
     - 如果不指定，返回全部图谱
     """
     if label:
-        graph = kg_manager.get_graph_by_label(label)
+        graph = await kg_manager.aget_graph_by_label(label)
     else:
-        graph = kg_manager.get_all_graphs()
+        graph = await kg_manager.aget_all_graphs()
 
     return GraphResponse(
         nodes=graph.get("nodes", []),
@@ -231,17 +262,60 @@ async def get_graphs(label: Optional[str] = Query(default=None)):
     )
 
 
+@app.get("/graphs/page", response_model=GraphPageResponse)
+async def get_graph_page(cursor: str = Query(default=""),
+                         limit: int = Query(default=1000, ge=1, le=10000)):
+    """
+    分页获取全部图谱（按实体 ID 键集分页，不截断）
+
+    首页 cursor 为空，之后传入上一页的 next_cursor；next_cursor 为 null 表示已到最后一页。
+    每条边只出现在其源节点所在的页中。
+    """
+    page = await kg_manager.aget_graph_page(cursor, limit)
+    if "error" in page:
+        raise HTTPException(status_code=503, detail=page["error"])
+
+    return GraphPageResponse(
+        nodes=page.get("nodes", []),
+        edges=page.get("edges", []),
+        next_cursor=page.get("next_cursor")
+    )
+
+
+@app.get("/graphs/stream")
+async def stream_graphs(page_size: int = Query(default=1000, ge=1, le=10000)):
+    """
+    以 NDJSON 流式导出全部图谱
+
+    每行一个 JSON 对象：{"type": "node", ...} 或 {"type": "edge", ...}；
+    服务端逐页读取 Neo4j，内存占用与图谱规模无关。
+    """
+    async def generate():
+        try:
+            async for page in kg_manager.aiter_graph_pages(page_size):
+                lines = [json.dumps({"type": "node", **node}, ensure_ascii=False)
+                         for node in page["nodes"]]
+                lines += [json.dumps({"type": "edge", **edge}, ensure_ascii=False)
+                          for edge in page["edges"]]
+                yield "\n".join(lines) + "\n"
+        except Exception as e:
+            # 响应头已发送，只能以最后一行报告错误
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @app.get("/documents", response_model=List[DocumentInfo])
 async def list_documents():
     """列出所有已处理的文档（从 Neo4j）"""
-    docs = kg_manager.list_documents()
+    docs = await kg_manager.alist_documents()
     return [DocumentInfo(**doc) for doc in docs]
 
 
 @app.get("/documents/{doc_id}", response_model=GraphResponse)
 async def get_document_graph(doc_id: str):
     """获取指定文档的图谱（从 Neo4j）"""
-    graph = kg_manager.load_document(doc_id)
+    graph = await kg_manager.aload_document(doc_id)
     if not graph or not graph.get("nodes"):
         raise HTTPException(status_code=404, detail=f"文档 {doc_id} 不存在")
 
@@ -251,31 +325,38 @@ async def get_document_graph(doc_id: str):
     )
 
 
-@app.delete("/documents/{doc_id}")
-async def delete_document(doc_id: str):
-    """删除指定文档的图谱和向量索引（从 Neo4j）"""
-    # 删除图谱（从 Neo4j）
-    delete_stats = kg_manager.delete_document(doc_id)
-
-    # 删除向量索引
-    deleted_vectors = vector_store.delete_by_doc(doc_id)
-
-    if "error" in delete_stats:
-        raise HTTPException(status_code=500, detail=delete_stats["error"])
+@app.delete("/documents/{doc_id}", status_code=202)
+async def delete_document(doc_id: str, background_tasks: BackgroundTasks):
+    """
+    删除指定文档的图谱和向量索引（后台任务）
 
+    Neo4j 和 Chroma 按批删除，进度持久化，可通过 /documents/delete-jobs/{job_id} 查询。
+    该文档的删除任务正在执行时返回该任务，不重复启动
+    """
+    job = deletion_jobs.submit(doc_id)
+    if not deletion_jobs.is_running(job["job_id"]):
+        background_tasks.add_task(deletion_jobs.run, job["job_id"])
     return {
         "success": True,
-        "message": f"文档 {doc_id} 已删除",
-        "neo4j": delete_stats.get("neo4j", {}),
-        "deleted_chunks": deleted_vectors.get("chunks_deleted", 0),
-        "deleted_entities": deleted_vectors.get("entities_deleted", 0)
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "message": f"文档 {doc_id} 删除任务已在后台启动"
     }
 
 
+@app.get("/documents/delete-jobs/{job_id}")
+async def get_delete_job(job_id: str):
+    """查询文档删除任务的阶段和进度"""
+    job = deletion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"删除任务 {job_id} 不存在")
+    return job
+
+
 @app.get("/stats", response_model=StatsResponse)
 async def get_stats():
-    """获取统计信息（从 Neo4j）"""
-    stats = kg_manager.get_stats()
+    """获取统计信息（从 Neo4j 计数存储读取，与图谱规模无关）"""
+    stats = await kg_manager.aget_stats()
 
     if "error" in stats:
         return StatsResponse(
@@ -285,13 +366,28 @@ async def get_stats():
         )
 
     neo4j_stats = stats.get("neo4j", {})
+    document_count = neo4j_stats.get("total_documents")
+    if document_count is None:
+        document_count = len(await kg_manager.alist_documents())
     return StatsResponse(
-        document_count=len(kg_manager.list_documents()),
+        document_count=document_count,
         total_nodes=neo4j_stats.get("total_nodes", 0),
         total_edges=neo4j_stats.get("total_edges", 0)
     )
 
 
+@app.get("/stats/cache")
+async def get_cache_stats():
+    """读缓存统计：命中率、条目数、图谱版本号"""
+    return kg_manager.get_cache_stats()
+
+
+@app.get("/stats/writes")
+async def get_write_stats():
+    """并发写入统计：冲突数、等待时间、瞬时错误重试数"""
+    return kg_manager.get_write_stats()
+
+
 # ==================== QA API 端点 ====================
 
 @app.post("/qa", response_model=QAResponse)
@@ -375,6 +471,57 @@ async def get_entity_context(entity_name: str, n_hops: int = Query(default=2, ge
         raise HTTPException(status_code=500, detail=f"获取实体上下文失败: {e}")
 
 
+@app.post("/entities/resolve")
+async def resolve_entities(background_tasks: BackgroundTasks, dry_run: bool = Query(default=False)):
+    """
+    跨文档实体消歧（后台任务）
+
+    遍历 Neo4j 中已有实体，按别名索引 / 向量召回合并重复节点
+    """
+    background_tasks.add_task(kg_manager.resolve_existing_entities, dry_run)
+    return {"success": True, "message": "实体消歧任务已在后台启动", "dry_run": dry_run}
+
+
+@app.post("/graph/renormalize")
+async def renormalize_graph(
+    background_tasks: BackgroundTasks,
+    dry_run: bool = Query(default=False),
+    resume: bool = Query(default=True)
+):
+    """
+    按当前规范化规则重新规范化已有图谱（后台任务）
+
+    差异报告写入 CHECKPOINT_DIR/renormalize_report.json
+    """
+    background_tasks.add_task(kg_manager.renormalize_graph, dry_run, resume)
+    return {"success": True, "message": "重新规范化任务已在后台启动", "dry_run": dry_run}
+
+
+@app.get("/graph/components/{entity_id}")
+async def get_entity_component(entity_id: str):
+    """查询实体所在的全局连通分量（索引失效时会从存储重建，在线程池中执行）"""
+    component = await asyncio.to_thread(kg_manager.get_component, entity_id)
+    if component is None:
+        raise HTTPException(status_code=404, detail=f"实体不存在或连通分量索引未启用: {entity_id}")
+    return component
+
+
+@app.post("/graph/connect-islands")
+async def connect_islands(
+    dry_run: bool = Query(default=True),
+    limit: Optional[int] = Query(default=None, ge=1)
+):
+    """
+    把全局孤立分量连接到主图
+
+    默认只返回连接建议（dry_run=true）
+    """
+    result = await asyncio.to_thread(kg_manager.connect_islands_globally, dry_run=dry_run, limit=limit)
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result["error"])
+    return result
+
+
 @app.get("/vector-stats")
 async def get_vector_stats():
     """获取向量存储统计信息"""
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+图谱存储基准测试
+
+生成合成图谱，分别用逐行写入（row）、UNWIND 批量写入（unwind）、分事务批量导入
+（bulk）和单一关系类型的 UNWIND 写入（single，NEO4J_RELATION_MODE=single）保存到
+Neo4j，输出每种模式的耗时和每秒写入数，以及 2 跳子图查询的每秒查询数。
+--backends 包含 sqlite 时对嵌入式 SQLite 存储（SQLITE_GRAPH_PATH）执行同样的写入和查询
+（写入模式只适用于 Neo4j，SQLite 只测一次）。测试数据写入独立的 doc_id，结束后自动删除。
+
+用法:
+    python scripts/benchmark_graph_storage.py --nodes 5000 --edges 10000
+    python scripts/benchmark_graph_storage.py --nodes 200000 --edges 400000 --modes unwind,bulk
+    python scripts/benchmark_graph_storage.py --modes unwind,single
+    python scripts/benchmark_graph_storage.py --backends neo4j,sqlite --modes unwind
+    python scripts/benchmark_graph_storage.py --backends sqlite
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.storage.neo4j import get_neo4j_storage, RELATION_TYPE_MAPPING
+from backend.core.storage.sqlite_graph import get_sqlite_graph_storage
+
+
+def make_graph(node_count: int, edge_count: int, seed: int = 42) -> dict:
+    """生成合成图谱（节点 id 带前缀，避免与真实数据冲突）"""
+    rng = random.Random(seed)
+    labels = list(RELATION_TYPE_MAPPING.keys())
+    nodes = [
+        {"id": f"__bench_{i}", "label": f"__bench_{i}", "type": "Entity", "description": ""}
+        for i in range(node_count)
+    ]
+    edges = []
+    for _ in range(edge_count):
+        s, t = rng.sample(range(node_count), 2)
+        edges.append({
+            "source": f"__bench_{s}",
+            "target": f"__bench_{t}",
+            "label": rng.choice(labels),
+            "weight": 1
+        })
+    return {"nodes": nodes, "edges": edges}
+
+
+def time_subgraphs(storage, graph: dict, queries: int = 100, seed: int = 7) -> float:
+    """随机实体的 2 跳子图查询，返回每秒查询数"""
+    rng = random.Random(seed)
+    ids = [rng.choice(graph["nodes"])["id"] for _ in range(queries)]
+    start = time.perf_counter()
+    for entity_id in ids:
+        storage.query_subgraph(entity_id, n_hops=2)
+    elapsed = time.perf_counter() - start
+    return queries / elapsed if elapsed > 0 else 0
+
+
+def run_mode(storage, mode: str, graph: dict, doc_id: str) -> dict:
+    """用指定写入模式保存一次图谱并计时"""
+    # bulk 模式：阈值设为 1，强制走 Neo4jBulkLoader；其他模式关闭批量导入
+    # single 模式：UNWIND 写入，所有关系统一为 RELATES（一条参数化查询）
+    os.environ['NEO4J_WRITE_MODE'] = 'unwind' if mode in ('bulk', 'single') else mode
+    os.environ['NEO4J_BULK_THRESHOLD'] = '1' if mode == 'bulk' else '0'
+    os.environ['NEO4J_RELATION_MODE'] = 'single' if mode == 'single' else 'typed'
+    storage.delete_by_doc(doc_id)
+
+    start = time.perf_counter()
+    stats = storage.save_graph_batch(graph, doc_id, overwrite=False)
+    elapsed = time.perf_counter() - start
+
+    writes = stats["nodes_created"] + stats["edges_created"]
+    for phase, info in stats.get("phases", {}).items():
+        print(f"    {phase:>8}: {info['rows']} 行, {info['seconds']}s, {info['rows_per_sec']} rows/s")
+    return {
+        "mode": mode,
+        "seconds": elapsed,
+        "writes": writes,
+        "writes_per_sec": writes / elapsed if elapsed > 0 else 0,
+        "failed": stats["failed"],
+        "subgraphs_per_sec": time_subgraphs(storage, graph)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图谱存储基准测试")
+    parser.add_argument("--nodes", type=int, default=5000, help="节点数")
+    parser.add_argument("--edges", type=int, default=10000, help="边数")
+    parser.add_argument("--modes", default="row,unwind", help="要对比的 Neo4j 写入模式（row / unwind / bulk / single），逗号分隔")
+    parser.add_argument("--backends", default="neo4j", help="要测试的存储后端（neo4j / sqlite），逗号分隔")
+    args = parser.parse_args()
+
+    graph = make_graph(args.nodes, args.edges)
+    doc_id = "__benchmark__"
+    original_env = {key: os.environ.get(key) for key in
+                    ('NEO4J_WRITE_MODE', 'NEO4J_BULK_THRESHOLD', 'NEO4J_RELATION_MODE')}
+
+    print("=" * 60)
+    print(f"图谱存储基准测试: {args.nodes} 节点, {args.edges} 边")
+    print("=" * 60)
+
+    results = []
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        if backend == "sqlite":
+            storage, modes = get_sqlite_graph_storage(), ["sqlite"]
+        else:
+            storage, modes = get_neo4j_storage(), [m.strip() for m in args.modes.split(",")]
+        if not storage:
+            print(f"❌ {backend} 不可用，请检查 .env 配置")
+            continue
+
+        try:
+            for mode in modes:
+                result = run_mode(storage, mode, graph, doc_id)
+                results.append(result)
+                print(f"{result['mode']:>8}: {result['seconds']:.2f}s, "
+                      f"{result['writes_per_sec']:.0f} writes/s, 失败 {result['failed']}, "
+                      f"2 跳子图 {result['subgraphs_per_sec']:.0f} queries/s")
+        finally:
+            storage.delete_by_doc(doc_id)
+            for key, value in original_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    if len(results) >= 2 and results[0]["seconds"] > 0:
+        speedup = results[0]["seconds"] / results[-1]["seconds"]
+        print(f"\n{results[-1]['mode']} 相对 {results[0]['mode']} 加速: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+关系存储模式转换
+
+把 Neo4j 中按类型存储的关系（typed 模式）转换为 single 模式：
+统一为 RELATES 关系，原关系类型保存在索引属性 r.type 中。
+转换完成后在 .env 中设置 NEO4J_RELATION_MODE=single。
+
+用法:
+    python scripts/convert_relation_mode.py --batch-size 5000
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.storage.neo4j import get_neo4j_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把已有关系转换为 single 存储模式")
+    parser.add_argument("--batch-size", type=int, default=5000, help="每个事务转换的关系数")
+    args = parser.parse_args()
+
+    storage = get_neo4j_storage()
+    if not storage:
+        print("❌ Neo4j 不可用，请检查 .env 配置")
+        return
+
+    converted = storage.convert_to_single_relation_type(batch_size=args.batch_size)
+    print(f"✅ 已转换 {converted} 条关系，请在 .env 中设置 NEO4J_RELATION_MODE=single")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+为 Neo4j 中已有数据建立文档目录
+
+根据实体的 doc_ids 创建 (:Document) 节点和 MENTIONS 关联，
+之后按文档删除、覆盖写入和文档列表只访问文档自身的数据。可重复执行。
+
+用法:
+    python scripts/migrate_document_catalog.py
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.storage.neo4j import get_neo4j_storage
+
+
+def main():
+    storage = get_neo4j_storage()
+    if not storage:
+        print("❌ Neo4j 不可用，请检查 .env 配置")
+        return
+
+    stats = storage.migrate_document_catalog()
+    print(f"✅ 已处理 {stats['entities']} 个实体，{stats['documents']} 个文档")
+
+
+if __name__ == "__main__":
+    main()
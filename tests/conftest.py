@@ -73,6 +73,7 @@ def sample_chunks() -> List[str]:
 def mock_env_vars(monkeypatch):
     """模拟环境变量"""
     monkeypatch.setenv("USE_NEO4J", "false")
+    monkeypatch.setenv("COMPONENT_INDEX_ENABLED", "false")
     monkeypatch.setenv("LLM_BINDING_HOST", "https://api.example.com/v1")
     monkeypatch.setenv("LLM_BINDING_API_KEY", "test-key")
 
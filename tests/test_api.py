@@ -5,7 +5,7 @@ Test FastAPI Endpoints
 
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import json
 
 
@@ -27,10 +27,10 @@ class TestHealthEndpoint:
 class TestGraphEndpoints:
     """测试图谱相关端点"""
 
-    @patch('backend.server.kg_manager')
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
     def test_get_popular_labels(self, mock_kg_manager, api_client):
         """测试获取热门标签"""
-        mock_kg_manager.get_popular_labels.return_value = ["Person", "Book", "Concept"]
+        mock_kg_manager.aget_popular_labels.return_value = ["Person", "Book", "Concept"]
 
         response = api_client.get("/graph/label/popular?limit=3")
 
@@ -39,10 +39,10 @@ class TestGraphEndpoints:
         assert isinstance(data, list)
         assert len(data) <= 3
 
-    @patch('backend.server.kg_manager')
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
     def test_get_graphs_all(self, mock_kg_manager, api_client):
         """测试获取全部图谱"""
-        mock_kg_manager.get_all_graphs.return_value = {
+        mock_kg_manager.aget_all_graphs.return_value = {
             "nodes": [{"id": "node1"}],
             "edges": [{"source": "node1", "target": "node2"}]
         }
@@ -54,10 +54,10 @@ class TestGraphEndpoints:
         assert "nodes" in data
         assert "edges" in data
 
-    @patch('backend.server.kg_manager')
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
     def test_get_graphs_by_label(self, mock_kg_manager, api_client):
         """测试按标签获取图谱"""
-        mock_kg_manager.get_graph_by_label.return_value = {
+        mock_kg_manager.aget_graph_by_label.return_value = {
             "nodes": [{"id": "person1", "type": "Person"}],
             "edges": []
         }
@@ -68,15 +68,46 @@ class TestGraphEndpoints:
         data = response.json()
         assert "nodes" in data
 
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
+    def test_get_graph_page(self, mock_kg_manager, api_client):
+        """测试分页获取图谱"""
+        mock_kg_manager.aget_graph_page.return_value = {
+            "nodes": [{"id": "node1"}],
+            "edges": [],
+            "next_cursor": "node1"
+        }
+
+        response = api_client.get("/graphs/page?limit=1")
+
+        assert response.status_code == 200
+        assert response.json()["next_cursor"] == "node1"
+        mock_kg_manager.aget_graph_page.assert_awaited_once_with("", 1)
+
+    @patch('backend.server.kg_manager')
+    def test_stream_graphs(self, mock_kg_manager, api_client):
+        """测试 NDJSON 流式导出"""
+        async def pages(page_size):
+            yield {"nodes": [{"id": "a"}, {"id": "b"}], "edges": [{"source": "a", "target": "b"}]}
+            yield {"nodes": [{"id": "c"}], "edges": []}
+
+        mock_kg_manager.aiter_graph_pages = pages
+
+        response = api_client.get("/graphs/stream?page_size=2")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["type"] for line in lines] == ["node", "node", "edge", "node"]
+
 
 @pytest.mark.unit
 class TestDocumentEndpoints:
     """测试文档相关端点"""
 
-    @patch('backend.server.kg_manager')
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
     def test_list_documents(self, mock_kg_manager, api_client):
         """测试列出文档"""
-        mock_kg_manager.list_documents.return_value = [
+        mock_kg_manager.alist_documents.return_value = [
             {
                 "doc_id": "doc1",
                 "file": "test.txt",
@@ -94,10 +125,10 @@ class TestDocumentEndpoints:
         assert len(data) == 1
         assert data[0]["doc_id"] == "doc1"
 
-    @patch('backend.server.kg_manager')
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
     def test_get_document_graph(self, mock_kg_manager, api_client):
         """测试获取文档图谱"""
-        mock_kg_manager.load_document.return_value = {
+        mock_kg_manager.aload_document.return_value = {
             "nodes": [{"id": "node1"}],
             "edges": []
         }
@@ -109,50 +140,66 @@ class TestDocumentEndpoints:
         assert "nodes" in data
         assert "edges" in data
 
-    @patch('backend.server.kg_manager')
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
     def test_get_document_not_found(self, mock_kg_manager, api_client):
         """测试获取不存在的文档"""
-        mock_kg_manager.load_document.return_value = {"nodes": []}
+        mock_kg_manager.aload_document.return_value = {"nodes": []}
 
         response = api_client.get("/documents/nonexistent")
 
         assert response.status_code == 404
 
-    @patch('backend.server.kg_manager')
-    @patch('backend.server.vector_store')
-    def test_delete_document(self, mock_vector_store, mock_kg_manager, api_client):
-        """测试删除文档"""
-        mock_kg_manager.delete_document.return_value = {
-            "neo4j": {"nodes_deleted": 5, "edges_deleted": 8}
-        }
-        mock_vector_store.delete_by_doc.return_value = {
-            "chunks_deleted": 10,
-            "entities_deleted": 5
-        }
+    @patch('backend.server.deletion_jobs')
+    def test_delete_document(self, mock_jobs, api_client):
+        """测试删除文档（创建后台删除任务）"""
+        mock_jobs.submit.return_value = {"job_id": "abc123", "status": "queued"}
+        mock_jobs.is_running.return_value = False
 
         response = api_client.delete("/documents/test_doc")
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         data = response.json()
         assert data["success"] is True
-        assert "neo4j" in data
-        assert "deleted_chunks" in data
+        assert data["job_id"] == "abc123"
+        mock_jobs.submit.assert_called_once_with("test_doc")
+        mock_jobs.run.assert_called_once_with("abc123")
+
+    @patch('backend.server.deletion_jobs')
+    def test_delete_document_already_running(self, mock_jobs, api_client):
+        """测试删除任务正在执行时不重复启动"""
+        mock_jobs.submit.return_value = {"job_id": "abc123", "status": "running"}
+        mock_jobs.is_running.return_value = True
+
+        response = api_client.delete("/documents/test_doc")
+
+        assert response.status_code == 202
+        assert response.json()["job_id"] == "abc123"
+        mock_jobs.run.assert_not_called()
+
+    @patch('backend.server.deletion_jobs')
+    def test_get_delete_job(self, mock_jobs, api_client):
+        """测试查询删除任务"""
+        mock_jobs.get.return_value = {"job_id": "abc123", "status": "running", "phase": "neo4j"}
+        assert api_client.get("/documents/delete-jobs/abc123").json()["phase"] == "neo4j"
+
+        mock_jobs.get.return_value = None
+        assert api_client.get("/documents/delete-jobs/missing").status_code == 404
 
 
 @pytest.mark.unit
 class TestStatsEndpoint:
     """测试统计端点"""
 
-    @patch('backend.server.kg_manager')
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
     def test_get_stats(self, mock_kg_manager, api_client):
         """测试获取统计信息"""
-        mock_kg_manager.get_stats.return_value = {
+        mock_kg_manager.aget_stats.return_value = {
             "neo4j": {
                 "total_nodes": 100,
                 "total_edges": 200
             }
         }
-        mock_kg_manager.list_documents.return_value = [
+        mock_kg_manager.alist_documents.return_value = [
             {"doc_id": "doc1"},
             {"doc_id": "doc2"}
         ]
@@ -166,6 +213,40 @@ class TestStatsEndpoint:
         assert "total_edges" in data
         assert data["document_count"] == 2
 
+    @patch('backend.server.kg_manager', new_callable=AsyncMock)
+    def test_get_stats_uses_document_catalog_count(self, mock_kg_manager, api_client):
+        """文档数来自计数查询，不再列出全部文档"""
+        mock_kg_manager.aget_stats.return_value = {
+            "neo4j": {"total_nodes": 100, "total_edges": 200, "total_documents": 7}
+        }
+
+        response = api_client.get("/stats")
+
+        assert response.json()["document_count"] == 7
+        mock_kg_manager.alist_documents.assert_not_called()
+
+    @patch('backend.server.kg_manager')
+    def test_get_cache_stats(self, mock_kg_manager, api_client):
+        """读缓存统计"""
+        mock_kg_manager.get_cache_stats.return_value = {"hits": 9, "misses": 1, "hit_rate": 0.9}
+
+        response = api_client.get("/stats/cache")
+
+        assert response.status_code == 200
+        assert response.json()["hit_rate"] == 0.9
+
+    @patch('backend.server.kg_manager')
+    def test_get_write_stats(self, mock_kg_manager, api_client):
+        """并发写入统计"""
+        mock_kg_manager.get_write_stats.return_value = {
+            "writes": 3, "conflicts": 1, "retries": 2, "failed": 0
+        }
+
+        response = api_client.get("/stats/writes")
+
+        assert response.status_code == 200
+        assert response.json()["conflicts"] == 1
+
 
 @pytest.mark.unit
 class TestQAEndpoints:
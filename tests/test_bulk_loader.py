@@ -0,0 +1,197 @@
+"""
+Test Neo4j Bulk Loader
+测试大文档分事务批量导入（模拟驱动，不需要真实数据库）
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.core.storage.bulk_loader import Neo4jBulkLoader
+from backend.core.storage.neo4j import Neo4jStorage
+
+
+class FakeTx:
+    """记录查询，按查询内容返回 single() 记录"""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    def run(self, query, **params):
+        self.owner.queries.append((query, params))
+        if self.owner.fail_on and self.owner.fail_on(query, params):
+            raise Exception("transient failure")
+        result = MagicMock()
+        rows = params.get("rows")
+        result.single.return_value = {
+            "written": len(rows) if rows else 0,
+            "found": 1, "deleted": 0, "touched": [], "ids": []
+        }
+        return result
+
+
+class FakeSession:
+    """execute_write 直接在模拟事务上执行工作函数"""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute_write(self, work):
+        self.owner.transactions += 1
+        return work(FakeTx(self.owner))
+
+
+def make_loader(tmp_path, fail_on=None, **kwargs):
+    """创建使用模拟驱动的导入器"""
+    storage = Neo4jStorage.__new__(Neo4jStorage)
+    storage.driver = MagicMock()
+    storage.queries = []
+    storage.transactions = 0
+    storage.fail_on = fail_on
+    storage.driver.session.side_effect = lambda: FakeSession(storage)
+    loader = Neo4jBulkLoader(storage, checkpoint_dir=str(tmp_path), **kwargs)
+    return loader, storage
+
+
+@pytest.fixture
+def big_graph():
+    """五个节点、四条边（两种关系类型）"""
+    nodes = [{"id": f"实体{i}", "label": f"实体{i}", "type": "Concept"} for i in range(5)]
+    edges = [
+        {"source": "实体0", "target": "实体1", "label": "推荐"},
+        {"source": "实体1", "target": "实体2", "label": "推荐"},
+        {"source": "实体2", "target": "实体3", "label": "主张"},
+        {"source": "实体3", "target": "实体4", "label": "推荐"}
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+def node_writes(storage):
+    return [params for query, params in storage.queries if "MERGE (n:Entity" in query]
+
+
+@pytest.mark.unit
+class TestNeo4jBulkLoader:
+    """测试分阶段批量导入"""
+
+    def test_load_runs_all_phases(self, tmp_path, big_graph):
+        """每批一个事务，输出每个阶段的吞吐量"""
+        loader, storage = make_loader(tmp_path, batch_size=2, workers=2)
+
+        stats = loader.load(big_graph, "doc1")
+
+        assert stats["nodes_created"] == 5
+        assert stats["edges_created"] == 4
+        assert stats["failed"] == 0
+        assert stats["resumed"] is False
+        assert set(stats["phases"]) == {"delete", "nodes", "mentions", "edges", "finalize"}
+        assert len(node_writes(storage)) == 3
+        # 节点 3 批 + 边 3 批（推荐 2 批、主张 1 批），每批独立事务
+        assert storage.transactions > 6
+        assert not list(tmp_path.glob("bulk_*.json"))
+
+    def test_mentions_written_after_nodes(self, tmp_path, big_graph):
+        """并发的节点批次不建立 MENTIONS，MENTIONS 在节点阶段之后顺序写入"""
+        loader, storage = make_loader(tmp_path, batch_size=2, workers=2)
+
+        loader.load(big_graph, "doc1")
+
+        assert not any("MENTIONS" in query for query, _ in storage.queries
+                       if "MERGE (n:Entity" in query)
+        mentions = [(i, params) for i, (query, params) in enumerate(storage.queries)
+                    if "MERGE (d)-[:MENTIONS]->(n)" in query]
+        assert sorted(id for _, params in mentions for id in params["ids"]) == \
+            [f"实体{i}" for i in range(5)]
+        last_node_write = max(i for i, (query, _) in enumerate(storage.queries)
+                              if "MERGE (n:Entity" in query)
+        assert all(i > last_node_write for i, _ in mentions)
+
+    def test_failed_node_batch_keeps_checkpoint_and_resumes(self, tmp_path, big_graph):
+        """节点批次失败后保留检查点，续跑只写未完成的批次"""
+        def fail_second_batch(query, params):
+            return "MERGE (n:Entity" in query and params["rows"][0]["id"] == "实体2"
+
+        loader, storage = make_loader(tmp_path, fail_on=fail_second_batch, batch_size=2, workers=1)
+        with pytest.raises(RuntimeError):
+            loader.load(big_graph, "doc1")
+        assert list(tmp_path.glob("bulk_*.json"))
+
+        loader, storage = make_loader(tmp_path, batch_size=2, workers=1)
+        stats = loader.load(big_graph, "doc1")
+
+        assert stats["resumed"] is True
+        assert [params["rows"][0]["id"] for params in node_writes(storage)] == ["实体2"]
+        assert stats["nodes_created"] == 5
+        # 续跑不会重复执行删除阶段
+        assert not any("DELETE r" in query for query, _ in storage.queries)
+
+    def test_changed_graph_ignores_checkpoint(self, tmp_path, big_graph):
+        """数据变化后旧检查点失效，从头导入"""
+        loader, _ = make_loader(tmp_path, fail_on=lambda q, p: "MERGE (s)-[r:" in q, batch_size=2)
+        with pytest.raises(Exception):
+            loader.load(big_graph, "doc1")
+
+        big_graph["nodes"].append({"id": "实体5", "label": "实体5"})
+        loader, storage = make_loader(tmp_path, batch_size=2)
+        stats = loader.load(big_graph, "doc1")
+
+        assert stats["resumed"] is False
+        assert stats["nodes_created"] == 6
+
+    def test_rejected_rows_counted(self, tmp_path, big_graph):
+        """缺少 id / 端点的行计入失败数"""
+        big_graph["nodes"].append({"label": "无 id"})
+        big_graph["edges"].append({"source": "实体0", "label": "推荐"})
+        loader, _ = make_loader(tmp_path, batch_size=2)
+
+        stats = loader.load(big_graph, "doc1", overwrite=False)
+
+        assert stats["failed"] == 2
+        assert "delete" not in stats["phases"]
+
+    def test_edge_with_foreign_endpoint_rejected(self, tmp_path, big_graph):
+        """端点不在导入节点中的边剔除，不写入"""
+        big_graph["edges"].append({"source": "其他文档实体", "target": "实体0", "label": "推荐"})
+        loader, storage = make_loader(tmp_path, batch_size=2)
+
+        stats = loader.load(big_graph, "doc1", overwrite=False)
+
+        edge_sources = [row["source"] for query, params in storage.queries
+                        if "MERGE (s)-[r:" in query for row in params["rows"]]
+        assert "其他文档实体" not in edge_sources
+        assert stats["failed"] == 1
+
+
+@pytest.mark.unit
+class TestBulkThreshold:
+    """测试 save_graph_batch 的批量导入路由"""
+
+    def test_large_graph_uses_bulk_loader(self, tmp_path, big_graph, monkeypatch):
+        """超过阈值时改用批量导入"""
+        monkeypatch.setenv("NEO4J_BULK_THRESHOLD", "5")
+        monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+        _, storage = make_loader(tmp_path)
+
+        stats = storage.save_graph_batch(big_graph, "doc1")
+
+        assert "phases" in stats
+        assert stats["nodes_created"] == 5
+
+    def test_threshold_disabled(self, tmp_path, big_graph, monkeypatch):
+        """阈值为 0 时仍使用单事务写入"""
+        monkeypatch.setenv("NEO4J_BULK_THRESHOLD", "0")
+        _, storage = make_loader(tmp_path)
+        storage.driver.session.side_effect = None
+        session = storage.driver.session.return_value.__enter__.return_value
+        tx = session.begin_transaction.return_value.__enter__.return_value
+        tx.run.return_value.single.return_value = {"written": 1, "deleted": 0, "found": 1}
+
+        stats = storage.save_graph_batch(big_graph, "doc1", overwrite=False)
+
+        assert "phases" not in stats
+        session.begin_transaction.assert_called_once()
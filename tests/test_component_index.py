@@ -0,0 +1,112 @@
+"""
+Test Component Index
+测试全局连通分量索引
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.management.component_index import ComponentIndex
+
+
+def make_graph(edges, types=None):
+    """根据边列表构造图谱"""
+    types = types or {}
+    node_ids = {n for edge in edges for n in edge}
+    return {
+        "nodes": [{"id": n, "type": types.get(n, "Entity")} for n in sorted(node_ids)],
+        "edges": [{"source": s, "target": t, "label": "相关"} for s, t in edges]
+    }
+
+
+@pytest.mark.unit
+class TestComponentIndex:
+    """测试连通分量索引"""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        """创建临时索引"""
+        return ComponentIndex(index_path=str(tmp_path / "component_index.json"))
+
+    def test_components_merge_across_documents(self, index):
+        """不同文档共享实体时分量合并"""
+        index.add_graph(make_graph([("李笑来", "定投")]))
+        index.add_graph(make_graph([("指数基金", "标普500")]))
+        assert not index.same_component("李笑来", "标普500")
+
+        index.add_graph(make_graph([("定投", "指数基金")]))
+        assert index.same_component("李笑来", "标普500")
+        assert index.component_of("标普500")["size"] == 4
+        assert index.get_stats()["components"] == 1
+
+    def test_unknown_entity(self, index):
+        """未登记的实体返回 None"""
+        assert index.component_of("不存在") is None
+        assert not index.same_component("不存在", "不存在")
+
+    def test_persistence(self, index, tmp_path):
+        """索引保存后可重新加载"""
+        index.add_graph(make_graph([("李笑来", "定投")]))
+
+        reloaded = ComponentIndex(index_path=str(tmp_path / "component_index.json"))
+        assert reloaded.same_component("李笑来", "定投")
+
+    def test_plan_island_links(self, index):
+        """孤岛优先连接到主图中同类型的核心节点"""
+        index.add_graph(make_graph(
+            [("定投", "指数基金"), ("李笑来", "定投")],
+            types={"定投": "Strategy", "李笑来": "Person"}
+        ))
+        index.add_graph(make_graph([("巴菲特", "价值投资")], types={"巴菲特": "Person"}))
+        index.add_graph({"nodes": [{"id": "复利", "type": "Concept"}], "edges": []})
+
+        links = index.plan_island_links()
+        assert len(links) == 2
+        assert {"source": "巴菲特", "target": "李笑来", "relation": "相关"} in links
+        assert {"source": "复利", "target": "定投", "relation": "提及"} in links
+
+        index.apply_links(links)
+        assert index.get_stats()["components"] == 1
+        assert index.plan_island_links() == []
+
+    def test_rebuild_when_stale(self, index):
+        """索引失效后从存储分页重建"""
+        index.add_graph(make_graph([("李笑来", "定投")]))
+        index.invalidate()
+
+        storage = MagicMock()
+        storage.iter_entity_ids.return_value = iter([[{"id": "李笑来", "type": "Person"},
+                                                      {"id": "定投", "type": "Strategy"}]])
+        storage.iter_entity_edges.return_value = iter([[]])
+        index.ensure_fresh(storage)
+
+        assert not index.stale
+        assert not index.same_component("李笑来", "定投")
+        assert index.get_stats()["components"] == 2
+
+    def test_saves_append_to_journal(self, index, tmp_path):
+        """保存只追加日志，累积到阈值后写回快照；重新加载时重放日志"""
+        index.compact_every = 3
+        index.add_graph(make_graph([("李笑来", "定投")]))
+        index.add_graph(make_graph([("定投", "指数基金")]))
+
+        assert index.journal_path.exists()
+        assert not index.index_path.exists()
+        reloaded = ComponentIndex(index_path=str(tmp_path / "component_index.json"))
+        assert reloaded.same_component("李笑来", "指数基金")
+
+        index.add_graph(make_graph([("巴菲特", "价值投资")]))
+        assert index.index_path.exists()
+        assert not index.journal_path.exists()
+        reloaded = ComponentIndex(index_path=str(tmp_path / "component_index.json"))
+        assert reloaded.get_stats()["components"] == 2
+
+    def test_stale_index_skips_saves(self, index, tmp_path):
+        """失效状态持久化，失效期间的保存不再登记"""
+        index.add_graph(make_graph([("李笑来", "定投")]))
+        index.invalidate()
+        index.add_graph(make_graph([("巴菲特", "价值投资")]))
+
+        assert index.component_of("巴菲特") is None
+        reloaded = ComponentIndex(index_path=str(tmp_path / "component_index.json"))
+        assert reloaded.stale
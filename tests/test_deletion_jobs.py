@@ -0,0 +1,206 @@
+"""
+Test Document Deletion Jobs
+测试文档删除任务（分批删除、阶段检查点、失败后继续）
+"""
+
+import json
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.core.storage.vector import VectorStore
+from backend.management.deletion_jobs import DocumentDeletionJobs
+
+
+def make_kg_manager(batches, fail_after=None):
+    """按给定批次删除的管理器；fail_after 批后抛出异常（只失败一次）"""
+    manager = MagicMock()
+    state = {"failed": False}
+
+    def iter_delete(doc_id, batch_size):
+        for i, batch in enumerate(batches):
+            if fail_after is not None and i == fail_after and not state["failed"]:
+                state["failed"] = True
+                raise RuntimeError("connection lost")
+            yield batch
+
+    manager.iter_delete_document.side_effect = iter_delete
+    return manager
+
+
+def make_vector_store():
+    store = MagicMock()
+    store.iter_delete_batches.side_effect = lambda doc_id, batch_size: iter([
+        {"collection": "chunks", "deleted": 3},
+        {"collection": "entities", "deleted": 2}
+    ])
+    return store
+
+
+BATCHES = [
+    {"deleted_edges": 10, "deleted_nodes": 4, "touched": ["a", "b"]},
+    {"deleted_edges": 5, "deleted_nodes": 1, "touched": ["c"]}
+]
+
+
+@pytest.mark.unit
+class TestDocumentDeletionJobs:
+    """测试删除任务的阶段和进度"""
+
+    def test_job_runs_all_phases(self, tmp_path):
+        """任务依次删除图谱和向量，记录每批进度"""
+        manager = make_kg_manager(BATCHES)
+        jobs = DocumentDeletionJobs(manager, make_vector_store(), jobs_dir=tmp_path)
+
+        job = jobs.submit("doc1")
+        assert job["status"] == "queued"
+
+        result = jobs.run(job["job_id"])
+
+        assert result["status"] == "completed"
+        assert result["phase"] == "done"
+        assert result["progress"] == {"batches": 4, "deleted_edges": 15, "deleted_nodes": 5,
+                                      "chunks_deleted": 3, "entities_deleted": 2}
+        manager.finish_document_delete.assert_called_once_with("doc1", {"a", "b", "c"})
+        assert jobs.get(job["job_id"])["status"] == "completed"
+
+    def test_failed_job_resumes_from_checkpoint(self, tmp_path):
+        """失败后重新执行：已完成的批次保留，度数重算包含失败前触及的实体"""
+        manager = make_kg_manager(BATCHES, fail_after=1)
+        vectors = make_vector_store()
+        jobs = DocumentDeletionJobs(manager, vectors, jobs_dir=tmp_path)
+        job_id = jobs.submit("doc1")["job_id"]
+
+        failed = jobs.run(job_id)
+        assert failed["status"] == "failed"
+        assert failed["phase"] == "neo4j"
+        assert failed["error"] == "connection lost"
+        assert failed["progress"]["deleted_edges"] == 10
+        vectors.iter_delete_batches.assert_not_called()
+
+        # 模拟重启：新实例从磁盘上的检查点继续
+        manager.iter_delete_document.side_effect = lambda doc_id, batch_size: iter(BATCHES[1:])
+        resumed = DocumentDeletionJobs(manager, vectors, jobs_dir=tmp_path)
+        assert resumed.resume_unfinished() == [job_id]
+
+        result = resumed.get(job_id)
+        assert result["status"] == "completed"
+        assert result["progress"]["deleted_edges"] == 15
+        manager.finish_document_delete.assert_called_once_with("doc1", {"a", "b", "c"})
+
+    def test_vector_phase_skips_graph_on_resume(self, tmp_path):
+        """图谱阶段已完成时只继续向量删除"""
+        manager = make_kg_manager(BATCHES)
+        vectors = make_vector_store()
+        vectors.iter_delete_batches.side_effect = RuntimeError("chroma unavailable")
+        jobs = DocumentDeletionJobs(manager, vectors, jobs_dir=tmp_path)
+        job_id = jobs.submit("doc1")["job_id"]
+
+        assert jobs.run(job_id)["phase"] == "vectors"
+
+        vectors.iter_delete_batches.side_effect = lambda doc_id, batch_size: iter([])
+        assert jobs.run(job_id)["status"] == "completed"
+        assert manager.iter_delete_document.call_count == 1
+
+    def test_running_job_not_run_twice(self, tmp_path):
+        """任务执行期间再次调用 run 直接返回，不重复计数"""
+        manager = make_kg_manager(BATCHES)
+        jobs = DocumentDeletionJobs(manager, make_vector_store(), jobs_dir=tmp_path)
+        job_id = jobs.submit("doc1")["job_id"]
+
+        def iter_delete(doc_id, batch_size):
+            assert jobs.is_running(job_id)
+            assert jobs.run(job_id)["status"] == "running"
+            yield from BATCHES
+
+        manager.iter_delete_document.side_effect = iter_delete
+        result = jobs.run(job_id)
+
+        assert result["status"] == "completed"
+        assert result["progress"]["deleted_edges"] == 15
+        assert manager.iter_delete_document.call_count == 1
+        assert not jobs.is_running(job_id)
+
+    def test_resume_skips_jobs_over_attempt_limit(self, tmp_path):
+        """启动时不再自动重试失败次数达到上限的任务"""
+        manager = make_kg_manager(BATCHES)
+        manager.iter_delete_document.side_effect = RuntimeError("always fails")
+        jobs = DocumentDeletionJobs(manager, make_vector_store(), jobs_dir=tmp_path)
+        jobs.max_attempts = 2
+        job_id = jobs.submit("doc1")["job_id"]
+
+        jobs.run(job_id)
+        assert jobs.resume_unfinished() == [job_id]
+        assert jobs.get(job_id)["attempts"] == 2
+        assert jobs.resume_unfinished() == []
+
+        # 显式重新提交仍可执行
+        manager.iter_delete_document.side_effect = lambda doc_id, batch_size: iter(BATCHES)
+        assert jobs.run(jobs.submit("doc1")["job_id"])["status"] == "completed"
+
+    def test_graph_phase_skipped_without_storage(self, tmp_path):
+        """图谱存储未启用时跳过图谱阶段，仍删除向量"""
+        manager = make_kg_manager(BATCHES)
+        manager.neo4j_storage = None
+        vectors = make_vector_store()
+        jobs = DocumentDeletionJobs(manager, vectors, jobs_dir=tmp_path)
+
+        result = jobs.run(jobs.submit("doc1")["job_id"])
+
+        assert result["status"] == "completed"
+        assert result["progress"]["chunks_deleted"] == 3
+        manager.iter_delete_document.assert_not_called()
+        manager.finish_document_delete.assert_not_called()
+
+    def test_submit_reuses_unfinished_job(self, tmp_path):
+        """同一文档已有未完成任务时返回该任务"""
+        jobs = DocumentDeletionJobs(make_kg_manager(BATCHES), make_vector_store(), jobs_dir=tmp_path)
+
+        first = jobs.submit("doc1")
+        assert jobs.submit("doc1")["job_id"] == first["job_id"]
+        assert jobs.submit("doc2")["job_id"] != first["job_id"]
+
+        jobs.run(first["job_id"])
+        assert jobs.submit("doc1")["job_id"] != first["job_id"]
+
+    def test_progress_persisted_without_internal_fields(self, tmp_path):
+        """任务文件保存受影响实体，查询结果不暴露内部字段"""
+        jobs = DocumentDeletionJobs(make_kg_manager(BATCHES, fail_after=1),
+                                    make_vector_store(), jobs_dir=tmp_path)
+        job_id = jobs.submit("doc1")["job_id"]
+        jobs.run(job_id)
+
+        with open(tmp_path / f"{job_id}.json", encoding="utf-8") as f:
+            assert json.load(f)["touched"] == ["a", "b"]
+        assert "touched" not in jobs.get(job_id)
+        assert jobs.get("../etc") is None
+
+
+@pytest.mark.unit
+class TestVectorBatchDelete:
+    """测试向量存储的分批删除"""
+
+    def test_deletes_in_bounded_batches(self):
+        """每批最多 batch_size 条，直到没有剩余"""
+        remaining = {"chunks": [f"c{i}" for i in range(5)], "entities": ["e1"]}
+
+        def collection(name):
+            col = MagicMock()
+            col.get.side_effect = lambda where, include, limit: {"ids": remaining[name][:limit]}
+            col.delete.side_effect = lambda ids: remaining.__setitem__(
+                name, [i for i in remaining[name] if i not in ids])
+            return col
+
+        store = VectorStore.__new__(VectorStore)
+        store._chunks_collection = collection("chunks")
+        store._entities_collection = collection("entities")
+
+        batches = list(store.iter_delete_batches("doc1", batch_size=2))
+
+        assert batches == [
+            {"collection": "chunks", "deleted": 2},
+            {"collection": "chunks", "deleted": 2},
+            {"collection": "chunks", "deleted": 1},
+            {"collection": "entities", "deleted": 1}
+        ]
+        assert remaining == {"chunks": [], "entities": []}
@@ -129,3 +129,55 @@ class TestEntityFilter:
         filter1 = get_entity_filter()
         filter2 = get_entity_filter()
         assert filter1 is filter2
+
+
+@pytest.mark.unit
+class TestCompiledEntityFilter:
+    """测试预编译过滤规则与缓存"""
+
+    @pytest.fixture
+    def filter(self):
+        """创建过滤器实例"""
+        return EntityFilter()
+
+    def test_matches_original_rules(self, filter):
+        """预编译正则与原 lambda 规则判定一致"""
+        special = "!@#$%^&*()+=[]{}|\\:;\"'<>?/"
+        original_patterns = [
+            lambda x: len(x) == 1,
+            lambda x: x.isdigit(),
+            lambda x: any(c in x for c in special),
+            lambda x: len(x) > 50,
+        ]
+        names = ["李笑来", "a", "ab", "12", "x" * 50, "x" * 51, "定投\n策略",
+                 "S&P 500", "C++", "a/b", "it's", "标普500", "²³"] + list(special)
+
+        for name in names:
+            expected = any(p(name.strip()) for p in original_patterns) or \
+                name.strip() in filter.stop_entities or \
+                name.strip().lower() in filter.stop_entities_en
+            assert filter.should_filter(name) is expected, name
+
+    def test_memoizes_names(self, filter):
+        """重复名称命中缓存"""
+        assert filter.should_filter("李笑来") is False
+        assert filter._cache["李笑来"] is False
+        assert filter.should_filter("李笑来") is False
+
+    def test_filter_graph_prunes_dangling_relations(self, filter):
+        """单次遍历剔除悬空关系并规范化通用关系词"""
+        graph = {
+            "entities": [
+                {"name": "李笑来", "type": "Person"},
+                {"name": "定投", "type": "Strategy"}
+            ],
+            "relations": [
+                {"source": "李笑来", "target": "定投", "relation": "相关"},
+                {"source": "李笑来", "target": "不存在", "relation": "主张"},
+                {"source": "定投", "target": "李笑来", "relation": "著作"}
+            ]
+        }
+
+        filtered = filter.filter_graph(graph)
+
+        assert [r["relation"] for r in filtered["relations"]] == ["RELATES", "著作"]
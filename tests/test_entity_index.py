@@ -0,0 +1,92 @@
+"""
+Test Entity Index
+测试实体名称的 n-gram 倒排索引（模糊匹配的候选与排序）
+"""
+
+import pytest
+
+from backend.management.entity_index import NgramIndex, ngrams
+from backend.management.graph_index import GraphIndex
+
+
+@pytest.mark.unit
+class TestNgrams:
+    """测试 n-gram 切分"""
+
+    def test_bigrams(self):
+        """中文按二元组切分，英文忽略大小写"""
+        assert ngrams("指数基金") == {"指数", "数基", "基金"}
+        assert ngrams("ETF") == {"et", "tf"}
+
+    def test_short_text(self):
+        """短于 n 的文本整体作为一个 gram，空文本没有 gram"""
+        assert ngrams("书") == {"书"}
+        assert ngrams("  ") == set()
+
+
+@pytest.mark.unit
+class TestNgramIndex:
+    """测试倒排索引查找"""
+
+    @pytest.fixture
+    def index(self):
+        index = NgramIndex()
+        for key, text in enumerate(["指数基金", "指数基金定投", "基金经理", "注意力", "书"]):
+            index.add(key, text)
+        return index
+
+    def test_containment_ranked_first(self, index):
+        """包含关系优先，其次按重合度"""
+        hits = index.search("指数基金", limit=5, min_score=0.5)
+        assert [key for key, _, _ in hits[:2]] == [0, 1]
+        assert hits[0] == (0, True, 1.0)
+        assert all(contained for _, contained, _ in hits)
+
+    def test_min_score_filters_weak_overlap(self, index):
+        """没有包含关系且重合度低的候选被过滤"""
+        keys = [key for key, _, _ in index.search("基金公司", limit=5, min_score=0.5)]
+        assert 2 not in keys
+        keys = [key for key, _, _ in index.search("基金公司", limit=5, min_score=0.1)]
+        assert set(keys) == {0, 1, 2}
+
+    def test_limit_and_tiebreak(self, index):
+        """候选数有上限，同分时按 tiebreak 排序"""
+        index.add(5, "指数基金")
+        hits = index.search("指数基金", limit=1, tiebreak=lambda key: key)
+        assert hits == [(5, True, 1.0)]
+
+    def test_single_char_entity(self, index):
+        """单字实体只在查询包含该字时命中"""
+        assert index.search("这本书", limit=5)[0][0] == 4
+        assert index.search("注意", limit=5)[0][0] == 3
+        assert index.search("不相关", limit=5) == []
+
+    def test_duplicate_text_ignored(self, index):
+        """同一键重复登记相同文本只保留一份"""
+        size = len(index)
+        index.add(0, "指数基金")
+        assert len(index) == size
+
+
+@pytest.mark.unit
+class TestGraphIndexFuzzyMatch:
+    """测试图谱索引的模糊匹配"""
+
+    def test_matches_labels_and_ranks_by_degree(self):
+        """标签参与匹配，重合度高的优先，同分按度数排序，随增量追加更新"""
+        index = GraphIndex()
+        index.rebuild([{"nodes": [
+            {"id": "index_fund", "label": "指数基金", "degree": 1},
+            {"id": "指数基金投资", "label": "指数基金投资", "degree": 9},
+            {"id": "货币基金", "label": "货币基金", "degree": 5}
+        ], "edges": []}])
+
+        hits = index.fuzzy_match("指数基金", limit=5)
+        assert [hit["id"] for hit in hits] == ["index_fund", "指数基金投资"]
+        assert hits[0]["score"] == 1.0
+
+        hits = index.fuzzy_match("基金", limit=2)
+        assert [hit["id"] for hit in hits] == ["货币基金", "index_fund"]
+
+        index.add_graph({"nodes": [{"id": "基金"}], "edges": []})
+        assert index.fuzzy_match("基金", limit=1)[0]["id"] == "基金"
@@ -0,0 +1,158 @@
+"""
+Test Entity Resolver
+测试跨文档实体消歧
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.management.entity_resolver import EntityResolver, clean_entity_name
+
+
+@pytest.mark.unit
+class TestEntityResolver:
+    """测试实体消歧器"""
+
+    @pytest.fixture
+    def resolver(self, tmp_path):
+        """创建不启用向量召回的消歧器"""
+        return EntityResolver(index_path=str(tmp_path / "alias_index.json"), use_embeddings=False)
+
+    def test_clean_entity_name(self):
+        """测试名称清洗"""
+        assert clean_entity_name("《让时间陪你慢慢变富》") == "让时间陪你慢慢变富"
+        assert clean_entity_name("Dollar-Cost Averaging") == "dollarcostaveraging"
+        assert clean_entity_name("") == ""
+
+    def test_resolve_registers_first_name_as_canonical(self, resolver):
+        """首次出现的名称成为规范实体，清洗后相同的名称映射到它"""
+        assert resolver.resolve("Dollar-Cost Averaging", "Strategy") == "Dollar-Cost Averaging"
+        assert resolver.resolve("dollar cost averaging") == "Dollar-Cost Averaging"
+
+    def test_manual_alias(self, resolver):
+        """测试手动登记别名"""
+        resolver.add_alias("DCA", "定投", "Strategy")
+        resolver.add_alias("定期定额投资", "定投")
+
+        assert resolver.resolve("DCA") == "定投"
+        assert resolver.resolve("定期定额投资") == "定投"
+
+    def test_resolve_graph_across_documents(self, resolver):
+        """第二个文档的节点映射到第一个文档的规范实体"""
+        resolver.add_alias("DCA", "定投", "Strategy")
+        resolver.resolve_graph({
+            "nodes": [{"id": "定投", "label": "定投", "type": "Strategy"}],
+            "edges": []
+        })
+
+        graph = {
+            "nodes": [
+                {"id": "DCA", "label": "DCA", "type": "Strategy", "degree": 1},
+                {"id": "普通人", "label": "普通人", "type": "Group", "degree": 1}
+            ],
+            "edges": [{"source": "DCA", "target": "普通人", "label": "适用于"}]
+        }
+        stats = resolver.resolve_graph(graph)
+
+        assert stats["resolved_nodes"] == 1
+        assert {n["id"] for n in graph["nodes"]} == {"定投", "普通人"}
+        assert graph["edges"][0]["source"] == "定投"
+
+    def test_resolve_graph_merges_and_drops_self_loops(self, resolver):
+        """同一文档中映射到同一实体的节点被合并，产生的自环被丢弃"""
+        resolver.add_alias("DCA", "定投")
+        graph = {
+            "nodes": [
+                {"id": "定投", "label": "定投", "type": "Strategy", "degree": 1},
+                {"id": "DCA", "label": "DCA", "type": "Strategy", "degree": 2, "description": "定期定额"}
+            ],
+            "edges": [{"source": "DCA", "target": "定投", "label": "类似"}]
+        }
+        stats = resolver.resolve_graph(graph)
+
+        assert len(graph["nodes"]) == 1
+        assert graph["nodes"][0]["degree"] == 2
+        assert graph["nodes"][0]["description"] == "定期定额"
+        assert graph["edges"] == []
+        assert stats["merged_nodes"] == 1
+        assert stats["dropped_edges"] == 1
+
+    def test_index_is_persistent(self, tmp_path):
+        """别名索引持久化到磁盘，新实例可直接使用"""
+        path = str(tmp_path / "alias_index.json")
+        first = EntityResolver(index_path=path, use_embeddings=False)
+        first.add_alias("DCA", "定投")
+        first.save()
+
+        second = EntityResolver(index_path=path, use_embeddings=False)
+        assert second.lookup("dca") == "定投"
+
+    def test_embedding_candidates(self, tmp_path):
+        """别名索引未命中时使用向量召回，并校验阈值和类型"""
+        vector_store = MagicMock()
+        vector_store.search_entities_batch.return_value = [
+            [{"id": "定投", "type": "Strategy", "score": 0.95}],
+            [{"id": "定投", "type": "Strategy", "score": 0.5}],
+            [{"id": "定投", "type": "Strategy", "score": 0.99}]
+        ]
+        resolver = EntityResolver(index_path=str(tmp_path / "idx.json"), use_embeddings=True,
+                                  threshold=0.9, vector_store=vector_store)
+
+        resolved = resolver.resolve_many(
+            ["定期定额投资", "长期主义", "李笑来"],
+            ["Strategy", "Concept", "Person"]
+        )
+
+        assert resolved == ["定投", "长期主义", "李笑来"]
+        vector_store.search_entities_batch.assert_called_once()
+
+    def test_resolve_existing_dry_run(self, resolver):
+        """批量任务 dry-run 只返回合并计划"""
+        storage = MagicMock()
+        storage.iter_entity_ids.return_value = iter([[
+            {"id": "定投", "type": "Strategy"},
+            {"id": "《定投》", "type": "Strategy"}
+        ]])
+
+        stats, merges = resolver.resolve_existing(storage, dry_run=True)
+
+        assert stats["scanned"] == 2
+        assert merges == [("《定投》", "定投")]
+        storage.merge_entities.assert_not_called()
+
+    def test_dry_run_leaves_alias_index_unchanged(self, resolver):
+        """dry-run 不改动在用的别名索引，后续持久化不会写入预览结果"""
+        resolver.add_alias("DCA", "定投")
+        before = (dict(resolver.aliases), dict(resolver.canonicals))
+        storage = MagicMock()
+        storage.iter_entity_ids.return_value = iter([[
+            {"id": "李笑来", "type": "Person"},
+            {"id": "dca", "type": "Strategy"}
+        ]])
+
+        stats, merges = resolver.resolve_existing(storage, dry_run=True)
+
+        assert merges == [("dca", "定投")]
+        assert (resolver.aliases, resolver.canonicals) == before
+        assert resolver.lookup("李笑来") is None
+
+    def test_resolve_graph_collapses_duplicate_edges(self, resolver):
+        """端点映射后重复的边合并为一条，权重相加"""
+        resolver.add_alias("DCA", "定投")
+        graph = {
+            "nodes": [
+                {"id": "定投", "label": "定投", "type": "Strategy"},
+                {"id": "DCA", "label": "DCA", "type": "Strategy"},
+                {"id": "普通人", "label": "普通人", "type": "Person"}
+            ],
+            "edges": [
+                {"source": "普通人", "target": "定投", "label": "适合", "weight": 1},
+                {"source": "普通人", "target": "DCA", "label": "适合", "weight": 2},
+                {"source": "普通人", "target": "DCA", "label": "使用"}
+            ]
+        }
+        stats = resolver.resolve_graph(graph)
+
+        edges = {(e["source"], e["label"], e["target"]): e.get("weight") for e in graph["edges"]}
+        assert edges == {("普通人", "适合", "定投"): 3, ("普通人", "使用", "定投"): None}
+        assert stats["dropped_edges"] == 1
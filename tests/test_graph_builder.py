@@ -0,0 +1,116 @@
+"""
+Test Incremental Graph Builder
+测试增量图谱构建器
+"""
+
+import pytest
+
+from backend.extraction.graph_builder import IncrementalGraphBuilder
+from backend.extraction.normalizer import KnowledgeGraphNormalizer
+
+
+@pytest.fixture
+def builder():
+    """不保留来源数据的构建器"""
+    return IncrementalGraphBuilder(KnowledgeGraphNormalizer({'provenance': 'none'}))
+
+
+@pytest.mark.unit
+class TestIncrementalGraphBuilder:
+    """测试增量图谱构建器"""
+
+    def test_merges_chunks_and_counts_degree(self, builder):
+        """跨块合并实体和关系，度数等于规范化后的关联边数"""
+        builder.add_result({
+            "entities": [
+                {"name": "李笑来", "type": "Person", "description": "作者"},
+                {"name": "《让时间陪你慢慢变富》", "type": "Book", "description": ""}
+            ],
+            "relations": [
+                {"source": "李笑来", "target": "《让时间陪你慢慢变富》", "relation": "编写"}
+            ]
+        })
+        builder.add_result({
+            "entities": [
+                {"name": "让时间陪你慢慢变富", "type": "Book", "description": "理财书籍"}
+            ],
+            "relations": [
+                {"source": "李笑来", "target": "让时间陪你慢慢变富", "relation": "撰写"},
+                {"source": "让时间陪你慢慢变富", "target": "定投", "relation": "主张"}
+            ]
+        })
+
+        graph = builder.build()
+        nodes = {node["id"]: node for node in graph["nodes"]}
+
+        # 书名号变体合并为同一节点，描述取首个非空值
+        assert set(nodes) == {"李笑来", "让时间陪你慢慢变富", "定投"}
+        assert nodes["让时间陪你慢慢变富"]["description"] == "理财书籍"
+
+        # "编写" 和 "撰写" 规范化为同一关系，去重后只保留一条
+        assert len(graph["edges"]) == 2
+        assert nodes["李笑来"]["degree"] == 1
+        assert nodes["让时间陪你慢慢变富"]["degree"] == 2
+        assert graph["stats"] == {
+            "original_nodes": 4,
+            "normalized_nodes": 3,
+            "original_edges": 3,
+            "normalized_edges": 2
+        }
+
+    def test_implicit_node_takes_later_declared_type(self, builder):
+        """先作为关系端点出现的节点，在之后的实体声明中补全类型"""
+        builder.add_result({
+            "entities": [{"name": "李笑来", "type": "Person"}],
+            "relations": [{"source": "李笑来", "target": "定投", "relation": "推荐"}]
+        })
+        assert builder.build()["nodes"][1]["type"] == "Entity"
+
+        builder.add_result({
+            "entities": [{"name": "定投", "type": "Strategy", "description": "定期定额投资"}],
+            "relations": []
+        })
+        node = builder.build()["nodes"][1]
+        assert node["type"] == "Strategy"
+        assert node["description"] == "定期定额投资"
+
+    def test_skips_invalid_relations(self, builder):
+        """过滤空端点、空关系词和自环"""
+        builder.add_result({
+            "entities": [],
+            "relations": [
+                {"source": "", "target": "定投", "relation": "推荐"},
+                {"source": "定投", "target": "定投", "relation": "包含"},
+                {"source": "定投", "target": "指数基金", "relation": ""},
+                {"source": "《定投》", "target": "定投", "relation": "包含"}
+            ]
+        })
+
+        graph = builder.build()
+        assert graph["edges"] == []
+        assert graph["stats"]["normalized_nodes"] == 1
+
+    def test_matches_normalize_graph_nodes(self, builder):
+        """节点合并结果与 normalize_graph 一致"""
+        normalizer = KnowledgeGraphNormalizer({'provenance': 'none'})
+        names = ["指数基金", "标普500指数基金", "《指数基金》", "定投", "定投策略", "长期投资"]
+
+        builder.add_result({"entities": [{"name": n, "type": "Concept"} for n in names],
+                            "relations": []})
+        expected = normalizer.normalize_graph({
+            "nodes": [{"id": n, "label": n, "type": "Concept"} for n in names],
+            "edges": []
+        })
+
+        assert [n["id"] for n in builder.build()["nodes"]] == [n["id"] for n in expected["nodes"]]
+
+    def test_default_normalizer_drops_provenance(self):
+        """默认构建器（入库路径）不保留来源数据"""
+        builder = IncrementalGraphBuilder()
+        builder.add_result({"entities": [{"name": "定投", "type": "Concept"},
+                                         {"name": "指数基金", "type": "Concept"}],
+                            "relations": [{"source": "定投", "target": "指数基金", "relation": "投资"}]})
+        graph = builder.build()
+
+        assert all("original" not in node for node in graph["nodes"])
+        assert all("original" not in edge for edge in graph["edges"])
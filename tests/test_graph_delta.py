@@ -0,0 +1,186 @@
+"""
+Test Graph Delta
+测试文档重新处理时的增量写入（模拟驱动，不需要真实数据库）
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.core.storage.graph_delta import compute_graph_delta
+from backend.core.storage.neo4j import Neo4jStorage
+
+
+OLD_NODES = [
+    {"id": "李笑来", "label": "李笑来", "type": "Person", "description": "作者", "doc_ids": ["doc1"]},
+    {"id": "定投", "label": "定投", "type": "Strategy", "description": "", "doc_ids": ["doc1", "doc2"]},
+    {"id": "旧概念", "label": "旧概念", "type": "Concept", "description": "", "doc_ids": ["doc1"]}
+]
+
+OLD_EDGES = [
+    {"source": "李笑来", "target": "定投", "rel_type": "RECOMMENDS", "label": "推荐", "weight": 1},
+    {"source": "李笑来", "target": "旧概念", "rel_type": "ADVOCATES", "label": "主张", "weight": 1}
+]
+
+
+@pytest.fixture
+def new_graph():
+    """李笑来描述修改、旧概念移除、新增指数基金；一条边不变、一条移除、一条新增"""
+    return {
+        "nodes": [
+            {"id": "李笑来", "label": "李笑来", "type": "Person", "description": "投资者和作家"},
+            {"id": "定投", "label": "定投", "type": "Strategy", "description": ""},
+            {"id": "指数基金", "label": "指数基金", "type": "Concept", "description": ""}
+        ],
+        "edges": [
+            {"source": "李笑来", "target": "定投", "label": "推荐", "weight": 1},
+            {"source": "定投", "target": "指数基金", "label": "推荐", "weight": 1}
+        ]
+    }
+
+
+@pytest.mark.unit
+class TestComputeGraphDelta:
+    """测试差异计算"""
+
+    def test_delta_counts(self, new_graph):
+        """新增 / 修改 / 移除 / 不变分别统计"""
+        delta = compute_graph_delta(OLD_NODES, OLD_EDGES, new_graph, "doc1")
+
+        assert delta["counts"] == {
+            "nodes_added": 1, "nodes_changed": 1, "nodes_removed": 1, "nodes_unchanged": 1,
+            "edges_added": 1, "edges_changed": 0, "edges_removed": 1, "edges_unchanged": 1
+        }
+        assert [row["id"] for row in delta["nodes_added"]] == ["指数基金"]
+        assert [row["id"] for row in delta["nodes_changed"]] == ["李笑来"]
+        assert delta["nodes_removed"] == ["旧概念"]
+        assert delta["edges_removed"] == [
+            {"source": "李笑来", "rel_type": "ADVOCATES", "target": "旧概念"}
+        ]
+        assert list(delta["edges_upsert"]) == ["RECOMMENDS"]
+
+    def test_identical_graph_has_no_delta(self):
+        """数据未变化时没有任何写入"""
+        graph = {
+            "nodes": [{k: v for k, v in node.items() if k != "doc_ids"} for node in OLD_NODES],
+            "edges": [{"source": e["source"], "target": e["target"], "label": e["label"], "weight": 1}
+                      for e in OLD_EDGES]
+        }
+
+        delta = compute_graph_delta(OLD_NODES, OLD_EDGES, graph, "doc1")
+
+        assert not delta["nodes_added"] and not delta["nodes_changed"] and not delta["nodes_removed"]
+        assert not delta["edges_upsert"] and not delta["edges_removed"]
+
+    def test_shared_node_only_fills_empty_description(self):
+        """共享节点的标签和类型不被本文档覆盖，只补全空描述"""
+        graph = {"nodes": [{"id": "定投", "label": "定投策略", "type": "Concept", "description": ""}],
+                 "edges": []}
+        assert not compute_graph_delta(OLD_NODES, [], graph, "doc1")["nodes_changed"]
+
+        graph["nodes"][0]["description"] = "定期定额投资"
+        assert compute_graph_delta(OLD_NODES, [], graph, "doc1")["counts"]["nodes_changed"] == 1
+
+    def test_edge_weight_change(self):
+        """边的权重变化计为修改"""
+        graph = {"nodes": OLD_NODES[:2], "edges": [
+            {"source": "李笑来", "target": "定投", "label": "推荐", "weight": 3}
+        ]}
+
+        counts = compute_graph_delta(OLD_NODES[:2], OLD_EDGES[:1], graph, "doc1")["counts"]
+
+        assert counts["edges_changed"] == 1
+        assert counts["edges_added"] == 0
+
+    def test_edge_with_foreign_endpoint_rejected(self, new_graph):
+        """端点不在新图谱节点中的边剔除，不写入也不计入差异"""
+        new_graph["edges"].append({"source": "其他文档实体", "target": "定投", "label": "推荐"})
+
+        delta = compute_graph_delta(OLD_NODES, OLD_EDGES, new_graph, "doc1")
+
+        assert delta["rejected"] == 1
+        assert delta["counts"]["edges_added"] == 1
+        assert all(row["source"] != "其他文档实体"
+                   for rows in delta["edges_upsert"].values() for row in rows)
+
+
+def make_storage(old_nodes, old_edges):
+    """创建模拟存储：文档目录中已有 doc1 的足迹"""
+    storage = Neo4jStorage.__new__(Neo4jStorage)
+    storage.driver = MagicMock()
+    session = storage.driver.session.return_value.__enter__.return_value
+    tx = session.begin_transaction.return_value.__enter__.return_value
+
+    def run(query, **params):
+        if "as rel_type" in query:
+            return iter(old_edges)
+        if "n.doc_ids as doc_ids" in query:
+            return iter(old_nodes)
+        result = MagicMock()
+        rows = params.get("rows") or params.get("ids")
+        result.single.return_value = {"written": len(rows) if rows else 0, "found": 1,
+                                      "deleted": len(rows) if rows else 0, "touched": []}
+        return result
+
+    tx.run.side_effect = run
+    return storage, tx
+
+
+@pytest.mark.unit
+class TestSaveGraphDelta:
+    """测试 save_graph_batch 的增量覆盖"""
+
+    def test_delta_writes_only_changes(self, new_graph, monkeypatch):
+        """只删除移除的数据、只写入新增和修改的数据"""
+        monkeypatch.setenv("NEO4J_OVERWRITE_MODE", "delta")
+        storage, tx = make_storage(OLD_NODES, OLD_EDGES)
+
+        stats = storage.save_graph_batch(new_graph, "doc1")
+
+        executed = [c.args[0] for c in tx.run.call_args_list]
+        node_merges = [c for c in tx.run.call_args_list if "MERGE (n:Entity" in c.args[0]]
+        assert [row["id"] for row in node_merges[0].kwargs["rows"]] == ["指数基金"]
+        assert stats["mode"] == "delta"
+        assert stats["nodes_created"] == 1
+        assert stats["edges_created"] == 1
+        assert stats["deleted_edges"] == 1
+        # 不再整体删除文档的全部关系
+        assert not any("DELETE r" in q and "UNWIND" not in q for q in executed)
+
+    def test_delta_removes_edge_from_unmentioned_source(self, new_graph, monkeypatch):
+        """旧数据中起点不属于本文档的边进入足迹，新图谱不再包含时删除"""
+        monkeypatch.setenv("NEO4J_OVERWRITE_MODE", "delta")
+        dangling = {"source": "其他文档实体", "target": "定投", "rel_type": "RECOMMENDS",
+                    "label": "推荐", "weight": 1}
+        storage, tx = make_storage(OLD_NODES, OLD_EDGES + [dangling])
+
+        stats = storage.save_graph_batch(new_graph, "doc1")
+
+        footprint = next(c.args[0] for c in tx.run.call_args_list if "as rel_type" in c.args[0])
+        assert "(:Entity)-[r]-(:Entity)" in footprint
+        delete_rows = next(c.kwargs["rows"] for c in tx.run.call_args_list
+                           if "DELETE r" in c.args[0])
+        assert {"source": "其他文档实体", "rel_type": "RECOMMENDS", "target": "定投"} in delete_rows
+        assert stats["delta"]["edges_removed"] == 2
+
+    def test_unchanged_document_skips_writes(self, monkeypatch):
+        """重新处理结果相同时不执行写入和度数刷新"""
+        monkeypatch.setenv("NEO4J_OVERWRITE_MODE", "delta")
+        storage, tx = make_storage(OLD_NODES[:1], [])
+        graph = {"nodes": [{"id": "李笑来", "label": "李笑来", "type": "Person", "description": "作者"}],
+                 "edges": []}
+
+        stats = storage.save_graph_batch(graph, "doc1")
+
+        executed = [c.args[0] for c in tx.run.call_args_list]
+        assert stats["delta"]["nodes_unchanged"] == 1
+        assert not any("MERGE" in q or "SET" in q for q in executed)
+
+    def test_rewrite_mode(self, new_graph, monkeypatch):
+        """NEO4J_OVERWRITE_MODE=rewrite 时沿用删除后重建"""
+        monkeypatch.setenv("NEO4J_OVERWRITE_MODE", "rewrite")
+        storage, tx = make_storage(OLD_NODES, OLD_EDGES)
+
+        stats = storage.save_graph_batch(new_graph, "doc1")
+
+        assert "mode" not in stats
+        assert stats["nodes_created"] == 3
@@ -0,0 +1,270 @@
+"""
+Test Graph Index
+测试进程内图谱邻接索引（CSR 构建、N 跳扩展、增量维护）
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from backend.management.graph_index import GraphIndex
+from backend.management.kg_manager import KnowledgeGraphManager
+
+
+PAGES = [
+    {"nodes": [{"id": "李笑来", "label": "李笑来", "degree": 2},
+               {"id": "财富自由之路", "label": "财富自由之路", "degree": 2}],
+     "edges": [{"source": "李笑来", "target": "财富自由之路", "label": "著作"},
+               {"source": "财富自由之路", "target": "注意力", "label": "讨论"}]},
+    {"nodes": [{"id": "注意力", "label": "注意力", "degree": 1},
+               {"id": "孤立概念", "label": "孤立概念", "degree": 0}],
+     "edges": []}
+]
+
+
+def ids(nodes):
+    return sorted(node["id"] for node in nodes)
+
+
+@pytest.mark.unit
+class TestGraphIndex:
+    """测试 CSR 索引"""
+
+    @pytest.fixture
+    def index(self):
+        index = GraphIndex()
+        index.rebuild(PAGES)
+        return index
+
+    def test_rebuild_from_pages(self, index):
+        """边先于端点节点所在的页出现时，节点数据在后续页补全"""
+        assert index.stale is False
+        assert index.get_stats()["nodes"] == 4
+        assert index.get_stats()["edges"] == 2
+        assert index.nodes[index.id_to_idx["注意力"]]["label"] == "注意力"
+        # CSR：每条边在两个端点下各出现一次
+        assert index.offsets[-1] == 4
+
+    def test_neighborhood_hops(self, index):
+        """N 跳扩展返回节点和经过的边"""
+        nodes, edges = index.neighborhood(["李笑来"], n_hops=1)
+        assert ids(nodes) == ["李笑来", "财富自由之路"]
+        assert [e["label"] for e in edges] == ["著作"]
+
+        nodes, edges = index.neighborhood(["李笑来"], n_hops=2)
+        assert ids(nodes) == ["李笑来", "注意力", "财富自由之路"]
+        assert len(edges) == 2
+
+    def test_neighborhood_unknown_and_isolated(self, index):
+        """不存在的种子忽略，孤立节点只返回自身"""
+        assert index.neighborhood(["不存在"], n_hops=2) == ([], [])
+        nodes, edges = index.neighborhood(["孤立概念", "不存在"], n_hops=2)
+        assert ids(nodes) == ["孤立概念"]
+        assert edges == []
+
+    def test_results_are_copies(self, index):
+        """修改返回结果不影响索引"""
+        nodes, _ = index.neighborhood(["李笑来"], n_hops=0)
+        nodes[0]["label"] = "changed"
+        assert index.nodes[index.id_to_idx["李笑来"]]["label"] == "李笑来"
+
+    def test_add_graph_incremental(self, index):
+        """增量追加新节点和新边，重复的边忽略，端点度数递增"""
+        index.add_graph({
+            "nodes": [{"id": "注意力", "description": "稀缺资源"}, {"id": "时间", "label": "时间"}],
+            "edges": [{"source": "注意力", "target": "时间", "label": "相关"},
+                      {"source": "李笑来", "target": "财富自由之路", "label": "著作"}]
+        })
+
+        assert index.get_stats()["edges"] == 3
+        nodes, _ = index.neighborhood(["时间"], n_hops=2)
+        assert ids(nodes) == ["时间", "注意力", "财富自由之路"]
+        attention = index.nodes[index.id_to_idx["注意力"]]
+        assert attention["degree"] == 2
+        assert attention["description"] == "稀缺资源"
+
+    def test_csr_rebuilt_lazily(self, index):
+        """多次追加只在下次查询时重排一次 CSR"""
+        with patch.object(index, "_build_csr", wraps=index._build_csr) as build:
+            index.add_graph({"nodes": [{"id": "时间"}],
+                             "edges": [{"source": "时间", "target": "注意力", "label": "相关"}]})
+            index.add_graph({"nodes": [{"id": "孤岛"}],
+                             "edges": [{"source": "孤岛", "target": "时间", "label": "相关"}]})
+            assert build.call_count == 0
+
+            nodes, _ = index.neighborhood(["孤岛"], n_hops=2)
+            index.neighborhood(["时间"], n_hops=1)
+            assert build.call_count == 1
+        assert ids(nodes) == ["孤岛", "时间", "注意力"]
+
+    def test_new_isolated_node_queryable(self, index):
+        """只新增节点（无边）时查询仍然正确"""
+        index.add_graph({"nodes": [{"id": "孤立节点"}], "edges": []})
+        assert index.neighborhood(["孤立节点"], n_hops=2)[0][0]["id"] == "孤立节点"
+
+    def test_add_graph_ignored_while_stale(self):
+        """失效（未构建）的索引不接受增量，等待重建"""
+        index = GraphIndex()
+        index.add_graph({"nodes": [{"id": "a"}], "edges": []})
+        assert index.nodes == []
+
+        load = MagicMock(return_value=PAGES)
+        index.ensure_fresh(load)
+        index.ensure_fresh(load)
+        load.assert_called_once()
+
+        index.invalidate()
+        index.ensure_fresh(load)
+        assert load.call_count == 2
+
+
+@pytest.mark.unit
+class TestManagerGraphIndex:
+    """测试管理器对邻接索引的维护"""
+
+    @pytest.fixture
+    def manager(self):
+        with patch('backend.management.kg_manager.get_neo4j_storage') as get_storage:
+            storage = MagicMock()
+            storage.iter_graph_pages.side_effect = lambda page_size: iter(PAGES)
+            storage.save_graph_batch.return_value = {"nodes_created": 1, "edges_created": 1}
+            storage.document_entity_ids.return_value = []
+            get_storage.return_value = storage
+            yield KnowledgeGraphManager(use_neo4j=True, use_component_index=False)
+
+    def test_index_built_once(self, manager):
+        """首次使用时构建，之后复用"""
+        index = manager.get_graph_index()
+        assert manager.get_graph_index() is index
+        assert manager.neo4j_storage.iter_graph_pages.call_count == 1
+
+    def test_save_appends_and_delete_invalidates(self, manager):
+        """保存新文档增量追加；删除后下次使用时重建"""
+        manager.get_graph_index()
+        manager.save_document("doc2", {
+            "nodes": [{"id": "时间"}], "edges": [{"source": "时间", "target": "注意力", "label": "相关"}],
+            "stats": {}
+        })
+        assert manager.graph_index.has("时间")
+        assert manager.neo4j_storage.iter_graph_pages.call_count == 1
+
+        manager.delete_document("doc2")
+        assert manager.graph_index.stale is True
+        assert not manager.get_graph_index().has("时间")
+
+    def test_overwrite_invalidates(self, manager):
+        """覆盖写入删除了旧数据时标记失效"""
+        manager.get_graph_index()
+        manager.neo4j_storage.save_graph_batch.return_value = {"deleted_edges": 3, "deleted_nodes": 0}
+        manager.save_document("doc1", {"nodes": [], "edges": [], "stats": {}})
+        assert manager.graph_index.stale is True
+
+    def test_additive_delta_appends(self, manager):
+        """只有新增的增量写入照常追加，不触发重建"""
+        manager.get_graph_index()
+        counts = {"nodes_added": 1, "nodes_changed": 0, "nodes_removed": 0,
+                  "edges_added": 1, "edges_changed": 0, "edges_removed": 0}
+        manager.neo4j_storage.save_graph_batch.return_value = {
+            "nodes_created": 1, "edges_created": 1, "mode": "delta", "delta": counts}
+        manager.save_document("doc1", {
+            "nodes": [{"id": "时间"}], "edges": [{"source": "时间", "target": "注意力", "label": "相关"}],
+            "stats": {}
+        })
+
+        assert manager.graph_index.stale is False
+        assert manager.graph_index.has("时间")
+        assert manager.neo4j_storage.iter_graph_pages.call_count == 1
+
+    def test_delta_with_changes_invalidates(self, manager):
+        """增量写入修改或删除了已有数据时标记失效"""
+        manager.get_graph_index()
+        counts = {"nodes_added": 0, "nodes_changed": 1, "nodes_removed": 0,
+                  "edges_added": 0, "edges_changed": 0, "edges_removed": 0}
+        manager.neo4j_storage.save_graph_batch.return_value = {"mode": "delta", "delta": counts}
+        manager.save_document("doc1", {"nodes": [], "edges": [], "stats": {}})
+        assert manager.graph_index.stale is True
+
+
+def star_pages():
+    """种子 s 连接 h0..h2；h0 连接一个有 50 个叶子的枢纽节点"""
+    edges = [{"source": "s", "target": f"h{i}", "label": "相关"} for i in range(3)]
+    edges += [{"source": "h0", "target": "hub", "label": "相关"},
+              {"source": "h1", "target": "h2", "label": "相关"}]
+    edges += [{"source": "hub", "target": f"leaf{i}", "label": "包含"} for i in range(50)]
+    return [{"nodes": [], "edges": edges}]
+
+
+@pytest.mark.unit
+class TestPersonalizedPageRank:
+    """测试个性化 PageRank 排序"""
+
+    @pytest.fixture
+    def index(self):
+        index = GraphIndex()
+        index.rebuild(star_pages())
+        return index
+
+    def test_scores_form_distribution(self, index):
+        """邻域内全部节点的得分之和为 1，种子得分最高"""
+        nodes, _ = index.ranked_neighborhood(["s"], n_hops=2, max_nodes=1000)
+        assert sum(node["score"] for node in nodes) == pytest.approx(1.0, abs=1e-4)
+        assert nodes[0]["id"] == "s"
+        # 邻域只到 2 跳：枢纽的叶子不参与
+        assert not any(node["id"].startswith("leaf") for node in nodes)
+
+    def test_budget_prefers_relevant_nodes(self, index):
+        """预算内保留与种子连接紧密的节点，枢纽的大量叶子被截掉"""
+        nodes, edges = index.ranked_neighborhood(["s"], n_hops=3, max_nodes=5, max_edges=3)
+
+        assert [node["id"] for node in nodes][0] == "s"
+        assert {node["id"] for node in nodes} == {"s", "h0", "h1", "h2", "hub"}
+        assert len(edges) == 3
+        ids = {node["id"] for node in nodes}
+        assert all(e["source"] in ids and e["target"] in ids for e in edges)
+        assert [e["score"] for e in edges] == sorted((e["score"] for e in edges), reverse=True)
+
+    def test_seeds_always_kept(self, index):
+        """种子总是保留，没有邻居的种子得分为 1"""
+        nodes, _ = index.ranked_neighborhood(["s", "leaf3"], n_hops=1, max_nodes=2)
+        assert {node["id"] for node in nodes} == {"s", "leaf3"}
+
+        index.add_graph({"nodes": [{"id": "孤立"}], "edges": []})
+        nodes, edges = index.ranked_neighborhood(["孤立"], n_hops=2)
+        assert nodes[0]["score"] == 1.0
+        assert edges == []
+
+    def test_unknown_seed(self, index):
+        """没有匹配的种子时返回空结果"""
+        assert index.ranked_neighborhood(["不存在"]) == ([], [])
+
+
+@pytest.mark.unit
+class TestRetrieverRanking:
+    """测试检索器的 KG 排序模式"""
+
+    def make_retriever(self, monkeypatch, ranking):
+        from backend.retrieval.hybrid_retriever import HybridRetriever
+
+        monkeypatch.setenv("KG_RETRIEVAL_RANKING", ranking)
+        monkeypatch.setenv("KG_PPR_MAX_NODES", "5")
+        index = GraphIndex()
+        index.rebuild(star_pages())
+        manager = MagicMock()
+        manager.get_graph_index.return_value = index
+        with patch('backend.retrieval.hybrid_retriever.get_kg_manager', return_value=manager), \
+                patch('backend.retrieval.hybrid_retriever.get_vector_store'), \
+                patch('backend.retrieval.hybrid_retriever.OpenAI'):
+            return HybridRetriever()
+
+    def test_bfs_returns_whole_neighborhood(self, monkeypatch):
+        """bfs 模式返回 N 跳内全部节点"""
+        retriever = self.make_retriever(monkeypatch, "bfs")
+        entities, _ = retriever.retrieve_from_kg(["s"], n_hops=3)
+        assert len(entities) == 55
+
+    def test_ppr_respects_budget(self, monkeypatch):
+        """ppr 模式只返回预算内得分最高的节点"""
+        retriever = self.make_retriever(monkeypatch, "ppr")
+        entities, relations = retriever.retrieve_from_kg(["s"], n_hops=3)
+        assert [e["id"] for e in entities][0] == "s"
+        assert len(entities) == 5
+        assert all("score" in r for r in relations)
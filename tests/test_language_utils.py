@@ -0,0 +1,49 @@
+"""
+Test Language Utils
+测试语言检测
+"""
+
+import pytest
+
+from backend.core.language_utils import detect_language, detect_languages
+
+
+def reference_detect_language(text: str) -> str:
+    """逐字符统计的参考实现（原始规则：CJK 占比 > 50% 为中文）"""
+    if not text or not text.strip():
+        return "en"
+    text = text.strip()
+    cjk_count = sum(1 for c in text if '一' <= c <= '鿿')
+    return "zh" if (cjk_count / len(text)) > 0.5 else "en"
+
+
+CASES = [
+    "", "   ", "\n\t", "李笑来", "Warren Buffett", "标普500指数", "S&P 500",
+    "定投DCA", "定投 DCA", "ab定投", "a定", "定a", "a定投", "  定  ",
+    "一", "鿿", "䷿", "ꀀ", "日本語テキスト", "한국어",
+    "café", "naïve résumé", "《让时间陪你慢慢变富》", "“定投”", "定投。",
+]
+
+
+@pytest.mark.unit
+class TestDetectLanguage:
+    """测试语言检测快速路径"""
+
+    @pytest.mark.parametrize("text", CASES)
+    def test_matches_reference(self, text):
+        """快速路径与原始 >50% CJK 规则结果完全一致"""
+        assert detect_language(text) == reference_detect_language(text)
+
+    def test_ascii_shortcut(self):
+        """纯 ASCII 文本判定为英文"""
+        assert detect_language("value investing") == "en"
+        assert detect_language("123") == "en"
+
+    def test_batch_matches_single(self):
+        """批量接口结果与逐个检测一致，且保持输入顺序"""
+        texts = CASES + CASES[::-1]
+        assert detect_languages(texts) == [detect_language(t) for t in texts]
+
+    def test_batch_empty(self):
+        """空列表返回空列表"""
+        assert detect_languages([]) == []
@@ -0,0 +1,157 @@
+"""
+Test Async Neo4j Path
+测试 Neo4j 异步存储和管理器的异步读接口（模拟驱动，不需要真实数据库）
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.core.storage.neo4j_async import AsyncNeo4jStorage
+from backend.management.kg_manager import KnowledgeGraphManager
+
+
+class FakeAsyncResult:
+    """异步迭代的查询结果"""
+
+    def __init__(self, records):
+        self.records = records
+
+    def __aiter__(self):
+        self._iter = iter(self.records)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeAsyncSession:
+    """按查询内容返回预置记录"""
+
+    def __init__(self, responses, queries):
+        self.responses = responses
+        self.queries = queries
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def run(self, query, **params):
+        self.queries.append((query, params))
+        for marker, records in self.responses.items():
+            if marker in query:
+                return FakeAsyncResult(records)
+        return FakeAsyncResult([])
+
+
+def make_async_storage(responses):
+    """创建使用模拟异步驱动的存储，返回 (storage, queries)"""
+    queries = []
+    storage = AsyncNeo4jStorage.__new__(AsyncNeo4jStorage)
+    storage.driver = MagicMock()
+    storage.driver.session.side_effect = lambda: FakeAsyncSession(responses, queries)
+    storage.schema_version = 7
+    return storage, queries
+
+
+@pytest.mark.unit
+class TestAsyncNeo4jStorage:
+    """测试异步存储读查询"""
+
+    def test_list_documents(self):
+        """文档列表与同步存储格式一致"""
+        storage, _ = make_async_storage({
+            "MATCH (d:Document)": [{"doc_id": "doc1", "node_count": 3, "edge_count": None,
+                                    "updated_at": None}]
+        })
+
+        docs = asyncio.run(storage.list_documents())
+
+        assert docs == [{"doc_id": "doc1", "node_count": 3, "edge_count": 0, "updated_at": "N/A"}]
+
+    def test_load_document(self):
+        """读取文档节点和边"""
+        storage, queries = make_async_storage({
+            "(n:Entity)": [{"id": "定投"}],
+            "(:Entity)-[r]-(:Entity)": [{"source": "定投", "target": "指数基金"}]
+        })
+
+        graph = asyncio.run(storage.load_document("doc1"))
+
+        assert graph == {"nodes": [{"id": "定投"}], "edges": [{"source": "定投", "target": "指数基金"}]}
+        assert all(params == {"doc_id": "doc1"} for _, params in queries)
+
+    def test_get_stats_and_popular_labels(self):
+        """统计和热门标签"""
+        storage, _ = make_async_storage({
+            "CALL": [{"node_count": 5, "edge_count": 4, "document_count": 1}],
+            "n.degree IS NOT NULL": [{"id": "定投"}]
+        })
+
+        assert asyncio.run(storage.get_stats()) == {
+            "total_nodes": 5, "total_edges": 4, "total_documents": 1
+        }
+        assert asyncio.run(storage.get_popular_labels(limit=1)) == ["定投"]
+
+    def test_degree_migration_pending_uses_coalesce(self):
+        """度数迁移未执行时按 coalesce(n.degree, 0) 排序，没有度数的实体不被过滤"""
+        storage, queries = make_async_storage({
+            "SchemaMigration": [{"version": 5}],
+            "coalesce(n.degree, 0)": [{"id": "未回填实体", "label": "未回填实体", "type": "Concept",
+                                      "description": "", "doc_count": 1, "degree": 0}]
+        })
+        storage.schema_version = 0
+
+        assert asyncio.run(storage.get_popular_labels(limit=1)) == ["未回填实体"]
+        graph = asyncio.run(storage.get_all_graphs())
+        assert [node["id"] for node in graph["nodes"]] == ["未回填实体"]
+        assert not any("n.degree IS NOT NULL" in query for query, _ in queries)
+        assert storage.schema_version == 0
+
+
+@pytest.mark.unit
+class TestManagerAsyncReads:
+    """测试管理器的异步读接口"""
+
+    def test_uses_async_storage(self, mock_env_vars):
+        """有异步驱动时直接 await 异步存储"""
+        manager = KnowledgeGraphManager(use_neo4j=False)
+        manager.neo4j_storage = MagicMock()
+        storage, _ = make_async_storage({"n.degree IS NOT NULL": [{"id": "定投"}]})
+        manager._async_storage = storage
+
+        assert asyncio.run(manager.aget_popular_labels(5)) == ["定投"]
+        manager.neo4j_storage.get_popular_labels.assert_not_called()
+
+    def test_falls_back_to_thread(self, mock_env_vars, monkeypatch):
+        """关闭异步驱动时在线程池中执行同步查询"""
+        monkeypatch.setenv('NEO4J_ASYNC', 'false')
+        manager = KnowledgeGraphManager(use_neo4j=False)
+        manager.neo4j_storage = MagicMock()
+        manager.neo4j_storage.list_documents.return_value = [{"doc_id": "doc1"}]
+
+        assert asyncio.run(manager.alist_documents()) == [{"doc_id": "doc1"}]
+
+    def test_async_error_returns_default(self, mock_env_vars):
+        """异步查询失败时返回与同步接口一致的默认值"""
+        manager = KnowledgeGraphManager(use_neo4j=False)
+        manager.neo4j_storage = MagicMock()
+        manager._async_storage = MagicMock()
+        manager._async_storage.get_all_graphs.side_effect = Exception("connection refused")
+        manager._async_storage.get_stats.side_effect = Exception("connection refused")
+
+        assert asyncio.run(manager.aget_all_graphs()) == {"nodes": [], "edges": []}
+        assert "error" in asyncio.run(manager.aget_stats())
+
+    def test_no_neo4j(self):
+        """未启用 Neo4j 时与同步接口行为一致"""
+        manager = KnowledgeGraphManager(use_neo4j=False)
+
+        assert asyncio.run(manager.aget_popular_labels()) == []
+        assert "error" in asyncio.run(manager.aload_document("doc1"))
@@ -0,0 +1,545 @@
+"""
+Test Neo4j Storage
+测试 Neo4j 存储适配器（模拟驱动，不需要真实数据库）
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.core.storage.neo4j import Neo4jStorage
+
+
+def make_storage():
+    """创建使用模拟驱动的存储实例，返回 (storage, tx)"""
+    storage = Neo4jStorage.__new__(Neo4jStorage)
+    storage.driver = MagicMock()
+    session = storage.driver.session.return_value.__enter__.return_value
+    tx = session.begin_transaction.return_value.__enter__.return_value
+
+    def run(query, **params):
+        result = MagicMock()
+        rows = params.get("rows")
+        result.single.return_value = {"written": len(rows) if rows else 0,
+                                      "deleted": 0, "found": 1}
+        return result
+
+    tx.run.side_effect = run
+    storage.schema_state = {"version": 7, "latest": 7}
+    return storage, tx
+
+
+def queries(tx):
+    """所有执行过的查询文本"""
+    return [c.args[0] for c in tx.run.call_args_list]
+
+
+@pytest.fixture
+def graph():
+    """三个节点、三条边（两种关系类型）"""
+    return {
+        "nodes": [
+            {"id": "李笑来", "label": "李笑来", "type": "Person", "description": "作者"},
+            {"id": "定投", "label": "定投", "type": "Strategy", "description": ""},
+            {"id": "指数基金", "label": "指数基金", "type": "Concept", "description": ""}
+        ],
+        "edges": [
+            {"source": "李笑来", "target": "定投", "label": "推荐", "weight": 1},
+            {"source": "定投", "target": "指数基金", "label": "推荐", "weight": 1},
+            {"source": "李笑来", "target": "指数基金", "label": "主张", "weight": 1}
+        ]
+    }
+
+
+def merge_calls(tx):
+    """过滤出写入节点/关系的 tx.run 调用"""
+    return [c for c in tx.run.call_args_list
+            if "MERGE (n:Entity" in c.args[0] or "MERGE (s)-[r:" in c.args[0]]
+
+
+@pytest.mark.unit
+class TestSaveGraphBatch:
+    """测试批量写入"""
+
+    def test_unwind_mode_batches_rows(self, graph, monkeypatch):
+        """UNWIND 模式：一批节点一条查询，每种关系类型一条查询"""
+        monkeypatch.setenv("NEO4J_WRITE_MODE", "unwind")
+        storage, tx = make_storage()
+
+        stats = storage.save_graph_batch(graph, "doc1", overwrite=False)
+
+        calls = merge_calls(tx)
+        assert len(calls) == 3
+        assert len(calls[0].kwargs["rows"]) == 3
+        assert ":RECOMMENDS]" in calls[1].args[0]
+        assert len(calls[1].kwargs["rows"]) == 2
+        assert ":ADVOCATES]" in calls[2].args[0]
+        assert stats["nodes_created"] == 3
+        assert stats["edges_created"] == 3
+        assert stats["failed"] == 0
+
+    def test_unwind_mode_respects_batch_size(self, graph, monkeypatch):
+        """按 NEO4J_BATCH_SIZE 切分批次"""
+        monkeypatch.setenv("NEO4J_WRITE_MODE", "unwind")
+        monkeypatch.setenv("NEO4J_BATCH_SIZE", "2")
+        storage, tx = make_storage()
+
+        storage.save_graph_batch(graph, "doc1", overwrite=False)
+
+        node_calls = [c for c in merge_calls(tx) if "MERGE (n:Entity" in c.args[0]]
+        assert [len(c.kwargs["rows"]) for c in node_calls] == [2, 1]
+
+    def test_unwind_mode_counts_failed_rows(self, graph, monkeypatch):
+        """缺少 id 的节点和端点不存在的边按行计入失败数"""
+        monkeypatch.setenv("NEO4J_WRITE_MODE", "unwind")
+        storage, tx = make_storage()
+        graph["nodes"].append({"id": "", "label": ""})
+
+        def run(query, **params):
+            result = MagicMock()
+            rows = params.get("rows") or []
+            # 模拟一条边的端点不存在
+            written = len(rows) - 1 if "RECOMMENDS" in query else len(rows)
+            result.single.return_value = {"written": written, "deleted": 0}
+            return result
+
+        tx.run.side_effect = run
+        stats = storage.save_graph_batch(graph, "doc1", overwrite=False)
+
+        assert stats["nodes_created"] == 3
+        assert stats["edges_created"] == 2
+        assert stats["failed"] == 2
+
+    def test_row_mode_issues_one_query_per_row(self, graph, monkeypatch):
+        """逐行模式保留旧行为：每个节点、每条边一条查询"""
+        monkeypatch.setenv("NEO4J_WRITE_MODE", "row")
+        storage, tx = make_storage()
+
+        stats = storage.save_graph_batch(graph, "doc1", overwrite=False)
+
+        assert len(merge_calls(tx)) == 6
+        assert stats["nodes_created"] == 3
+        assert stats["edges_created"] == 3
+
+    @pytest.mark.parametrize("write_mode", ["unwind", "row"])
+    def test_edge_with_foreign_endpoint_rejected(self, graph, write_mode, monkeypatch):
+        """端点不在本文档节点中的边不写入：删除文档时经 MENTIONS 找不到这类边"""
+        monkeypatch.setenv("NEO4J_WRITE_MODE", write_mode)
+        storage, tx = make_storage()
+        # 丙由其他文档创建，本文档没有保存该节点
+        graph["edges"].append({"source": "丙", "target": "定投", "label": "推荐", "weight": 1})
+
+        stats = storage.save_graph_batch(graph, "doc1", overwrite=False)
+
+        written = [row["source"] for c in merge_calls(tx) if "MERGE (s)-[r:" in c.args[0]
+                   for row in c.kwargs.get("rows") or [c.kwargs]]
+        assert "丙" not in written
+        assert stats["edges_created"] == 3
+        assert stats["failed"] == 1
+
+        storage.delete_by_doc("doc1")
+        assert any("[m:MENTIONS]" in q for q in queries(tx))
+
+    def test_save_links_document_catalog(self, graph):
+        """保存时创建文档节点，节点写入建立 MENTIONS 关联，最后更新文档统计"""
+        storage, tx = make_storage()
+
+        storage.save_graph_batch(graph, "doc1", overwrite=False)
+
+        executed = queries(tx)
+        assert "MERGE (d:Document {id: $doc_id})" in executed[0]
+        assert "MERGE (d)-[:MENTIONS]->(n)" in merge_calls(tx)[0].args[0]
+        counts_at = next(i for i, q in enumerate(executed) if "d.node_count" in q)
+        assert counts_at > executed.index(merge_calls(tx)[-1].args[0])
+
+    def test_save_refreshes_degrees(self, graph, monkeypatch):
+        """覆盖重建时重算写入节点和旧足迹端点的度数"""
+        monkeypatch.setenv("NEO4J_OVERWRITE_MODE", "rewrite")
+        storage, tx = make_storage()
+
+        def run(query, **params):
+            result = MagicMock()
+            rows = params.get("rows")
+            result.single.return_value = {"written": len(rows) if rows else 0, "found": 1,
+                                          "deleted": 1, "touched": ["旧邻居"]}
+            return result
+
+        tx.run.side_effect = run
+        storage.save_graph_batch(graph, "doc1")
+
+        degree_calls = [c for c in tx.run.call_args_list if "n.degree" in c.args[0]]
+        assert len(degree_calls) == 1
+        assert degree_calls[0].kwargs["ids"] == ["定投", "指数基金", "旧邻居", "李笑来"]
+
+
+@pytest.mark.unit
+class TestDeleteByDoc:
+    """测试按文档删除"""
+
+    def test_delete_uses_document_footprint(self):
+        """有文档节点时只遍历该文档的 MENTIONS 足迹，不扫描全图"""
+        storage, tx = make_storage()
+
+        storage.delete_by_doc("doc1")
+
+        executed = queries(tx)
+        assert all("{doc_id: $doc_id}]->()" not in q for q in executed)
+        assert any("[m:MENTIONS]" in q for q in executed)
+        assert any("DETACH DELETE d" in q for q in executed)
+
+    def test_delete_legacy_document_falls_back_to_scan(self):
+        """没有文档节点的旧数据回退到扫描删除"""
+        storage, tx = make_storage()
+
+        def run(query, **params):
+            result = MagicMock()
+            result.single.return_value = {"found": 0, "deleted": 2}
+            return result
+
+        tx.run.side_effect = run
+        stats = storage.delete_by_doc("legacy_doc")
+
+        assert stats == {"nodes_deleted": 2, "edges_deleted": 2}
+        assert any("$doc_id IN n.doc_ids" in q for q in queries(tx))
+
+
+@pytest.mark.unit
+class TestMergeDuplicateIds:
+    """测试合并重复实体（创建唯一约束前执行）"""
+
+    def test_merges_into_first_node(self):
+        """同 id 的多余节点合并到第一个节点"""
+        storage, tx = make_storage()
+        session = storage.driver.session.return_value.__enter__.return_value
+        session.run.return_value = [{"id": "定投", "element_ids": ["e1", "e2", "e3"]}]
+        storage._merge_nodes = MagicMock(return_value=0)
+
+        merged = storage.merge_duplicate_ids()
+
+        assert merged == 2
+        assert [c.args[1:] for c in storage._merge_nodes.call_args_list] == [("e2", "e1"), ("e3", "e1")]
+
+    def test_no_duplicates(self):
+        """没有重复实体时不开启事务"""
+        storage, tx = make_storage()
+        session = storage.driver.session.return_value.__enter__.return_value
+        session.run.return_value = []
+
+        assert storage.merge_duplicate_ids() == 0
+        session.begin_transaction.assert_not_called()
+
+
+@pytest.mark.unit
+class TestRenameEntity:
+    """测试重新规范化使用的实体重命名"""
+
+    def make_rename_storage(self, target):
+        storage, tx = make_storage()
+        storage._merge_nodes = MagicMock(return_value=2)
+
+        def run(query, **params):
+            result = MagicMock()
+            result.single.return_value = {"source": "e1", "target": target}
+            return result
+
+        tx.run.side_effect = run
+        return storage, tx
+
+    def test_rename_when_target_missing(self):
+        """新 ID 不存在时在同一事务内改名"""
+        storage, tx = self.make_rename_storage(target=None)
+
+        stats = storage.rename_entity("《定投》", "定投")
+
+        assert stats == {"renamed": 1, "merged": 0, "relations_moved": 0}
+        assert any("SET n.id = $new_id" in q for q in queries(tx))
+        storage._merge_nodes.assert_not_called()
+
+    def test_merge_when_target_exists(self):
+        """新 ID 已存在时合并，不触发唯一约束"""
+        storage, tx = self.make_rename_storage(target="e2")
+
+        stats = storage.rename_entity("《定投》", "定投")
+
+        assert stats == {"renamed": 0, "merged": 1, "relations_moved": 2}
+        assert not any("SET n.id" in q for q in queries(tx))
+
+    def test_constraint_conflict_falls_back_to_merge(self):
+        """并发写入在检查后创建了同名实体：改名违反约束时回退到合并"""
+        storage, tx = self.make_rename_storage(target=None)
+        original = tx.run.side_effect
+
+        def run(query, **params):
+            if "SET n.id" in query:
+                raise Exception("Node already exists with label `Entity` and property `id`")
+            return original(query, **params)
+
+        tx.run.side_effect = run
+        storage.merge_entities = MagicMock(return_value={"merged": 1, "relations_moved": 3})
+
+        stats = storage.rename_entity("《定投》", "定投")
+
+        storage.merge_entities.assert_called_once_with("《定投》", "定投")
+        assert stats == {"renamed": 0, "merged": 1, "relations_moved": 3}
+
+
+@pytest.mark.unit
+class TestDegrees:
+    """测试度数维护"""
+
+    def test_delete_refreshes_neighbors(self):
+        """删除文档后重算删除边端点和被删节点邻居的度数"""
+        storage, tx = make_storage()
+
+        def run(query, **params):
+            result = MagicMock()
+            result.single.return_value = {"found": 1, "deleted": 1, "touched": ["定投", "普通人"]}
+            return result
+
+        tx.run.side_effect = run
+        storage.delete_by_doc("doc1")
+
+        degree_calls = [c for c in tx.run.call_args_list if "n.degree" in c.args[0]]
+        assert degree_calls[0].kwargs["ids"] == ["定投", "普通人"]
+
+    def test_refresh_degrees_batches(self):
+        """按批次重算，空集合不执行查询"""
+        storage, tx = make_storage()
+
+        storage.refresh_degrees(set(), tx=tx)
+        assert tx.run.call_count == 0
+
+        storage.refresh_degrees({"c", "a", "b"}, tx=tx, batch_size=2)
+        assert [c.kwargs["ids"] for c in tx.run.call_args_list] == [["a", "b"], ["c"]]
+
+    def test_popular_labels_read_degree_index(self):
+        """热门标签按 degree 属性排序，不做关系聚合"""
+        storage, tx = make_storage()
+        session = storage.driver.session.return_value.__enter__.return_value
+        session.run.return_value = [{"id": "定投"}, {"id": "李笑来"}]
+
+        assert storage.get_popular_labels(limit=2) == ["定投", "李笑来"]
+        query = session.run.call_args.args[0]
+        assert "ORDER BY n.degree DESC" in query
+        assert "count(" not in query
+
+    @pytest.mark.parametrize("schema_state", [{}, {"version": 5, "latest": 7}])
+    def test_degree_migration_pending_uses_coalesce(self, schema_state):
+        """未自动迁移或度数迁移未执行时，没有 degree 的实体仍出现在热门标签和全图中"""
+        storage, _ = make_storage()
+        storage.schema_state = schema_state
+        session = storage.driver.session.return_value.__enter__.return_value
+
+        def run(query, **params):
+            if "SchemaMigration" in query:
+                result = MagicMock()
+                result.single.return_value = {"version": 5}
+                return result
+            if "RETURN n.id as id\n" in query:
+                return [{"id": "未回填实体"}]
+            if "MATCH (n:Entity)" in query:
+                return [{"id": "未回填实体", "label": "未回填实体", "type": "Concept",
+                         "description": "", "doc_count": 1, "degree": 0}]
+            return []
+
+        session.run.side_effect = run
+
+        assert storage.get_popular_labels(limit=1) == ["未回填实体"]
+        assert [node["id"] for node in storage.get_all_graphs()["nodes"]] == ["未回填实体"]
+        executed = [c.args[0] for c in session.run.call_args_list]
+        assert not any("n.degree IS NOT NULL" in query for query in executed)
+        assert sum("coalesce(n.degree, 0)" in query for query in executed) == 2
+
+    def test_degree_migration_applied_later(self):
+        """迁移在运行中完成后切换到度数索引查询"""
+        storage, _ = make_storage()
+        storage.schema_state = {}
+        session = storage.driver.session.return_value.__enter__.return_value
+        session.run.return_value.single.return_value = {"version": 7}
+
+        storage.get_popular_labels(limit=1)
+
+        assert "n.degree IS NOT NULL" in session.run.call_args.args[0]
+        assert storage.schema_state["version"] == 7
+
+
+@pytest.mark.unit
+class TestRelationMode:
+    """测试 single 关系存储模式"""
+
+    def test_single_mode_one_parameterized_query(self, graph, monkeypatch):
+        """所有关系类型合并为一条固定文本的查询，类型作为行参数"""
+        monkeypatch.setenv("NEO4J_RELATION_MODE", "single")
+        storage, tx = make_storage()
+
+        stats = storage.save_graph_batch(graph, "doc1", overwrite=False)
+
+        edge_calls = [c for c in merge_calls(tx) if "MERGE (s)-[r:" in c.args[0]]
+        assert len(edge_calls) == 1
+        assert "MERGE (s)-[r:RELATES {type: row.rel_type}]->(t)" in edge_calls[0].args[0]
+        assert {row["rel_type"] for row in edge_calls[0].kwargs["rows"]} == {"RECOMMENDS", "ADVOCATES"}
+        assert stats["edges_created"] == 3
+
+    def test_single_mode_reads_relates_only(self, monkeypatch):
+        """读取文档边时按 RELATES 类型展开"""
+        monkeypatch.setenv("NEO4J_RELATION_MODE", "single")
+        storage, _ = make_storage()
+        session = storage.driver.session.return_value.__enter__.return_value
+        session.run.return_value = iter([])
+
+        storage.load_document("doc1")
+
+        edge_query = session.run.call_args_list[-1].args[0]
+        assert "(:Entity)-[r:RELATES]-(:Entity)" in edge_query
+        assert "r.type" in edge_query
+
+
+@pytest.mark.unit
+class TestGetStats:
+    """测试统计查询"""
+
+    def test_stats_from_count_store(self):
+        """节点、关系、文档数均为无过滤计数，边数扣除 MENTIONS"""
+        storage, tx = make_storage()
+        session = storage.driver.session.return_value.__enter__.return_value
+        session.run.return_value.single.return_value = {
+            "node_count": 10, "edge_count": 15, "document_count": 2
+        }
+
+        stats = storage.get_stats()
+
+        assert stats == {"total_nodes": 10, "total_edges": 15, "total_documents": 2}
+        query = session.run.call_args.args[0]
+        assert "OPTIONAL MATCH" not in query
+        assert "rel_count - mention_count" in query
+
+
+def expand_row(source, target, rid=None, neighbor=None):
+    """构造一条 SUBGRAPH_EXPAND_QUERY 记录"""
+    neighbor = neighbor or target
+    return {"rid": rid or f"{source}->{target}", "source": source, "target": target,
+            "label": "相关", "weight": 1, "id": neighbor, "node_label": neighbor,
+            "type": "Entity", "description": ""}
+
+
+@pytest.mark.unit
+class TestSubgraphExpansion:
+    """测试有界逐层子图扩展"""
+
+    START = {"id": "A", "label": "A", "type": "Entity", "description": ""}
+
+    def test_dedupes_nodes_and_edges(self):
+        """同一条边从两端展开只保留一次"""
+        from backend.core.storage.neo4j import SubgraphExpansion
+
+        expansion = SubgraphExpansion(dict(self.START), n_hops=2)
+        expansion.add_rows([expand_row("A", "B"), expand_row("A", "C")])
+        batch = expansion.add_rows([expand_row("A", "B", neighbor="A"),
+                                    expand_row("B", "C", neighbor="C"),
+                                    expand_row("B", "C", neighbor="B")])
+
+        result = expansion.result()
+        assert [n["id"] for n in result["nodes"]] == ["A", "B", "C"]
+        assert len(result["edges"]) == 3
+        assert batch["nodes"] == []
+        assert expansion.done()
+
+    def test_node_budget_truncates(self):
+        """节点预算用完后停止扩展并标记截断"""
+        from backend.core.storage.neo4j import SubgraphExpansion
+
+        expansion = SubgraphExpansion(dict(self.START), n_hops=3, max_nodes=3)
+        expansion.add_rows([expand_row("A", x) for x in "BCDE"])
+
+        result = expansion.result()
+        assert len(result["nodes"]) == 3
+        assert len(result["edges"]) == 2
+        assert result["truncated"]
+        assert expansion.done()
+
+    def test_edge_budget_truncates(self):
+        """边预算用完后停止"""
+        from backend.core.storage.neo4j import SubgraphExpansion
+
+        expansion = SubgraphExpansion(dict(self.START), n_hops=1, max_edges=2)
+        expansion.add_rows([expand_row("A", x) for x in "BCD"])
+
+        assert len(expansion.result()["edges"]) == 2
+        assert expansion.truncated
+
+    def test_iter_subgraph_level_by_level(self):
+        """每层只展开上一层新发现的节点，并把 fanout 传给查询"""
+        storage, _ = make_storage()
+        session = storage.driver.session.return_value.__enter__.return_value
+        levels = [[expand_row("A", "B")], [expand_row("B", "C")]]
+
+        def run(query, **params):
+            result = MagicMock()
+            if "RETURN n.id as id" in query:
+                result.single.return_value = dict(self.START)
+                return result
+            return levels.pop(0)
+
+        session.run.side_effect = run
+        batches = list(storage.iter_subgraph("A", n_hops=2, fanout=7))
+
+        assert [b["level"] for b in batches] == [0, 1, 2]
+        expand_calls = [c for c in session.run.call_args_list if "$fanout" in c.args[0]]
+        assert [c.kwargs["frontier"] for c in expand_calls] == [["A"], ["B"]]
+        assert all(c.kwargs["fanout"] == 7 for c in expand_calls)
+
+    def test_missing_entity(self):
+        """实体不存在时返回空子图"""
+        storage, _ = make_storage()
+        session = storage.driver.session.return_value.__enter__.return_value
+        session.run.return_value.single.return_value = None
+
+        assert storage.query_subgraph("missing") == {"nodes": [], "edges": [], "truncated": False}
+
+
+@pytest.mark.unit
+class TestGraphPages:
+    """测试键集分页读取全图"""
+
+    def make_paged_storage(self, ids):
+        """按 id 键集分页返回节点，每个节点一条出边"""
+        storage, _ = make_storage()
+        session = storage.driver.session.return_value.__enter__.return_value
+
+        def run(query, **params):
+            if "$cursor" in query:
+                page = [i for i in sorted(ids) if i > params["cursor"]][:params["limit"]]
+                return [{"id": i, "label": i, "type": "Entity", "description": "", "degree": 1}
+                        for i in page]
+            return [{"source": i, "target": "x", "label": "相关", "weight": 1} for i in params["ids"]]
+
+        session.run.side_effect = run
+        return storage, session
+
+    def test_pages_cover_graph_once(self):
+        """分页遍历覆盖全部节点和边，且不重复"""
+        storage, _ = self.make_paged_storage(["a", "b", "c", "d", "e"])
+
+        pages = list(storage.iter_graph_pages(page_size=2))
+
+        assert [len(p["nodes"]) for p in pages] == [2, 2, 1]
+        assert [n["id"] for p in pages for n in p["nodes"]] == ["a", "b", "c", "d", "e"]
+        assert sum(len(p["edges"]) for p in pages) == 5
+        assert pages[-1]["next_cursor"] is None
+
+    def test_exact_multiple_ends_with_empty_page(self):
+        """节点数正好是页大小的整数倍时，最后一次空页不产出"""
+        storage, session = self.make_paged_storage(["a", "b"])
+
+        pages = list(storage.iter_graph_pages(page_size=2))
+
+        assert len(pages) == 1
+        assert pages[0]["next_cursor"] == "b"
+
+    def test_page_resumes_from_cursor(self):
+        """从游标之后继续"""
+        storage, _ = self.make_paged_storage(["a", "b", "c"])
+
+        page = storage.get_graph_page(cursor="a", limit=10)
+
+        assert [n["id"] for n in page["nodes"]] == ["b", "c"]
+        assert page["next_cursor"] is None
@@ -3,8 +3,11 @@ Test Knowledge Graph Normalizer
 测试知识图谱规范化器
 """
 
+import json
+
 import pytest
-from backend.extraction.normalizer import KnowledgeGraphNormalizer
+
+from backend.extraction.normalizer import KnowledgeGraphNormalizer, Provenance, json_default
 
 
 @pytest.mark.unit
@@ -182,3 +185,69 @@ class TestKnowledgeGraphNormalizer:
         assert len(short_desc) <= 53  # 50 + "..."
         if properties:
             assert "numbers" in properties or "times" in properties
+
+
+@pytest.mark.unit
+class TestProvenanceModes:
+    """测试来源数据保留模式"""
+
+    def test_full_mode_keeps_original_copy(self, sample_graph):
+        """full 模式保留完整原始字典"""
+        normalizer = KnowledgeGraphNormalizer({'provenance': 'full'})
+        normalized = normalizer.normalize_graph(sample_graph)
+
+        node = normalized["nodes"][0]
+        assert isinstance(node["original"], dict)
+        assert node["original"]["id"] == sample_graph["nodes"][0]["id"]
+
+    def test_compact_mode_records_index(self, sample_graph):
+        """compact 模式只记录下标和常用字段"""
+        normalizer = KnowledgeGraphNormalizer({'provenance': 'compact'})
+        normalized = normalizer.normalize_graph(sample_graph)
+
+        for node in normalized["nodes"]:
+            provenance = node["original"]
+            assert isinstance(provenance, Provenance)
+            assert sample_graph["nodes"][provenance.index]["id"] == provenance.name
+
+        edge = normalized["edges"][0]
+        assert edge["original"].index == 0
+        assert edge["original"].label == sample_graph["edges"][0]["label"]
+        assert edge["original"].to_dict()["index"] == 0
+
+    def test_compact_provenance_hashable_and_serializable(self, sample_graph):
+        """Provenance 可哈希，compact 模式的图谱可通过 json_default 导出"""
+        normalizer = KnowledgeGraphNormalizer({'provenance': 'compact'})
+        normalized = normalizer.normalize_graph(sample_graph)
+
+        record = normalized["nodes"][0]["original"]
+        assert {record, Provenance(**record.to_dict())} == {record}
+
+        exported = json.loads(json.dumps(normalized, ensure_ascii=False, default=json_default))
+        assert exported["nodes"][0]["original"] == record.to_dict()
+
+    def test_none_mode_drops_original(self, sample_graph):
+        """none 模式不保留来源数据"""
+        normalizer = KnowledgeGraphNormalizer({'provenance': 'none'})
+        normalized = normalizer.normalize_graph(sample_graph)
+
+        assert all("original" not in node for node in normalized["nodes"])
+        assert all("original" not in edge for edge in normalized["edges"])
+
+    def test_modes_produce_same_graph(self, sample_graph):
+        """不同模式的规范化结果一致（除来源数据外）"""
+        def strip(graph):
+            nodes = [{k: v for k, v in n.items() if k != "original"} for n in graph["nodes"]]
+            edges = [{k: v for k, v in e.items() if k != "original"} for e in graph["edges"]]
+            return nodes, edges
+
+        results = [
+            strip(KnowledgeGraphNormalizer({'provenance': mode}).normalize_graph(sample_graph))
+            for mode in ('full', 'compact', 'none')
+        ]
+        assert results[0] == results[1] == results[2]
+
+    def test_invalid_mode(self):
+        """无效模式应报错"""
+        with pytest.raises(ValueError):
+            KnowledgeGraphNormalizer({'provenance': 'bogus'})
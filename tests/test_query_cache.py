@@ -0,0 +1,136 @@
+"""
+Test Query Cache
+测试读查询缓存和管理器的缓存失效
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.management.kg_manager import KnowledgeGraphManager
+from backend.management.query_cache import QueryCache
+
+
+@pytest.mark.unit
+class TestQueryCache:
+    """测试 LRU 缓存和版本号"""
+
+    def test_hit_after_load(self):
+        """第二次读取命中缓存"""
+        cache = QueryCache(max_entries=10, ttl=0, enabled=True)
+        loader = MagicMock(return_value=["doc1"])
+
+        assert cache.get_or_load(("list_documents",), loader) == ["doc1"]
+        assert cache.get_or_load(("list_documents",), loader) == ["doc1"]
+
+        loader.assert_called_once()
+        metrics = cache.get_metrics()
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 1
+        assert metrics["hit_rate"] == 0.5
+
+    def test_lru_eviction(self):
+        """超出容量时淘汰最久未使用的条目"""
+        cache = QueryCache(max_entries=2, ttl=0, enabled=True)
+        cache.get_or_load("a", lambda: 1)
+        cache.get_or_load("b", lambda: 2)
+        cache.get_or_load("a", lambda: 1)
+        cache.get_or_load("c", lambda: 3)
+
+        assert cache.lookup("a")[0] is True
+        assert cache.lookup("b")[0] is False
+        assert cache.get_metrics()["evictions"] == 1
+
+    def test_invalidate_bumps_version(self):
+        """写入后版本号递增，缓存清空"""
+        cache = QueryCache(max_entries=10, ttl=0, enabled=True)
+        cache.get_or_load("a", lambda: 1)
+
+        cache.invalidate()
+
+        assert cache.lookup("a")[0] is False
+        assert cache.get_metrics()["version"] == 1
+
+    def test_stale_result_not_stored(self):
+        """查询期间发生写入时，旧结果不写回缓存"""
+        cache = QueryCache(max_entries=10, ttl=0, enabled=True)
+
+        def loader():
+            cache.invalidate()
+            return "旧结果"
+
+        assert cache.get_or_load("a", loader) == "旧结果"
+        assert cache.lookup("a")[0] is False
+
+    def test_errors_not_cached(self):
+        """查询异常原样抛出，不缓存"""
+        cache = QueryCache(max_entries=10, ttl=0, enabled=True)
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_load("a", MagicMock(side_effect=RuntimeError("connection refused")))
+        assert cache.get_metrics()["size"] == 0
+
+    def test_disabled(self):
+        """关闭缓存时每次都执行查询"""
+        cache = QueryCache(max_entries=10, ttl=0, enabled=False)
+        loader = MagicMock(return_value=1)
+
+        cache.get_or_load("a", loader)
+        cache.get_or_load("a", loader)
+
+        assert loader.call_count == 2
+
+
+@pytest.mark.unit
+class TestManagerQueryCache:
+    """测试管理器的读穿缓存"""
+
+    @pytest.fixture
+    def manager(self, mock_env_vars, monkeypatch):
+        monkeypatch.setenv('QUERY_CACHE_ENABLED', 'true')
+        manager = KnowledgeGraphManager(use_neo4j=False, use_component_index=False)
+        manager.neo4j_storage = MagicMock()
+        manager.neo4j_storage.list_documents.return_value = [{"doc_id": "doc1"}]
+        manager.neo4j_storage.save_graph_batch.return_value = {"nodes_created": 1}
+        manager.neo4j_storage.document_entity_ids.return_value = []
+        return manager
+
+    def test_repeat_reads_skip_neo4j(self, manager):
+        """两次写入之间重复读取不访问 Neo4j"""
+        manager.list_documents()
+        manager.list_documents()
+
+        manager.neo4j_storage.list_documents.assert_called_once()
+
+    def test_cache_keyed_by_arguments(self, manager):
+        """不同参数分别缓存"""
+        manager.query_subgraph("定投", 1)
+        manager.query_subgraph("定投", 2)
+        manager.query_subgraph("定投", 1)
+
+        assert manager.neo4j_storage.query_subgraph.call_count == 2
+
+    def test_save_and_delete_invalidate(self, manager, sample_graph):
+        """保存和删除文档后重新查询"""
+        manager.list_documents()
+        manager.save_document("doc2", sample_graph)
+        manager.list_documents()
+        manager.delete_document("doc2")
+        manager.list_documents()
+
+        assert manager.neo4j_storage.list_documents.call_count == 3
+
+    def test_async_reads_share_cache(self, manager):
+        """异步驱动的查询结果同样缓存"""
+        storage = MagicMock()
+
+        async def get_popular_labels(limit):
+            return ["定投"]
+
+        storage.get_popular_labels.side_effect = get_popular_labels
+        manager._async_storage = storage
+
+        assert asyncio.run(manager.aget_popular_labels(5)) == ["定投"]
+        assert asyncio.run(manager.aget_popular_labels(5)) == ["定投"]
+        assert storage.get_popular_labels.call_count == 1
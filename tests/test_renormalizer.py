@@ -0,0 +1,183 @@
+"""
+Test Graph Renormalization Job
+测试全量图谱重新规范化任务
+"""
+
+import json
+
+import pytest
+
+from backend.extraction.normalizer import KnowledgeGraphNormalizer
+from backend.management.renormalizer import GraphRenormalizationJob
+
+
+class FakeStorage:
+    """内存中的假 Neo4jStorage（只实现重新规范化用到的方法），记录写入调用"""
+
+    def __init__(self, nodes, edges):
+        self.nodes = nodes
+        self.edges = edges
+        self.writes = []
+
+    def get_entity_page(self, cursor, limit):
+        return sorted((dict(n) for n in self.nodes if n["id"] > cursor),
+                      key=lambda n: n["id"])[:limit]
+
+    def get_relation_page(self, cursor, limit):
+        sources = sorted(n["id"] for n in self.nodes if n["id"] > cursor)[:limit]
+        if not sources:
+            return [], None
+        return [dict(e) for e in self.edges if e["source"] in sources], sources[-1]
+
+    def existing_entity_ids(self, ids):
+        return {n["id"] for n in self.nodes} & set(ids)
+
+    def set_entity_types(self, rows):
+        self.writes.append(("set_entity_types", rows))
+        return len(rows)
+
+    def rename_entity(self, old_id, new_id):
+        self.writes.append(("rename_entity", old_id, new_id))
+        source = next((n for n in self.nodes if n["id"] == old_id), None)
+        if source is None:
+            return {"renamed": 0, "merged": 0, "relations_moved": 0}
+        if any(n["id"] == new_id for n in self.nodes):
+            self.nodes.remove(source)
+            return {"renamed": 0, "merged": 1, "relations_moved": 0}
+        source["id"] = new_id
+        return {"renamed": 1, "merged": 0, "relations_moved": 0}
+
+    def relabel_relations(self, rows):
+        self.writes.append(("relabel_relations", rows))
+        return len(rows)
+
+    def retype_relations(self, rel_type, rows):
+        self.writes.append(("retype_relations", rel_type, rows))
+        return len(rows)
+
+
+class RecordingCoordinator:
+    """记录每次写入占用的实体，直接执行写入"""
+
+    def __init__(self):
+        self.keys = []
+
+    def run(self, entity_ids, write):
+        self.keys.append(set(entity_ids))
+        return write()
+
+
+@pytest.fixture
+def storage():
+    """内存中的假 Neo4jStorage"""
+    return FakeStorage(
+        nodes=[
+            {"id": "《定投》", "type": "Concept", "description": None},
+            {"id": "定投", "type": "Concept", "description": None},
+            {"id": "长期投资", "type": "Concept", "description": None},
+        ],
+        edges=[
+            {"source": "长期投资", "rid": "r1", "type": "CONTAINS", "label": "包含", "target": "定投"},
+            {"source": "长期投资", "rid": "r2", "type": "RELATES", "label": "提及", "target": "定投"},
+        ]
+    )
+
+
+@pytest.fixture
+def coordinator():
+    return RecordingCoordinator()
+
+
+@pytest.fixture
+def normalizer():
+    """把"包含"规范化为"包括"、"提及"规范化为"提到"的规范化器"""
+    return KnowledgeGraphNormalizer({
+        'provenance': 'none',
+        'standard_relations': {'包含': '包括', '提及': '提到'}
+    })
+
+
+@pytest.mark.unit
+class TestGraphRenormalizationJob:
+    """测试重新规范化任务"""
+
+    def make_job(self, storage, normalizer, tmp_path, coordinator=None, **kwargs):
+        return GraphRenormalizationJob(storage, normalizer,
+                                       checkpoint_path=str(tmp_path / "renormalize.json"),
+                                       coordinator=coordinator, **kwargs)
+
+    def test_dry_run_reports_without_writing(self, storage, normalizer, coordinator, tmp_path):
+        """dry-run 只生成差异报告，不写入也不合并"""
+        job = self.make_job(storage, normalizer, tmp_path, coordinator, page_size=2, dry_run=True)
+        report = job.run()
+
+        assert report["phase"] == "done"
+        assert report["stats"]["nodes_scanned"] == 3
+        assert report["stats"]["nodes_merged"] == 1
+        assert report["samples"]["merge"] == [{"from": "《定投》", "to": "定投"}]
+        assert report["stats"]["edges_relabeled"] == 1
+        assert report["samples"]["relabel"][0]["to"] == "提到"
+        assert report["stats"]["edges_retyped"] == 1
+        assert report["samples"]["retype"][0]["to"] == "INCLUDES"
+
+        assert storage.writes == []
+        assert coordinator.keys == []
+        assert not (tmp_path / "renormalize.json").exists()
+        assert (tmp_path / "renormalize_report.json").exists()
+
+    def test_run_writes_through_storage_and_coordinator(self, storage, normalizer, coordinator, tmp_path):
+        """正式运行时经存储方法写入，每次写入占用涉及实体的分片"""
+        job = self.make_job(storage, normalizer, tmp_path, coordinator, page_size=2)
+        report = job.run()
+
+        assert ("rename_entity", "《定投》", "定投") in storage.writes
+        assert ("relabel_relations", [{"rid": "r2", "label": "提到"}]) in storage.writes
+        assert ("retype_relations", "INCLUDES", [{"rid": "r1", "label": "包括"}]) in storage.writes
+        assert {"《定投》", "定投"} in coordinator.keys
+        assert coordinator.keys.count({"长期投资", "定投"}) == 2
+        assert report["stats"]["nodes_merged"] == 1
+
+        with open(tmp_path / "renormalize.json", encoding='utf-8') as f:
+            assert json.load(f)["phase"] == "done"
+
+    def test_merges_counted_from_storage_result(self, storage, normalizer, coordinator, tmp_path):
+        """合并数以存储实际返回的 merged 为准：目标不存在时存储直接改名，不计为合并"""
+        storage.nodes = [n for n in storage.nodes if n["id"] != "定投"]
+
+        report = self.make_job(storage, normalizer, tmp_path, coordinator).run()
+
+        assert report["stats"]["nodes_merged"] == 0
+        assert report["stats"]["nodes_renamed"] == 1
+        assert report["samples"]["rename"] == [{"from": "《定投》", "to": "定投"}]
+
+    def test_failed_rename_does_not_abort_page(self, storage, normalizer, coordinator, tmp_path):
+        """单个节点重命名失败只计入失败数，同页其他写入继续"""
+        storage.nodes.append({"id": "《长期投资》", "type": "Concept", "description": None})
+        original = storage.rename_entity
+
+        def rename(old_id, new_id):
+            if old_id == "《定投》":
+                raise RuntimeError("constraint violation")
+            return original(old_id, new_id)
+
+        storage.rename_entity = rename
+        report = self.make_job(storage, normalizer, tmp_path, coordinator).run()
+
+        assert report["stats"]["failed"] == 1
+        assert report["stats"]["nodes_merged"] == 1
+        assert report["samples"]["merge"] == [{"from": "《长期投资》", "to": "长期投资"}]
+
+    def test_resume_from_checkpoint(self, storage, normalizer, coordinator, tmp_path):
+        """从检查点续跑时跳过已完成的阶段"""
+        checkpoint = tmp_path / "renormalize.json"
+        job = self.make_job(storage, normalizer, tmp_path, coordinator)
+        state = job._new_state()
+        state["phase"] = "edges"
+        state["cursor"] = "长期投资"
+        checkpoint.write_text(json.dumps(state), encoding='utf-8')
+
+        report = job.run()
+
+        assert report["stats"]["nodes_scanned"] == 0
+        assert report["stats"]["edges_scanned"] == 0
+        assert storage.writes == []
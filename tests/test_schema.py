@@ -0,0 +1,163 @@
+"""
+Test Schema Manager
+测试 Neo4j schema 迁移管理器（模拟驱动，不需要真实数据库）
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.core.storage.neo4j import DEGREE_MIGRATION_VERSION
+from backend.core.storage.schema import MIGRATIONS, Migration, SchemaManager
+
+
+class FakeSchemaSession:
+    """记录查询，并模拟 (:SchemaMigration) 版本记录"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def run(self, query, **params):
+        self.db["queries"].append(query)
+        result = MagicMock()
+        if "max(m.version)" in query:
+            result.single.return_value = {"version": max(self.db["versions"], default=None)}
+        elif "MERGE (m:SchemaMigration" in query:
+            self.db["versions"].append(params["version"])
+        elif "SHOW INDEXES" in query:
+            result.__iter__.return_value = iter(self.db["indexes"])
+        for statement in self.db["fail_on"]:
+            if statement in query:
+                raise RuntimeError("constraint violation")
+        return result
+
+
+def make_storage(versions=None, fail_on=()):
+    """创建使用模拟驱动的存储，返回 (storage, db)"""
+    db = {"queries": [], "versions": list(versions or []), "fail_on": list(fail_on),
+          "indexes": [{"name": "entity_id_unique", "state": "ONLINE"},
+                      {"name": "entity_fulltext", "state": "POPULATING"}]}
+    storage = MagicMock()
+    storage.schema_state = {}
+    storage.driver.session.side_effect = lambda: FakeSchemaSession(db)
+    return storage, db
+
+
+@pytest.mark.unit
+class TestSchemaMigrations:
+    """测试迁移执行"""
+
+    def test_migrations_ordered_and_unique(self):
+        """迁移版本号唯一且递增"""
+        versions = [m.version for m in MIGRATIONS]
+        assert versions == sorted(set(versions))
+
+    def test_degree_migration_version(self):
+        """读查询判断度数是否已回填所用的版本号与 entity_degree 迁移一致"""
+        degree = next(m for m in MIGRATIONS if m.name == "entity_degree")
+        assert degree.version == DEGREE_MIGRATION_VERSION
+
+    def test_fresh_database_applies_all(self):
+        """空库执行全部迁移并记录版本"""
+        storage, db = make_storage()
+
+        state = SchemaManager(storage).migrate()
+
+        assert state["version"] == MIGRATIONS[-1].version
+        assert state["latest"] == MIGRATIONS[-1].version
+        assert len(state["applied"]) == len(MIGRATIONS)
+        assert "error" not in state
+        assert storage.schema_state == state
+
+        text = "\n".join(db["queries"])
+        assert "REQUIRE n.id IS UNIQUE" in text
+        assert "DROP INDEX entity_id_index" in text
+        assert "FULLTEXT INDEX entity_fulltext" in text
+        assert "ON (r.doc_id)" in text
+        storage.merge_duplicate_ids.assert_called_once()
+        storage.migrate_document_catalog.assert_called_once()
+
+    def test_duplicates_merged_before_constraint(self):
+        """先合并重复实体，再创建唯一约束"""
+        storage, db = make_storage()
+        order = []
+        storage.merge_duplicate_ids.side_effect = lambda: order.append(len(db["queries"]))
+
+        SchemaManager(storage).migrate()
+
+        constraint_at = next(i for i, q in enumerate(db["queries"]) if "entity_id_unique" in q)
+        assert order[0] <= constraint_at
+
+    def test_up_to_date_database_is_noop(self):
+        """已是最新版本时不执行任何迁移"""
+        storage, db = make_storage(versions=[m.version for m in MIGRATIONS])
+
+        state = SchemaManager(storage).migrate()
+
+        assert state["applied"] == []
+        assert not any("CREATE" in q for q in db["queries"])
+        storage.merge_duplicate_ids.assert_not_called()
+
+    def test_resume_from_recorded_version(self):
+        """只执行记录版本之后的迁移"""
+        storage, db = make_storage(versions=[1, 2, 3])
+
+        state = SchemaManager(storage).migrate()
+
+        assert state["applied"] == [m.name for m in MIGRATIONS if m.version > 3]
+        storage.migrate_document_catalog.assert_not_called()
+
+    def test_failure_stops_and_reports(self):
+        """迁移失败时停止，后续版本保持待执行"""
+        storage, db = make_storage(fail_on=["entity_type_index"])
+
+        state = SchemaManager(storage).migrate()
+
+        assert state["version"] == 1
+        assert "constraint violation" in state["error"]
+        assert state["applied"] == ["entity_id_unique"]
+        assert not any("FULLTEXT" in q for q in db["queries"])
+
+    def test_custom_migrations_sorted(self):
+        """自定义迁移按版本号排序执行"""
+        storage, db = make_storage()
+        migrations = [Migration(2, "b", ["CREATE INDEX b"]), Migration(1, "a", ["CREATE INDEX a"])]
+
+        state = SchemaManager(storage, migrations).migrate()
+
+        assert state["applied"] == ["a", "b"]
+
+
+@pytest.mark.unit
+class TestSchemaState:
+    """测试 schema 状态查询"""
+
+    def test_get_state(self):
+        """报告版本、待执行迁移和索引状态"""
+        storage, db = make_storage(versions=[1, 2])
+
+        state = SchemaManager(storage).get_state()
+
+        assert state["version"] == 2
+        assert state["pending"] == [m.name for m in MIGRATIONS if m.version > 2]
+        assert state["indexes_online"] == 1
+        assert state["indexes_total"] == 2
+
+    def test_manager_schema_state(self, mock_env_vars):
+        """KG 管理器根据迁移结果报告状态"""
+        from backend.management.kg_manager import KnowledgeGraphManager
+
+        manager = KnowledgeGraphManager(use_neo4j=False)
+        assert manager.get_schema_state() == {"status": "disabled"}
+
+        manager.neo4j_storage = MagicMock()
+        manager.neo4j_storage.schema_state = {"version": 5, "latest": 5, "applied": []}
+        assert manager.get_schema_state()["status"] == "ok"
+
+        manager.neo4j_storage.schema_state = {"version": 1, "latest": 5, "error": "boom"}
+        assert manager.get_schema_state()["status"] == "error"
@@ -0,0 +1,256 @@
+"""
+Test SQLite Graph Storage
+测试嵌入式 SQLite 图谱存储（与 Neo4jStorage 接口一致）
+"""
+
+import pytest
+from unittest.mock import patch
+
+from backend.core.storage.sqlite_graph import SQLiteGraphStorage
+from backend.management.kg_manager import KnowledgeGraphManager
+
+
+GRAPH_A = {
+    "nodes": [
+        {"id": "李笑来", "label": "李笑来", "type": "人物", "description": ""},
+        {"id": "财富自由之路", "label": "财富自由之路", "type": "作品", "description": "一本书"},
+        {"id": "注意力", "label": "注意力", "type": "概念", "description": "稀缺资源"}
+    ],
+    "edges": [
+        {"source": "李笑来", "target": "财富自由之路", "label": "著作"},
+        {"source": "财富自由之路", "target": "注意力", "label": "讨论"}
+    ]
+}
+
+GRAPH_B = {
+    "nodes": [
+        {"id": "李笑来", "label": "李笑来", "type": "人物", "description": "作者、投资人"},
+        {"id": "定投", "label": "定投", "type": "概念", "description": "定期投资"}
+    ],
+    "edges": [
+        {"source": "李笑来", "target": "定投", "label": "提出"}
+    ]
+}
+
+
+def ids(nodes):
+    return sorted(node["id"] for node in nodes)
+
+
+@pytest.fixture
+def storage():
+    storage = SQLiteGraphStorage(":memory:")
+    yield storage
+    storage.close()
+
+
+@pytest.mark.unit
+class TestSQLiteGraphWrite:
+    """测试写入与读取"""
+
+    def test_save_and_load(self, storage):
+        """保存后按文档读取节点和边"""
+        stats = storage.save_graph_batch(GRAPH_A, "doc_a")
+
+        assert stats["nodes_created"] == 3
+        assert stats["edges_created"] == 2
+        assert stats["failed"] == 0
+
+        graph = storage.load_document("doc_a")
+        assert ids(graph["nodes"]) == ["李笑来", "注意力", "财富自由之路"]
+        assert len(graph["edges"]) == 2
+        assert all(node["doc_ids"] == ["doc_a"] for node in graph["nodes"])
+
+    def test_list_documents_and_stats(self, storage):
+        """文档目录记录节点数和边数"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+
+        documents = {doc["doc_id"]: doc for doc in storage.list_documents()}
+        assert documents["doc_a"]["node_count"] == 3
+        assert documents["doc_a"]["edge_count"] == 2
+        assert documents["doc_b"]["node_count"] == 2
+
+        assert storage.get_stats() == {"total_nodes": 4, "total_edges": 3, "total_documents": 2}
+
+    def test_shared_node_fills_description(self, storage):
+        """共享实体：空描述由后写入的文档补全，两个文档都关联该实体"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+
+        node = next(n for n in storage.load_document("doc_a")["nodes"] if n["id"] == "李笑来")
+        assert node["description"] == "作者、投资人"
+        assert sorted(node["doc_ids"]) == ["doc_a", "doc_b"]
+
+    def test_edge_with_missing_endpoint_rejected(self, storage):
+        """端点不存在的边计入失败"""
+        graph = {"nodes": GRAPH_A["nodes"],
+                 "edges": GRAPH_A["edges"] + [{"source": "李笑来", "target": "不存在", "label": "相关"}]}
+        stats = storage.save_graph_batch(graph, "doc_a")
+
+        assert stats["edges_created"] == 2
+        assert stats["failed"] == 1
+
+    def test_edge_with_foreign_endpoint_rejected(self, storage):
+        """端点属于其他文档、不在本文档节点中的边剔除，删除文档后不留下"""
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+        graph = {"nodes": GRAPH_A["nodes"],
+                 "edges": GRAPH_A["edges"] + [{"source": "定投", "target": "注意力", "label": "相关"}]}
+
+        stats = storage.save_graph_batch(graph, "doc_a")
+        storage.delete_by_doc("doc_a")
+
+        assert stats["failed"] == 1
+        assert storage.get_stats()["total_edges"] == 1
+
+    def test_overwrite_replaces_footprint(self, storage):
+        """覆盖保存先删除旧数据，共享实体保留"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+
+        stats = storage.save_graph_batch(GRAPH_B, "doc_a")
+
+        assert stats["deleted_edges"] == 2
+        assert stats["deleted_nodes"] == 2  # 财富自由之路、注意力；李笑来仍属于 doc_b
+        assert ids(storage.load_document("doc_a")["nodes"]) == ["定投", "李笑来"]
+        assert storage.get_stats()["total_nodes"] == 2
+
+    def test_degrees_refreshed(self, storage):
+        """度数随写入和删除更新"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+        assert storage.get_popular_labels(1)[0] in ("李笑来", "财富自由之路")
+
+        storage.delete_by_doc("doc_a")
+        degrees = {node["id"]: node["degree"] for node in storage.get_graph_page()["nodes"]}
+        assert degrees == {"李笑来": 1, "定投": 1}
+
+
+@pytest.mark.unit
+class TestSQLiteGraphDelete:
+    """测试删除"""
+
+    def test_delete_by_doc(self, storage):
+        """删除文档只移除其独有的实体"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+
+        result = storage.delete_by_doc("doc_a")
+
+        assert result == {"nodes_deleted": 2, "edges_deleted": 2}
+        assert [doc["doc_id"] for doc in storage.list_documents()] == ["doc_b"]
+        assert ids(storage.load_document("doc_b")["nodes"]) == ["定投", "李笑来"]
+
+    def test_iter_delete_batches(self, storage):
+        """分批删除：批次之和等于全部数据，文档行由 delete_document_node 删除"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+
+        batches = list(storage.iter_delete_batches("doc_a", batch_size=1))
+
+        assert sum(batch["deleted_edges"] for batch in batches) == 2
+        assert sum(batch["deleted_nodes"] for batch in batches) == 3
+        assert len(batches) > 2
+        assert storage.get_stats()["total_documents"] == 1
+
+        storage.delete_document_node("doc_a")
+        assert storage.get_stats() == {"total_nodes": 0, "total_edges": 0, "total_documents": 0}
+
+
+@pytest.mark.unit
+class TestSQLiteGraphMaintenance:
+    """测试实体合并和跨文档关联"""
+
+    def test_merge_entities(self, storage):
+        """关系迁移到目标实体，文档关联取并集"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch({
+            "nodes": [{"id": "李笑来老师", "label": "李笑来老师", "type": "人物"},
+                      {"id": "定投", "label": "定投", "type": "概念"}],
+            "edges": [{"source": "李笑来老师", "target": "定投", "label": "提出"}]
+        }, "doc_b")
+
+        stats = storage.merge_entities("李笑来老师", "李笑来")
+
+        assert stats == {"merged": 1, "relations_moved": 1}
+        node = next(n for n in storage.load_document("doc_b")["nodes"] if n["id"] == "李笑来")
+        assert sorted(node["doc_ids"]) == ["doc_a", "doc_b"]
+        subgraph = storage.query_subgraph("定投")
+        assert "李笑来" in ids(subgraph["nodes"])
+
+    def test_merge_missing_entity_noop(self, storage):
+        """任一实体不存在时不合并"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        assert storage.merge_entities("不存在", "李笑来") == {"merged": 0, "relations_moved": 0}
+
+    def test_link_entities(self, storage):
+        """跨文档关联写入新边"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+
+        result = storage.link_entities([{"source": "注意力", "target": "定投", "relation": "相关"}])
+
+        assert result["edges_created"] == 1
+        assert "定投" in ids(storage.query_subgraph("注意力")["nodes"])
+
+
+@pytest.mark.unit
+class TestSQLiteGraphRead:
+    """测试子图查询和分页"""
+
+    def test_query_subgraph_hops(self, storage):
+        """N 跳子图按跳数扩展"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+
+        one_hop = storage.query_subgraph("财富自由之路", n_hops=1)
+        two_hop = storage.query_subgraph("财富自由之路", n_hops=2)
+
+        assert ids(one_hop["nodes"]) == ["李笑来", "注意力", "财富自由之路"]
+        assert "定投" in ids(two_hop["nodes"])
+        assert len(two_hop["edges"]) == 3
+        assert storage.query_subgraph("不存在")["nodes"] == []
+
+    def test_graph_pages_cover_graph(self, storage):
+        """分页遍历覆盖全部节点，每条边只出现一次"""
+        storage.save_graph_batch(GRAPH_A, "doc_a")
+        storage.save_graph_batch(GRAPH_B, "doc_b")
+
+        pages = list(storage.iter_graph_pages(page_size=2))
+
+        assert len(pages) == 2
+        assert sorted(node["id"] for page in pages for node in page["nodes"]) == \
+            ["定投", "李笑来", "注意力", "财富自由之路"]
+        assert sum(len(page["edges"]) for page in pages) == 3
+
+
+@pytest.mark.unit
+class TestManagerSQLiteBackend:
+    """测试 KnowledgeGraphManager 使用 SQLite 后端"""
+
+    @pytest.fixture
+    def manager(self, storage):
+        with patch('backend.management.kg_manager.get_sqlite_graph_storage', return_value=storage):
+            yield KnowledgeGraphManager(graph_backend='sqlite', use_entity_resolution=False,
+                                        use_component_index=False)
+
+    def test_backend_selected(self, manager, storage):
+        """graph_backend='sqlite' 时使用 SQLite 存储"""
+        assert manager.graph_backend == 'sqlite'
+        assert manager.neo4j_storage is storage
+
+    def test_save_load_delete(self, manager):
+        """保存、读取、检索索引、删除走同一存储"""
+        manager.save_document("doc_a", GRAPH_A)
+
+        graph = manager.load_document("doc_a")
+        assert ids(graph["nodes"]) == ["李笑来", "注意力", "财富自由之路"]
+
+        index = manager.get_graph_index()
+        assert index.has("注意力")
+
+        manager.delete_document("doc_a")
+        assert manager.load_document("doc_a")["nodes"] == []
+
+    def test_renormalize_not_supported(self, manager):
+        """重新规范化仅支持 Neo4j"""
+        assert "error" in manager.renormalize_graph(dry_run=True)
@@ -0,0 +1,188 @@
+"""
+Test Write Coordinator
+测试并发写入协调器（实体分片、瞬时错误重试）
+"""
+
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.core.storage.neo4j import node_rows, edge_rows_by_type
+from backend.management.kg_manager import KnowledgeGraphManager
+from backend.management.write_coordinator import WriteCoordinator
+
+
+class DeadlockError(Exception):
+    """模拟 Neo4j 的 TransientError"""
+    code = "Neo.TransientError.Transaction.DeadlockDetected"
+
+
+@pytest.mark.unit
+class TestWriteCoordinator:
+    """测试分片协调和重试"""
+
+    def test_disjoint_writes_run_in_parallel(self):
+        """没有共同分片的写入不互相等待"""
+        coordinator = WriteCoordinator(shards=4096)
+        barrier = threading.Barrier(2, timeout=2)
+
+        def write(ids):
+            # 两个写入必须同时处于临界区，barrier 才能通过
+            coordinator.run(ids, barrier.wait)
+
+        threads = [threading.Thread(target=write, args=(["李笑来"],)),
+                   threading.Thread(target=write, args=(["指数基金"],))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        metrics = coordinator.get_metrics()
+        assert metrics["writes"] == 2
+        assert metrics["conflicts"] == 0
+
+    def test_conflicting_writes_serialized(self):
+        """共享实体的写入排队执行"""
+        coordinator = WriteCoordinator(shards=4096)
+        active = []
+        overlaps = []
+
+        def write():
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.05)
+            active.pop()
+
+        threads = [threading.Thread(target=coordinator.run, args=(["李笑来", f"概念{i}"], write))
+                   for i in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert max(overlaps) == 1
+        assert coordinator.get_metrics()["conflicts"] >= 1
+        assert coordinator.get_metrics()["in_flight"] == 0
+
+    def test_waiting_large_write_not_overtaken(self):
+        """冲突的写入按到达顺序执行：后到的小写入不能越过等待中的大写入，不冲突的写入照常执行"""
+        coordinator = WriteCoordinator(shards=4096)
+        order = []
+
+        def wait_for_waiters(count):
+            deadline = time.time() + 2
+            while len(coordinator._waiting) < count and time.time() < deadline:
+                time.sleep(0.005)
+
+        def write(name, ids):
+            with coordinator.hold(ids):
+                order.append(name)
+
+        with coordinator.hold(["李笑来"]):
+            large = threading.Thread(target=write, args=("large", ["李笑来", "指数基金"]))
+            large.start()
+            wait_for_waiters(1)
+
+            small = threading.Thread(target=write, args=("small", ["指数基金"]))
+            small.start()
+            wait_for_waiters(2)
+
+            # 与等待中的写入都不冲突，直接执行
+            write("other", ["长期主义"])
+            assert order == ["other"]
+
+        large.join(timeout=2)
+        small.join(timeout=2)
+        assert order == ["other", "large", "small"]
+        assert coordinator._waiting == {}
+
+    def test_transient_error_retried(self):
+        """死锁重试后成功"""
+        coordinator = WriteCoordinator(shards=16, max_retries=3, base_delay=0)
+        write = MagicMock(side_effect=[DeadlockError("deadlock"), DeadlockError("deadlock"), "ok"])
+
+        assert coordinator.run(["定投"], write) == "ok"
+        metrics = coordinator.get_metrics()
+        assert metrics["retries"] == 2
+        assert metrics["writes"] == 1
+
+    def test_retries_exhausted(self):
+        """超过最大重试次数后抛出并计入失败"""
+        coordinator = WriteCoordinator(shards=16, max_retries=1, base_delay=0)
+        write = MagicMock(side_effect=DeadlockError("deadlock"))
+
+        with pytest.raises(DeadlockError):
+            coordinator.run(["定投"], write)
+        assert write.call_count == 2
+        assert coordinator.get_metrics()["failed"] == 1
+
+    def test_other_errors_not_retried(self):
+        """非瞬时错误直接抛出，并释放分片"""
+        coordinator = WriteCoordinator(shards=16, max_retries=3, base_delay=0)
+        write = MagicMock(side_effect=ValueError("bad data"))
+
+        with pytest.raises(ValueError):
+            coordinator.run(["定投"], write)
+        assert write.call_count == 1
+        assert coordinator.run(["定投"], lambda: "ok") == "ok"
+
+
+@pytest.mark.unit
+class TestWriteOrdering:
+    """测试写入行按实体 ID 排序"""
+
+    def test_rows_sorted_by_id(self):
+        """节点按 id、边按 (source, target) 排序，并发事务以相同顺序加锁"""
+        rows, _ = node_rows([{"id": "b"}, {"id": "a"}, {"id": "c"}])
+        grouped, _ = edge_rows_by_type([
+            {"source": "b", "target": "a", "label": "推荐"},
+            {"source": "a", "target": "c", "label": "推荐"}
+        ])
+
+        assert [row["id"] for row in rows] == ["a", "b", "c"]
+        assert [row["source"] for row in grouped["RECOMMENDS"]] == ["a", "b"]
+
+
+@pytest.mark.unit
+class TestManagerWriteCoordination:
+    """测试管理器通过协调器写入"""
+
+    def test_save_locks_new_and_existing_entities(self, mock_env_vars, sample_graph):
+        """写入键包含新图谱实体和文档已有实体"""
+        manager = KnowledgeGraphManager(use_neo4j=False, use_component_index=False)
+        manager.neo4j_storage = MagicMock()
+        manager.neo4j_storage.document_entity_ids.return_value = ["旧实体"]
+        manager.neo4j_storage.save_graph_batch.return_value = {"nodes_created": 1}
+        manager.write_coordinator = MagicMock()
+        manager.write_coordinator.run.side_effect = lambda keys, write: write()
+
+        stats = manager.save_document("doc1", sample_graph)
+
+        keys = manager.write_coordinator.run.call_args.args[0]
+        assert "旧实体" in keys
+        assert {node["id"] for node in sample_graph["nodes"]} <= keys
+        assert stats["neo4j"] == {"nodes_created": 1}
+
+    def test_resave_reuses_recorded_entities(self, mock_env_vars, sample_graph):
+        """再次保存同一文档时使用上次写入的实体作为写入键，不再查询存储"""
+        manager = KnowledgeGraphManager(use_neo4j=False, use_component_index=False)
+        manager.neo4j_storage = MagicMock()
+        manager.neo4j_storage.document_entity_ids.return_value = []
+        manager.neo4j_storage.save_graph_batch.return_value = {"nodes_created": 1}
+        manager.write_coordinator = MagicMock()
+        manager.write_coordinator.run.side_effect = lambda keys, write: write()
+
+        manager.save_document("doc1", sample_graph)
+        first_ids = {node["id"] for node in sample_graph["nodes"]}
+        manager.save_document("doc1", {"nodes": [{"id": "新实体"}], "edges": [], "stats": {}})
+
+        assert manager.neo4j_storage.document_entity_ids.call_count == 1
+        keys = manager.write_coordinator.run.call_args.args[0]
+        assert first_ids | {"新实体"} <= keys
+
+        # 删除后记录失效，重新查询
+        manager.delete_document("doc1")
+        manager.save_document("doc1", sample_graph)
+        assert manager.neo4j_storage.document_entity_ids.call_count == 2